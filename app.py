@@ -1,11 +1,46 @@
 
 from flask import Flask, render_template, request
+import os
 import requests
 
 app = Flask(__name__)
 
 API_URL = "http://127.0.0.1:8000"
 
+# Usuario de la API: el listado de productos exige un token Bearer
+API_USER = os.getenv("COMICSTORE_API_USER", "")
+API_PASSWORD = os.getenv("COMICSTORE_API_PASSWORD", "")
+token_api = {"access_token": None}
+
+# Última lista de productos recibida y su ETag: si el catálogo no cambió la
+# API responde 304 sin cuerpo y se reutiliza la lista guardada
+cache_productos = {"etag": None, "productos": []}
+
+def autorizacion(renovar=False):
+    """Cabecera Authorization; inicia sesión la primera vez o si se pide renovar."""
+    if renovar or not token_api["access_token"]:
+        response = requests.post(f"{API_URL}/auth/login", data={"username": API_USER, "password": API_PASSWORD})
+        response.raise_for_status()
+        token_api["access_token"] = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token_api['access_token']}"}
+
+def obtener_productos():
+    headers = autorizacion()
+    if cache_productos["etag"]:
+        headers["If-None-Match"] = cache_productos["etag"]
+    response = requests.get(f"{API_URL}/productos/", headers=headers)
+    if response.status_code == 401:
+        # Token caducado: iniciar sesión de nuevo y repetir una vez
+        headers.update(autorizacion(renovar=True))
+        response = requests.get(f"{API_URL}/productos/", headers=headers)
+    if response.status_code == 304:
+        return cache_productos["productos"]
+    response.raise_for_status()
+    productos = response.json()
+    if response.headers.get("ETag"):
+        cache_productos.update(etag=response.headers["ETag"], productos=productos)
+    return productos
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -13,8 +48,7 @@ def index():
 @app.route('/productos')
 def productos():
     try:
-        response = requests.get(f"{API_URL}/productos")
-        productos = response.json()
+        productos = obtener_productos()
     except:
         productos = []
     return render_template('productos.html', productos=productos)
@@ -56,8 +90,7 @@ def clientes():
 @app.route('/pos')
 def pos():
     try:
-        response = requests.get(f"{API_URL}/productos")
-        productos = response.json()
+        productos = obtener_productos()
     except:
         productos = []
     return render_template('POS.html', productos=productos)
@@ -0,0 +1,269 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+from ..database import get_db
+from ..core.auditoria import audit_log
+from ..core.auth import password_hasher
+from ..core.catalog_version import catalog_version
+from ..core.pool_metrics import pool_registry
+from ..core.query_metrics import query_metrics
+from ..core.reference_data import reference_data
+from ..core.request_metrics import request_metrics
+from ..core.search import catalog_search
+from ..core.stock import verificar_alertas
+from ..core.stock_stream import stock_stream
+from ..core.user_cache import user_cache
+from ..dependencies import get_admin_user
+from ..models.empleados import Empleados
+
+router = APIRouter()
+
+# Obtener métricas del pool de conexiones
+@router.get("/pool", summary="Obtener métricas del pool de conexiones")
+async def get_pool_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve, por motor de base de datos, el estado del pool (conexiones en uso,
+    overflow), el histograma de espera en el checkout y los contadores de conexiones.
+
+    Requiere permisos de administrador.
+    """
+    return {name: metrics.snapshot() for name, metrics in pool_registry.items()}
+
+# Reiniciar métricas del pool
+@router.post("/pool/reset", status_code=status.HTTP_204_NO_CONTENT, summary="Reiniciar métricas del pool")
+async def reset_pool_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Reinicia los contadores e histogramas del pool (los indicadores instantáneos no cambian).
+
+    Requiere permisos de administrador.
+    """
+    for metrics in pool_registry.values():
+        metrics.reset()
+    return None
+
+
+# Obtener estadísticas de la caché de usuarios autenticados
+@router.get("/user-cache", summary="Obtener estadísticas de la caché de usuarios")
+async def get_user_cache_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve aciertos, fallos, invalidaciones y ocupación de la caché de usuarios.
+
+    Requiere permisos de administrador.
+    """
+    return user_cache.stats()
+
+# Vaciar la caché de usuarios autenticados
+@router.delete("/user-cache", status_code=status.HTTP_204_NO_CONTENT, summary="Vaciar caché de usuarios")
+async def clear_user_cache(
+    db: AsyncSession = Depends(get_db),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Elimina todas las entradas de la caché de usuarios autenticados, en este
+    proceso al momento y en los demás workers en su siguiente sondeo.
+
+    Requiere permisos de administrador.
+    """
+    await user_cache.bump(db)
+    await db.commit()
+    user_cache.clear()
+    return None
+
+
+# Obtener métricas del pool de hash de contraseñas
+@router.get("/password-hasher", summary="Obtener métricas del hash de contraseñas")
+async def get_password_hasher_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve la profundidad de la cola, operaciones en curso, rechazos y tiempos
+    medios del pool que ejecuta bcrypt.
+
+    Requiere permisos de administrador.
+    """
+    return password_hasher.stats()
+
+# Obtener estado de los catálogos en memoria
+@router.get("/reference-data", summary="Obtener estado de los catálogos en memoria")
+async def get_reference_data_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve el número de registros y la hora de carga de cada catálogo en memoria.
+
+    Requiere permisos de administrador.
+    """
+    return reference_data.stats()
+
+# Forzar recarga de los catálogos en memoria
+@router.post("/reference-data/reload", summary="Recargar catálogos en memoria")
+async def reload_reference_data(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Recarga desde la base de datos todas las tablas de catálogo (categorías, estatus,
+    roles, puestos, estados de pedido, tipos de movimiento y niveles de membresía).
+
+    Requiere permisos de administrador.
+    """
+    await reference_data.load()
+    return reference_data.stats()
+
+# Obtener estado de los índices de búsqueda
+@router.get("/search", summary="Obtener estado de los índices de búsqueda")
+async def get_search_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve, por índice (productos, clientes, proveedores), el número de documentos
+    y términos, la hora y duración de la última construcción y los contadores de uso.
+
+    Requiere permisos de administrador.
+    """
+    return catalog_search.stats()
+
+# Forzar reconstrucción de los índices de búsqueda
+@router.post("/search/reload", summary="Reconstruir índices de búsqueda")
+async def reload_search(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Reconstruye desde la base de datos todos los índices de búsqueda.
+
+    Requiere permisos de administrador.
+    """
+    await catalog_search.load()
+    return catalog_search.stats()
+
+# Obtener la versión del catálogo
+@router.get("/catalogo-version", summary="Obtener la versión del catálogo")
+async def get_catalog_version(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve la versión del catálogo que usa este proceso para los ETag, su
+    Last-Modified y los contadores de lecturas, cambios vistos y escrituras.
+
+    Requiere permisos de administrador.
+    """
+    return catalog_version.stats()
+
+# Verificar el índice de alertas de stock
+@router.get("/alertas-stock", summary="Verificar índice de alertas de stock")
+async def check_alertas_stock(
+    db: AsyncSession = Depends(get_db),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict[str, List[int]]:
+    """
+    Compara el índice de alertas de stock con un recorrido completo de productos y
+    devuelve los IDs que faltan en el índice y los que sobran (ambas listas vacías
+    si es consistente).
+
+    Requiere permisos de administrador.
+    """
+    return await verificar_alertas(db)
+
+# Reparar el índice de alertas de stock
+@router.post("/alertas-stock/reparar", summary="Reparar índice de alertas de stock")
+async def repair_alertas_stock(
+    db: AsyncSession = Depends(get_db),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict[str, List[int]]:
+    """
+    Corrige las diferencias entre el índice de alertas de stock y los productos, y
+    devuelve las diferencias encontradas.
+
+    Requiere permisos de administrador.
+    """
+    diferencias = await verificar_alertas(db, reparar=True)
+    await db.commit()
+    return diferencias
+
+# Obtener estado del stream de inventario
+@router.get("/inventario-stream", summary="Obtener estado del stream de inventario")
+async def get_inventario_stream_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve los clientes conectados al stream de inventario, el último movimiento
+    difundido, los IDs pendientes de confirmar y los contadores de consultas,
+    eventos y clientes desconectados por no consumir a tiempo.
+
+    Requiere permisos de administrador.
+    """
+    return stock_stream.stats()
+
+# Obtener métricas del registro de auditoría
+@router.get("/auditoria", summary="Obtener métricas del registro de auditoría")
+async def get_auditoria_stats(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve el estado de la cola de eventos de auditoría (pendientes, máximo
+    alcanzado), los eventos escritos y descartados por cola llena o errores de
+    escritura, y el histograma de duración de cada escritura de lote.
+
+    Requiere permisos de administrador.
+    """
+    return audit_log.stats()
+
+# Obtener métricas HTTP por ruta
+@router.get("/requests", summary="Obtener métricas HTTP por ruta")
+async def get_request_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve, por método y plantilla de ruta, las peticiones en curso, el total
+    atendido por código de estado y la latencia media y aproximada (p50, p99)
+    de este worker. Las mismas métricas están en ``/metrics`` para Prometheus.
+
+    Requiere permisos de administrador.
+    """
+    return request_metrics.snapshot()
+
+# Reiniciar métricas HTTP por ruta
+@router.post("/requests/reset", status_code=status.HTTP_204_NO_CONTENT, summary="Reiniciar métricas HTTP por ruta")
+async def reset_request_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Pone a cero las métricas HTTP de este worker.
+
+    Requiere permisos de administrador.
+    """
+    request_metrics.reset()
+    return None
+
+# Obtener consultas SQL por ruta
+@router.get("/sql", summary="Obtener consultas SQL por ruta")
+async def get_sql_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+) -> Dict:
+    """
+    Devuelve, por método y plantilla de ruta, las consultas SQL por petición
+    (media y máximo), el tiempo medio en base de datos y cuántas peticiones
+    repitieron una misma sentencia más de ``SQL_N_PLUS_ONE_THRESHOLD`` veces
+    (posible N+1), con la última sentencia detectada.
+
+    Requiere permisos de administrador.
+    """
+    return query_metrics.snapshot()
+
+# Reiniciar consultas SQL por ruta
+@router.post("/sql/reset", status_code=status.HTTP_204_NO_CONTENT, summary="Reiniciar consultas SQL por ruta")
+async def reset_sql_metrics(
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Pone a cero las consultas SQL por ruta de este worker.
+
+    Requiere permisos de administrador.
+    """
+    query_metrics.reset()
+    return None
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
 from jose import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from ..database import get_db
@@ -10,7 +11,9 @@ from ..config import settings
 from ..models.empleados import Empleados
 from ..schemas.auth import Token, UserLogin, PasswordChange
 from ..dependencies import get_current_active_user
-from ..core.auth import verify_password, get_password_hash
+from ..core.auditoria import audit_log
+from ..core.auth import verify_password_async, get_password_hash_async
+from ..core.user_cache import user_cache
 
 router = APIRouter()
 
@@ -27,7 +30,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 @router.post("/login", response_model=Token, summary="Iniciar sesión")
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Autenticación de usuario y generación de token JWT.
@@ -35,9 +38,11 @@ async def login_for_access_token(
     - **username**: Nombre de usuario
     - **password**: Contraseña
     """
-    user = db.query(Empleados).filter(Empleados.nombre_usuario == form_data.username).first()
+    user = await db.scalar(select(Empleados).where(Empleados.nombre_usuario == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
+        audit_log.record("error", "Empleados", user.id_empleado if user else None,
+                         detalle=f"Inicio de sesión fallido: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
@@ -45,6 +50,7 @@ async def login_for_access_token(
         )
     
     if user.id_status != 1:  # Asumiendo que 1 es el estatus activo
+        audit_log.record("error", "Empleados", user.id_empleado, user.id_empleado, "Inicio de sesión de usuario inactivo")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario inactivo",
@@ -53,7 +59,9 @@ async def login_for_access_token(
     
     # Actualizar último acceso
     user.ultimo_acceso = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    user_cache.invalidate(user.nombre_usuario)
+    audit_log.record("login", "Empleados", user.id_empleado, user.id_empleado)
     
     # Crear token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -82,7 +90,7 @@ async def read_users_me(current_user: Empleados = Depends(get_current_active_use
 @router.post("/change-password", summary="Cambiar contraseña")
 async def change_password(
     password_data: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -92,14 +100,17 @@ async def change_password(
     - **new_password**: Nueva contraseña
     """
     # Verificar contraseña actual
-    if not verify_password(password_data.old_password, current_user.password_hash):
+    if not await verify_password_async(password_data.old_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
     
     # Actualizar contraseña
-    current_user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
+    current_user.password_hash = await get_password_hash_async(password_data.new_password)
+    await user_cache.bump(db)
+    await db.commit()
+    user_cache.invalidate(current_user.nombre_usuario)
+    audit_log.record("actualizar", "Empleados", current_user.id_empleado, current_user.id_empleado, "Cambio de contraseña")
     
     return {"message": "Contraseña actualizada exitosamente"}
\ No newline at end of file
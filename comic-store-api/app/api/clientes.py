@@ -1,25 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db, get_read_db, read_session_factory
 from ..models.clientes import Clientes, NivelesMembresia, HistorialMembresia
 from ..schemas.clientes import (
     Cliente, ClienteCreate, ClienteUpdate, ClienteDetalle,
     NivelMembresia, UpdateMembresia, HistorialMembresia as HistorialMembresiaSchema
 )
-from ..dependencies import get_current_active_user, get_admin_user
+from ..core.auditoria import audit_log
+from ..core.exports import export_response
+from ..core.fast_json import Projection
+from ..core.loading import with_profile
+from ..core.pagination import in_ids, keyset_paginate, paginar_busqueda, set_next_cursor
+from ..core.reference_data import ReferenceData
+from ..core.search import CatalogSearch
+from ..dependencies import get_current_active_user, get_admin_user, get_catalog_search, get_reference_data
 from ..models.empleados import Empleados
 
 router = APIRouter()
 
+CLIENTES = Projection(Cliente, Clientes.__table__)
+
 # Obtener todos los clientes (con paginación y filtros)
 @router.get("/", response_model=List[Cliente], summary="Obtener lista de clientes")
 async def get_clientes(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
-    search: Optional[str] = Query(None, description="Buscar por nombre, apellidos o email"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); sustituye a skip"),
+    search: Optional[str] = Query(None, description="Buscar por nombre, apellidos o email (ordenado por relevancia)"),
     nivel: Optional[int] = Query(None, description="Filtrar por nivel de membresía"),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -27,30 +41,67 @@ async def get_clientes(
     
     - **skip**: Número de registros a omitir (para paginación)
     - **limit**: Número máximo de registros a devolver
-    - **search**: Búsqueda por nombre, apellidos o email
+    - **cursor**: Cursor de la página siguiente devuelto en la cabecera X-Next-Cursor
+    - **search**: Búsqueda por nombre, apellidos o email; los resultados se ordenan por
+      relevancia y se paginan con skip (no admite cursor)
     - **nivel**: Filtrar por nivel de membresía
     """
-    query = db.query(Clientes)
+    query = select(Clientes)
     
     # Aplicar filtros
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Clientes.nombre.like(search_term)) | 
-            (Clientes.apellidos.like(search_term)) | 
-            (Clientes.email.like(search_term))
-        )
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La paginación por cursor no está disponible en búsquedas"
+            )
+    
+    query = filtrar_clientes(query, nivel)
     
+    if search:
+        # Ordenar por relevancia y paginar sobre los resultados de la búsqueda
+        ranking = await buscador.ranking("clientes", search)
+        return await paginar_busqueda(db, query, Clientes.id_cliente, ranking, skip, limit)
+    
+    columnas = [Clientes.id_cliente]
+    result = await db.scalars(keyset_paginate(query, columnas, cursor, skip, limit, descending=False))
+    rows = result.all()
+    set_next_cursor(response, rows, columnas, limit)
+    return rows
+
+# Exportar clientes en streaming
+@router.get("/export", response_class=StreamingResponse, summary="Exportar clientes en NDJSON o CSV")
+async def export_clientes(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de salida: ndjson (una fila JSON por línea) o csv"),
+    search: Optional[str] = Query(None, description="Buscar por nombre, apellidos o email"),
+    nivel: Optional[int] = Query(None, description="Filtrar por nivel de membresía"),
+    buscador: CatalogSearch = Depends(get_catalog_search),
+    current_user: Empleados = Depends(get_current_active_user)
+):
+    """
+    Exporta todos los clientes que cumplen los filtros de ``GET /clientes/``,
+    ordenados por id. Con ``search`` se exportan todos los resultados de la
+    búsqueda, pero por id y no por relevancia.
+    """
+    query = select(Clientes)
+    if search:
+        query = query.where(in_ids(Clientes.id_cliente, await buscador.ranking("clientes", search)))
+    query = filtrar_clientes(query, nivel).order_by(Clientes.id_cliente)
+    return export_response(read_session_factory(request), query, CLIENTES, formato, "clientes")
+
+def filtrar_clientes(query, nivel: Optional[int]):
+    """Filtros comunes del listado y la exportación de clientes."""
     if nivel:
-        query = query.filter(Clientes.id_nivel == nivel)
+        query = query.where(Clientes.id_nivel == nivel)
     
-    return query.offset(skip).limit(limit).all()
+    return query
 
 # Obtener un cliente por ID
 @router.get("/{cliente_id}", response_model=ClienteDetalle, summary="Obtener cliente por ID")
 async def get_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -58,7 +109,9 @@ async def get_cliente(
     
     - **cliente_id**: ID del cliente a consultar
     """
-    cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    cliente = await db.scalar(
+        with_profile(select(Clientes).where(Clientes.id_cliente == cliente_id), ClienteDetalle)
+    )
     if cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,7 +123,9 @@ async def get_cliente(
 @router.post("/", response_model=Cliente, status_code=status.HTTP_201_CREATED, summary="Crear nuevo cliente")
 async def create_cliente(
     cliente: ClienteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -84,7 +139,7 @@ async def create_cliente(
     - **id_status**: ID del estado del cliente (opcional, predeterminado: 1)
     """
     # Verificar si el email ya existe
-    db_cliente = db.query(Clientes).filter(Clientes.email == cliente.email).first()
+    db_cliente = await db.scalar(select(Clientes).where(Clientes.email == cliente.email))
     if db_cliente:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -92,7 +147,7 @@ async def create_cliente(
         )
     
     # Verificar si el nivel de membresía existe
-    nivel = db.query(NivelesMembresia).filter(NivelesMembresia.id_nivel == cliente.id_nivel).first()
+    nivel = catalogos.get("niveles_membresia", cliente.id_nivel)
     if not nivel:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -102,8 +157,11 @@ async def create_cliente(
     # Crear nuevo cliente
     db_cliente = Clientes(**cliente.model_dump())
     db.add(db_cliente)
-    db.commit()
-    db.refresh(db_cliente)
+    await db.flush()
+    await buscador.registrar(db, "clientes", [db_cliente.id_cliente])
+    await db.commit()
+    await db.refresh(db_cliente)
+    audit_log.record("crear", "Clientes", db_cliente.id_cliente, current_user.id_empleado)
     
     return db_cliente
 
@@ -112,7 +170,9 @@ async def create_cliente(
 async def update_cliente(
     cliente_id: int,
     cliente_update: ClienteUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -122,7 +182,7 @@ async def update_cliente(
     - **cliente_update**: Datos del cliente a actualizar (cualquier campo es opcional)
     """
     # Verificar si el cliente existe
-    db_cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    db_cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == cliente_id))
     if db_cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -131,7 +191,7 @@ async def update_cliente(
     
     # Verificar si el email ya existe (si se está actualizando)
     if cliente_update.email and cliente_update.email != db_cliente.email:
-        exists = db.query(Clientes).filter(Clientes.email == cliente_update.email).first()
+        exists = await db.scalar(select(Clientes).where(Clientes.email == cliente_update.email))
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -140,7 +200,7 @@ async def update_cliente(
     
     # Verificar si el nivel de membresía existe (si se está actualizando)
     if cliente_update.id_nivel:
-        nivel = db.query(NivelesMembresia).filter(NivelesMembresia.id_nivel == cliente_update.id_nivel).first()
+        nivel = catalogos.get("niveles_membresia", cliente_update.id_nivel)
         if not nivel:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -152,8 +212,10 @@ async def update_cliente(
     for key, value in update_data.items():
         setattr(db_cliente, key, value)
     
-    db.commit()
-    db.refresh(db_cliente)
+    await buscador.registrar(db, "clientes", [cliente_id])
+    await db.commit()
+    await db.refresh(db_cliente)
+    audit_log.record("actualizar", "Clientes", cliente_id, current_user.id_empleado, f"Campos: {', '.join(update_data)}")
     
     return db_cliente
 
@@ -161,7 +223,7 @@ async def update_cliente(
 @router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar cliente")
 async def delete_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
@@ -170,7 +232,7 @@ async def delete_cliente(
     - **cliente_id**: ID del cliente a eliminar
     """
     # Verificar si el cliente existe
-    db_cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    db_cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == cliente_id))
     if db_cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -179,7 +241,8 @@ async def delete_cliente(
     
     # Soft delete (cambiar status a inactivo - asumiendo que 2 es "inactivo")
     db_cliente.id_status = 2
-    db.commit()
+    await db.commit()
+    audit_log.record("eliminar", "Clientes", cliente_id, current_user.id_empleado)
     
     return None
 
@@ -187,7 +250,8 @@ async def delete_cliente(
 @router.get("/{cliente_id}/membresia", response_model=NivelMembresia, summary="Obtener membresía de cliente")
 async def get_membresia(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -196,14 +260,14 @@ async def get_membresia(
     - **cliente_id**: ID del cliente
     """
     # Verificar si el cliente existe
-    cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == cliente_id))
     if cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Cliente con ID {cliente_id} no encontrado"
         )
     
-    nivel = db.query(NivelesMembresia).filter(NivelesMembresia.id_nivel == cliente.id_nivel).first()
+    nivel = catalogos.get("niveles_membresia", cliente.id_nivel)
     return nivel
 
 # Actualizar membresía de un cliente
@@ -211,7 +275,8 @@ async def get_membresia(
 async def update_membresia(
     cliente_id: int,
     membresia: UpdateMembresia,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -222,7 +287,7 @@ async def update_membresia(
     - **motivo**: Motivo del cambio (opcional)
     """
     # Verificar si el cliente existe
-    cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == cliente_id))
     if cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -230,7 +295,7 @@ async def update_membresia(
         )
     
     # Verificar si el nivel de membresía existe
-    nivel = db.query(NivelesMembresia).filter(NivelesMembresia.id_nivel == membresia.id_nivel).first()
+    nivel = catalogos.get("niveles_membresia", membresia.id_nivel)
     if not nivel:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -256,8 +321,10 @@ async def update_membresia(
     )
     
     db.add(historial)
-    db.commit()
-    db.refresh(cliente)
+    await db.commit()
+    await db.refresh(cliente)
+    audit_log.record("actualizar", "Clientes", cliente_id, current_user.id_empleado,
+                     f"Membresía: nivel {id_nivel_anterior} -> {membresia.id_nivel}")
     
     return cliente
 
@@ -265,7 +332,7 @@ async def update_membresia(
 @router.get("/{cliente_id}/historial-membresia", response_model=List[HistorialMembresiaSchema], summary="Obtener historial de membresía")
 async def get_historial_membresia(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -274,15 +341,17 @@ async def get_historial_membresia(
     - **cliente_id**: ID del cliente
     """
     # Verificar si el cliente existe
-    cliente = db.query(Clientes).filter(Clientes.id_cliente == cliente_id).first()
+    cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == cliente_id))
     if cliente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Cliente con ID {cliente_id} no encontrado"
         )
     
-    historial = db.query(HistorialMembresia).filter(
-        HistorialMembresia.id_cliente == cliente_id
-    ).order_by(HistorialMembresia.fecha_cambio.desc()).all()
+    historial = await db.scalars(
+        select(HistorialMembresia).where(
+            HistorialMembresia.id_cliente == cliente_id
+        ).order_by(HistorialMembresia.fecha_cambio.desc())
+    )
     
-    return historial
\ No newline at end of file
+    return historial.all()
\ No newline at end of file
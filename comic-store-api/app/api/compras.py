@@ -1,42 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db, get_read_db, read_session_factory
 from ..models.compras import ComprasProveedores, DetallesCompra
 from ..models.productos import Productos
 from ..models.proveedores import Proveedores
 from ..models.inventario import Inventario, TiposMovimiento
 from ..schemas.compras import (
     Compra, CompraCreate, CompraUpdate, CompraDetalle, 
-    DetalleCompra, RecepcionCompra
+    DetalleCompra, RecepcionCompra, SugerenciasCompra
 )
-from ..dependencies import get_current_active_user, get_admin_user
+from ..core.exports import export_response
+from ..core.fast_json import Projection
+from ..core.loading import refresh_profile, with_profile
+from ..core.numeracion import numerador_compras
+from ..core.pagination import keyset_paginate, set_next_cursor
+from ..core.reference_data import ReferenceData
+from ..core.auditoria import audit_log
+from ..core.reposicion import calcular_sugerencias, crear_compras_sugeridas
+from ..core.stock import historial_stock, mover_stock
+from ..dependencies import get_current_active_user, get_admin_user, get_reference_data
 from ..models.empleados import Empleados
 from datetime import datetime, date
-import random
-import string
 
 router = APIRouter()
 
-# Generar número de compra único
-def generar_numero_compra(db: Session):
-    while True:
-        # Formato: COMP-YYYYMMDD-XXXXX (donde X es un carácter alfanumérico)
-        fecha = datetime.now().strftime("%Y%m%d")
-        sufijo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        numero_compra = f"COMP-{fecha}-{sufijo}"
-        
-        # Verificar que no exista
-        existe = db.query(ComprasProveedores).filter(ComprasProveedores.numero_compra == numero_compra).first()
-        if not existe:
-            return numero_compra
+COMPRAS = Projection(Compra, ComprasProveedores.__table__)
+
+# Orden del listado (y de la exportación): más recientes primero
+ORDEN_COMPRAS = [ComprasProveedores.fecha_orden, ComprasProveedores.id_compra]
 
 # Obtener todas las compras
 @router.get("/", response_model=List[Compra], summary="Obtener lista de compras")
 async def get_compras(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); sustituye a skip"),
     id_proveedor: Optional[int] = Query(None, description="Filtrar por proveedor"),
     estado: Optional[str] = Query(None, description="Filtrar por estado"),
     fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
@@ -46,36 +49,64 @@ async def get_compras(
     """
     Obtiene la lista de compras a proveedores con paginación y filtros opcionales.
     """
-    query = db.query(ComprasProveedores)
+    query = filtrar_compras(select(ComprasProveedores), id_proveedor, estado, fecha_desde, fecha_hasta)
     
-    # Aplicar filtros
+    columnas = ORDEN_COMPRAS
+    result = await db.scalars(keyset_paginate(query, columnas, cursor, skip, limit))
+    rows = result.all()
+    set_next_cursor(response, rows, columnas, limit)
+    return rows
+
+# Exportar compras en streaming
+@router.get("/export", response_class=StreamingResponse, summary="Exportar compras en NDJSON o CSV")
+async def export_compras(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de salida: ndjson (una fila JSON por línea) o csv"),
+    id_proveedor: Optional[int] = Query(None, description="Filtrar por proveedor"),
+    estado: Optional[str] = Query(None, description="Filtrar por estado"),
+    fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Filtrar hasta fecha (YYYY-MM-DD)"),
+    current_user: Empleados = Depends(get_current_active_user)
+):
+    """
+    Exporta todas las compras que cumplen los filtros de ``GET /compras/``,
+    en el mismo orden y con los mismos campos, sin paginar.
+    """
+    query = filtrar_compras(select(ComprasProveedores), id_proveedor, estado, fecha_desde, fecha_hasta)
+    query = query.order_by(*(columna.desc() for columna in ORDEN_COMPRAS))
+    return export_response(read_session_factory(request), query, COMPRAS, formato, "compras")
+
+def filtrar_compras(query, id_proveedor: Optional[int], estado: Optional[str], fecha_desde: Optional[str], fecha_hasta: Optional[str]):
+    """Filtros comunes del listado y la exportación de compras."""
     if id_proveedor:
-        query = query.filter(ComprasProveedores.id_proveedor == id_proveedor)
+        query = query.where(ComprasProveedores.id_proveedor == id_proveedor)
     
     if estado:
-        query = query.filter(ComprasProveedores.estado == estado)
+        query = query.where(ComprasProveedores.estado == estado)
     
     if fecha_desde:
         fecha_desde_obj = datetime.strptime(fecha_desde, "%Y-%m-%d").date()
-        query = query.filter(ComprasProveedores.fecha_orden >= fecha_desde_obj)
+        query = query.where(ComprasProveedores.fecha_orden >= fecha_desde_obj)
     
     if fecha_hasta:
         fecha_hasta_obj = datetime.strptime(fecha_hasta, "%Y-%m-%d").date()
-        query = query.filter(ComprasProveedores.fecha_orden <= fecha_hasta_obj)
+        query = query.where(ComprasProveedores.fecha_orden <= fecha_hasta_obj)
     
-    return query.order_by(ComprasProveedores.fecha_orden.desc()).offset(skip).limit(limit).all()
+    return query
 
 # Obtener una compra por ID
 @router.get("/{compra_id}", response_model=CompraDetalle, summary="Obtener compra por ID")
 async def get_compra(
     compra_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene los detalles de una compra específica por su ID.
     """
-    compra = db.query(ComprasProveedores).filter(ComprasProveedores.id_compra == compra_id).first()
+    compra = await db.scalar(
+        with_profile(select(ComprasProveedores).where(ComprasProveedores.id_compra == compra_id), CompraDetalle)
+    )
     if compra is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,14 +118,14 @@ async def get_compra(
 @router.post("/", response_model=CompraDetalle, status_code=status.HTTP_201_CREATED, summary="Crear nueva compra")
 async def create_compra(
     compra: CompraCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea una nueva compra a proveedor con sus detalles.
     """
     # Verificar si el proveedor existe
-    proveedor = db.query(Proveedores).filter(Proveedores.id_proveedor == compra.id_proveedor).first()
+    proveedor = await db.scalar(select(Proveedores).where(Proveedores.id_proveedor == compra.id_proveedor))
     if not proveedor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,14 +136,13 @@ async def create_compra(
     subtotal = 0
     detalles_procesados = []
     
-    # Verificar que existan todos los productos
+    # Verificar que existan todos los productos (una sola consulta)
+    activos = set(await db.scalars(select(Productos.id_producto).where(
+        Productos.id_producto.in_({detalle.id_producto for detalle in compra.detalles}),
+        Productos.id_status == 1  # Solo productos activos
+    )))
     for detalle in compra.detalles:
-        producto = db.query(Productos).filter(
-            Productos.id_producto == detalle.id_producto,
-            Productos.id_status == 1  # Solo productos activos
-        ).first()
-        
-        if not producto:
+        if detalle.id_producto not in activos:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Producto con ID {detalle.id_producto} no encontrado o no está activo"
@@ -137,7 +167,7 @@ async def create_compra(
     total = subtotal + impuestos
     
     # Generar número de compra
-    numero_compra = generar_numero_compra(db)
+    numero_compra = await numerador_compras.siguiente()
     
     # Crear compra
     db_compra = ComprasProveedores(
@@ -153,41 +183,75 @@ async def create_compra(
         notas=compra.notas
     )
     
+    # Insertar la cabecera sin confirmar para obtener su ID; la compra se
+    # confirma con sus detalles en una única transacción
     db.add(db_compra)
-    db.commit()
-    db.refresh(db_compra)
+    await db.flush()
     
-    # Crear detalles de la compra
+    # Crear detalles de la compra en bloque
     for detalle in detalles_procesados:
-        db_detalle = DetallesCompra(
-            id_compra=db_compra.id_compra,
-            id_producto=detalle["id_producto"],
-            cantidad_ordenada=detalle["cantidad_ordenada"],
-            cantidad_recibida=0,
-            precio_unitario=detalle["precio_unitario"],
-            subtotal=detalle["subtotal"],
-            estado="pendiente"
-        )
-        db.add(db_detalle)
+        detalle.update(id_compra=db_compra.id_compra, cantidad_recibida=0, estado="pendiente")
+    await db.execute(insert(DetallesCompra), detalles_procesados)
     
-    db.commit()
-    db.refresh(db_compra)
+    await db.commit()
+    await refresh_profile(db, db_compra, CompraDetalle)
+    audit_log.record("crear", "ComprasProveedores", db_compra.id_compra, current_user.id_empleado, db_compra.numero_compra)
     
     return db_compra
 
+# Sugerencias de reposición
+@router.post("/sugerencias", response_model=SugerenciasCompra, summary="Generar compras sugeridas de reposición")
+async def create_sugerencias(
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
+    dry_run: bool = Query(False, description="Solo calcular las sugerencias, sin crear compras"),
+    dias_ventas: int = Query(30, ge=1, le=365, description="Días de ventas para calcular la velocidad"),
+    dias_cobertura: int = Query(30, ge=0, le=365, description="Días de venta que debe cubrir la compra además del punto de reorden"),
+    id_proveedor: Optional[int] = Query(None, description="Limitar a un proveedor"),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Calcula, para cada producto activo con proveedor, la velocidad de venta
+    (salidas de inventario), el punto de reorden (velocidad × plazo de entrega
+    del proveedor + stock mínimo) y lo pendiente de recibir en compras abiertas,
+    y sugiere las cantidades a pedir agrupadas por proveedor.
+
+    Sin ``dry_run`` crea una compra pendiente por proveedor con esas líneas; al
+    quedar abiertas, una nueva ejecución ya las descuenta.
+    """
+    tipo_salida = catalogos.tipo_movimiento("salida")
+    tipo_entrada = catalogos.tipo_movimiento("entrada")
+    if not tipo_salida or not tipo_entrada:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Tipos de movimiento 'entrada' y 'salida' no encontrados en el sistema"
+        )
+    
+    sugerencias = await calcular_sugerencias(
+        db, tipo_salida.id_tipo_movimiento, tipo_entrada.id_tipo_movimiento,
+        dias_ventas, dias_cobertura, id_proveedor
+    )
+    if not dry_run:
+        await crear_compras_sugeridas(db, sugerencias["compras"], current_user.id_empleado)
+        for compra in sugerencias["compras"]:
+            audit_log.record("crear", "ComprasProveedores", compra["id_compra"], current_user.id_empleado,
+                             f"{compra['numero_compra']} (sugerencia de reposición)")
+    
+    return {"dry_run": dry_run, **sugerencias}
+
 # Actualizar estado de una compra
 @router.put("/{compra_id}/estado", response_model=Compra, summary="Actualizar estado de compra")
 async def update_estado_compra(
     compra_id: int,
     compra_update: CompraUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Actualiza el estado de una compra existente.
     """
     # Verificar si la compra existe
-    db_compra = db.query(ComprasProveedores).filter(ComprasProveedores.id_compra == compra_id).first()
+    db_compra = await db.scalar(select(ComprasProveedores).where(ComprasProveedores.id_compra == compra_id))
     if db_compra is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -213,8 +277,9 @@ async def update_estado_compra(
     if compra_update.notas is not None:
         db_compra.notas = compra_update.notas
     
-    db.commit()
-    db.refresh(db_compra)
+    await db.commit()
+    await db.refresh(db_compra)
+    audit_log.record("actualizar", "ComprasProveedores", compra_id, current_user.id_empleado, f"Estado: {db_compra.estado}")
     
     return db_compra
 
@@ -223,14 +288,15 @@ async def update_estado_compra(
 async def registrar_recepcion(
     compra_id: int,
     recepcion: RecepcionCompra,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Registra la recepción de productos de una compra y actualiza el inventario.
     """
     # Verificar si la compra existe
-    db_compra = db.query(ComprasProveedores).filter(ComprasProveedores.id_compra == compra_id).first()
+    db_compra = await db.scalar(select(ComprasProveedores).where(ComprasProveedores.id_compra == compra_id))
     if db_compra is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -248,7 +314,7 @@ async def registrar_recepcion(
     db_compra.fecha_recepcion = recepcion.fecha_recepcion
     
     # Buscar tipo de movimiento "entrada"
-    tipo_entrada = db.query(TiposMovimiento).filter(TiposMovimiento.nombre_tipo == "entrada").first()
+    tipo_entrada = catalogos.tipo_movimiento("entrada")
     if not tipo_entrada:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -257,17 +323,21 @@ async def registrar_recepcion(
     
     # Procesar cada detalle de recepción
     todos_completos = True
+    recibidos = []
+    
+    # Detalles de la compra en una sola consulta (bloqueados para que dos
+    # recepciones simultáneas no sumen la misma mercancía dos veces)
+    result = await db.scalars(select(DetallesCompra).where(
+        DetallesCompra.id_detalle.in_({d.get("id_detalle") for d in recepcion.detalles}),
+        DetallesCompra.id_compra == compra_id
+    ).order_by(DetallesCompra.id_detalle).with_for_update())
+    detalles_compra = {detalle.id_detalle: detalle for detalle in result.all()}
     
     for detalle_recepcion in recepcion.detalles:
         id_detalle = detalle_recepcion.get("id_detalle")
         cantidad_recibida = detalle_recepcion.get("cantidad_recibida", 0)
         
-        # Obtener el detalle de la compra
-        detalle = db.query(DetallesCompra).filter(
-            DetallesCompra.id_detalle == id_detalle,
-            DetallesCompra.id_compra == compra_id
-        ).first()
-        
+        detalle = detalles_compra.get(id_detalle)
         if not detalle:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -290,34 +360,7 @@ async def registrar_recepcion(
         
         # Si hay productos por recibir, procesar la recepción
         if cantidad_recibida > 0:
-            # Obtener el producto
-            producto = db.query(Productos).filter(Productos.id_producto == detalle.id_producto).first()
-            if not producto:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Producto con ID {detalle.id_producto} no encontrado"
-                )
-            
-            # Actualizar stock
-            stock_anterior = producto.stock_actual
-            stock_nuevo = stock_anterior + cantidad_recibida
-            
-            # Registrar movimiento en inventario
-            db_movimiento = Inventario(
-                id_producto=detalle.id_producto,
-                id_tipo_movimiento=tipo_entrada.id_tipo_movimiento,
-                cantidad=cantidad_recibida,
-                stock_anterior=stock_anterior,
-                stock_nuevo=stock_nuevo,
-                id_empleado=current_user.id_empleado,
-                motivo=f"Entrada por compra #{db_compra.numero_compra}",
-                id_documento=db_compra.id_compra,
-                tipo_documento="compra"
-            )
-            db.add(db_movimiento)
-            
-            # Actualizar stock del producto
-            producto.stock_actual = stock_nuevo
+            recibidos.append((detalle, cantidad_recibida))
             
             # Actualizar cantidad recibida en el detalle
             detalle.cantidad_recibida = nueva_cantidad_recibida
@@ -330,15 +373,51 @@ async def registrar_recepcion(
                 todos_completos = False
             else:
                 todos_completos = False
-        
+    
+    # Sumar al stock todo lo recibido en un único UPDATE atómico
+    entradas = {}
+    for detalle, cantidad_recibida in recibidos:
+        entradas.setdefault(detalle.id_producto, []).append((detalle, cantidad_recibida))
+    stock_final = await mover_stock(db, {
+        id_producto: sum(cantidad for _, cantidad in lineas)
+        for id_producto, lineas in entradas.items()
+    })
+    
+    # Registrar movimientos en inventario a partir del stock real tras la entrada
+    movimientos = []
+    for id_producto, lineas in entradas.items():
+        if id_producto not in stock_final:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Producto con ID {id_producto} no encontrado"
+            )
+        historial = historial_stock(stock_final[id_producto], [cantidad for _, cantidad in lineas])
+        for (detalle, cantidad_recibida), (stock_anterior, stock_nuevo) in zip(lineas, historial):
+            movimientos.append({
+                "id_producto": id_producto,
+                "id_tipo_movimiento": tipo_entrada.id_tipo_movimiento,
+                "cantidad": cantidad_recibida,
+                "stock_anterior": stock_anterior,
+                "stock_nuevo": stock_nuevo,
+                "id_empleado": current_user.id_empleado,
+                "motivo": f"Entrada por compra #{db_compra.numero_compra}",
+                "id_documento": db_compra.id_compra,
+                "tipo_documento": "compra"
+            })
+    
+    # Registrar movimientos en inventario en bloque
+    if movimientos:
+        await db.execute(insert(Inventario), movimientos)
+    
     # Actualizar estado de la compra
     if todos_completos:
         db_compra.estado = "entregado"
     else:
         db_compra.estado = "procesado"
     
-    db.commit()
-    db.refresh(db_compra)
+    await db.commit()
+    await refresh_profile(db, db_compra, CompraDetalle)
+    audit_log.record("actualizar", "ComprasProveedores", compra_id, current_user.id_empleado, f"Recepción: {db_compra.estado}")
     
     return db_compra
 
@@ -346,14 +425,14 @@ async def registrar_recepcion(
 @router.post("/{compra_id}/cancelar", response_model=Compra, summary="Cancelar compra")
 async def cancelar_compra(
     compra_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Cancela una compra a proveedor.
     """
     # Verificar si la compra existe
-    db_compra = db.query(ComprasProveedores).filter(ComprasProveedores.id_compra == compra_id).first()
+    db_compra = await db.scalar(select(ComprasProveedores).where(ComprasProveedores.id_compra == compra_id))
     if db_compra is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -371,12 +450,13 @@ async def cancelar_compra(
     db_compra.estado = "cancelado"
     
     # Actualizar estado de los detalles
-    detalles = db.query(DetallesCompra).filter(DetallesCompra.id_compra == compra_id).all()
+    detalles = (await db.scalars(select(DetallesCompra).where(DetallesCompra.id_compra == compra_id))).all()
     for detalle in detalles:
         if detalle.estado != "completo":  # No cancelar lo que ya se ha recibido
             detalle.estado = "cancelado"
     
-    db.commit()
-    db.refresh(db_compra)
+    await db.commit()
+    await db.refresh(db_compra)
+    audit_log.record("actualizar", "ComprasProveedores", compra_id, current_user.id_empleado, "Cancelada")
     
     return db_compra
\ No newline at end of file
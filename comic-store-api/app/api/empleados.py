@@ -1,22 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.empleados import Empleados, Puestos
 from ..models.base import Roles
 from ..schemas.empleados import (
     Empleado, EmpleadoCreate, EmpleadoUpdate, EmpleadoDetalle,
     Puesto, PuestoCreate, Rol, RolCreate, EmpleadoAdminCreate
 )
-from ..dependencies import get_current_active_user, get_admin_user
-from ..core.auth import get_password_hash
+from ..core.auditoria import audit_log
+from ..core.loading import with_profile
+from ..core.reference_data import ReferenceData
+from ..dependencies import get_current_active_user, get_admin_user, get_reference_data
+from ..core.auth import get_password_hash_async
+from ..core.user_cache import user_cache
 
 router = APIRouter()
 
 # Obtener todos los empleados
 @router.get("/", response_model=List[Empleado], summary="Obtener lista de empleados")
 async def get_empleados(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
     search: Optional[str] = Query(None, description="Buscar por nombre, apellidos o email"),
@@ -28,27 +33,28 @@ async def get_empleados(
     
     Requiere permisos de administrador.
     """
-    query = db.query(Empleados)
+    query = select(Empleados)
     
     # Aplicar filtros
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (Empleados.nombre.like(search_term)) | 
             (Empleados.apellidos.like(search_term)) | 
             (Empleados.email.like(search_term))
         )
     
     if puesto:
-        query = query.filter(Empleados.id_puesto == puesto)
+        query = query.where(Empleados.id_puesto == puesto)
     
-    return query.offset(skip).limit(limit).all()
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
 
 # Obtener un empleado por ID
 @router.get("/{empleado_id}", response_model=EmpleadoDetalle, summary="Obtener empleado por ID")
 async def get_empleado(
     empleado_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -64,7 +70,10 @@ async def get_empleado(
             detail="No tienes permiso para ver la información de este empleado"
         )
     
-    empleado = db.query(Empleados).filter(Empleados.id_empleado == empleado_id).first()
+    empleado = await db.scalar(
+        with_profile(select(Empleados), EmpleadoDetalle)
+        .where(Empleados.id_empleado == empleado_id)
+    )
     if empleado is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,7 +85,8 @@ async def get_empleado(
 @router.post("/", response_model=Empleado, status_code=status.HTTP_201_CREATED, summary="Crear nuevo empleado")
 async def create_empleado(
     empleado: EmpleadoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -85,7 +95,7 @@ async def create_empleado(
     Requiere permisos de administrador.
     """
     # Verificar si el email ya existe
-    db_empleado = db.query(Empleados).filter(Empleados.email == empleado.email).first()
+    db_empleado = await db.scalar(select(Empleados).where(Empleados.email == empleado.email))
     if db_empleado:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -93,7 +103,7 @@ async def create_empleado(
         )
     
     # Verificar si el nombre de usuario ya existe
-    db_username = db.query(Empleados).filter(Empleados.nombre_usuario == empleado.nombre_usuario).first()
+    db_username = await db.scalar(select(Empleados).where(Empleados.nombre_usuario == empleado.nombre_usuario))
     if db_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -101,7 +111,7 @@ async def create_empleado(
         )
     
     # Verificar si el puesto existe
-    puesto = db.query(Puestos).filter(Puestos.id_puesto == empleado.id_puesto).first()
+    puesto = catalogos.get("puestos", empleado.id_puesto)
     if not puesto:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -110,7 +120,7 @@ async def create_empleado(
     
     # Verificar si el rol existe (si se proporciona)
     if empleado.id_rol:
-        rol = db.query(Roles).filter(Roles.id_rol == empleado.id_rol).first()
+        rol = catalogos.get("roles", empleado.id_rol)
         if not rol:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -118,7 +128,7 @@ async def create_empleado(
             )
     
     # Crear nuevo empleado
-    hashed_password = get_password_hash(empleado.password)
+    hashed_password = await get_password_hash_async(empleado.password)
     
     db_empleado = Empleados(
         nombre=empleado.nombre,
@@ -135,8 +145,9 @@ async def create_empleado(
     )
     
     db.add(db_empleado)
-    db.commit()
-    db.refresh(db_empleado)
+    await db.commit()
+    await db.refresh(db_empleado)
+    audit_log.record("crear", "Empleados", db_empleado.id_empleado, current_user.id_empleado)
     
     return db_empleado
 
@@ -145,7 +156,8 @@ async def create_empleado(
 async def update_empleado(
     empleado_id: int,
     empleado_update: EmpleadoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
@@ -173,7 +185,7 @@ async def update_empleado(
             )
     
     # Verificar si el empleado existe
-    db_empleado = db.query(Empleados).filter(Empleados.id_empleado == empleado_id).first()
+    db_empleado = await db.scalar(select(Empleados).where(Empleados.id_empleado == empleado_id))
     if db_empleado is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -182,7 +194,7 @@ async def update_empleado(
     
     # Verificar si el email ya existe (si se está actualizando)
     if empleado_update.email and empleado_update.email != db_empleado.email:
-        exists = db.query(Empleados).filter(Empleados.email == empleado_update.email).first()
+        exists = await db.scalar(select(Empleados).where(Empleados.email == empleado_update.email))
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -191,7 +203,7 @@ async def update_empleado(
     
     # Verificar si el puesto existe (si se está actualizando)
     if empleado_update.id_puesto:
-        puesto = db.query(Puestos).filter(Puestos.id_puesto == empleado_update.id_puesto).first()
+        puesto = catalogos.get("puestos", empleado_update.id_puesto)
         if not puesto:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -200,7 +212,7 @@ async def update_empleado(
     
     # Verificar si el rol existe (si se está actualizando)
     if empleado_update.id_rol:
-        rol = db.query(Roles).filter(Roles.id_rol == empleado_update.id_rol).first()
+        rol = catalogos.get("roles", empleado_update.id_rol)
         if not rol:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -212,8 +224,11 @@ async def update_empleado(
     for key, value in update_data.items():
         setattr(db_empleado, key, value)
     
-    db.commit()
-    db.refresh(db_empleado)
+    await user_cache.bump(db)
+    await db.commit()
+    user_cache.invalidate(db_empleado.nombre_usuario)
+    await db.refresh(db_empleado)
+    audit_log.record("actualizar", "Empleados", empleado_id, current_user.id_empleado, f"Campos: {', '.join(update_data)}")
     
     return db_empleado
 
@@ -221,7 +236,7 @@ async def update_empleado(
 @router.delete("/{empleado_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar empleado")
 async def delete_empleado(
     empleado_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -230,7 +245,7 @@ async def delete_empleado(
     Requiere permisos de administrador.
     """
     # Verificar si el empleado existe
-    db_empleado = db.query(Empleados).filter(Empleados.id_empleado == empleado_id).first()
+    db_empleado = await db.scalar(select(Empleados).where(Empleados.id_empleado == empleado_id))
     if db_empleado is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -246,7 +261,10 @@ async def delete_empleado(
     
     # Soft delete (cambiar status a inactivo - asumiendo que 2 es "inactivo")
     db_empleado.id_status = 2
-    db.commit()
+    await user_cache.bump(db)
+    await db.commit()
+    user_cache.invalidate(db_empleado.nombre_usuario)
+    audit_log.record("eliminar", "Empleados", empleado_id, current_user.id_empleado)
     
     return None
 
@@ -254,7 +272,8 @@ async def delete_empleado(
 @router.post("/admin", response_model=Empleado, status_code=status.HTTP_201_CREATED, summary="Crear administrador")
 async def create_admin(
     empleado: EmpleadoAdminCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -270,24 +289,25 @@ async def create_admin(
         )
     
     # Utilizar la función de crear empleado regular
-    return await create_empleado(empleado, db, current_user)
+    return await create_empleado(empleado, db, catalogos, current_user)
 
 # Obtener todos los puestos
 @router.get("/puestos", response_model=List[Puesto], summary="Obtener lista de puestos")
 async def get_puestos(
-    db: Session = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de todos los puestos.
     """
-    return db.query(Puestos).all()
+    return catalogos.all("puestos")
 
 # Crear un nuevo puesto (solo administradores)
 @router.post("/puestos", response_model=Puesto, status_code=status.HTTP_201_CREATED, summary="Crear nuevo puesto")
 async def create_puesto(
     puesto: PuestoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -296,7 +316,7 @@ async def create_puesto(
     Requiere permisos de administrador.
     """
     # Verificar si el nombre ya existe
-    db_puesto = db.query(Puestos).filter(Puestos.nombre_puesto == puesto.nombre_puesto).first()
+    db_puesto = await db.scalar(select(Puestos).where(Puestos.nombre_puesto == puesto.nombre_puesto))
     if db_puesto:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -306,15 +326,17 @@ async def create_puesto(
     # Crear nuevo puesto
     db_puesto = Puestos(**puesto.model_dump())
     db.add(db_puesto)
-    db.commit()
-    db.refresh(db_puesto)
+    await db.commit()
+    await db.refresh(db_puesto)
+    await catalogos.refresh("puestos")
+    audit_log.record("crear", "Puestos", db_puesto.id_puesto, current_user.id_empleado)
     
     return db_puesto
 
 # Obtener todos los roles (solo administradores)
 @router.get("/roles", response_model=List[Rol], summary="Obtener lista de roles")
 async def get_roles(
-    db: Session = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -322,13 +344,14 @@ async def get_roles(
     
     Requiere permisos de administrador.
     """
-    return db.query(Roles).all()
+    return catalogos.all("roles")
 
 # Crear un nuevo rol (solo administradores)
 @router.post("/roles", response_model=Rol, status_code=status.HTTP_201_CREATED, summary="Crear nuevo rol")
 async def create_rol(
     rol: RolCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)
 ):
     """
@@ -337,7 +360,7 @@ async def create_rol(
     Requiere permisos de administrador.
     """
     # Verificar si el nombre ya existe
-    db_rol = db.query(Roles).filter(Roles.nombre_rol == rol.nombre_rol).first()
+    db_rol = await db.scalar(select(Roles).where(Roles.nombre_rol == rol.nombre_rol))
     if db_rol:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -347,7 +370,9 @@ async def create_rol(
     # Crear nuevo rol
     db_rol = Roles(**rol.model_dump())
     db.add(db_rol)
-    db.commit()
-    db.refresh(db_rol)
+    await db.commit()
+    await db.refresh(db_rol)
+    await catalogos.refresh("roles")
+    audit_log.record("crear", "Roles", db_rol.id_rol, current_user.id_empleado)
     
     return db_rol
\ No newline at end of file
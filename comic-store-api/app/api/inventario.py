@@ -1,66 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
-from ..models.inventario import Inventario, TiposMovimiento
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db, get_read_db, read_session_factory
+from ..models.inventario import AlertasStock, Inventario, TiposMovimiento
 from ..models.productos import Productos
 from ..schemas.inventario import (
     MovimientoInventario, MovimientoInventarioCreate, 
     MovimientoInventarioDetalle, TipoMovimiento, AjusteInventario
 )
 from ..schemas.productos import ProductoDetalle 
-from ..dependencies import get_current_active_user, get_admin_user
+from ..core.auditoria import audit_log
+from ..core.exports import export_response
+from ..core.fast_json import Projection
+from ..core.loading import with_profile
+from ..core.pagination import keyset_paginate, set_next_cursor
+from ..core.reference_data import ReferenceData
+from ..core.stock import fijar_stock, mover_stock
+from ..core.stock_stream import RESET, stock_stream
+from ..config import settings
+from ..dependencies import get_current_active_user, get_admin_user, get_reference_data, get_stream_user
 from ..models.empleados import Empleados
 from datetime import datetime
+import asyncio
 
 router = APIRouter()
 
+MOVIMIENTOS = Projection(MovimientoInventarioDetalle, Inventario.__table__, nested=["tipo_movimiento"])
+MOVIMIENTOS_PLANOS = Projection(MovimientoInventario, Inventario.__table__)
+
+# Orden del listado (y de la exportación): más recientes primero
+ORDEN_MOVIMIENTOS = [Inventario.fecha_movimiento, Inventario.id_movimiento]
+
 # Obtener movimientos de inventario
 @router.get("/movimientos", response_model=List[MovimientoInventarioDetalle], summary="Obtener movimientos de inventario")
 async def get_movimientos(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); sustituye a skip"),
     id_producto: Optional[int] = Query(None, description="Filtrar por producto"),
     tipo_movimiento: Optional[int] = Query(None, description="Filtrar por tipo de movimiento"),
     fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
     fecha_hasta: Optional[str] = Query(None, description="Filtrar hasta fecha (YYYY-MM-DD)"),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de movimientos de inventario con filtros opcionales.
     """
-    query = db.query(Inventario)
+    query = filtrar_movimientos(select(Inventario), id_producto, tipo_movimiento, fecha_desde, fecha_hasta)
     
-    # Aplicar filtros
+    columnas = ORDEN_MOVIMIENTOS
+    if settings.FAST_JSON_LISTS:
+        query = query.with_only_columns(*MOVIMIENTOS.columns)
+        rows = (await db.execute(keyset_paginate(query, columnas, cursor, skip, limit))).all()
+        set_next_cursor(response, rows, columnas, limit)
+        # El tipo de movimiento sale del catálogo en memoria en lugar de otra consulta
+        if {row.id_tipo_movimiento for row in rows}.difference(tipo.id_tipo_movimiento for tipo in catalogos.all("tipos_movimiento")):
+            await catalogos.refresh("tipos_movimiento")
+        tipos = {
+            tipo.id_tipo_movimiento: TipoMovimiento.model_validate(tipo).model_dump(mode="json")
+            for tipo in catalogos.all("tipos_movimiento")
+        }
+        return MOVIMIENTOS.response(rows, response, tipo_movimiento=lambda fila: tipos[fila["id_tipo_movimiento"]])
+
+    query = with_profile(query, MovimientoInventarioDetalle)
+    result = await db.scalars(keyset_paginate(query, columnas, cursor, skip, limit))
+    rows = result.all()
+    set_next_cursor(response, rows, columnas, limit)
+    return rows
+
+# Exportar movimientos de inventario en streaming
+@router.get("/movimientos/export", response_class=StreamingResponse, summary="Exportar movimientos de inventario en NDJSON o CSV")
+async def export_movimientos(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de salida: ndjson (una fila JSON por línea) o csv"),
+    id_producto: Optional[int] = Query(None, description="Filtrar por producto"),
+    tipo_movimiento: Optional[int] = Query(None, description="Filtrar por tipo de movimiento"),
+    fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Filtrar hasta fecha (YYYY-MM-DD)"),
+    current_user: Empleados = Depends(get_current_active_user)
+):
+    """
+    Exporta todos los movimientos que cumplen los filtros de
+    ``GET /inventario/movimientos``, en el mismo orden y sin paginar. Cada
+    fila lleva ``id_tipo_movimiento`` en lugar del objeto anidado
+    (``/inventario/tipos-movimiento`` da los nombres).
+    """
+    query = filtrar_movimientos(select(Inventario), id_producto, tipo_movimiento, fecha_desde, fecha_hasta)
+    query = query.order_by(*(columna.desc() for columna in ORDEN_MOVIMIENTOS))
+    return export_response(read_session_factory(request), query, MOVIMIENTOS_PLANOS, formato, "movimientos")
+
+def filtrar_movimientos(query, id_producto: Optional[int], tipo_movimiento: Optional[int], fecha_desde: Optional[str], fecha_hasta: Optional[str]):
+    """Filtros comunes del listado y la exportación de movimientos."""
     if id_producto:
-        query = query.filter(Inventario.id_producto == id_producto)
+        query = query.where(Inventario.id_producto == id_producto)
     
     if tipo_movimiento:
-        query = query.filter(Inventario.id_tipo_movimiento == tipo_movimiento)
+        query = query.where(Inventario.id_tipo_movimiento == tipo_movimiento)
     
     if fecha_desde:
         fecha_desde_obj = datetime.strptime(fecha_desde, "%Y-%m-%d").date()
-        query = query.filter(Inventario.fecha_movimiento >= fecha_desde_obj)
+        query = query.where(Inventario.fecha_movimiento >= fecha_desde_obj)
     
     if fecha_hasta:
         fecha_hasta_obj = datetime.strptime(fecha_hasta, "%Y-%m-%d").date()
-        query = query.filter(Inventario.fecha_movimiento <= fecha_hasta_obj)
+        query = query.where(Inventario.fecha_movimiento <= fecha_hasta_obj)
     
-    return query.order_by(Inventario.fecha_movimiento.desc()).offset(skip).limit(limit).all()
+    return query
 
 # Crear un movimiento de inventario
 @router.post("/movimientos", response_model=MovimientoInventario, status_code=status.HTTP_201_CREATED, summary="Crear movimiento de inventario")
 async def create_movimiento(
     movimiento: MovimientoInventarioCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea un nuevo movimiento de inventario.
     """
     # Verificar si el producto existe
-    producto = db.query(Productos).filter(Productos.id_producto == movimiento.id_producto).first()
+    producto = await db.scalar(select(Productos).where(Productos.id_producto == movimiento.id_producto))
     if not producto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,28 +132,25 @@ async def create_movimiento(
         )
     
     # Verificar si el tipo de movimiento existe
-    tipo_movimiento = db.query(TiposMovimiento).filter(TiposMovimiento.id_tipo_movimiento == movimiento.id_tipo_movimiento).first()
+    tipo_movimiento = catalogos.get("tipos_movimiento", movimiento.id_tipo_movimiento)
     if not tipo_movimiento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tipo de movimiento con ID {movimiento.id_tipo_movimiento} no encontrado"
         )
     
-    # Calcular nuevo stock según el tipo de movimiento
-    stock_anterior = producto.stock_actual
-    stock_nuevo = stock_anterior
-    
+    # Aplicar el movimiento de forma atómica y tomar el stock real resultante
     if tipo_movimiento.nombre_tipo == "entrada":
-        stock_nuevo = stock_anterior + movimiento.cantidad
+        stock_nuevo = (await mover_stock(db, {movimiento.id_producto: movimiento.cantidad}))[movimiento.id_producto]
+        stock_anterior = stock_nuevo - movimiento.cantidad
     elif tipo_movimiento.nombre_tipo == "salida":
-        if stock_anterior < movimiento.cantidad:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuficiente. Stock actual: {stock_anterior}, Cantidad solicitada: {movimiento.cantidad}"
-            )
-        stock_nuevo = stock_anterior - movimiento.cantidad
+        stock_nuevo = (await mover_stock(db, {movimiento.id_producto: -movimiento.cantidad}))[movimiento.id_producto]
+        stock_anterior = stock_nuevo + movimiento.cantidad
     elif tipo_movimiento.nombre_tipo == "ajuste":
-        stock_nuevo = movimiento.cantidad  # Para ajustes, la cantidad es el nuevo stock
+        # Para ajustes, la cantidad es el nuevo stock
+        stock_anterior, stock_nuevo = await fijar_stock(db, movimiento.id_producto, movimiento.cantidad)
+    else:
+        stock_anterior = stock_nuevo = producto.stock_actual
     
     # Crear movimiento
     db_movimiento = Inventario(
@@ -104,12 +165,11 @@ async def create_movimiento(
         tipo_documento=movimiento.tipo_documento
     )
     
-    # Actualizar stock del producto
-    producto.stock_actual = stock_nuevo
-    
     db.add(db_movimiento)
-    db.commit()
-    db.refresh(db_movimiento)
+    await db.commit()
+    await db.refresh(db_movimiento)
+    audit_log.record("crear", "Inventario", db_movimiento.id_movimiento, current_user.id_empleado,
+                     f"{tipo_movimiento.nombre_tipo} producto {movimiento.id_producto}: {stock_anterior} -> {stock_nuevo}")
     
     return db_movimiento
 
@@ -117,14 +177,15 @@ async def create_movimiento(
 @router.post("/ajuste", response_model=MovimientoInventario, status_code=status.HTTP_201_CREATED, summary="Realizar ajuste de inventario")
 async def ajuste_inventario(
     ajuste: AjusteInventario,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Realiza un ajuste de inventario para un producto.
     """
     # Verificar si el producto existe
-    producto = db.query(Productos).filter(Productos.id_producto == ajuste.id_producto).first()
+    producto = await db.scalar(select(Productos).where(Productos.id_producto == ajuste.id_producto))
     if not producto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -132,16 +193,15 @@ async def ajuste_inventario(
         )
     
     # Obtener tipo de movimiento "ajuste"
-    tipo_ajuste = db.query(TiposMovimiento).filter(TiposMovimiento.nombre_tipo == "ajuste").first()
+    tipo_ajuste = catalogos.tipo_movimiento("ajuste")
     if not tipo_ajuste:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tipo de movimiento 'ajuste' no encontrado"
         )
     
-    # Crear movimiento de ajuste
-    stock_anterior = producto.stock_actual
-    stock_nuevo = ajuste.nueva_cantidad
+    # Crear movimiento de ajuste con la fila del producto bloqueada
+    stock_anterior, stock_nuevo = await fijar_stock(db, ajuste.id_producto, ajuste.nueva_cantidad)
     
     db_movimiento = Inventario(
         id_producto=ajuste.id_producto,
@@ -154,39 +214,100 @@ async def ajuste_inventario(
         tipo_documento="ajuste"
     )
     
-    # Actualizar stock del producto
-    producto.stock_actual = stock_nuevo
-    
     db.add(db_movimiento)
-    db.commit()
-    db.refresh(db_movimiento)
+    await db.commit()
+    await db.refresh(db_movimiento)
+    audit_log.record("crear", "Inventario", db_movimiento.id_movimiento, current_user.id_empleado,
+                     f"ajuste producto {ajuste.id_producto}: {stock_anterior} -> {stock_nuevo}")
     
     return db_movimiento
 
 # Obtener productos con stock bajo
 @router.get("/alerta-stock", response_model=List[ProductoDetalle], summary="Obtener productos con stock bajo")
 async def get_alerta_stock(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de productos con stock por debajo del mínimo.
     """
+    # Se parte del índice de alertas (AlertasStock) en lugar de recorrer el catálogo
+    productos = await db.scalars(
+        with_profile(select(Productos), ProductoDetalle)
+        .where(
+            Productos.id_producto.in_(select(AlertasStock.id_producto)),
+            Productos.id_status == 1  # Solo productos activos
+        )
+    )
     
-    productos = db.query(Productos).filter(
-        Productos.stock_actual < Productos.stock_minimo,
-        Productos.id_status == 1  # Solo productos activos
-    ).all()
-    
-    return productos
+    return productos.all()
+
+# Stream de cambios de inventario (Server-Sent Events)
+@router.get("/stream", response_class=StreamingResponse, summary="Stream de cambios de inventario")
+async def stream_inventario(
+    producto: Optional[List[int]] = Query(None, description="IDs de producto a seguir (repetible)"),
+    categoria: Optional[List[int]] = Query(None, description="IDs de categoría a seguir (repetible)"),
+    last_event_id: Optional[int] = Header(None, description="Último evento recibido, para reanudar tras reconectar"),
+    current_user: Empleados = Depends(get_stream_user)
+):
+    """
+    Envía en formato SSE (text/event-stream) un evento ``movimiento`` por cada
+    movimiento de inventario (ventas, cancelaciones, compras, ajustes) y un
+    evento ``alerta`` cuando un producto cruza su stock mínimo. Sin filtros se
+    reciben todos; con ``producto`` y/o ``categoria`` solo los que coincidan.
+
+    Al reconectar, el navegador envía Last-Event-ID y se reenvían los eventos
+    perdidos. Si son demasiados, o si el cliente no consume a tiempo, se envía
+    ``reset``: el cliente debe recargar el estado y volver a conectarse.
+
+    Los clientes EventSource pueden autenticarse con el parámetro ``access_token``.
+    """
+    return StreamingResponse(
+        eventos_inventario(producto, categoria, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def eventos_inventario(productos: Optional[List[int]], categorias: Optional[List[int]], last_event_id: Optional[int]):
+    subscription = stock_stream.subscribe(productos, categorias)
+    try:
+        # Los eventos posteriores a esta posición ya llegan a la cola
+        hasta = await stock_stream.position()
+        yield ": conectado\n\n"
+        
+        reenviados = set()
+        if last_event_id is not None:
+            perdidos = await stock_stream.replay(last_event_id, hasta)
+            if perdidos is None:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            for evento in perdidos:
+                if subscription.accepts(evento):
+                    reenviados.add(evento.id)
+                    yield evento.encode()
+        
+        while True:
+            try:
+                evento = await asyncio.wait_for(subscription.queue.get(), settings.INVENTARIO_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Latido: mantiene la conexión abierta a través de proxies
+                yield ": ping\n\n"
+                continue
+            if evento is RESET:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            if evento.id not in reenviados:
+                yield evento.encode()
+    finally:
+        stock_stream.unsubscribe(subscription)
 
 # Obtener tipos de movimiento
 @router.get("/tipos-movimiento", response_model=List[TipoMovimiento], summary="Obtener tipos de movimiento")
 async def get_tipos_movimiento(
-    db: Session = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de tipos de movimiento de inventario.
     """
-    return db.query(TiposMovimiento).all()
\ No newline at end of file
+    return catalogos.all("tipos_movimiento")
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db, get_read_db, read_session_factory
 from ..models.pedidos import Pedidos, DetallesPedido, EstadosPedido
 from ..models.productos import Productos
 from ..models.clientes import Clientes, NivelesMembresia
@@ -10,34 +12,40 @@ from ..schemas.pedidos import (
     Pedido, PedidoCreate, PedidoUpdate, PedidoDetalle, 
     DetallePedido, EstadoPedido
 )
-from ..dependencies import get_current_active_user, get_admin_user
+from ..config import settings
+from ..core.auditoria import audit_log
+from ..core.exports import export_response
+from ..core.fast_json import Projection
+from ..core.loading import refresh_profile, with_profile
+from ..core.numeracion import numerador_pedidos
+from ..core.pagination import keyset_paginate, set_next_cursor
+from ..core.reference_data import ReferenceData
+from ..core.stock import historial_stock, mover_stock
+from ..core.ventas import ESTADO_CANCELADO, acumular_ventas, lineas_de_pedido
+from ..exceptions import ConflictError
+from ..dependencies import get_current_active_user, get_admin_user, get_reference_data
 from ..models.empleados import Empleados
 from datetime import datetime
-import random
-import string
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
 router = APIRouter()
 
-# Generar número de pedido único
-def generar_numero_pedido(db: Session):
-    while True:
-        # Formato: PED-YYYYMMDD-XXXXX (donde X es un carácter alfanumérico)
-        fecha = datetime.now().strftime("%Y%m%d")
-        sufijo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        numero_pedido = f"PED-{fecha}-{sufijo}"
-        
-        # Verificar que no exista
-        existe = db.query(Pedidos).filter(Pedidos.numero_pedido == numero_pedido).first()
-        if not existe:
-            return numero_pedido
+CENTAVO = Decimal("0.01")
+
+PEDIDOS = Projection(Pedido, Pedidos.__table__)
+LINEAS = Projection(DetallePedido, DetallesPedido.__table__)
+
+# Orden del listado (y de la exportación): más recientes primero
+ORDEN_PEDIDOS = [Pedidos.fecha_creacion, Pedidos.id_pedido]
 
 # Obtener todos los pedidos
 @router.get("/", response_model=List[Pedido], summary="Obtener lista de pedidos")
 async def get_pedidos(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); sustituye a skip"),
     id_cliente: Optional[int] = Query(None, description="Filtrar por cliente"),
     id_estado: Optional[int] = Query(None, description="Filtrar por estado"),
     fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
@@ -47,36 +55,79 @@ async def get_pedidos(
     """
     Obtiene la lista de pedidos con paginación y filtros opcionales.
     """
-    query = db.query(Pedidos)
+    query = filtrar_pedidos(select(Pedidos), id_cliente, id_estado, fecha_desde, fecha_hasta)
     
-    # Aplicar filtros
+    columnas = ORDEN_PEDIDOS
+    if settings.FAST_JSON_LISTS:
+        query = query.with_only_columns(*PEDIDOS.columns)
+        rows = (await db.execute(keyset_paginate(query, columnas, cursor, skip, limit))).all()
+        set_next_cursor(response, rows, columnas, limit)
+        return PEDIDOS.response(rows, response)
+
+    result = await db.scalars(keyset_paginate(query, columnas, cursor, skip, limit))
+    rows = result.all()
+    set_next_cursor(response, rows, columnas, limit)
+    return rows
+
+# Exportar pedidos (o sus líneas) en streaming
+@router.get("/export", response_class=StreamingResponse, summary="Exportar pedidos en NDJSON o CSV")
+async def export_pedidos(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de salida: ndjson (una fila JSON por línea) o csv"),
+    lineas: bool = Query(False, description="Exportar las líneas de los pedidos filtrados en lugar de las cabeceras"),
+    id_cliente: Optional[int] = Query(None, description="Filtrar por cliente"),
+    id_estado: Optional[int] = Query(None, description="Filtrar por estado"),
+    fecha_desde: Optional[str] = Query(None, description="Filtrar desde fecha (YYYY-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Filtrar hasta fecha (YYYY-MM-DD)"),
+    current_user: Empleados = Depends(get_current_active_user)
+):
+    """
+    Exporta todos los pedidos que cumplen los filtros de ``GET /pedidos/``,
+    en el mismo orden y con los mismos campos, sin paginar. Con ``lineas``
+    exporta las líneas de esos pedidos (una fila por línea).
+    """
+    if lineas:
+        query = filtrar_pedidos(
+            select(DetallesPedido).join(Pedidos, DetallesPedido.id_pedido == Pedidos.id_pedido),
+            id_cliente, id_estado, fecha_desde, fecha_hasta,
+        ).order_by(*(columna.desc() for columna in ORDEN_PEDIDOS), DetallesPedido.id_detalle)
+        return export_response(read_session_factory(request), query, LINEAS, formato, "pedidos-lineas")
+
+    query = filtrar_pedidos(select(Pedidos), id_cliente, id_estado, fecha_desde, fecha_hasta)
+    query = query.order_by(*(columna.desc() for columna in ORDEN_PEDIDOS))
+    return export_response(read_session_factory(request), query, PEDIDOS, formato, "pedidos")
+
+def filtrar_pedidos(query, id_cliente: Optional[int], id_estado: Optional[int], fecha_desde: Optional[str], fecha_hasta: Optional[str]):
+    """Filtros comunes del listado y la exportación de pedidos."""
     if id_cliente:
-        query = query.filter(Pedidos.id_cliente == id_cliente)
+        query = query.where(Pedidos.id_cliente == id_cliente)
     
     if id_estado:
-        query = query.filter(Pedidos.id_estado == id_estado)
+        query = query.where(Pedidos.id_estado == id_estado)
     
     if fecha_desde:
         fecha_desde_obj = datetime.strptime(fecha_desde, "%Y-%m-%d").date()
-        query = query.filter(Pedidos.fecha_creacion >= fecha_desde_obj)
+        query = query.where(Pedidos.fecha_creacion >= fecha_desde_obj)
     
     if fecha_hasta:
         fecha_hasta_obj = datetime.strptime(fecha_hasta, "%Y-%m-%d").date()
-        query = query.filter(Pedidos.fecha_creacion <= fecha_hasta_obj)
+        query = query.where(Pedidos.fecha_creacion <= fecha_hasta_obj)
     
-    return query.order_by(Pedidos.fecha_creacion.desc()).offset(skip).limit(limit).all()
+    return query
 
 # Obtener un pedido por ID
 @router.get("/{pedido_id}", response_model=PedidoDetalle, summary="Obtener pedido por ID")
 async def get_pedido(
     pedido_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene los detalles de un pedido específico por su ID.
     """
-    pedido = db.query(Pedidos).filter(Pedidos.id_pedido == pedido_id).first()
+    pedido = await db.scalar(
+        with_profile(select(Pedidos).where(Pedidos.id_pedido == pedido_id), PedidoDetalle)
+    )
     if pedido is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -88,14 +139,15 @@ async def get_pedido(
 @router.post("/", response_model=PedidoDetalle, status_code=status.HTTP_201_CREATED, summary="Crear nuevo pedido")
 async def create_pedido(
     pedido: PedidoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea un nuevo pedido con sus detalles.
     """
     # Verificar si el cliente existe
-    cliente = db.query(Clientes).filter(Clientes.id_cliente == pedido.id_cliente).first()
+    cliente = await db.scalar(select(Clientes).where(Clientes.id_cliente == pedido.id_cliente))
     if not cliente:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -103,36 +155,39 @@ async def create_pedido(
         )
     
     # Obtener nivel de membresía del cliente para aplicar descuento
-    nivel_membresia = db.query(NivelesMembresia).filter(NivelesMembresia.id_nivel == cliente.id_nivel).first()
+    nivel_membresia = catalogos.get("niveles_membresia", cliente.id_nivel)
     descuento_porcentaje = nivel_membresia.descuento_porcentaje if nivel_membresia else 0
     
-    # Verificar productos y calcular totales
+    # Cantidad total solicitada por producto (un producto puede repetirse en varias líneas)
+    solicitado = {}
+    for detalle in pedido.detalles:
+        solicitado[detalle.id_producto] = solicitado.get(detalle.id_producto, 0) + detalle.cantidad
+    
+    # Cargar todos los productos del pedido en una sola consulta
+    result = await db.scalars(select(Productos).where(
+        Productos.id_producto.in_(solicitado.keys()),
+        Productos.id_status == 1  # Solo productos activos
+    ))
+    productos = {producto.id_producto: producto for producto in result.all()}
+    
+    # Verificar que existan todos los productos
+    for id_producto in solicitado:
+        if id_producto not in productos:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Producto con ID {id_producto} no encontrado o no está activo"
+            )
+    
+    # Calcular precios en memoria
     subtotal = 0
     impuestos = 0
     detalles_procesados = []
     
-    # Verificar que existan todos los productos y haya stock suficiente
     for detalle in pedido.detalles:
-        producto = db.query(Productos).filter(
-            Productos.id_producto == detalle.id_producto,
-            Productos.id_status == 1  # Solo productos activos
-        ).first()
-        
-        if not producto:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Producto con ID {detalle.id_producto} no encontrado o no está activo"
-            )
-        
-        if producto.stock_actual < detalle.cantidad:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuficiente para el producto {producto.nombre}. Disponible: {producto.stock_actual}, Solicitado: {detalle.cantidad}"
-            )
-        
-        # Calcular subtotal de cada detalle
-        precio_unitario = producto.precio_venta
-        descuento_unitario = (precio_unitario * descuento_porcentaje) / 100
+        precio_unitario = productos[detalle.id_producto].precio_venta
+        # Redondear a centavos como se guarda (DECIMAL(10, 2)) para que el
+        # subtotal y los acumulados de ventas cuadren con las líneas guardadas
+        descuento_unitario = ((precio_unitario * descuento_porcentaje) / 100).quantize(CENTAVO, ROUND_HALF_UP)
         subtotal_detalle = (precio_unitario - descuento_unitario) * detalle.cantidad
         
         detalles_procesados.append({
@@ -141,7 +196,7 @@ async def create_pedido(
             "precio_unitario": precio_unitario,
             "descuento_unitario": descuento_unitario,
             "subtotal": subtotal_detalle,
-            "producto": producto  # Para actualizar el stock después
+            "id_categoria": productos[detalle.id_producto].id_categoria
         })
         
         subtotal += subtotal_detalle
@@ -155,8 +210,12 @@ async def create_pedido(
     # Calcular total
     total = subtotal + impuestos
     
-    # Generar número de pedido
-    numero_pedido = generar_numero_pedido(db)
+    # Generar número de pedido antes de escribir nada: si hay que reservar un
+    # bloque nuevo se hace en otra conexión y no debe esperar a esta transacción
+    numero_pedido = await numerador_pedidos.siguiente()
+    
+    # Descontar el stock de forma atómica (409 si otra venta se llevó las unidades)
+    stock_final = await mover_stock(db, {id_producto: -cantidad for id_producto, cantidad in solicitado.items()})
     
     # Estado inicial de pedido (1: Pendiente)
     id_estado_inicial = 1
@@ -175,47 +234,42 @@ async def create_pedido(
         notas=pedido.notas
     )
     
+    # Insertar la cabecera sin confirmar para obtener su ID; todo el pedido
+    # se confirma en una única transacción al final
     db.add(db_pedido)
-    db.commit()
-    db.refresh(db_pedido)
+    await db.flush()
     
-    # Crear detalles del pedido
+    # Crear detalles del pedido en bloque
     for detalle in detalles_procesados:
-        db_detalle = DetallesPedido(
-            id_pedido=db_pedido.id_pedido,
-            id_producto=detalle["id_producto"],
-            cantidad=detalle["cantidad"],
-            precio_unitario=detalle["precio_unitario"],
-            descuento_unitario=detalle["descuento_unitario"],
-            subtotal=detalle["subtotal"]
-        )
-        db.add(db_detalle)
-        
-        # Actualizar inventario (disminuir stock)
-        producto = detalle["producto"]
-        stock_anterior = producto.stock_actual
-        stock_nuevo = stock_anterior - detalle["cantidad"]
-        
-        # Buscar tipo de movimiento "salida"
-        tipo_salida = db.query(TiposMovimiento).filter(TiposMovimiento.nombre_tipo == "salida").first()
-        
-        # Registrar movimiento en inventario
-        if tipo_salida:
-            db_movimiento = Inventario(
-                id_producto=detalle["id_producto"],
-                id_tipo_movimiento=tipo_salida.id_tipo_movimiento,
-                cantidad=detalle["cantidad"],
-                stock_anterior=stock_anterior,
-                stock_nuevo=stock_nuevo,
-                id_empleado=current_user.id_empleado,
-                motivo=f"Salida por pedido #{db_pedido.numero_pedido}",
-                id_documento=db_pedido.id_pedido,
-                tipo_documento="pedido"
-            )
-            db.add(db_movimiento)
+        detalle["id_pedido"] = db_pedido.id_pedido
+    await db.execute(insert(DetallesPedido), detalles_procesados)
+    
+    # Registrar movimientos en inventario a partir del stock real tras el descuento
+    tipo_salida = catalogos.tipo_movimiento("salida")
+    movimientos = []
+    if tipo_salida:
+        lineas_por_producto = {}
+        for detalle in detalles_procesados:
+            lineas_por_producto.setdefault(detalle["id_producto"], []).append(detalle)
         
-        # Actualizar stock del producto
-        producto.stock_actual = stock_nuevo
+        for id_producto, lineas in lineas_por_producto.items():
+            historial = historial_stock(stock_final[id_producto], [-d["cantidad"] for d in lineas])
+            for detalle, (stock_anterior, stock_nuevo) in zip(lineas, historial):
+                movimientos.append({
+                    "id_producto": id_producto,
+                    "id_tipo_movimiento": tipo_salida.id_tipo_movimiento,
+                    "cantidad": detalle["cantidad"],
+                    "stock_anterior": stock_anterior,
+                    "stock_nuevo": stock_nuevo,
+                    "id_empleado": current_user.id_empleado,
+                    "motivo": f"Salida por pedido #{db_pedido.numero_pedido}",
+                    "id_documento": db_pedido.id_pedido,
+                    "tipo_documento": "pedido"
+                })
+    
+    # Registrar movimientos en inventario en bloque
+    if movimientos:
+        await db.execute(insert(Inventario), movimientos)
     
     # Actualizar fecha última compra del cliente
     cliente.fecha_ultima_compra = datetime.now()
@@ -225,8 +279,15 @@ async def create_pedido(
         puntos_a_sumar = nivel_membresia.puntos_por_compra
         cliente.puntos_acumulados += puntos_a_sumar
     
-    db.commit()
-    db.refresh(db_pedido)
+    # Acumulados de ventas del día (al final: sus filas quedan bloqueadas hasta el commit)
+    await acumular_ventas(db, db_pedido.fecha_creacion.date(), [
+        (d["id_producto"], d["id_categoria"], d["cantidad"], d["subtotal"], d["descuento_unitario"])
+        for d in detalles_procesados
+    ])
+    
+    await db.commit()
+    await refresh_profile(db, db_pedido, PedidoDetalle)
+    audit_log.record("crear", "Pedidos", db_pedido.id_pedido, current_user.id_empleado, db_pedido.numero_pedido)
     
     return db_pedido
 
@@ -235,14 +296,21 @@ async def create_pedido(
 async def update_estado_pedido(
     pedido_id: int,
     pedido_update: PedidoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Actualiza el estado de un pedido existente.
+
+    Si el pedido entra en el estado cancelado o sale de él, sus ventas se
+    restan o se vuelven a sumar a los acumulados de su día en la misma
+    transacción (como hace el recálculo completo, que excluye los
+    cancelados). El stock no se toca: para cancelar devolviendo los
+    productos al inventario está ``POST /pedidos/{id}/cancelar``.
     """
     # Verificar si el pedido existe
-    db_pedido = db.query(Pedidos).filter(Pedidos.id_pedido == pedido_id).first()
+    db_pedido = await db.scalar(select(Pedidos).where(Pedidos.id_pedido == pedido_id))
     if db_pedido is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -251,13 +319,31 @@ async def update_estado_pedido(
     
     # Verificar si el estado existe
     if pedido_update.id_estado:
-        estado = db.query(EstadosPedido).filter(EstadosPedido.id_estado == pedido_update.id_estado).first()
+        estado = catalogos.get("estados_pedido", pedido_update.id_estado)
         if not estado:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Estado con ID {pedido_update.id_estado} no encontrado"
             )
         
+        # Entrar en "cancelado" o salir de él cambia lo que cuenta en los
+        # acumulados: cambiar el estado solo si nadie lo cambió entretanto,
+        # para no restar ni sumar el pedido dos veces
+        estado_anterior = db_pedido.id_estado
+        if (estado_anterior == ESTADO_CANCELADO) != (pedido_update.id_estado == ESTADO_CANCELADO):
+            result = await db.execute(
+                update(Pedidos)
+                .where(Pedidos.id_pedido == pedido_id, Pedidos.id_estado == estado_anterior)
+                .values(id_estado=pedido_update.id_estado)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise ConflictError(f"El pedido con ID {pedido_id} cambió de estado durante la actualización")
+            await acumular_ventas(
+                db, db_pedido.fecha_creacion.date(), await lineas_de_pedido(db, pedido_id),
+                signo=-1 if pedido_update.id_estado == ESTADO_CANCELADO else 1,
+            )
+        
         # Actualizar estado
         db_pedido.id_estado = pedido_update.id_estado
     
@@ -265,8 +351,9 @@ async def update_estado_pedido(
     if pedido_update.notas is not None:
         db_pedido.notas = pedido_update.notas
     
-    db.commit()
-    db.refresh(db_pedido)
+    await db.commit()
+    await db.refresh(db_pedido)
+    audit_log.record("actualizar", "Pedidos", pedido_id, current_user.id_empleado, f"Estado: {db_pedido.id_estado}")
     
     return db_pedido
 
@@ -274,14 +361,15 @@ async def update_estado_pedido(
 @router.post("/{pedido_id}/cancelar", response_model=Pedido, summary="Cancelar pedido")
 async def cancelar_pedido(
     pedido_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Cancela un pedido y devuelve los productos al inventario.
     """
     # Verificar si el pedido existe
-    db_pedido = db.query(Pedidos).filter(Pedidos.id_pedido == pedido_id).first()
+    db_pedido = await db.scalar(select(Pedidos).where(Pedidos.id_pedido == pedido_id))
     if db_pedido is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -295,24 +383,40 @@ async def cancelar_pedido(
             detail=f"No se puede cancelar un pedido que ya está entregado o cancelado"
         )
     
-    # Actualizar estado a cancelado (4)
+    # Actualizar estado a cancelado (4) solo si nadie lo canceló o entregó entretanto,
+    # para no devolver el stock dos veces
+    result = await db.execute(
+        update(Pedidos)
+        .where(Pedidos.id_pedido == pedido_id, Pedidos.id_estado.not_in([3, 4]))
+        .values(id_estado=4)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise ConflictError(f"El pedido con ID {pedido_id} cambió de estado durante la cancelación")
     db_pedido.id_estado = 4
     
     # Obtener detalles del pedido
-    detalles = db.query(DetallesPedido).filter(DetallesPedido.id_pedido == pedido_id).all()
+    detalles = (await db.scalars(select(DetallesPedido).where(DetallesPedido.id_pedido == pedido_id))).all()
     
     # Buscar tipo de movimiento "entrada"
-    tipo_entrada = db.query(TiposMovimiento).filter(TiposMovimiento.nombre_tipo == "entrada").first()
+    tipo_entrada = catalogos.tipo_movimiento("entrada")
     
-    # Devolver productos al inventario
+    # Devolver productos al inventario en un único UPDATE atómico
+    devoluciones = {}
     for detalle in detalles:
-        producto = db.query(Productos).filter(Productos.id_producto == detalle.id_producto).first()
-        if producto:
-            stock_anterior = producto.stock_actual
-            stock_nuevo = stock_anterior + detalle.cantidad
-            
-            # Registrar movimiento en inventario
-            if tipo_entrada:
+        devoluciones.setdefault(detalle.id_producto, []).append(detalle)
+    stock_final = await mover_stock(db, {
+        id_producto: sum(detalle.cantidad for detalle in lineas)
+        for id_producto, lineas in devoluciones.items()
+    })
+    
+    # Registrar movimientos en inventario a partir del stock real tras la devolución
+    if tipo_entrada:
+        for id_producto, lineas in devoluciones.items():
+            if id_producto not in stock_final:
+                continue
+            historial = historial_stock(stock_final[id_producto], [detalle.cantidad for detalle in lineas])
+            for detalle, (stock_anterior, stock_nuevo) in zip(lineas, historial):
                 db_movimiento = Inventario(
                     id_producto=detalle.id_producto,
                     id_tipo_movimiento=tipo_entrada.id_tipo_movimiento,
@@ -325,22 +429,27 @@ async def cancelar_pedido(
                     tipo_documento="pedido"
                 )
                 db.add(db_movimiento)
-            
-            # Actualizar stock del producto
-            producto.stock_actual = stock_nuevo
     
-    db.commit()
-    db.refresh(db_pedido)
+    # Restar el pedido de los acumulados de ventas de su día, con la
+    # categoría con la que se sumó cada línea
+    await acumular_ventas(db, db_pedido.fecha_creacion.date(), [
+        (detalle.id_producto, detalle.id_categoria, detalle.cantidad, detalle.subtotal, detalle.descuento_unitario)
+        for detalle in detalles
+    ], signo=-1)
+    
+    await db.commit()
+    await db.refresh(db_pedido)
+    audit_log.record("actualizar", "Pedidos", pedido_id, current_user.id_empleado, "Cancelado")
     
     return db_pedido
 
 # Obtener todos los estados de pedido
 @router.get("/estados", response_model=List[EstadoPedido], summary="Obtener estados de pedido")
 async def get_estados_pedido(
-    db: Session = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de todos los estados de pedido.
     """
-    return db.query(EstadosPedido).all()
\ No newline at end of file
+    return catalogos.all("estados_pedido")
\ No newline at end of file
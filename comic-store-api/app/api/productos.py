@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query, File, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db, get_read_db
 from ..models.productos import Productos, Categorias, Comics, FigurasColeccion
 from ..schemas.productos import (
     Producto, ProductoCreate, ProductoUpdate, ProductoDetalle,
     Categoria, CategoriaCreate, ComicCreate, ComicDetalle,
     FiguraColeccion, FiguraColeccionCreate, FiguraColeccionDetalle,
-    ProductoCompletoCreate
+    ProductoCompletoCreate, ResultadoImportacion
+)
+from ..config import settings
+from ..core.auditoria import audit_log
+from ..core.catalog_version import catalog_version
+from ..core.fast_json import Projection
+from ..core.importacion import importar_catalogo, leer_filas
+from ..core.loading import refresh_profile, with_profile
+from ..core.pagination import paginar_busqueda
+from ..core.reference_data import ReferenceData
+from ..core.search import CatalogSearch
+from ..core.stock import sincronizar_alertas
+from ..dependencies import (
+    get_current_active_user, get_admin_user, get_catalog_search, get_reference_data, check_catalog_etag
 )
-from ..dependencies import get_current_active_user, get_admin_user
 from ..models.empleados import Empleados
 import os
 import uuid
@@ -17,68 +30,67 @@ from datetime import datetime
 
 router = APIRouter()
 
+PRODUCTOS = Projection(Producto, Productos.__table__)
+
 # Obtener todos los productos
 @router.get("/", response_model=List[Producto], summary="Obtener lista de productos")
 async def get_productos(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
-    search: Optional[str] = Query(None, description="Buscar por nombre o SKU"),
+    search: Optional[str] = Query(None, description="Buscar por nombre, SKU, descripción o datos del comic/figura (ordenado por relevancia)"),
     categoria: Optional[int] = Query(None, description="Filtrar por categoría"),
     proveedor: Optional[int] = Query(None, description="Filtrar por proveedor"),
-    current_user: Empleados = Depends(get_current_active_user)
+    buscador: CatalogSearch = Depends(get_catalog_search),
+    current_user: Empleados = Depends(get_current_active_user),
+    _etag: None = Depends(check_catalog_etag)
 ):
     """
     Obtiene la lista de productos con paginación y filtros opcionales.
+    Responde 304 si If-None-Match coincide con la versión del catálogo.
     """
-    query = db.query(Productos)
+    query = select(Productos)
     
     # Aplicar filtros
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Productos.nombre.like(search_term)) | 
-            (Productos.sku.like(search_term))
-        )
-    
     if categoria:
-        query = query.filter(Productos.id_categoria == categoria)
+        query = query.where(Productos.id_categoria == categoria)
     
     if proveedor:
-        query = query.filter(Productos.id_proveedor == proveedor)
+        query = query.where(Productos.id_proveedor == proveedor)
     
-    return query.order_by(Productos.nombre).offset(skip).limit(limit).all()
-
-# Obtener un producto por ID
-@router.get("/{producto_id}", response_model=ProductoDetalle, summary="Obtener producto por ID")
-async def get_producto(
-    producto_id: int,
-    db: Session = Depends(get_db),
-    current_user: Empleados = Depends(get_current_active_user)
-):
-    """
-    Obtiene los detalles de un producto específico por su ID.
-    """
-    producto = db.query(Productos).filter(Productos.id_producto == producto_id).first()
-    if producto is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Producto con ID {producto_id} no encontrado"
-        )
-    return producto
+    if search:
+        ranking = await buscador.ranking("productos", search)
+    
+    if settings.FAST_JSON_LISTS:
+        query = query.with_only_columns(*PRODUCTOS.columns)
+        if search:
+            rows = await paginar_busqueda(db, query, Productos.id_producto, ranking, skip, limit, rows=True)
+            return PRODUCTOS.response(rows, response)
+        rows = (await db.execute(query.order_by(Productos.nombre).offset(skip).limit(limit))).all()
+        return PRODUCTOS.response(rows, response)
+    
+    if search:
+        # Ordenar por relevancia y paginar sobre los resultados de la búsqueda
+        return await paginar_busqueda(db, query, Productos.id_producto, ranking, skip, limit)
+    
+    result = await db.scalars(query.order_by(Productos.nombre).offset(skip).limit(limit))
+    return result.all()
 
 # Crear un nuevo producto
 @router.post("/", response_model=Producto, status_code=status.HTTP_201_CREATED, summary="Crear nuevo producto")
 async def create_producto(
     producto: ProductoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea un nuevo producto en el sistema.
     """
     # Verificar si el SKU ya existe
-    db_producto = db.query(Productos).filter(Productos.sku == producto.sku).first()
+    db_producto = await db.scalar(select(Productos).where(Productos.sku == producto.sku))
     if db_producto:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -86,7 +98,7 @@ async def create_producto(
         )
     
     # Verificar si la categoría existe
-    categoria = db.query(Categorias).filter(Categorias.id_categoria == producto.id_categoria).first()
+    categoria = catalogos.get("categorias", producto.id_categoria)
     if not categoria:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -96,8 +108,13 @@ async def create_producto(
     # Crear nuevo producto
     db_producto = Productos(**producto.model_dump())
     db.add(db_producto)
-    db.commit()
-    db.refresh(db_producto)
+    await db.flush()
+    await sincronizar_alertas(db, [db_producto.id_producto])
+    await catalog_version.bump(db)
+    await buscador.registrar(db, "productos", [db_producto.id_producto])
+    await db.commit()
+    await db.refresh(db_producto)
+    audit_log.record("crear", "Productos", db_producto.id_producto, current_user.id_empleado)
     
     return db_producto
 
@@ -106,14 +123,16 @@ async def create_producto(
 async def update_producto(
     producto_id: int,
     producto_update: ProductoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Actualiza los datos de un producto existente.
     """
     # Verificar si el producto existe
-    db_producto = db.query(Productos).filter(Productos.id_producto == producto_id).first()
+    db_producto = await db.scalar(select(Productos).where(Productos.id_producto == producto_id))
     if db_producto is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,7 +141,7 @@ async def update_producto(
     
     # Verificar si el SKU ya existe (si se está actualizando)
     if producto_update.sku and producto_update.sku != db_producto.sku:
-        exists = db.query(Productos).filter(Productos.sku == producto_update.sku).first()
+        exists = await db.scalar(select(Productos).where(Productos.sku == producto_update.sku))
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -131,7 +150,7 @@ async def update_producto(
     
     # Verificar si la categoría existe (si se está actualizando)
     if producto_update.id_categoria:
-        categoria = db.query(Categorias).filter(Categorias.id_categoria == producto_update.id_categoria).first()
+        categoria = catalogos.get("categorias", producto_update.id_categoria)
         if not categoria:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -143,8 +162,16 @@ async def update_producto(
     for key, value in update_data.items():
         setattr(db_producto, key, value)
     
-    db.commit()
-    db.refresh(db_producto)
+    # Mantener el índice de alertas si cambia el stock o el mínimo
+    if "stock_actual" in update_data or "stock_minimo" in update_data:
+        await db.flush()
+        await sincronizar_alertas(db, [producto_id])
+    
+    await catalog_version.bump(db)
+    await buscador.registrar(db, "productos", [producto_id])
+    await db.commit()
+    await db.refresh(db_producto)
+    audit_log.record("actualizar", "Productos", producto_id, current_user.id_empleado, f"Campos: {', '.join(update_data)}")
     
     return db_producto
 
@@ -152,14 +179,14 @@ async def update_producto(
 @router.delete("/{producto_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar producto")
 async def delete_producto(
     producto_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Elimina un producto del sistema (soft delete).
     """
     # Verificar si el producto existe
-    db_producto = db.query(Productos).filter(Productos.id_producto == producto_id).first()
+    db_producto = await db.scalar(select(Productos).where(Productos.id_producto == producto_id))
     if db_producto is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -168,7 +195,9 @@ async def delete_producto(
     
     # Soft delete (cambiar status a inactivo - asumiendo que 2 es "inactivo")
     db_producto.id_status = 2
-    db.commit()
+    await catalog_version.bump(db)
+    await db.commit()
+    audit_log.record("eliminar", "Productos", producto_id, current_user.id_empleado)
     
     return None
 
@@ -176,25 +205,25 @@ async def delete_producto(
 @router.post("/completo", response_model=ProductoDetalle, status_code=status.HTTP_201_CREATED, summary="Crear producto completo")
 async def create_producto_completo(
     producto_completo: ProductoCompletoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea un producto completo con sus detalles específicos (comic o figura).
     """
     # Verificar si el SKU ya existe
-    db_producto = db.query(Productos).filter(Productos.sku == producto_completo.producto.sku).first()
+    db_producto = await db.scalar(select(Productos).where(Productos.sku == producto_completo.producto.sku))
     if db_producto:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"El SKU {producto_completo.producto.sku} ya está registrado"
         )
     
-    # Crear nuevo producto
+    # Crear nuevo producto (en la misma transacción que su comic o figura)
     db_producto = Productos(**producto_completo.producto.model_dump())
     db.add(db_producto)
-    db.commit()
-    db.refresh(db_producto)
+    await db.flush()
     
     # Crear comic o figura según corresponda
     if producto_completo.comic:
@@ -210,41 +239,91 @@ async def create_producto_completo(
         )
         db.add(db_figura)
     
-    db.commit()
-    db.refresh(db_producto)
+    await sincronizar_alertas(db, [db_producto.id_producto])
+    await catalog_version.bump(db)
+    await buscador.registrar(db, "productos", [db_producto.id_producto])
+    await db.commit()
+    await refresh_profile(db, db_producto, ProductoDetalle)
+    audit_log.record("crear", "Productos", db_producto.id_producto, current_user.id_empleado)
     
     return db_producto
 
+# Importación masiva de productos completos (CSV o NDJSON)
+@router.post("/importar", response_model=ResultadoImportacion, summary="Importar catálogo desde CSV o NDJSON")
+async def importar_productos(
+    archivo: UploadFile = File(..., description="Archivo CSV o NDJSON con filas de ProductoCompletoCreate"),
+    formato: Optional[Literal["csv", "ndjson"]] = Query(None, description="Formato del archivo; por defecto según la extensión"),
+    dry_run: bool = Query(False, description="Solo validar, sin crear productos"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Da de alta en bloque productos con su comic o figura, por ejemplo el
+    catálogo mensual de un distribuidor.
+
+    - **NDJSON**: un objeto como el de ``POST /productos/completo`` por línea.
+    - **CSV**: una columna por campo del producto (``sku``, ``nombre``, ...) y
+      ``comic.<campo>`` o ``figura.<campo>`` para los detalles.
+
+    ``categoria`` y ``proveedor`` (por nombre) pueden sustituir a
+    ``id_categoria`` e ``id_proveedor``. Las filas se validan e insertan por
+    lotes de ``IMPORT_BATCH_SIZE``, cada uno en su transacción; las filas con
+    errores no se importan y se devuelven con su número de fila.
+    """
+    if formato is None:
+        extension = os.path.splitext(archivo.filename or "")[1].lower()
+        if extension not in (".csv", ".ndjson", ".jsonl"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Indique formato=csv o formato=ndjson (no se reconoce la extensión del archivo)"
+            )
+        formato = "csv" if extension == ".csv" else "ndjson"
+    
+    resultado = await importar_catalogo(db, leer_filas(archivo.file, formato), settings.IMPORT_BATCH_SIZE, dry_run)
+    ids = resultado.pop("ids")
+    if ids:
+        audit_log.record("crear", "Productos", None, current_user.id_empleado,
+                         f"Importación masiva: {len(ids)} productos ({resultado['comics']} comics, "
+                         f"{resultado['figuras']} figuras, {len(resultado['errores'])} filas con errores) "
+                         f"desde {archivo.filename}")
+    
+    return resultado
+
 # Obtener todos los comics
 @router.get("/comics", response_model=List[ComicDetalle], summary="Obtener lista de comics")
 async def get_comics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
-    search: Optional[str] = Query(None, description="Buscar por título")
+    search: Optional[str] = Query(None, description="Buscar por título, guionista, ISBN o datos del producto (ordenado por relevancia)"),
+    buscador: CatalogSearch = Depends(get_catalog_search),
+    _etag: None = Depends(check_catalog_etag)
 ):
     """
     Obtiene la lista de comics.
     """
-    query = db.query(Comics).join(Productos)
+    query = with_profile(select(Comics), ComicDetalle)
     
     # Aplicar filtros
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(Comics.titulo.like(search_term))
+        ranking = await buscador.ranking("productos", search)
+        return await paginar_busqueda(db, query, Comics.id_producto, ranking, skip, limit)
     
-    return query.offset(skip).limit(limit).all()
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
 
 # Obtener un comic por ID
 @router.get("/comics/{comic_id}", response_model=ComicDetalle, summary="Obtener comic por ID")
 async def get_comic(
     comic_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene los detalles de un comic específico por su ID.
     """
-    comic = db.query(Comics).filter(Comics.id_comic == comic_id).first()
+    comic = await db.scalar(
+        with_profile(select(Comics).where(Comics.id_comic == comic_id), ComicDetalle)
+    )
     if comic is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -255,36 +334,38 @@ async def get_comic(
 # Obtener todas las figuras
 @router.get("/figuras", response_model=List[FiguraColeccionDetalle], summary="Obtener lista de figuras")
 async def get_figuras(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
-    search: Optional[str] = Query(None, description="Buscar por personaje o universo")
+    search: Optional[str] = Query(None, description="Buscar por personaje, universo o datos del producto (ordenado por relevancia)"),
+    buscador: CatalogSearch = Depends(get_catalog_search),
+    _etag: None = Depends(check_catalog_etag)
 ):
     """
     Obtiene la lista de figuras de colección.
     """
-    query = db.query(FigurasColeccion).join(Productos)
+    query = with_profile(select(FigurasColeccion), FiguraColeccionDetalle)
     
     # Aplicar filtros
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (FigurasColeccion.personaje.like(search_term)) | 
-            (FigurasColeccion.universo.like(search_term))
-        )
+        ranking = await buscador.ranking("productos", search)
+        return await paginar_busqueda(db, query, FigurasColeccion.id_producto, ranking, skip, limit)
     
-    return query.offset(skip).limit(limit).all()
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
 
 # Obtener una figura por ID
 @router.get("/figuras/{figura_id}", response_model=FiguraColeccionDetalle, summary="Obtener figura por ID")
 async def get_figura(
     figura_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene los detalles de una figura específica por su ID.
     """
-    figura = db.query(FigurasColeccion).filter(FigurasColeccion.id_figura == figura_id).first()
+    figura = await db.scalar(
+        with_profile(select(FigurasColeccion).where(FigurasColeccion.id_figura == figura_id), FiguraColeccionDetalle)
+    )
     if figura is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -295,25 +376,48 @@ async def get_figura(
 # Obtener todas las categorías
 @router.get("/categorias", response_model=List[Categoria], summary="Obtener lista de categorías")
 async def get_categorias(
-    db: Session = Depends(get_db)
+    catalogos: ReferenceData = Depends(get_reference_data),
+    _etag: None = Depends(check_catalog_etag)
 ):
     """
     Obtiene la lista de todas las categorías de productos.
     """
-    return db.query(Categorias).all()
+    return catalogos.all("categorias")
+
+# Obtener un producto por ID (declarado después de /comics, /figuras y /categorias
+# para que esas rutas no se interpreten como un ID)
+@router.get("/{producto_id}", response_model=ProductoDetalle, summary="Obtener producto por ID")
+async def get_producto(
+    producto_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Empleados = Depends(get_current_active_user)
+):
+    """
+    Obtiene los detalles de un producto específico por su ID.
+    """
+    producto = await db.scalar(
+        with_profile(select(Productos).where(Productos.id_producto == producto_id), ProductoDetalle)
+    )
+    if producto is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Producto con ID {producto_id} no encontrado"
+        )
+    return producto
 
 # Crear nueva categoría
 @router.post("/categorias", response_model=Categoria, status_code=status.HTTP_201_CREATED, summary="Crear nueva categoría")
 async def create_categoria(
     categoria: CategoriaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Crea una nueva categoría de productos.
     """
     # Verificar si la categoría ya existe
-    db_categoria = db.query(Categorias).filter(Categorias.nombre_categoria == categoria.nombre_categoria).first()
+    db_categoria = await db.scalar(select(Categorias).where(Categorias.nombre_categoria == categoria.nombre_categoria))
     if db_categoria:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -323,8 +427,11 @@ async def create_categoria(
     # Crear nueva categoría
     db_categoria = Categorias(**categoria.model_dump())
     db.add(db_categoria)
-    db.commit()
-    db.refresh(db_categoria)
+    await catalog_version.bump(db)
+    await db.commit()
+    await db.refresh(db_categoria)
+    await catalogos.refresh("categorias")
+    audit_log.record("crear", "Categorias", db_categoria.id_categoria, current_user.id_empleado)
     
     return db_categoria
 
@@ -333,14 +440,15 @@ async def create_categoria(
 async def update_categoria(
     categoria_id: int,
     categoria: CategoriaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    catalogos: ReferenceData = Depends(get_reference_data),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Actualiza una categoría existente.
     """
     # Verificar si la categoría existe
-    db_categoria = db.query(Categorias).filter(Categorias.id_categoria == categoria_id).first()
+    db_categoria = await db.scalar(select(Categorias).where(Categorias.id_categoria == categoria_id))
     if db_categoria is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -349,7 +457,7 @@ async def update_categoria(
     
     # Verificar si el nombre ya existe (si se está actualizando)
     if categoria.nombre_categoria != db_categoria.nombre_categoria:
-        exists = db.query(Categorias).filter(Categorias.nombre_categoria == categoria.nombre_categoria).first()
+        exists = await db.scalar(select(Categorias).where(Categorias.nombre_categoria == categoria.nombre_categoria))
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -360,7 +468,10 @@ async def update_categoria(
     db_categoria.nombre_categoria = categoria.nombre_categoria
     db_categoria.descripcion = categoria.descripcion
     
-    db.commit()
-    db.refresh(db_categoria)
+    await catalog_version.bump(db)
+    await db.commit()
+    await db.refresh(db_categoria)
+    await catalogos.refresh("categorias")
+    audit_log.record("actualizar", "Categorias", db_categoria.id_categoria, current_user.id_empleado)
     
     return db_categoria
\ No newline at end of file
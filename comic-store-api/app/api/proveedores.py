@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.proveedores import Proveedores
 from ..schemas.proveedores import (
     Proveedor, ProveedorCreate, ProveedorUpdate
 )
-from ..dependencies import get_current_active_user, get_admin_user
+from ..core.auditoria import audit_log
+from ..core.pagination import paginar_busqueda
+from ..core.search import CatalogSearch
+from ..dependencies import get_current_active_user, get_admin_user, get_catalog_search
 from ..models.empleados import Empleados
 
 router = APIRouter()
@@ -14,38 +18,37 @@ router = APIRouter()
 # Obtener todos los proveedores
 @router.get("/", response_model=List[Proveedor], summary="Obtener lista de proveedores")
 async def get_proveedores(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, description="Número de registros a omitir"),
     limit: int = Query(100, description="Número máximo de registros a devolver"),
-    search: Optional[str] = Query(None, description="Buscar por nombre o email"),
+    search: Optional[str] = Query(None, description="Buscar por nombre o email (ordenado por relevancia)"),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de proveedores con paginación y filtros opcionales.
     """
-    query = db.query(Proveedores)
+    query = select(Proveedores)
     
     # Aplicar filtros
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Proveedores.nombre.like(search_term)) | 
-            (Proveedores.email.like(search_term))
-        )
+        ranking = await buscador.ranking("proveedores", search)
+        return await paginar_busqueda(db, query, Proveedores.id_proveedor, ranking, skip, limit)
     
-    return query.order_by(Proveedores.nombre).offset(skip).limit(limit).all()
+    result = await db.scalars(query.order_by(Proveedores.nombre).offset(skip).limit(limit))
+    return result.all()
 
 # Obtener un proveedor por ID
 @router.get("/{proveedor_id}", response_model=Proveedor, summary="Obtener proveedor por ID")
 async def get_proveedor(
     proveedor_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_current_active_user)
 ):
     """
     Obtiene los detalles de un proveedor específico por su ID.
     """
-    proveedor = db.query(Proveedores).filter(Proveedores.id_proveedor == proveedor_id).first()
+    proveedor = await db.scalar(select(Proveedores).where(Proveedores.id_proveedor == proveedor_id))
     if proveedor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,14 +60,15 @@ async def get_proveedor(
 @router.post("/", response_model=Proveedor, status_code=status.HTTP_201_CREATED, summary="Crear nuevo proveedor")
 async def create_proveedor(
     proveedor: ProveedorCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Crea un nuevo proveedor en el sistema.
     """
     # Verificar si el email ya existe
-    db_proveedor = db.query(Proveedores).filter(Proveedores.email == proveedor.email).first()
+    db_proveedor = await db.scalar(select(Proveedores).where(Proveedores.email == proveedor.email))
     if db_proveedor:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -74,8 +78,11 @@ async def create_proveedor(
     # Crear nuevo proveedor
     db_proveedor = Proveedores(**proveedor.model_dump())
     db.add(db_proveedor)
-    db.commit()
-    db.refresh(db_proveedor)
+    await db.flush()
+    await buscador.registrar(db, "proveedores", [db_proveedor.id_proveedor])
+    await db.commit()
+    await db.refresh(db_proveedor)
+    audit_log.record("crear", "Proveedores", db_proveedor.id_proveedor, current_user.id_empleado)
     
     return db_proveedor
 
@@ -84,14 +91,15 @@ async def create_proveedor(
 async def update_proveedor(
     proveedor_id: int,
     proveedor_update: ProveedorUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    buscador: CatalogSearch = Depends(get_catalog_search),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Actualiza los datos de un proveedor existente.
     """
     # Verificar si el proveedor existe
-    db_proveedor = db.query(Proveedores).filter(Proveedores.id_proveedor == proveedor_id).first()
+    db_proveedor = await db.scalar(select(Proveedores).where(Proveedores.id_proveedor == proveedor_id))
     if db_proveedor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,7 +108,7 @@ async def update_proveedor(
     
     # Verificar si el email ya existe (si se está actualizando)
     if proveedor_update.email and proveedor_update.email != db_proveedor.email:
-        exists = db.query(Proveedores).filter(Proveedores.email == proveedor_update.email).first()
+        exists = await db.scalar(select(Proveedores).where(Proveedores.email == proveedor_update.email))
         if exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -112,8 +120,10 @@ async def update_proveedor(
     for key, value in update_data.items():
         setattr(db_proveedor, key, value)
     
-    db.commit()
-    db.refresh(db_proveedor)
+    await buscador.registrar(db, "proveedores", [proveedor_id])
+    await db.commit()
+    await db.refresh(db_proveedor)
+    audit_log.record("actualizar", "Proveedores", proveedor_id, current_user.id_empleado, f"Campos: {', '.join(update_data)}")
     
     return db_proveedor
 
@@ -121,14 +131,14 @@ async def update_proveedor(
 @router.delete("/{proveedor_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar proveedor")
 async def delete_proveedor(
     proveedor_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Empleados = Depends(get_admin_user)  # Solo administradores
 ):
     """
     Elimina un proveedor del sistema (soft delete).
     """
     # Verificar si el proveedor existe
-    db_proveedor = db.query(Proveedores).filter(Proveedores.id_proveedor == proveedor_id).first()
+    db_proveedor = await db.scalar(select(Proveedores).where(Proveedores.id_proveedor == proveedor_id))
     if db_proveedor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -137,6 +147,7 @@ async def delete_proveedor(
     
     # Soft delete (cambiar status a inactivo - asumiendo que 2 es "inactivo")
     db_proveedor.id_status = 2
-    db.commit()
+    await db.commit()
+    audit_log.record("eliminar", "Proveedores", proveedor_id, current_user.id_empleado)
     
     return None
\ No newline at end of file
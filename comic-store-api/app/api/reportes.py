@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..database import get_read_db
+from ..models.productos import Productos, Categorias
+from ..models.reportes import VentasDiarias, VentasDiariasProducto, VentasDiariasCategoria
+from ..schemas.reportes import VentasDia, VentasProducto, VentasCategoria
+from ..dependencies import get_admin_user
+from ..models.empleados import Empleados
+from datetime import date, timedelta
+
+router = APIRouter()
+
+# Todos los reportes se leen de los acumulados diarios (app/core/ventas.py),
+# nunca de Pedidos/DetallesPedido, y van a la réplica de lectura si existe
+
+def rango_fechas(fecha_desde: Optional[date], fecha_hasta: Optional[date]):
+    """Rango pedido; por defecto los últimos 30 días hasta hoy."""
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta - timedelta(days=29)
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fecha_desde no puede ser posterior a fecha_hasta"
+        )
+    return fecha_desde, fecha_hasta
+
+def sumas(model):
+    return [
+        func.sum(model.pedidos).label("pedidos"),
+        func.sum(model.unidades).label("unidades"),
+        func.sum(model.ingresos).label("ingresos"),
+        func.sum(model.descuentos).label("descuentos"),
+    ]
+
+# Ventas por día
+@router.get("/ventas", response_model=List[VentasDia], summary="Obtener ventas por día")
+async def get_ventas(
+    db: AsyncSession = Depends(get_read_db),
+    fecha_desde: Optional[date] = Query(None, description="Desde fecha (YYYY-MM-DD); por defecto hace 30 días"),
+    fecha_hasta: Optional[date] = Query(None, description="Hasta fecha (YYYY-MM-DD); por defecto hoy"),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Obtiene pedidos, unidades, ingresos (sin impuestos) y descuentos de cada día
+    con ventas del rango. Los pedidos cancelados no cuentan.
+    """
+    fecha_desde, fecha_hasta = rango_fechas(fecha_desde, fecha_hasta)
+    result = await db.scalars(
+        select(VentasDiarias)
+        .where(VentasDiarias.fecha >= fecha_desde, VentasDiarias.fecha <= fecha_hasta)
+        .order_by(VentasDiarias.fecha)
+    )
+    return result.all()
+
+# Ventas por producto
+@router.get("/ventas/productos", response_model=List[VentasProducto], summary="Obtener ventas por producto")
+async def get_ventas_productos(
+    db: AsyncSession = Depends(get_read_db),
+    fecha_desde: Optional[date] = Query(None, description="Desde fecha (YYYY-MM-DD); por defecto hace 30 días"),
+    fecha_hasta: Optional[date] = Query(None, description="Hasta fecha (YYYY-MM-DD); por defecto hoy"),
+    id_categoria: Optional[int] = Query(None, description="Filtrar por categoría"),
+    orden: str = Query("ingresos", pattern="^(ingresos|unidades|pedidos)$", description="Ordenar por ingresos, unidades o pedidos"),
+    limit: int = Query(20, ge=1, le=1000, description="Número máximo de productos a devolver"),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Obtiene los productos más vendidos del rango con sus totales.
+    """
+    fecha_desde, fecha_hasta = rango_fechas(fecha_desde, fecha_hasta)
+    totales = (
+        select(VentasDiariasProducto.id_producto, *sumas(VentasDiariasProducto))
+        .where(VentasDiariasProducto.fecha >= fecha_desde, VentasDiariasProducto.fecha <= fecha_hasta)
+        .group_by(VentasDiariasProducto.id_producto)
+        .subquery()
+    )
+    query = (
+        select(totales, Productos.sku, Productos.nombre, Productos.id_categoria)
+        .join(Productos, Productos.id_producto == totales.c.id_producto)
+        .order_by(totales.c[orden].desc(), totales.c.id_producto)
+        .limit(limit)
+    )
+    if id_categoria:
+        query = query.where(Productos.id_categoria == id_categoria)
+    result = await db.execute(query)
+    return result.all()
+
+# Ventas diarias de un producto
+@router.get("/ventas/productos/{producto_id}", response_model=List[VentasDia], summary="Obtener ventas diarias de un producto")
+async def get_ventas_producto(
+    producto_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    fecha_desde: Optional[date] = Query(None, description="Desde fecha (YYYY-MM-DD); por defecto hace 30 días"),
+    fecha_hasta: Optional[date] = Query(None, description="Hasta fecha (YYYY-MM-DD); por defecto hoy"),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Obtiene las ventas de cada día del rango en que se vendió el producto.
+    """
+    fecha_desde, fecha_hasta = rango_fechas(fecha_desde, fecha_hasta)
+    result = await db.scalars(
+        select(VentasDiariasProducto)
+        .where(
+            VentasDiariasProducto.id_producto == producto_id,
+            VentasDiariasProducto.fecha >= fecha_desde,
+            VentasDiariasProducto.fecha <= fecha_hasta
+        )
+        .order_by(VentasDiariasProducto.fecha)
+    )
+    return result.all()
+
+# Ventas por categoría
+@router.get("/ventas/categorias", response_model=List[VentasCategoria], summary="Obtener ventas por categoría")
+async def get_ventas_categorias(
+    db: AsyncSession = Depends(get_read_db),
+    fecha_desde: Optional[date] = Query(None, description="Desde fecha (YYYY-MM-DD); por defecto hace 30 días"),
+    fecha_hasta: Optional[date] = Query(None, description="Hasta fecha (YYYY-MM-DD); por defecto hoy"),
+    current_user: Empleados = Depends(get_admin_user)  # Solo administradores
+):
+    """
+    Obtiene los totales del rango por categoría, de mayor a menor ingreso.
+    """
+    fecha_desde, fecha_hasta = rango_fechas(fecha_desde, fecha_hasta)
+    totales = (
+        select(VentasDiariasCategoria.id_categoria, *sumas(VentasDiariasCategoria))
+        .where(VentasDiariasCategoria.fecha >= fecha_desde, VentasDiariasCategoria.fecha <= fecha_hasta)
+        .group_by(VentasDiariasCategoria.id_categoria)
+        .subquery()
+    )
+    result = await db.execute(
+        select(totales, Categorias.nombre_categoria)
+        .join(Categorias, Categorias.id_categoria == totales.c.id_categoria)
+        .order_by(totales.c.ingresos.desc(), totales.c.id_categoria)
+    )
+    return result.all()
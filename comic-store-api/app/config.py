@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import os
 from dotenv import load_dotenv
 
@@ -11,15 +11,103 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "mysql+pymysql://root@localhost/ComicStore")
+    # URL para el motor asíncrono; si no se define se deriva de DATABASE_URL
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+
+    # Pool de conexiones (por proceso de uvicorn)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # Segundos; menor que wait_timeout de MySQL
+    DB_POOL_PRE_PING: bool = True
+    # SQLite en archivo (desarrollo y benchmarks): ms que espera una escritura
+    # a que otra conexión libere la base antes de "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS: int = 30000
+
+    # Réplicas de lectura (URLs separadas por comas) y ventana read-your-writes
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    READ_YOUR_WRITES_SECONDS: int = 5
     
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "admin")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Hash de contraseñas (bcrypt) fuera del event loop
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Caché de usuarios autenticados (0 desactiva la caché) y sondeo de la
+    # versión de los empleados: lo que tarda una baja o un cambio de rol en
+    # verse en los demás workers (segundos)
+    USER_CACHE_MAX_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_VERSION_POLL_SECONDS: float = 1.0
+
+    # Recarga periódica de catálogos en memoria (segundos)
+    REFERENCE_DATA_REFRESH_SECONDS: int = 300
+
+    # Búsqueda de catálogo: reconstrucción periódica de los índices (segundos)
+    # e ids por consulta al aplicar filtros y paginación a los resultados
+    SEARCH_INDEX_REFRESH_SECONDS: int = 900
+    SEARCH_BATCH_SIZE: int = 1000
+    # Cada cuántos segundos se aplican en segundo plano los cambios de otros
+    # workers (CambiosBusqueda); cada búsqueda los aplica además antes de
+    # responder
+    SEARCH_SYNC_SECONDS: float = 1.0
+
+    # Versión del catálogo para GET condicionales (ETag): cada cuántos
+    # segundos se relee para ver las escrituras de otros workers
+    CATALOGO_VERSION_POLL_SECONDS: float = 1.0
+
+    # Listados grandes (productos, pedidos, movimientos) leídos como filas y
+    # serializados con orjson en lugar de objetos ORM validados por Pydantic
+    FAST_JSON_LISTS: bool = True
+
+    # Exportaciones en streaming (NDJSON/CSV): filas leídas del cursor por lote
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Importación masiva de catálogo: filas validadas e insertadas por
+    # transacción
+    IMPORT_BATCH_SIZE: int = 500
+
+    # Números de pedido/compra reservados por proceso en cada viaje a la
+    # base de datos. Con 1 los números siguen el orden cronológico dentro del
+    # día; con bloques mayores (opcional, más rendimiento) cada worker reparte
+    # su propio tramo y el orden entre workers deja de ser cronológico
+    NUMERACION_BLOQUE: int = 1
+
+    # Stream SSE de inventario: intervalo de lectura de movimientos, tamaño de
+    # la cola por cliente, latido para mantener viva la conexión y máximo de
+    # eventos reenviados al reconectar con Last-Event-ID
+    INVENTARIO_STREAM_POLL_SECONDS: float = 1.0
+    INVENTARIO_STREAM_QUEUE_SIZE: int = 256
+    INVENTARIO_STREAM_HEARTBEAT_SECONDS: int = 15
+    INVENTARIO_STREAM_REPLAY_LIMIT: int = 1000
+
+    # Auditoría (LogsSistema): eventos en cola como máximo, filas por INSERT,
+    # intervalo máximo entre escrituras (ms) e intentos de un lote antes de
+    # escribirlo fila a fila descartando las que la base de datos rechace
+    AUDITORIA_QUEUE_SIZE: int = 10000
+    AUDITORIA_BATCH_SIZE: int = 200
+    AUDITORIA_FLUSH_MS: int = 500
+    AUDITORIA_MAX_INTENTOS: int = 3
+
+    # Métricas HTTP por ruta en /metrics (formato Prometheus)
+    METRICS_ENABLED: bool = True
+
+    # Consultas SQL por petición: cabecera Server-Timing (depuración) y aviso
+    # de N+1 cuando una misma sentencia se repite más de este número de veces
+    SQL_SERVER_TIMING: bool = False
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+
     # CORS
     CORS_ORIGINS: list = ["*"]
     
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
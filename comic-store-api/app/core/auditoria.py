@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert, text
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.logs import LogsSistema
+
+logger = logging.getLogger(__name__)
+
+# IP del cliente de la petición en curso (la fija el middleware de main.py)
+ip_cliente: ContextVar[Optional[str]] = ContextVar("ip_cliente", default=None)
+
+# Límites (en ms) del histograma de duración de cada escritura de lote
+FLUSH_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class AuditLog:
+    """
+    Registro de auditoría en ``LogsSistema`` fuera del camino de la petición.
+
+    ``record`` solo añade el evento a una cola en memoria acotada; una tarea
+    en segundo plano la vacía con un INSERT por lote (executemany) cada
+    ``flush_ms`` milisegundos o en cuanto hay ``batch_size`` eventos. Con la
+    cola llena los eventos nuevos se descartan (y se cuentan) en lugar de
+    frenar las peticiones; si la escritura falla el lote vuelve al frente de
+    la cola hasta donde quepa y se reintenta en el siguiente ciclo. Tras
+    ``max_intentos`` fallos seguidos se escribe fila a fila y se descartan
+    (y cuentan) solo las filas que la base de datos rechace, para que un
+    evento inválido no bloquee la cola.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_ms: int, max_intentos: int = 3):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_intentos = max_intentos
+        # Fallos seguidos del lote al frente de la cola
+        self._intentos = 0
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        # Se crean al primer uso (en Python 3.9 quedan ligados al loop activo)
+        self._wakeup: Optional[asyncio.Event] = None
+        # Un solo lote en escritura: flush() espera al que tenga en curso el
+        # escritor en segundo plano
+        self._escribiendo: Optional[asyncio.Lock] = None
+        self._closing = False
+        self.reset()
+
+    def reset(self):
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.write_errors = 0
+        self.max_pending_seen = len(self._queue)
+        self.flush_buckets = [0] * (len(FLUSH_BUCKETS_MS) + 1)
+        self.flush_count = 0
+        self.flush_sum_ms = 0.0
+        self.flush_max_ms = 0.0
+
+    def record(
+        self,
+        tipo_accion: str,
+        tabla_afectada: Optional[str] = None,
+        id_registro_afectado: Optional[int] = None,
+        id_empleado: Optional[int] = None,
+        detalle: Optional[str] = None,
+    ) -> bool:
+        """Encola un evento; devuelve False si se descartó por tener la cola llena."""
+        if len(self._queue) >= self.max_size:
+            self.dropped += 1
+            return False
+        self._queue.append({
+            "tipo_accion": tipo_accion,
+            "tabla_afectada": tabla_afectada,
+            "id_registro_afectado": id_registro_afectado,
+            "fecha_hora": datetime.now(),
+            "ip_usuario": ip_cliente.get(),
+            "id_empleado": id_empleado,
+            "detalle": detalle,
+        })
+        self.enqueued += 1
+        pendientes = len(self._queue)
+        if pendientes > self.max_pending_seen:
+            self.max_pending_seen = pendientes
+
+        if self._task is None or self._task.done():
+            if self._closing:
+                return True
+            self._wakeup = asyncio.Event()
+            # Contexto vacío: el escritor no hereda la petición que lo arranca
+            # (ni su IP ni el recuento de consultas de query_metrics)
+            self._task = Context().run(asyncio.create_task, self._run())
+        # Despertar al escritor con el primer evento y al completar un lote
+        if pendientes == 1 or pendientes >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self):
+        """
+        Escribe todo lo encolado hasta ahora (o hasta el primer fallo),
+        incluido el lote que el escritor tenga en curso.
+        """
+        # Aunque la cola esté vacía, esperar al lote en curso del escritor
+        while await self._write_batch() and self._queue:
+            pass
+
+    async def close(self):
+        """Detiene el escritor tras su lote en curso y escribe lo pendiente."""
+        self._closing = True
+        if self._task is not None and not self._task.done():
+            self._wakeup.set()
+            await self._task
+        await self.flush()
+
+    async def _run(self):
+        while not self._closing:
+            self._wakeup.clear()
+            if not self._queue:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+            # Esperar a completar un lote o a que venza el intervalo
+            if len(self._queue) < self.batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            if self._queue and not await self._write_batch():
+                # Base de datos con problemas: no reintentar en bucle
+                await asyncio.sleep(self.flush_ms / 1000)
+
+    async def _write_batch(self) -> bool:
+        if self._escribiendo is None:
+            self._escribiendo = asyncio.Lock()
+        async with self._escribiendo:
+            if not self._queue:
+                return True
+            return await self._write_queued()
+
+    async def _write_queued(self) -> bool:
+        lote: List[Dict[str, Any]] = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+        inicio = time.perf_counter()
+        try:
+            await self._insert(lote)
+        except Exception:
+            self.write_errors += 1
+            self._intentos += 1
+            if self._intentos >= self.max_intentos:
+                logger.exception("No se pudieron escribir %d eventos de auditoría tras %d intentos; "
+                                 "se escriben uno a uno", len(lote), self._intentos)
+                return await self._write_rows(lote)
+            logger.exception("No se pudieron escribir %d eventos de auditoría", len(lote))
+            self._devolver(lote)
+            return False
+        self._intentos = 0
+        self.written += len(lote)
+        self._observe_flush((time.perf_counter() - inicio) * 1000)
+        return True
+
+    async def _write_rows(self, lote: List[Dict[str, Any]]) -> bool:
+        """
+        Escribe fila a fila un lote que ha fallado ``max_intentos`` veces y
+        descarta las filas rechazadas (un valor fuera del ENUM en MySQL
+        estricto, por ejemplo). Si la base de datos ni siquiera responde, el
+        fallo no es de las filas: lo pendiente vuelve a la cola.
+        """
+        for i, evento in enumerate(lote):
+            try:
+                await self._insert([evento])
+            except Exception:
+                if not await self._disponible():
+                    self._devolver(lote[i:])
+                    return False
+                self.write_errors += 1
+                self.rejected += 1
+                logger.exception("Evento de auditoría rechazado por la base de datos, se descarta: %r", evento)
+                continue
+            self.written += 1
+        self._intentos = 0
+        return True
+
+    async def _insert(self, lote: List[Dict[str, Any]]):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(LogsSistema), lote)
+            await db.commit()
+
+    async def _disponible(self) -> bool:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+        except Exception:
+            return False
+        return True
+
+    def _devolver(self, lote: List[Dict[str, Any]]):
+        """Devuelve ``lote`` al frente de la cola; lo que no quepa se pierde."""
+        devueltos = lote[:max(self.max_size - len(self._queue), 0)]
+        self.dropped += len(lote) - len(devueltos)
+        self._queue.extendleft(reversed(devueltos))
+
+    def _observe_flush(self, elapsed_ms: float):
+        index = len(FLUSH_BUCKETS_MS)
+        for i, limit in enumerate(FLUSH_BUCKETS_MS):
+            if elapsed_ms <= limit:
+                index = i
+                break
+        self.flush_buckets[index] += 1
+        self.flush_count += 1
+        self.flush_sum_ms += elapsed_ms
+        if elapsed_ms > self.flush_max_ms:
+            self.flush_max_ms = elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        acumulado = 0
+        buckets = {}
+        for limit, count in zip(list(FLUSH_BUCKETS_MS) + ["+Inf"], self.flush_buckets):
+            acumulado += count
+            buckets[str(limit)] = acumulado
+        return {
+            "max_size": self.max_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_ms,
+            "running": self._task is not None and not self._task.done(),
+            "pending": len(self._queue),
+            "max_pending_seen": self.max_pending_seen,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "write_errors": self.write_errors,
+            "flush_ms": {
+                "count": self.flush_count,
+                "sum": round(self.flush_sum_ms, 3),
+                "max": round(self.flush_max_ms, 3),
+                "avg": round(self.flush_sum_ms / self.flush_count, 3) if self.flush_count else 0.0,
+                "buckets": buckets,
+            },
+        }
+
+audit_log = AuditLog(
+    settings.AUDITORIA_QUEUE_SIZE, settings.AUDITORIA_BATCH_SIZE, settings.AUDITORIA_FLUSH_MS,
+    settings.AUDITORIA_MAX_INTENTOS,
+)
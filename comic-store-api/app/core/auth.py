@@ -1,9 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
 from passlib.context import CryptContext
 
+from ..config import settings
+from ..exceptions import ServiceUnavailableError
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos acotado para no bloquear el event loop.
+
+    bcrypt libera el GIL, así que los hashes corren en paralelo con las demás
+    peticiones. Si hay más de ``max_pending`` operaciones en cola o en curso se
+    rechaza la petición en lugar de acumular latencia.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.max_pending_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def run(self, func: Callable, *args) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ServiceUnavailableError("Demasiadas operaciones de autenticación en curso, intente de nuevo")
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        encolado = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, encolado, func, args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _call(self, encolado: float, func: Callable, args: tuple) -> Any:
+        inicio = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.total_wait_ms += (inicio - encolado) * 1000
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_run_ms += (time.perf_counter() - inicio) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "max_pending_seen": self.max_pending_seen,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_ms / self.completed, 3) if self.completed else 0.0,
+                "avg_run_ms": round(self.total_run_ms / self.completed, 3) if self.completed else 0.0,
+            }
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hasher.run(get_password_hash, password)
@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import logging
+import time
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import async_engine, replica_engines
+from ..models.secuencias import Secuencias
+from .reference_data import reference_data
+
+logger = logging.getLogger(__name__)
+
+# Fila de Secuencias con la versión del catálogo
+NOMBRE = "catalogo"
+
+# Marca en Session.info de una transacción que subió la versión
+MODIFICADO = "catalogo_modificado"
+
+class CatalogVersion:
+    """
+    Versión del catálogo (productos, categorías, cómics y figuras) para
+    responder GET condicionales sin consultar la base de datos.
+
+    La versión vive en la fila ``catalogo`` de ``Secuencias``: cada edición
+    del catálogo la sube con ``bump`` dentro de su misma transacción, así que
+    cambia si y solo si se confirma el cambio.
+
+    Los movimientos de stock (ventas, ajustes, recepciones) no la suben: el
+    UPDATE bloquearía esa única fila hasta el commit de cada venta, con lo
+    que los cobros volverían a ir de uno en uno, y cada venta obligaría a los
+    terminales a descargar el catálogo entero. Por eso el ``stock_actual`` de
+    un listado revalidado con 304 puede ir por detrás; el stock al momento
+    está en ``/productos/{id}`` y ``/inventario/stream``, y las ventas se
+    validan siempre contra la base de datos. Su valor es la hora de la última modificación
+    en milisegundos (o el anterior + 1 si el reloj va por detrás), de modo
+    que sirve también para ``Last-Modified``.
+
+    Cada proceso la guarda en memoria y la vuelve a leer cada
+    ``CATALOGO_VERSION_POLL_SECONDS`` y tras sus propias escrituras. Con
+    réplicas se toma la menor de todas: la versión publicada nunca va por
+    delante de los datos que puede devolver cualquier réplica (a lo sumo se
+    reenvía un cuerpo que ya estaba al día). Si la lectura falla se deja de
+    publicar versión y los endpoints responden sin ETag.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._dirty = True
+        # Se crea al primer uso (en Python 3.9 queda ligado al loop activo)
+        self._lock: Optional[asyncio.Lock] = None
+        self.reads = 0
+        self.changes = 0
+        self.bumps = 0
+
+    async def load(self):
+        """Crea la fila de la versión si falta (base nueva) y la lee."""
+        async with async_engine.connect() as conn:
+            existe = await conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == NOMBRE))
+        if existe is None:
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(insert(Secuencias).values(nombre=NOMBRE, valor=time.time_ns() // 1_000_000))
+            except IntegrityError:
+                pass  # la creó otro worker
+        await self.refresh()
+
+    async def current(self) -> Optional[int]:
+        """Versión publicada; solo consulta la base tras una escritura local."""
+        if self._dirty:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("No se pudo leer la versión del catálogo")
+        return self.version
+
+    async def refresh(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._dirty = False
+            try:
+                version = await self._read()
+            except Exception:
+                self.version = None
+                self._dirty = True
+                raise
+            self.reads += 1
+            if version != self.version:
+                # Las categorías se sirven desde memoria: recargarlas antes de
+                # publicar la versión que ya las incluye
+                if self.version is not None:
+                    await reference_data.refresh("categorias")
+                self.version = version
+                self.changes += 1
+
+    async def _read(self) -> int:
+        versiones: List[int] = []
+        for engine in replica_engines or [async_engine]:
+            async with engine.connect() as conn:
+                versiones.append(await conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == NOMBRE)) or 0)
+        return min(versiones)
+
+    async def refresh_periodically(self, seconds: float):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("No se pudo leer la versión del catálogo")
+
+    def start(self, seconds: float) -> asyncio.Task:
+        # Contexto vacío: las lecturas no cuentan como consultas de la petición que lo arranca
+        return contextvars.Context().run(asyncio.create_task, self.refresh_periodically(seconds))
+
+    async def bump(self, db: AsyncSession):
+        """
+        Sube la versión dentro de la transacción de ``db``; debe llamarse en
+        toda edición del catálogo (no en los movimientos de stock).
+        """
+        ahora = time.time_ns() // 1_000_000
+        siguiente = Secuencias.valor + 1
+        result = await db.execute(
+            update(Secuencias)
+            .where(Secuencias.nombre == NOMBRE)
+            .values(valor=case((siguiente > ahora, siguiente), else_=ahora))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # Base sin la fila (normalmente la crea el arranque de la API)
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(Secuencias).values(nombre=NOMBRE, valor=ahora))
+            except IntegrityError:
+                return await self.bump(db)
+        self.bumps += 1
+        db.info[MODIFICADO] = True
+
+    def _after_commit(self, session: Session):
+        if session.info.pop(MODIFICADO, False):
+            self._dirty = True
+
+    def _after_rollback(self, session: Session):
+        session.info.pop(MODIFICADO, None)
+
+    def etag(self, version: int) -> str:
+        # Incluye la versión de la API: un despliegue puede cambiar el formato
+        return f'"catalogo-{version}-{settings.PROJECT_VERSION}"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Comparación débil de If-None-Match, como pide la RFC 9110."""
+        if not if_none_match:
+            return False
+        for candidato in if_none_match.split(","):
+            candidato = candidato.strip()
+            if candidato == "*" or candidato.removeprefix("W/") == etag:
+                return True
+        return False
+
+    def last_modified(self, version: int) -> str:
+        return formatdate(version / 1000, usegmt=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "last_modified": self.last_modified(self.version) if self.version else None,
+            "reads": self.reads,
+            "changes": self.changes,
+            "bumps": self.bumps,
+        }
+
+catalog_version = CatalogVersion()
+
+# Tras confirmar una escritura del catálogo este proceso relee la versión en
+# la siguiente petición condicional en lugar de esperar al sondeo
+event.listen(Session, "after_commit", catalog_version._after_commit)
+event.listen(Session, "after_rollback", catalog_version._after_rollback)
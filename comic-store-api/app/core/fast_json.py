@@ -0,0 +1,65 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Sequence, Type, Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Table
+
+class Projection:
+    """
+    Lectura rápida de listados grandes: selecciona de ``table`` solo las
+    columnas del esquema de respuesta y convierte cada fila Core en un dict
+    que se serializa con orjson, sin hidratar objetos ORM ni validar con
+    Pydantic (lo que más CPU consume al devolver miles de filas).
+
+    Reproduce la salida de ``response_model`` campo a campo y en el mismo
+    orden: los importes declarados como ``float`` salen como número y los
+    declarados como ``Decimal`` como texto, igual que los serializa
+    Pydantic; fechas y horas las escribe orjson en ISO 8601. Los campos en
+    ``nested`` (objetos anidados) los rellena el endpoint a partir de la
+    fila, normalmente desde un catálogo en memoria.
+    """
+
+    def __init__(self, schema: Type[BaseModel], table: Table, nested: Sequence[str] = ()):
+        self.schema = schema
+        self.nested = tuple(nested)
+        self.fields = list(schema.model_fields)
+        self.columns = [table.c[campo] for campo in schema.model_fields if campo not in self.nested]
+        self._keys = [column.key for column in self.columns]
+        self._conversions = []
+        for campo, info in schema.model_fields.items():
+            if campo in self.nested:
+                continue
+            tipo = _sin_optional(info.annotation)
+            if tipo is float:
+                self._conversions.append((campo, float))
+            elif tipo is Decimal:
+                self._conversions.append((campo, str))
+
+    def rows(self, filas: Sequence[Any], **nested: Callable[[Dict[str, Any]], Any]) -> List[Dict[str, Any]]:
+        keys = self._keys
+        conversions = self._conversions
+        salida = []
+        for fila in filas:
+            datos = dict(zip(keys, fila))
+            for campo, conversion in conversions:
+                valor = datos[campo]
+                if valor is not None:
+                    datos[campo] = conversion(valor)
+            for campo, valor in nested.items():
+                datos[campo] = valor(datos)
+            salida.append(datos)
+        return salida
+
+    def response(self, filas: Sequence[Any], response: Response, **nested: Callable[[Dict[str, Any]], Any]) -> ORJSONResponse:
+        # Las cabeceras fijadas en ``response`` (cursor, ETag) no se añaden
+        # solas cuando el endpoint devuelve su propia respuesta
+        return ORJSONResponse(self.rows(filas, **nested), headers=response.headers)
+
+def _sin_optional(tipo: Any) -> Any:
+    if get_origin(tipo) is Union:
+        args = [arg for arg in get_args(tipo) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return tipo
@@ -0,0 +1,256 @@
+import asyncio
+import codecs
+import csv
+import json
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.base import Status
+from ..models.productos import Categorias, Comics, FigurasColeccion, Productos
+from ..models.proveedores import Proveedores
+from ..schemas.productos import ProductoCompletoCreate
+from .catalog_version import catalog_version
+from .search import catalog_search
+from .stock import sincronizar_alertas
+
+# Columnas de texto que resuelven por nombre la categoría y el proveedor
+COLUMNA_CATEGORIA = "categoria"
+COLUMNA_PROVEEDOR = "proveedor"
+
+def leer_filas(archivo: IO[bytes], formato: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Recorre un archivo de importación y devuelve ``(número de fila, datos)``.
+
+    - NDJSON: un objeto ``ProductoCompletoCreate`` por línea. Las líneas
+      vacías se ignoran; las que no son JSON válido se devuelven como texto
+      para que ``importar_catalogo`` las reporte.
+    - CSV: una columna por campo. Las de ``comic`` y ``figura`` llevan el
+      prefijo (``comic.titulo``, ``figura.personaje``); las del producto van
+      sin prefijo o con ``producto.``. Las celdas vacías se omiten, así que
+      se aplican los valores por defecto del esquema.
+
+    En ambos formatos ``categoria`` y ``proveedor`` (por nombre) pueden
+    sustituir a ``id_categoria`` e ``id_proveedor``.
+    """
+    # Línea a línea sin cargar el archivo entero (csv une las celdas multilínea)
+    texto = codecs.iterdecode(archivo, "utf-8-sig")
+    if formato == "ndjson":
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except ValueError:
+                yield numero, linea
+        return
+
+    for numero, fila in enumerate(csv.DictReader(texto), start=2):  # la 1 es la cabecera
+        datos: Dict[str, Dict[str, Any]] = {}
+        for columna, valor in fila.items():
+            if columna is None or valor is None or valor == "":
+                continue
+            grupo, _, campo = columna.strip().rpartition(".")
+            datos.setdefault(grupo or "producto", {})[campo] = valor
+        yield numero, datos
+
+async def importar_catalogo(
+    db: AsyncSession,
+    filas: Iterable[Tuple[int, Any]],
+    lote: int,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Da de alta productos (con su comic o figura) en bloque.
+
+    Cada lote de ``lote`` filas se valida con ``ProductoCompletoCreate``,
+    resuelve categorías y proveedores con mapas cargados una sola vez al
+    empezar y busca los SKU ya registrados con una única consulta. Las filas
+    válidas se insertan con un executemany por tabla (productos, después
+    comics y figuras; INSERT de varias filas en MySQL) en una transacción por
+    lote, junto con las alertas de stock y
+    la versión del catálogo. Un error en una fila no detiene la importación:
+    se reporta con su número de fila y el resto del lote sigue adelante.
+
+    Con ``dry_run`` solo valida y no escribe nada.
+
+    La lectura del archivo y la validación de cada lote (CSV/JSON y
+    Pydantic, todo CPU) se hacen en un hilo para no bloquear el event loop
+    durante una importación grande.
+    """
+    mapas = await _cargar_mapas(db)
+    resultado: Dict[str, Any] = {
+        "dry_run": dry_run, "filas": 0, "importados": 0, "comics": 0, "figuras": 0,
+        "errores": [], "ids": [],
+    }
+    vistos: Set[str] = set()
+    filas = iter(filas)
+    while True:
+        leidas, validas, errores = await asyncio.to_thread(_leer_lote, filas, lote, mapas)
+        if not leidas:
+            return resultado
+        resultado["filas"] += leidas
+        resultado["errores"].extend(errores)
+        await _importar_lote(db, validas, vistos, dry_run, resultado)
+
+async def _cargar_mapas(db: AsyncSession) -> Dict[str, Dict[str, int]]:
+    """Categorías y proveedores por id (como texto) y por nombre en minúsculas; status por id."""
+    categorias: Dict[str, int] = {}
+    for id_categoria, nombre in await db.execute(select(Categorias.id_categoria, Categorias.nombre_categoria)):
+        categorias[str(id_categoria)] = categorias[nombre.strip().lower()] = id_categoria
+    proveedores: Dict[str, int] = {}
+    for id_proveedor, nombre in await db.execute(select(Proveedores.id_proveedor, Proveedores.nombre)):
+        proveedores[str(id_proveedor)] = id_proveedor
+        proveedores.setdefault(nombre.strip().lower(), id_proveedor)
+    status = {str(id_status): id_status for id_status in await db.scalars(select(Status.id_status))}
+    return {"id_categoria": categorias, "id_proveedor": proveedores, "id_status": status}
+
+def _leer_lote(
+    filas: Iterator[Tuple[int, Any]],
+    lote: int,
+    mapas: Dict[str, Dict[str, int]],
+) -> Tuple[int, List[Tuple[int, ProductoCompletoCreate]], List[Dict[str, Any]]]:
+    """Lee y valida hasta ``lote`` filas; devuelve (filas leídas, válidas, errores)."""
+    leidas = 0
+    validas: List[Tuple[int, ProductoCompletoCreate]] = []
+    errores: List[Dict[str, Any]] = []
+    for numero, datos in filas:
+        leidas += 1
+        producto, error = _validar(datos, mapas)
+        if error:
+            errores.append({"fila": numero, "sku": _sku(datos), "errores": error})
+        else:
+            validas.append((numero, producto))
+        if leidas >= lote:
+            break
+    return leidas, validas, errores
+
+async def _importar_lote(
+    db: AsyncSession,
+    validas: List[Tuple[int, ProductoCompletoCreate]],
+    vistos: Set[str],
+    dry_run: bool,
+    resultado: Dict[str, Any],
+) -> None:
+    # SKU repetidos dentro del archivo: gana la primera aparición
+    unicas = []
+    for numero, producto in validas:
+        sku = producto.producto.sku
+        if sku in vistos:
+            resultado["errores"].append({"fila": numero, "sku": sku, "errores": [f"SKU {sku} repetido en el archivo"]})
+        else:
+            vistos.add(sku)
+            unicas.append((numero, producto))
+
+    for intento in range(2):
+        # SKU ya registrados: una sola consulta por lote
+        registrados = set(await db.scalars(
+            select(Productos.sku).where(Productos.sku.in_([producto.producto.sku for _, producto in unicas]))
+        )) if unicas else set()
+        insertar = []
+        for numero, producto in unicas:
+            if producto.producto.sku in registrados:
+                resultado["errores"].append({
+                    "fila": numero, "sku": producto.producto.sku,
+                    "errores": [f"El SKU {producto.producto.sku} ya está registrado"],
+                })
+            else:
+                insertar.append(producto)
+        if dry_run or not insertar:
+            resultado["importados"] += len(insertar)
+            return
+        try:
+            ids, comics, figuras = await _insertar(db, insertar)
+            await sincronizar_alertas(db, ids)
+            await catalog_version.bump(db)
+            await catalog_search.registrar(db, "productos", ids)
+            await db.commit()
+        except IntegrityError:
+            # Otro proceso registró alguno de los SKU entre la consulta y el
+            # INSERT: se repite el lote una vez descartando los conflictos
+            await db.rollback()
+            if intento:
+                raise
+            reintentar = {id(producto) for producto in insertar}
+            unicas = [(numero, producto) for numero, producto in unicas if id(producto) in reintentar]
+            continue
+        resultado["importados"] += len(ids)
+        resultado["comics"] += comics
+        resultado["figuras"] += figuras
+        resultado["ids"].extend(ids)
+        return
+
+def _validar(datos: Any, mapas: Dict[str, Dict[str, int]]) -> Tuple[Optional[ProductoCompletoCreate], Optional[List[str]]]:
+    if not isinstance(datos, dict):
+        return None, ["La fila no es un objeto JSON válido"]
+    producto = datos.get("producto")
+    if not isinstance(producto, dict):
+        return None, ["Falta el objeto 'producto'"]
+
+    errores = []
+    producto = dict(producto)
+    for columna, campo in ((COLUMNA_CATEGORIA, "id_categoria"), (COLUMNA_PROVEEDOR, "id_proveedor"), (None, "id_status")):
+        mapa = mapas[campo]
+        nombre = producto.pop(columna, None) if columna else None
+        valor = producto.get(campo)
+        if valor is None and nombre is not None:
+            valor = mapa.get(str(nombre).strip().lower())
+            if valor is None:
+                errores.append(f"{columna}: '{nombre}' no existe")
+                continue
+        elif valor is not None:
+            if str(valor).strip() not in mapa:
+                errores.append(f"{campo}: {valor} no existe")
+                continue
+            valor = mapa[str(valor).strip()]
+        if valor is not None:
+            producto[campo] = valor
+    if errores:
+        return None, errores
+
+    try:
+        completo = ProductoCompletoCreate.model_validate({**datos, "producto": producto})
+    except ValidationError as exc:
+        return None, [f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" for error in exc.errors()]
+    if completo.comic and completo.figura:
+        return None, ["Un producto no puede ser a la vez comic y figura"]
+    return completo, None
+
+def _sku(datos: Any) -> Optional[str]:
+    if isinstance(datos, dict) and isinstance(datos.get("producto"), dict):
+        sku = datos["producto"].get("sku")
+        return str(sku) if sku is not None else None
+    return None
+
+async def _insertar(db: AsyncSession, productos: List[ProductoCompletoCreate]) -> Tuple[List[int], int, int]:
+    """
+    Inserta los productos y sus comics y figuras; devuelve (ids, comics,
+    figuras).
+
+    Se ejecuta como executemany de una sentencia compilada una vez (y
+    cacheada): el driver de MySQL lo reescribe en INSERT de varias filas, y
+    compilar un ``values([...])`` distinto en cada lote cuesta más que
+    insertarlo.
+    """
+    await db.execute(insert(Productos.__table__), [producto.producto.model_dump() for producto in productos])
+    # Ids asignados: por SKU, que es único (MySQL no admite RETURNING)
+    ids_por_sku = dict((await db.execute(
+        select(Productos.sku, Productos.id_producto)
+        .where(Productos.sku.in_([producto.producto.sku for producto in productos]))
+    )).all())
+    comics = [
+        {"id_producto": ids_por_sku[producto.producto.sku], **producto.comic.model_dump()}
+        for producto in productos if producto.comic
+    ]
+    figuras = [
+        {"id_producto": ids_por_sku[producto.producto.sku], **producto.figura.model_dump()}
+        for producto in productos if producto.figura
+    ]
+    if comics:
+        await db.execute(insert(Comics.__table__), comics)
+    if figuras:
+        await db.execute(insert(FigurasColeccion.__table__), figuras)
+    return [ids_por_sku[producto.producto.sku] for producto in productos], len(comics), len(figuras)
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+def with_profile(query, schema: Type[BaseModel]):
+    """
+    Aplica a ``query`` el perfil de carga de ``schema``: las relaciones que
+    el modelo de respuesta serializa se cargan en la misma consulta o en una
+    adicional por relación, nunca una por fila.
+
+    Con sesiones asíncronas una relación sin cargar no se consulta sola al
+    serializar (falla con ``MissingGreenlet``), así que todo endpoint que
+    devuelve un modelo ``*Detalle`` debe leerlo con su perfil.
+    """
+    entity = query.column_descriptions[0]["entity"]
+    return query.options(*loading_profile(entity, schema))
+
+@lru_cache(maxsize=None)
+def loading_profile(entity: Any, schema: Type[BaseModel]) -> Tuple[Any, ...]:
+    """
+    Opciones de carga de ``entity`` para responder con ``schema``.
+
+    Se deducen de los campos del esquema que son modelos anidados (o listas
+    de ellos) y coinciden con una relación de la entidad, a cualquier
+    profundidad: ``joinedload`` para las relaciones a uno (un JOIN en la
+    misma consulta) y ``selectinload`` para las colecciones (una consulta
+    ``IN`` por relación, que no multiplica filas ni rompe ``LIMIT``).
+    """
+    return tuple(_options(entity, schema, None))
+
+def profile_attributes(entity: Any, schema: Type[BaseModel]) -> List[str]:
+    """Relaciones de primer nivel de ``entity`` que serializa ``schema``."""
+    relaciones = inspect(entity).relationships
+    return [campo for campo, info in schema.model_fields.items() if campo in relaciones and _modelo(info.annotation)]
+
+async def refresh_profile(db: AsyncSession, instance: Any, schema: Type[BaseModel]) -> None:
+    """Recarga ``instance`` tras una escritura con las relaciones que serializa ``schema``."""
+    await db.refresh(instance, profile_attributes(type(instance), schema))
+
+def _options(entity: Any, schema: Type[BaseModel], parent: Optional[Any]):
+    relaciones = inspect(entity).relationships
+    for campo, info in schema.model_fields.items():
+        anidado = _modelo(info.annotation)
+        if anidado is None or campo not in relaciones:
+            continue
+        relacion = relaciones[campo]
+        if relacion.uselist:
+            opcion = parent.selectinload(getattr(entity, campo)) if parent is not None else selectinload(getattr(entity, campo))
+        else:
+            opcion = parent.joinedload(getattr(entity, campo)) if parent is not None else joinedload(getattr(entity, campo))
+        yield opcion
+        yield from _options(relacion.mapper.class_, anidado, opcion)
+
+def _modelo(tipo: Any) -> Optional[Type[BaseModel]]:
+    """El modelo Pydantic de un campo ``Modelo``, ``Optional[Modelo]`` o ``List[Modelo]``."""
+    if get_origin(tipo) in (Union, list, List):
+        for arg in get_args(tipo):
+            modelo = _modelo(arg)
+            if modelo is not None:
+                return modelo
+        return None
+    if isinstance(tipo, type) and issubclass(tipo, BaseModel):
+        return tipo
+    return None
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..config import settings
+from ..database import sequence_engine
+from ..models.secuencias import Secuencias
+
+class Numerador:
+    """
+    Genera números de documento únicos y legibles (``PED-YYYYMMDD-00042``)
+    sin consultar si ya existen.
+
+    El consecutivo de cada día vive en la tabla ``Secuencias``. Cada número
+    se reserva con un UPDATE atómico en su propia transacción (y su propio
+    pool, ver ``sequence_engine``), así que dos workers nunca obtienen el
+    mismo número y los números siguen el orden en que se pidieron.
+
+    Con ``bloque`` (o ``NUMERACION_BLOQUE``) mayor que 1 cada proceso
+    reserva tramos de ese tamaño y los reparte desde memoria: un viaje a la
+    base de datos por tramo, pero dentro del día los números de workers
+    distintos ya no quedan en orden cronológico, y los de un tramo que no se
+    llega a usar se pierden.
+    """
+
+    def __init__(self, prefijo: str, ancho: int = 5, bloque: Optional[int] = None):
+        self.prefijo = prefijo
+        self.ancho = ancho
+        self.bloque = bloque
+        # serie del día -> (siguiente número, último número reservado)
+        self._reservas: Dict[str, Tuple[int, int]] = {}
+        # Se crea al primer uso: en Python 3.9 un Lock queda ligado al event
+        # loop activo al crearlo, y este objeto se crea al importar el módulo
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def siguiente(self) -> str:
+        serie = f"{self.prefijo}-{datetime.now().strftime('%Y%m%d')}"
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            siguiente, ultimo = self._reservas.get(serie, (1, 0))
+            if siguiente > ultimo:
+                ultimo = await self._reservar(serie)
+                siguiente = ultimo - self._tamano_bloque() + 1
+            # Solo se conserva la serie del día en curso
+            self._reservas = {serie: (siguiente + 1, ultimo)}
+        return f"{serie}-{siguiente:0{self.ancho}d}"
+
+    def _tamano_bloque(self) -> int:
+        return max(1, self.bloque or settings.NUMERACION_BLOQUE)
+
+    async def _reservar(self, serie: str) -> int:
+        """Reserva el siguiente bloque de la serie y devuelve su último número."""
+        bloque = self._tamano_bloque()
+        for _ in range(2):
+            async with sequence_engine.begin() as conn:
+                result = await conn.execute(
+                    update(Secuencias)
+                    .where(Secuencias.nombre == serie)
+                    .values(valor=Secuencias.valor + bloque)
+                )
+                if result.rowcount == 1:
+                    # La fila sigue bloqueada por el UPDATE: el valor leído es el nuestro
+                    return await conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == serie))
+            # Primera reserva del día: crear la fila. Si otro proceso la crea
+            # a la vez, la inserción falla y se repite el UPDATE
+            try:
+                async with sequence_engine.begin() as conn:
+                    await conn.execute(insert(Secuencias).values(nombre=serie, valor=bloque))
+                return bloque
+            except IntegrityError:
+                continue
+        raise RuntimeError(f"No se pudo reservar numeración para {serie}")
+
+numerador_pedidos = Numerador("PED")
+numerador_compras = Numerador("COMP")
@@ -0,0 +1,109 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+
+# Cabecera con el cursor de la página siguiente (ausente en la última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codifica los valores de la clave de ordenación en un cursor opaco."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """Decodifica un cursor generado por ``encode_cursor`` para las columnas dadas."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(value) if value is not None and _is_datetime(column) else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+def keyset_paginate(query, columns: Sequence[Any], cursor: Optional[str], skip: int, limit: int, descending: bool = True):
+    """
+    Ordena ``query`` por ``columns`` (la última debe ser la clave primaria)
+    y aplica la página pedida.
+
+    Con ``cursor`` se filtra por la clave de la última fila vista (keyset),
+    de modo que cualquier página cuesta lo mismo que la primera; sin él se
+    mantiene la paginación clásica por ``skip``.
+    """
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+
+    values = decode_cursor(cursor, columns)
+    # (a, b) < (x, y)  ==>  a < x OR (a = x AND b < y), expandido para cualquier aridad
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        previous = [c == v for c, v in zip(columns[:i], values[:i])]
+        conditions.append(and_(*previous, column < value if descending else column > value))
+    # La cota redundante sobre la primera columna permite al motor usar el
+    # índice como rango en lugar de recorrerlo filtrando fila a fila
+    first = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return query.where(first, or_(*conditions)).limit(limit)
+
+def set_next_cursor(response: Response, rows: Sequence[Any], columns: Sequence[Any], limit: int) -> None:
+    """Publica en ``X-Next-Cursor`` el cursor de la página siguiente si puede haberla."""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in columns])
+
+async def paginar_busqueda(
+    db: AsyncSession,
+    query,
+    column,
+    ranking: Dict[int, int],
+    skip: int,
+    limit: int,
+    rows: bool = False,
+) -> List[Any]:
+    """
+    Página ``skip``/``limit`` de los resultados de una búsqueda ordenados por
+    relevancia (``ranking``: id -> posición, ver ``CatalogSearch.ranking``).
+
+    Los filtros de ``query`` se aplican a los ids del ranking en tramos de
+    ``SEARCH_BATCH_SIZE`` por orden de relevancia, hasta reunir
+    ``skip + limit`` filas: ni un filtro ni una página profunda pierden
+    resultados, y la primera página de una búsqueda sin filtros sigue siendo
+    una sola consulta. Con ``rows`` devuelve filas de Core en lugar de
+    entidades.
+    """
+    ids = list(ranking)
+    resultados: List[Any] = []
+    for inicio in range(0, len(ids), settings.SEARCH_BATCH_SIZE):
+        tramo = query.where(column.in_(ids[inicio:inicio + settings.SEARCH_BATCH_SIZE]))
+        filas = (await db.execute(tramo)).all() if rows else (await db.scalars(tramo)).all()
+        resultados.extend(sorted(filas, key=lambda fila: ranking[getattr(fila, column.key)]))
+        if len(resultados) >= skip + limit:
+            break
+    return resultados[skip:skip + limit]
+
+def in_ids(column, ids: Sequence[int]):
+    """
+    ``column IN (ids)`` con los enteros escritos en la sentencia en lugar de
+    un parámetro por id, para listas largas (SQLite admite 32766 parámetros).
+    """
+    return column.in_(bindparam(f"ids_{column.key}", list(ids), expanding=True, literal_execute=True))
+
+def _is_datetime(column) -> bool:
+    try:
+        return column.type.python_type is datetime
+    except NotImplementedError:
+        return False
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Dict, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+# Límites (en ms) del histograma de espera por una conexión del pool
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class PoolMetrics:
+    """
+    Métricas de un pool de conexiones: histograma del tiempo de espera en el
+    checkout, timeouts y contadores de rotación de conexiones.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Pool = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_count = 0
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.timeouts = 0
+            self.events = {"connect": 0, "close": 0, "invalidate": 0, "checkout": 0, "checkin": 0}
+
+    def observe_wait(self, elapsed_ms: float):
+        index = len(WAIT_BUCKETS_MS)
+        for i, limit in enumerate(WAIT_BUCKETS_MS):
+            if elapsed_ms <= limit:
+                index = i
+                break
+        with self._lock:
+            self.wait_buckets[index] += 1
+            self.wait_count += 1
+            self.wait_sum_ms += elapsed_ms
+            if elapsed_ms > self.wait_max_ms:
+                self.wait_max_ms = elapsed_ms
+
+    def count_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def count_event(self, name: str):
+        with self._lock:
+            self.events[name] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            acumulado = 0
+            buckets = {}
+            for limit, count in zip(list(WAIT_BUCKETS_MS) + ["+Inf"], self.wait_buckets):
+                acumulado += count
+                buckets[str(limit)] = acumulado
+            data = {
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum_ms, 3),
+                    "max": round(self.wait_max_ms, 3),
+                    "avg": round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    "buckets": buckets,
+                },
+                "timeouts": self.timeouts,
+                "connections": dict(self.events),
+            }
+        data["pool"] = pool_status(self.pool)
+        return data
+
+def pool_status(pool: Pool) -> Dict:
+    """Lee los indicadores instantáneos del pool (si el tipo de pool los expone)."""
+    if pool is None or not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+# Métricas registradas por nombre de motor
+pool_registry: Dict[str, PoolMetrics] = {}
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    if name not in pool_registry:
+        pool_registry[name] = PoolMetrics(name)
+    return pool_registry[name]
+
+def instrumented_pool_class(pool_class: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    Devuelve una subclase del pool que mide cuánto espera cada checkout.
+    Se usa una subclase porque SQLAlchemy no emite un evento antes del checkout;
+    al recrearse el pool (engine.dispose()) se conserva la misma clase.
+    """
+
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                metrics.count_timeout()
+                raise
+            finally:
+                metrics.observe_wait((time.perf_counter() - inicio) * 1000)
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    InstrumentedPool.__qualname__ = InstrumentedPool.__name__
+    return InstrumentedPool
+
+def instrument_engine(engine, metrics: PoolMetrics):
+    """Conecta los eventos del pool del motor (síncrono) con sus métricas."""
+    metrics.pool = engine.pool
+
+    for name in metrics.events:
+        def listener(*args, _name=name):
+            metrics.count_event(_name)
+        event.listen(engine, name, listener)
+
+    # engine.dispose() reemplaza el pool; mantener la referencia actualizada
+    @event.listens_for(engine, "engine_disposed")
+    def _on_dispose(disposed_engine):
+        metrics.pool = disposed_engine.pool
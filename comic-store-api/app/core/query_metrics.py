@@ -0,0 +1,198 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Normalización de sentencias para agrupar las repetidas: listas de
+# parámetros (IN, VALUES de varias filas) y números literales
+_PARAMETER_LIST = re.compile(r"(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+")
+_VALUES_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+# Sentencias ya normalizadas (el texto SQL se repite mucho); al llenarse se vacía
+FINGERPRINT_CACHE_SIZE = 5000
+_fingerprints: Dict[str, str] = {}
+
+def fingerprint(statement: str) -> str:
+    """Sentencia sin valores: dos consultas con distintos parámetros dan la misma huella."""
+    huella = _fingerprints.get(statement)
+    if huella is None:
+        huella = _SPACES.sub(" ", statement).strip()
+        huella = _PARAMETER_LIST.sub("?", huella)
+        huella = _VALUES_ROWS.sub("(?)", huella)
+        huella = _NUMBER.sub("N", huella)
+        if len(_fingerprints) >= FINGERPRINT_CACHE_SIZE:
+            _fingerprints.clear()
+        _fingerprints[statement] = huella
+    return huella
+
+class QueryStats:
+    """Consultas de una petición (o de un bloque ``capturar_consultas``)."""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        huella = fingerprint(statement)
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.statements[huella] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Sentencias ejecutadas más de ``threshold`` veces (patrón N+1)."""
+        return [(huella, veces) for huella, veces in self.statements.most_common() if veces > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} consultas"'
+
+# Consultas de la petición en curso (las fija QueryTrackingMiddleware)
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+def instrument_queries(engine):
+    """Registra en la petición en curso cada sentencia del motor y su duración."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["query_start"].pop()
+        stats = current_queries.get()
+        if stats is not None:
+            stats.record(statement, (time.perf_counter() - inicio) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # La sentencia falló: no habrá after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+class RouteQueryStats:
+    __slots__ = ("requests", "queries", "max_queries", "db_ms", "n_plus_one", "last_n_plus_one")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.n_plus_one = 0
+        self.last_n_plus_one: Optional[str] = None
+
+class QueryMetrics:
+    """Consultas por ruta (plantilla) y detecciones de N+1, por worker."""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteQueryStats] = {}
+
+    def reset(self):
+        self._routes.clear()
+
+    def observe(self, method: str, route: str, stats: QueryStats):
+        ruta = self._routes.get((method, route))
+        if ruta is None:
+            ruta = self._routes[(method, route)] = RouteQueryStats()
+        ruta.requests += 1
+        ruta.queries += stats.count
+        ruta.max_queries = max(ruta.max_queries, stats.count)
+        ruta.db_ms += stats.total_ms
+        for huella, veces in stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+            ruta.n_plus_one += 1
+            ruta.last_n_plus_one = huella
+            logger.warning("Posible N+1 en %s %s: %d ejecuciones de %s", method, route, veces, huella[:300])
+
+    def snapshot(self) -> Dict:
+        return {
+            f"{method} {route}": {
+                "requests": ruta.requests,
+                "avg_queries": round(ruta.queries / ruta.requests, 2),
+                "max_queries": ruta.max_queries,
+                "avg_db_ms": round(ruta.db_ms / ruta.requests, 3),
+                "n_plus_one": ruta.n_plus_one,
+                "last_n_plus_one": ruta.last_n_plus_one,
+            }
+            for (method, route), ruta in sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0]))
+        }
+
+query_metrics = QueryMetrics()
+
+class QueryTrackingMiddleware:
+    """
+    Middleware ASGI que cuenta las consultas SQL de cada petición: número,
+    tiempo total en base de datos y sentencias repetidas. Con
+    ``SQL_SERVER_TIMING`` las devuelve en la cabecera ``Server-Timing``
+    (las consultas hechas después de empezar la respuesta, p. ej. en un
+    stream, no entran en la cabecera pero sí en las métricas).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=current_queries.get())
+        token = current_queries.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.SQL_SERVER_TIMING:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_queries.reset(token)
+            route = scope.get("route")
+            query_metrics.observe(scope["method"], getattr(route, "path", "unmatched"), stats)
+
+class TooManyQueriesError(AssertionError):
+    pass
+
+@contextmanager
+def capturar_consultas() -> Iterator[QueryStats]:
+    """
+    Cuenta las consultas hechas dentro del bloque, incluidas las de las
+    peticiones atendidas en proceso (httpx.ASGITransport) mientras dura.
+    """
+    stats = QueryStats(parent=current_queries.get())
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+@contextmanager
+def max_consultas(limite: int) -> Iterator[QueryStats]:
+    """
+    Falla con ``TooManyQueriesError`` si el bloque hace más de ``limite``
+    consultas. Para benchmarks y pruebas::
+
+        with max_consultas(3):
+            await http.get("/productos/comics", headers=headers)
+    """
+    with capturar_consultas() as stats:
+        yield stats
+    if stats.count > limite:
+        detalle = "\n".join(f"  {veces} x {huella[:200]}" for huella, veces in stats.statements.most_common(5))
+        raise TooManyQueriesError(f"{stats.count} consultas (máximo {limite}):\n{detalle}")
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect, select
+
+from ..database import AsyncSessionLocal
+from ..models.base import Roles, Status
+from ..models.clientes import NivelesMembresia
+from ..models.empleados import Puestos
+from ..models.inventario import TiposMovimiento
+from ..models.pedidos import EstadosPedido
+from ..models.productos import Categorias
+
+logger = logging.getLogger(__name__)
+
+# Tablas de catálogo que casi nunca cambian
+TABLES = {
+    "categorias": Categorias,
+    "status": Status,
+    "roles": Roles,
+    "puestos": Puestos,
+    "estados_pedido": EstadosPedido,
+    "tipos_movimiento": TiposMovimiento,
+    "niveles_membresia": NivelesMembresia,
+}
+
+class ReferenceData:
+    """
+    Registro en memoria de las tablas de catálogo.
+
+    Se carga al iniciar la aplicación y cada tabla se recarga después de que un
+    endpoint la modifica. Los registros se cargan en una sesión propia y se
+    desasocian de ella, así que solo deben leerse (nunca asignarse a otros modelos).
+    Es local a cada proceso: los demás workers ven los cambios en la siguiente
+    recarga periódica o con POST /admin/reference-data/reload.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[int, Any]] = {}
+        self.loaded_at: Dict[str, datetime] = {}
+        self.reloads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return len(self._tables) == len(TABLES)
+
+    async def load(self):
+        for table in TABLES:
+            await self.refresh(table)
+
+    async def refresh(self, table: str):
+        model = TABLES[table]
+        pk = inspect(model).primary_key[0]
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(select(model).order_by(pk))).all()
+            db.expunge_all()
+        # Reemplazo atómico: los lectores nunca ven una tabla a medio cargar
+        self._tables[table] = {getattr(row, pk.key): row for row in rows}
+        self.loaded_at[table] = datetime.now()
+        self.reloads += 1
+
+    async def refresh_periodically(self, seconds: int):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("No se pudieron recargar los catálogos")
+
+    def get(self, table: str, id_registro: Optional[int]) -> Optional[Any]:
+        return self._tables[table].get(id_registro)
+
+    def all(self, table: str) -> List[Any]:
+        return list(self._tables[table].values())
+
+    def find(self, table: str, **filtros) -> Optional[Any]:
+        for row in self._tables[table].values():
+            if all(getattr(row, campo) == valor for campo, valor in filtros.items()):
+                return row
+        return None
+
+    def tipo_movimiento(self, nombre_tipo: str) -> Optional[TiposMovimiento]:
+        return self.find("tipos_movimiento", nombre_tipo=nombre_tipo)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reloads": self.reloads,
+            "tables": {
+                table: {
+                    "rows": len(rows),
+                    "loaded_at": self.loaded_at[table].isoformat(),
+                }
+                for table, rows in self._tables.items()
+            },
+        }
+
+reference_data = ReferenceData()
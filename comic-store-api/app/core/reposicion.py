@@ -0,0 +1,182 @@
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.compras import ComprasProveedores, DetallesCompra
+from ..models.inventario import Inventario
+from ..models.productos import Productos
+from ..models.proveedores import Proveedores
+from .numeracion import numerador_compras
+
+# Plazo de entrega supuesto para proveedores sin tiempo_entrega_promedio (días)
+PLAZO_ENTREGA_DEFECTO = 7
+
+# Mismo impuesto que create_compra
+TASA_IMPUESTOS = Decimal("0.16")
+
+NOTA_SUGERENCIA = "Sugerencia automática de reposición"
+
+async def calcular_sugerencias(
+    db: AsyncSession,
+    id_salida: int,
+    id_entrada: int,
+    dias_ventas: int,
+    dias_cobertura: int,
+    id_proveedor: Optional[int] = None,
+) -> Dict:
+    """
+    Calcula qué productos activos hay que reponer, agrupados por proveedor.
+
+    - Velocidad: unidades de los movimientos de salida de los últimos
+      ``dias_ventas`` días, menos las devueltas por cancelación de pedidos,
+      por día.
+    - Punto de reorden: velocidad × plazo de entrega del proveedor + stock
+      mínimo (como stock de seguridad).
+    - Disponible: stock actual + lo pendiente de recibir en compras abiertas.
+
+    Si el disponible no supera el punto de reorden se sugiere pedir hasta
+    cubrir el punto de reorden más ``dias_cobertura`` días de venta. Todo se
+    obtiene con tres consultas agregadas y una pasada en memoria, sin
+    consultas por producto.
+    """
+    desde = datetime.now() - timedelta(days=dias_ventas)
+    es_salida = Inventario.id_tipo_movimiento == id_salida
+    vendidas = dict((await db.execute(
+        select(Inventario.id_producto, func.sum(case((es_salida, Inventario.cantidad), else_=-Inventario.cantidad)))
+        .where(
+            Inventario.fecha_movimiento >= desde,
+            or_(
+                es_salida,
+                and_(Inventario.id_tipo_movimiento == id_entrada, Inventario.tipo_documento == "pedido")
+            )
+        )
+        .group_by(Inventario.id_producto)
+    )).all())
+
+    en_camino = dict((await db.execute(
+        select(
+            DetallesCompra.id_producto,
+            func.sum(DetallesCompra.cantidad_ordenada - func.coalesce(DetallesCompra.cantidad_recibida, 0))
+        )
+        .join(ComprasProveedores, ComprasProveedores.id_compra == DetallesCompra.id_compra)
+        .where(
+            ComprasProveedores.estado.in_(["pendiente", "procesado"]),
+            DetallesCompra.estado.in_(["pendiente", "parcial"])
+        )
+        .group_by(DetallesCompra.id_producto)
+    )).all())
+
+    query = (
+        select(
+            Productos.id_producto, Productos.sku, Productos.nombre, Productos.stock_actual,
+            Productos.stock_minimo, Productos.precio_compra, Productos.id_proveedor,
+            Proveedores.nombre.label("nombre_proveedor"), Proveedores.tiempo_entrega_promedio,
+        )
+        .join(Proveedores, Proveedores.id_proveedor == Productos.id_proveedor)
+        .where(Productos.id_status == 1, Proveedores.id_status == 1)
+    )
+    if id_proveedor:
+        query = query.where(Productos.id_proveedor == id_proveedor)
+    productos = (await db.execute(query)).all()
+
+    compras: Dict[int, Dict] = {}
+    for p in productos:
+        velocidad = max(vendidas.get(p.id_producto) or 0, 0) / dias_ventas
+        plazo = p.tiempo_entrega_promedio or PLAZO_ENTREGA_DEFECTO
+        punto_reorden = math.ceil(velocidad * plazo) + (p.stock_minimo or 0)
+        pendiente = int(en_camino.get(p.id_producto) or 0)
+        disponible = (p.stock_actual or 0) + pendiente
+        if disponible > punto_reorden:
+            continue
+        cantidad = math.ceil(punto_reorden + velocidad * dias_cobertura) - disponible
+        if cantidad <= 0:
+            continue
+
+        compra = compras.get(p.id_proveedor)
+        if compra is None:
+            compra = compras[p.id_proveedor] = {
+                "id_proveedor": p.id_proveedor,
+                "nombre_proveedor": p.nombre_proveedor,
+                "id_compra": None,
+                "numero_compra": None,
+                "fecha_estimada_llegada": date.today() + timedelta(days=plazo),
+                "subtotal": Decimal(0),
+                "detalles": [],
+            }
+        subtotal = p.precio_compra * cantidad
+        compra["subtotal"] += subtotal
+        compra["detalles"].append({
+            "id_producto": p.id_producto,
+            "sku": p.sku,
+            "nombre": p.nombre,
+            "stock_actual": p.stock_actual or 0,
+            "stock_minimo": p.stock_minimo or 0,
+            "en_camino": pendiente,
+            "velocidad_diaria": round(velocidad, 3),
+            "plazo_entrega": plazo,
+            "punto_reorden": punto_reorden,
+            "cantidad": cantidad,
+            "precio_unitario": p.precio_compra,
+            "subtotal": subtotal,
+        })
+
+    for compra in compras.values():
+        compra["impuestos"] = (compra["subtotal"] * TASA_IMPUESTOS).quantize(Decimal("0.01"))
+        compra["total"] = compra["subtotal"] + compra["impuestos"]
+    return {
+        "productos_evaluados": len(productos),
+        "compras": [compras[id_] for id_ in sorted(compras)],
+    }
+
+async def crear_compras_sugeridas(db: AsyncSession, compras: List[Dict], id_empleado: Optional[int]) -> None:
+    """
+    Guarda las compras sugeridas como compras pendientes (una por proveedor)
+    en una sola transacción: cabeceras en un flush y todas las líneas en un
+    único INSERT. Completa ``id_compra`` y ``numero_compra`` de cada compra.
+    """
+    if not compras:
+        return
+    # Numeración antes de escribir: si hay que reservar un bloque se hace en
+    # otra conexión y no debe esperar a esta transacción
+    for compra in compras:
+        compra["numero_compra"] = await numerador_compras.siguiente()
+
+    cabeceras = [
+        ComprasProveedores(
+            numero_compra=compra["numero_compra"],
+            id_proveedor=compra["id_proveedor"],
+            fecha_orden=datetime.now(),
+            fecha_estimada_llegada=compra["fecha_estimada_llegada"],
+            subtotal=compra["subtotal"],
+            impuestos=compra["impuestos"],
+            total=compra["total"],
+            estado="pendiente",
+            id_empleado=id_empleado,
+            notas=NOTA_SUGERENCIA,
+        )
+        for compra in compras
+    ]
+    db.add_all(cabeceras)
+    await db.flush()
+
+    lineas = []
+    for compra, cabecera in zip(compras, cabeceras):
+        compra["id_compra"] = cabecera.id_compra
+        lineas += [
+            {
+                "id_compra": cabecera.id_compra,
+                "id_producto": detalle["id_producto"],
+                "cantidad_ordenada": detalle["cantidad"],
+                "cantidad_recibida": 0,
+                "precio_unitario": detalle["precio_unitario"],
+                "subtotal": detalle["subtotal"],
+                "estado": "pendiente",
+            }
+            for detalle in compra["detalles"]
+        ]
+    await db.execute(insert(DetallesCompra), lineas)
+    await db.commit()
@@ -0,0 +1,197 @@
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import Match
+
+# Límites (en segundos) del histograma de latencia de las peticiones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiqueta de las rutas que no corresponden a ningún endpoint (404, escaneos)
+UNMATCHED = "unmatched"
+
+# Rutas resueltas en caché (método, path) -> plantilla; al llenarse se vacía
+ROUTE_CACHE_SIZE = 10000
+
+# Segmentos numéricos del path: /pedidos/17 y /pedidos/42 se resuelven igual
+# (ninguna ruta tiene segmentos numéricos literales), así que comparten
+# entrada en la caché y solo el primero recorre las rutas
+NUMERIC_SEGMENT = re.compile(r"/[0-9]+(?=/|$)")
+
+class RouteStats:
+    """Contadores de una ruta (método + plantilla): en curso, histograma y estados."""
+
+    __slots__ = ("in_flight", "buckets", "count", "sum", "statuses")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.statuses: Dict[int, int] = {}
+
+class RequestMetrics:
+    """
+    Métricas HTTP por ruta: peticiones por código de estado, peticiones en
+    curso e histograma de latencia, etiquetadas con la plantilla de la ruta
+    (``/pedidos/{pedido_id}``) y no con el path real, para que el número de
+    series no crezca con los IDs.
+
+    Todo se actualiza desde el event loop (el middleware nunca corre en el
+    pool de hilos), así que los contadores son enteros sin lock. Cada worker
+    de uvicorn tiene los suyos.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._templates: Dict[Tuple[str, str], str] = {}
+
+    def reset(self):
+        # Las peticiones en curso se mantienen: el middleware las descontará al terminar
+        for stats in self._routes.values():
+            stats.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+            stats.count = 0
+            stats.sum = 0.0
+            stats.statuses = {}
+
+    def route_template(self, app, scope) -> str:
+        """Plantilla de la ruta que atenderá la petición (la primera que coincide, como el router)."""
+        key = (scope["method"], NUMERIC_SEGMENT.sub("/0", scope["path"]))
+        template = self._templates.get(key)
+        if template is None:
+            template = UNMATCHED
+            for route in app.router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    template = route.path
+                    break
+                if match == Match.PARTIAL and template == UNMATCHED:
+                    # Método no permitido: se etiqueta con la ruta del path
+                    template = route.path
+            if len(self._templates) >= ROUTE_CACHE_SIZE:
+                self._templates.clear()
+            self._templates[key] = template
+        return template
+
+    def stats_for(self, method: str, template: str) -> RouteStats:
+        stats = self._routes.get((method, template))
+        if stats is None:
+            stats = self._routes[(method, template)] = RouteStats()
+        return stats
+
+    @staticmethod
+    def observe(stats: RouteStats, status: int, elapsed: float):
+        stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        stats.count += 1
+        stats.sum += elapsed
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def snapshot(self) -> Dict:
+        """Resumen por ruta (para /admin y los benchmarks)."""
+        data = {}
+        for (method, template), stats in sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0])):
+            data[f"{method} {template}"] = {
+                "in_flight": stats.in_flight,
+                "count": stats.count,
+                "avg_ms": round(stats.sum / stats.count * 1000, 3) if stats.count else 0.0,
+                "p50_ms": _quantile_ms(stats, 0.5),
+                "p99_ms": _quantile_ms(stats, 0.99),
+                "statuses": {str(status): count for status, count in sorted(stats.statuses.items())},
+            }
+        return data
+
+    def render(self) -> str:
+        """Métricas en formato de texto de Prometheus (versión 0.0.4)."""
+        rutas = sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0]))
+        lines: List[str] = [
+            "# HELP http_requests_total Peticiones HTTP atendidas, por ruta y código de estado.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, template), stats in rutas:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{{_labels(method, template)},status="{status}"}} {count}')
+
+        lines += [
+            "# HELP http_requests_in_flight Peticiones HTTP en curso, por ruta.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, template), stats in rutas:
+            lines.append(f"http_requests_in_flight{{{_labels(method, template)}}} {stats.in_flight}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Latencia de las peticiones HTTP hasta el último byte de la respuesta.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, template), stats in rutas:
+            labels = _labels(method, template)
+            acumulado = 0
+            for limit, count in zip(LATENCY_BUCKETS + (None,), stats.buckets):
+                acumulado += count
+                le = "+Inf" if limit is None else repr(limit)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {acumulado}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.sum!r}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+        return "\n".join(lines) + "\n"
+
+def _labels(method: str, template: str) -> str:
+    template = template.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'method="{method}",route="{template}"'
+
+def _quantile_ms(stats: RouteStats, q: float) -> Optional[float]:
+    """Cuantil aproximado: límite superior del bucket que lo contiene."""
+    if not stats.count:
+        return None
+    objetivo = q * stats.count
+    acumulado = 0
+    for limit, count in zip(LATENCY_BUCKETS, stats.buckets):
+        acumulado += count
+        if acumulado >= objetivo:
+            return limit * 1000
+    return None
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que alimenta ``RequestMetrics``. Es ASGI puro (no
+    BaseHTTPMiddleware): no crea tareas ni copia la respuesta, solo envuelve
+    ``send`` para leer el código de estado y el final del cuerpo.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics, router_app=None):
+        self.app = app
+        self.metrics = metrics
+        # Aplicación con las rutas (la FastAPI que monta este middleware)
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = self.metrics.stats_for(method, self.metrics.route_template(self.router_app, scope))
+        stats.in_flight += 1
+        status = 500
+        inicio = time.perf_counter()
+        terminado = False
+
+        async def send_wrapper(message):
+            nonlocal status, terminado
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False) and not terminado:
+                terminado = True
+                stats.in_flight -= 1
+                self.metrics.observe(stats, status, time.perf_counter() - inicio)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Excepción o cliente desconectado antes del final de la respuesta
+            if not terminado:
+                terminado = True
+                stats.in_flight -= 1
+                self.metrics.observe(stats, status, time.perf_counter() - inicio)
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,535 @@
+import asyncio
+import bisect
+import contextvars
+from array import array
+from collections import defaultdict
+from itertools import islice
+import logging
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import AsyncSessionLocal
+from ..models.busqueda import CambiosBusqueda
+from ..models.clientes import Clientes
+from ..models.productos import Comics, FigurasColeccion, Productos
+from ..models.proveedores import Proveedores
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+NO_ALFANUMERICO_RE = re.compile(r"[^a-z0-9]+")
+PALABRA_RE = re.compile(r"\w+")
+
+# Los términos más cortos solo coinciden con palabras completas; los demás
+# también como prefijo (búsqueda mientras se escribe) y, desde
+# MIN_INFIX_LENGTH, dentro de una palabra ("man" encuentra "Batman")
+MIN_PREFIX_LENGTH = 2
+MIN_INFIX_LENGTH = 3
+MAX_INFIX_EXPANSION = 1000
+
+# Peso de una coincidencia por prefijo o dentro de la palabra respecto a una
+# palabra completa
+PREFIX_FACTOR = 0.5
+INFIX_FACTOR = 0.25
+
+# Identificadores (SKU, ISBN): se indexan enteros, sin separadores, y se
+# buscan con la consulta completa a partir de esta longitud
+MIN_IDENTIFIER_PREFIX = 4
+IDENTIFIER_WEIGHT = 10
+MAX_IDENTIFIER_EXPANSION = 1000
+
+# Documentos que refresh() lee y reindexa de cada vez: una importación
+# masiva no bloquea las demás peticiones mientras se indexa
+REFRESH_CHUNK = 500
+
+# Cambios de CambiosBusqueda leídos por consulta al sincronizar
+SYNC_BATCH = 10_000
+
+# Un id_cambio saltado puede ser de una transacción que aún no ha confirmado
+# (MySQL asigna el autoincremento al insertar): se vuelve a buscar durante
+# estos segundos. Pasado ese tiempo, o con más huecos de la cuenta, lo
+# recoge la siguiente reconstrucción completa.
+GAP_SECONDS = 60
+MAX_GAPS = 1000
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos: "Batmán" -> "batman"."""
+    if texto.isascii():
+        return texto.lower()
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    if not texto:
+        return []
+    # Internar los términos: cada palabra se guarda una sola vez aunque
+    # aparezca en miles de documentos
+    if texto.isascii():
+        return [sys.intern(token) for token in TOKEN_RE.findall(texto.lower())]
+    tokens: List[str] = []
+    for palabra in PALABRA_RE.findall(texto):
+        tokens.extend(_tokenizar_palabra(palabra))
+    return tokens
+
+@lru_cache(maxsize=65536)
+def _tokenizar_palabra(palabra: str) -> Tuple[str, ...]:
+    # Quitar acentos es lo más costoso de indexar; las palabras se repiten mucho
+    return tuple(sys.intern(token) for token in TOKEN_RE.findall(normalizar(palabra)))
+
+def compactar(texto: Optional[str]) -> str:
+    """Identificador sin separadores: "SKU-00123" -> "sku00123"."""
+    if not texto:
+        return ""
+    return NO_ALFANUMERICO_RE.sub("", normalizar(texto))
+
+class Posting:
+    """
+    Documentos en los que aparece un término, ordenados por ID, con el peso
+    del mejor campo. Se guardan en arrays compactos (5 bytes por aparición)
+    en lugar de un dict por término.
+    """
+
+    __slots__ = ("ids", "pesos")
+
+    def __init__(self):
+        self.ids = array("l")
+        self.pesos = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, doc_id: int, peso: int):
+        # Los documentos suelen llegar en orden de ID: añadir al final es O(1)
+        if not self.ids or doc_id > self.ids[-1]:
+            self.ids.append(doc_id)
+            self.pesos.append(peso)
+            return
+        posicion = bisect.bisect_left(self.ids, doc_id)
+        if posicion < len(self.ids) and self.ids[posicion] == doc_id:
+            self.pesos[posicion] = max(self.pesos[posicion], peso)
+        else:
+            self.ids.insert(posicion, doc_id)
+            self.pesos.insert(posicion, peso)
+
+    def remove(self, doc_id: int):
+        posicion = bisect.bisect_left(self.ids, doc_id)
+        if posicion < len(self.ids) and self.ids[posicion] == doc_id:
+            del self.ids[posicion]
+            del self.pesos[posicion]
+
+    def items(self):
+        return zip(self.ids, self.pesos)
+
+class SearchIndex:
+    """
+    Índice invertido en memoria para una tabla.
+
+    Cada documento aporta campos de texto con peso e identificadores. La
+    puntuación suma, por cada término buscado, el mayor peso de los campos en
+    que aparece (a mitad de peso si solo coincide como prefijo y a la cuarta
+    parte si aparece dentro de una palabra) y todos los términos deben
+    aparecer (AND). Además, la consulta completa se compara con los
+    identificadores (SKU, ISBN) sin tener en cuenta separadores.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Any, Optional[Sequence[int]]], Any]):
+        self.name = name
+        self._loader = loader
+        self._postings: Dict[str, Posting] = {}
+        self._tokens: List[str] = []
+        self._identifiers: Dict[str, Tuple[int, ...]] = {}
+        self._identifier_tokens: List[str] = []
+        # Términos e identificadores de cada documento, para poder retirarlo
+        self._documents: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self.loaded_at: Optional[datetime] = None
+        self.build_seconds = 0.0
+        self.searches = 0
+        self.updates = 0
+        # IDs actualizados mientras se reconstruye el índice completo
+        self._pending: Optional[Set[int]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    async def load(self):
+        self._pending = set()
+        try:
+            inicio = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                rows = await self._loader(db, None)
+            # Construir fuera del event loop y reemplazar de una vez
+            nuevo = await asyncio.to_thread(self._build, rows)
+            (self._postings, self._tokens, self._identifiers,
+             self._identifier_tokens, self._documents) = nuevo
+            self.build_seconds = time.perf_counter() - inicio
+            self.loaded_at = datetime.now()
+            pendientes = self._pending
+        finally:
+            self._pending = None
+        if pendientes:
+            await self.refresh(pendientes)
+
+    async def refresh(self, ids: Iterable[int]):
+        """Reindexa los documentos indicados (o los elimina si ya no existen)."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return
+        for inicio in range(0, len(ids), REFRESH_CHUNK):
+            lote = ids[inicio:inicio + REFRESH_CHUNK]
+            async with AsyncSessionLocal() as db:
+                rows = await self._loader(db, lote)
+            encontrados = set()
+            for doc_id, campos, identificadores in rows:
+                self._remove(doc_id)
+                self._add(self._postings, self._identifiers, self._documents, doc_id, campos, identificadores,
+                          self._tokens, self._identifier_tokens)
+                encontrados.add(doc_id)
+            for doc_id in set(lote) - encontrados:
+                self._remove(doc_id)
+        if self._pending is not None:
+            self._pending.update(ids)
+        self.updates += 1
+
+    def search(self, texto: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Devuelve ``(id, puntuación)`` ordenados por relevancia."""
+        self.searches += 1
+        resultado = self._search_terms(list(dict.fromkeys(tokenizar(texto))))
+
+        compacto = compactar(texto)
+        if len(compacto) >= MIN_IDENTIFIER_PREFIX:
+            for identificador in self._expand(self._identifier_tokens, compacto, MAX_IDENTIFIER_EXPANSION):
+                valor = IDENTIFIER_WEIGHT * (1.0 if identificador == compacto else PREFIX_FACTOR)
+                for doc_id in self._identifiers[identificador]:
+                    resultado[doc_id] = max(resultado.get(doc_id, 0), valor)
+
+        ordenados = sorted(resultado.items(), key=lambda item: (-item[1], item[0]))
+        return ordenados[:limit] if limit is not None else ordenados
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._documents),
+            "tokens": len(self._tokens),
+            "identifiers": len(self._identifier_tokens),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "build_seconds": round(self.build_seconds, 3),
+            "searches": self.searches,
+            "updates": self.updates,
+        }
+
+    def _search_terms(self, terminos: List[str]) -> Dict[int, float]:
+        resultado: Optional[Dict[int, float]] = None
+        # Empezar por el término más largo (normalmente el más selectivo)
+        # reduce el trabajo de la intersección
+        for termino in sorted(terminos, key=len, reverse=True):
+            if len(termino) < MIN_PREFIX_LENGTH:
+                tokens = [termino] if termino in self._postings else []
+            else:
+                tokens = self._expand(self._tokens, termino)
+                if len(termino) >= MIN_INFIX_LENGTH:
+                    tokens += self._infixes(termino)
+            puntos: Dict[int, float] = {}
+            for token in tokens:
+                if token == termino:
+                    factor = 1.0
+                elif token.startswith(termino):
+                    factor = PREFIX_FACTOR
+                else:
+                    factor = INFIX_FACTOR
+                for doc_id, peso in self._postings[token].items():
+                    if resultado is not None and doc_id not in resultado:
+                        continue
+                    valor = peso * factor
+                    if valor > puntos.get(doc_id, 0):
+                        puntos[doc_id] = valor
+            if resultado is None:
+                resultado = puntos
+            else:
+                resultado = {doc_id: resultado[doc_id] + valor for doc_id, valor in puntos.items()}
+            if not resultado:
+                return {}
+        return resultado or {}
+
+    @staticmethod
+    def _expand(tokens: List[str], prefijo: str, maximo: Optional[int] = None) -> List[str]:
+        inicio = bisect.bisect_left(tokens, prefijo)
+        fin = bisect.bisect_left(tokens, prefijo + "\uffff", inicio)
+        if maximo is not None:
+            fin = min(fin, inicio + maximo)
+        return tokens[inicio:fin]
+
+    def _infixes(self, termino: str) -> List[str]:
+        # Recorre el vocabulario (no los documentos): unos ms con decenas de
+        # miles de términos
+        return list(islice(
+            (token for token in self._tokens if termino in token and not token.startswith(termino)),
+            MAX_INFIX_EXPANSION,
+        ))
+
+    @classmethod
+    def _build(cls, rows):
+        postings: Dict[str, Posting] = {}
+        identifiers: Dict[str, Tuple[int, ...]] = {}
+        documents: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        for doc_id, campos, identificadores in rows:
+            cls._add(postings, identifiers, documents, doc_id, campos, identificadores)
+        return postings, sorted(postings), identifiers, sorted(identifiers), documents
+
+    @staticmethod
+    def _add(postings, identifiers, documents, doc_id: int, campos, identificadores,
+             tokens: Optional[List[str]] = None, identifier_tokens: Optional[List[str]] = None):
+        # Mayor peso de cada término entre todos los campos del documento
+        vistos: Dict[str, int] = {}
+        for texto, peso in campos:
+            for token in tokenizar(texto):
+                if peso > vistos.get(token, 0):
+                    vistos[token] = peso
+        for token, peso in vistos.items():
+            docs = postings.get(token)
+            if docs is None:
+                docs = postings[token] = Posting()
+                if tokens is not None:
+                    bisect.insort(tokens, token)
+            docs.add(doc_id, peso)
+        ids_vistos: Set[str] = set()
+        for texto in identificadores:
+            identificador = compactar(texto)
+            if not identificador or identificador in ids_vistos:
+                continue
+            actuales = identifiers.get(identificador)
+            if actuales is None:
+                identifiers[identificador] = (doc_id,)
+                if identifier_tokens is not None:
+                    bisect.insort(identifier_tokens, identificador)
+            else:
+                identifiers[identificador] = actuales + (doc_id,)
+            ids_vistos.add(identificador)
+        documents[doc_id] = (tuple(vistos), tuple(ids_vistos))
+
+    def _remove(self, doc_id: int):
+        vistos, ids_vistos = self._documents.pop(doc_id, ((), ()))
+        for token in vistos:
+            docs = self._postings.get(token)
+            if docs is None:
+                continue
+            docs.remove(doc_id)
+            if not docs:
+                del self._postings[token]
+                self._discard(self._tokens, token)
+        for identificador in ids_vistos:
+            restantes = tuple(d for d in self._identifiers.get(identificador, ()) if d != doc_id)
+            if restantes:
+                self._identifiers[identificador] = restantes
+            else:
+                self._identifiers.pop(identificador, None)
+                self._discard(self._identifier_tokens, identificador)
+
+    @staticmethod
+    def _discard(tokens: List[str], token: str):
+        posicion = bisect.bisect_left(tokens, token)
+        if posicion < len(tokens) and tokens[posicion] == token:
+            del tokens[posicion]
+
+# Cargadores: devuelven [(id, [(texto, peso), ...], [identificador, ...]), ...],
+# opcionalmente solo para ``ids``
+
+async def _cargar_productos(db, ids: Optional[Sequence[int]]):
+    query = (
+        select(
+            Productos.id_producto, Productos.sku, Productos.nombre, Productos.descripcion,
+            Comics.titulo, Comics.guionista, Comics.isbn,
+            FigurasColeccion.personaje, FigurasColeccion.universo,
+        )
+        .outerjoin(Comics, Comics.id_producto == Productos.id_producto)
+        .outerjoin(FigurasColeccion, FigurasColeccion.id_producto == Productos.id_producto)
+    )
+    if ids is not None:
+        query = query.where(Productos.id_producto.in_(ids))
+    result = await db.execute(query.order_by(Productos.id_producto))
+    return [
+        (row.id_producto, [
+            (row.nombre, 4), (row.titulo, 4), (row.personaje, 4),
+            (row.guionista, 2), (row.universo, 2),
+            (row.descripcion, 1),
+        ], [row.sku, row.isbn])
+        for row in result.all()
+    ]
+
+async def _cargar_clientes(db, ids: Optional[Sequence[int]]):
+    query = select(Clientes.id_cliente, Clientes.nombre, Clientes.apellidos, Clientes.email)
+    if ids is not None:
+        query = query.where(Clientes.id_cliente.in_(ids))
+    result = await db.execute(query.order_by(Clientes.id_cliente))
+    return [
+        (row.id_cliente, [(row.nombre, 4), (row.apellidos, 4), (row.email, 2)], [row.email])
+        for row in result.all()
+    ]
+
+async def _cargar_proveedores(db, ids: Optional[Sequence[int]]):
+    query = select(Proveedores.id_proveedor, Proveedores.nombre, Proveedores.email)
+    if ids is not None:
+        query = query.where(Proveedores.id_proveedor.in_(ids))
+    result = await db.execute(query.order_by(Proveedores.id_proveedor))
+    return [
+        (row.id_proveedor, [(row.nombre, 4), (row.email, 2)], [row.email])
+        for row in result.all()
+    ]
+
+class CatalogSearch:
+    """
+    Índices de búsqueda de productos (incluye campos de comics y figuras),
+    clientes y proveedores.
+
+    Son locales a cada proceso. Los endpoints de escritura anotan con
+    ``registrar`` los documentos que cambian en ``CambiosBusqueda``, dentro
+    de su propia transacción, y cada worker reindexa los cambios posteriores
+    al último que aplicó: en segundo plano cada ``SEARCH_SYNC_SECONDS`` y
+    siempre antes de responder una búsqueda (``ranking``), así que ningún
+    worker busca sobre datos anteriores a una escritura ya confirmada. La
+    reconstrucción periódica completa queda como red de seguridad y purga
+    los cambios antiguos.
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, SearchIndex] = {
+            "productos": SearchIndex("productos", _cargar_productos),
+            "clientes": SearchIndex("clientes", _cargar_clientes),
+            "proveedores": SearchIndex("proveedores", _cargar_proveedores),
+        }
+        # Último id_cambio aplicado y huecos anteriores aún por confirmar
+        # (id_cambio -> momento en que se detectó)
+        self.ultimo_cambio: Optional[int] = None
+        self._huecos: Dict[int, float] = {}
+        # Se crea al primer uso (en Python 3.9 queda ligado al loop activo)
+        self._lock: Optional[asyncio.Lock] = None
+        self.cambios_aplicados = 0
+
+    @property
+    def loaded(self) -> bool:
+        return all(index.loaded for index in self.indexes.values())
+
+    async def load(self):
+        # Los cambios que se confirmen durante la carga se aplican después
+        async with AsyncSessionLocal() as db:
+            ultimo = await db.scalar(select(func.max(CambiosBusqueda.id_cambio))) or 0
+        for index in self.indexes.values():
+            await index.load()
+        if self.ultimo_cambio is None or ultimo > self.ultimo_cambio:
+            self.ultimo_cambio = ultimo
+            self._huecos = {}
+
+    async def refresh(self, name: str, ids: Iterable[int]):
+        await self.indexes[name].refresh(ids)
+
+    async def registrar(self, db: AsyncSession, name: str, ids: Iterable[int]):
+        """
+        Anota en la transacción de ``db`` los documentos de ``name`` que
+        cambia; todos los workers (también este) los reindexan antes de su
+        siguiente búsqueda. Debe llamarse en toda escritura que afecte a los
+        campos indexados.
+        """
+        filas = [{"indice": name, "id_registro": doc_id} for doc_id in ids]
+        if filas:
+            await db.execute(insert(CambiosBusqueda), filas)
+
+    async def sincronizar(self):
+        """Reindexa los documentos cambiados desde la última sincronización."""
+        if self.ultimo_cambio is None:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self._huecos = {id_cambio: desde for id_cambio, desde in self._huecos.items()
+                                if ahora - desde < GAP_SECONDS}
+                condicion = CambiosBusqueda.id_cambio > self.ultimo_cambio
+                if self._huecos:
+                    condicion = or_(condicion, CambiosBusqueda.id_cambio.in_(list(self._huecos)))
+                async with AsyncSessionLocal() as db:
+                    cambios = (await db.execute(
+                        select(CambiosBusqueda.id_cambio, CambiosBusqueda.indice, CambiosBusqueda.id_registro)
+                        .where(condicion)
+                        .order_by(CambiosBusqueda.id_cambio)
+                        .limit(SYNC_BATCH)
+                    )).all()
+                if not cambios:
+                    return
+                por_indice: Dict[str, List[int]] = defaultdict(list)
+                for id_cambio, indice, id_registro in cambios:
+                    if indice in self.indexes:
+                        por_indice[indice].append(id_registro)
+                    self._huecos.pop(id_cambio, None)
+                    if id_cambio > self.ultimo_cambio:
+                        saltados = range(self.ultimo_cambio + 1, id_cambio)
+                        if len(self._huecos) + len(saltados) <= MAX_GAPS:
+                            self._huecos.update(dict.fromkeys(saltados, ahora))
+                        self.ultimo_cambio = id_cambio
+                for indice, ids in por_indice.items():
+                    await self.indexes[indice].refresh(ids)
+                self.cambios_aplicados += len(cambios)
+                if len(cambios) < SYNC_BATCH:
+                    return
+
+    async def sincronizar_periodicamente(self, seconds: float):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await self.sincronizar()
+            except Exception:
+                logger.exception("No se pudieron aplicar los cambios de los índices de búsqueda")
+
+    def start(self, seconds: float) -> asyncio.Task:
+        # Contexto vacío: las lecturas no cuentan como consultas de la petición que lo arranca
+        return contextvars.Context().run(asyncio.create_task, self.sincronizar_periodicamente(seconds))
+
+    async def purgar(self, antiguedad: timedelta):
+        """
+        Borra los cambios más antiguos que ``antiguedad`` salvo el último: con
+        la tabla vacía el autoincremento podría volver a empezar (SQLite, o
+        MySQL al reiniciar) y los workers ignorarían los ids ya vistos.
+        """
+        async with AsyncSessionLocal() as db:
+            ultimo = await db.scalar(select(func.max(CambiosBusqueda.id_cambio)))
+            if ultimo is None:
+                return
+            await db.execute(
+                delete(CambiosBusqueda)
+                .where(CambiosBusqueda.fecha < datetime.now() - antiguedad, CambiosBusqueda.id_cambio < ultimo)
+            )
+            await db.commit()
+
+    async def rebuild_periodically(self, seconds: int):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await self.load()
+                # Cada worker reconstruye al menos cada ``seconds``: lo anterior
+                # a dos intervalos ya lo tienen todos
+                await self.purgar(timedelta(seconds=2 * seconds))
+            except Exception:
+                logger.exception("No se pudieron reconstruir los índices de búsqueda")
+
+    async def ranking(self, name: str, texto: str, limit: Optional[int] = None) -> Dict[int, int]:
+        """
+        IDs que coinciden con ``texto`` mapeados a su posición por relevancia,
+        tras aplicar los cambios confirmados por cualquier worker.
+        """
+        try:
+            await self.sincronizar()
+        except Exception:
+            logger.exception("No se pudieron aplicar los cambios de los índices de búsqueda")
+        return {doc_id: posicion for posicion, (doc_id, _) in enumerate(self.indexes[name].search(texto, limit))}
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: index.stats() for name, index in self.indexes.items()}
+
+catalog_search = CatalogSearch()
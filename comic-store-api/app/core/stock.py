@@ -0,0 +1,133 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, delete, exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..exceptions import ConflictError
+from ..models.inventario import AlertasStock
+from ..models.productos import Productos
+
+# Condición de alerta; la misma expresión sirve al índice y al verificador
+STOCK_BAJO = Productos.stock_actual < Productos.stock_minimo
+
+async def mover_stock(db: AsyncSession, deltas: Dict[int, int]) -> Dict[int, int]:
+    """
+    Aplica cambios de stock (``id_producto -> delta``; negativo para salidas)
+    en un único UPDATE atómico y devuelve el stock resultante por producto.
+
+    Las salidas van protegidas por ``stock_actual >= cantidad`` dentro del
+    propio UPDATE, de modo que dos terminales no pueden vender la misma
+    unidad. Si alguna salida no alcanza, se deshace la transacción y se
+    lanza ``ConflictError`` (409). Los productos inexistentes no aparecen
+    en el resultado; cada llamador decide cómo tratarlos. También mantiene
+    el índice de alertas; la versión del catálogo no cambia (ver
+    ``CatalogVersion``).
+    """
+    if not deltas:
+        return {}
+
+    delta = case(deltas, value=Productos.id_producto)
+    query = (
+        update(Productos)
+        .where(Productos.id_producto.in_(deltas.keys()))
+        .values(stock_actual=Productos.stock_actual + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if any(d < 0 for d in deltas.values()):
+        query = query.where(Productos.stock_actual >= -delta)
+    result = await db.execute(query)
+
+    # Leer el valor real tras el UPDATE (las filas quedan bloqueadas hasta el commit)
+    stock = await leer_stock(db, deltas.keys())
+
+    if result.rowcount != len(stock):
+        await db.rollback()
+        for id_producto, cantidad in deltas.items():
+            if id_producto in stock and cantidad < 0 and stock[id_producto] < -cantidad:
+                raise ConflictError(
+                    f"Stock insuficiente para el producto con ID {id_producto}. "
+                    f"Disponible: {stock[id_producto]}, Solicitado: {-cantidad}"
+                )
+        raise ConflictError("El stock cambió durante la operación, inténtelo de nuevo")
+
+    await sincronizar_alertas(db, stock.keys())
+    return stock
+
+async def fijar_stock(db: AsyncSession, id_producto: int, cantidad: int) -> Tuple[int, int]:
+    """
+    Fija el stock de un producto a un valor absoluto bloqueando la fila
+    (``SELECT ... FOR UPDATE``) y devuelve ``(stock_anterior, stock_nuevo)``.
+    """
+    stock_anterior = await db.scalar(
+        select(Productos.stock_actual)
+        .where(Productos.id_producto == id_producto)
+        .with_for_update()
+    )
+    await db.execute(
+        update(Productos)
+        .where(Productos.id_producto == id_producto)
+        .values(stock_actual=cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    await sincronizar_alertas(db, [id_producto])
+    return stock_anterior, cantidad
+
+async def sincronizar_alertas(db: AsyncSession, ids: Iterable[int]) -> None:
+    """
+    Actualiza ``AlertasStock`` para los productos dados según su stock
+    actual: quita los que ya no están por debajo del mínimo y agrega los
+    que acaban de bajar.
+
+    Debe llamarse en la misma transacción que el cambio de stock o de
+    ``stock_minimo``; ``mover_stock`` y ``fijar_stock`` ya lo hacen.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    bajos = select(Productos.id_producto).where(Productos.id_producto.in_(ids), STOCK_BAJO)
+    await db.execute(
+        delete(AlertasStock)
+        .where(AlertasStock.id_producto.in_(ids), AlertasStock.id_producto.not_in(bajos))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        insert(AlertasStock).from_select(
+            ["id_producto"],
+            bajos.where(~exists().where(AlertasStock.id_producto == Productos.id_producto))
+        )
+    )
+
+async def verificar_alertas(db: AsyncSession, reparar: bool = False) -> Dict[str, List[int]]:
+    """
+    Compara ``AlertasStock`` con un recorrido completo de ``Productos`` y
+    devuelve los productos que faltan en el índice y los que sobran. Con
+    ``reparar`` corrige las diferencias en la transacción de ``db`` (sin
+    confirmarla).
+    """
+    esperados = set(await db.scalars(select(Productos.id_producto).where(STOCK_BAJO)))
+    indexados = set(await db.scalars(select(AlertasStock.id_producto)))
+    diferencias = {
+        "faltantes": sorted(esperados - indexados),
+        "sobrantes": sorted(indexados - esperados),
+    }
+    if reparar:
+        await sincronizar_alertas(db, diferencias["faltantes"] + diferencias["sobrantes"])
+    return diferencias
+
+async def leer_stock(db: AsyncSession, ids: Iterable[int]) -> Dict[int, int]:
+    result = await db.execute(
+        select(Productos.id_producto, Productos.stock_actual).where(Productos.id_producto.in_(list(ids)))
+    )
+    return dict(result.all())
+
+def historial_stock(stock_final: int, cantidades: List[int]) -> List[Tuple[int, int]]:
+    """
+    Reconstruye ``(stock_anterior, stock_nuevo)`` para varios movimientos
+    consecutivos de un mismo producto a partir del stock final real.
+    """
+    stock = stock_final - sum(cantidades)
+    historial = []
+    for cantidad in cantidades:
+        historial.append((stock, stock + cantidad))
+        stock += cantidad
+    return historial
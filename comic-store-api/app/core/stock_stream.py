@@ -0,0 +1,240 @@
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import func, or_, select
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.inventario import Inventario, TiposMovimiento
+from ..models.productos import Productos
+
+logger = logging.getLogger(__name__)
+
+# Movimientos leídos por consulta
+BATCH_SIZE = 1000
+
+# Segundos que se espera a un ID saltado (transacción aún sin confirmar)
+# antes de darlo por perdido (transacción deshecha)
+GAP_TIMEOUT_SECONDS = 30
+
+class StockEvent:
+    """Evento listo para enviarse: nombre SSE, ID del movimiento y datos."""
+
+    __slots__ = ("event", "id", "id_producto", "id_categoria", "data")
+
+    def __init__(self, event: str, id: int, id_producto: int, id_categoria: Optional[int], data: Dict[str, Any]):
+        self.event = event
+        self.id = id
+        self.id_producto = id_producto
+        self.id_categoria = id_categoria
+        self.data = data
+
+    def encode(self) -> str:
+        return f"event: {self.event}\nid: {self.id}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+# Marca en la cola de un suscriptor que no consumió a tiempo
+RESET = object()
+
+class Subscription:
+    """Suscripción de un cliente, con su filtro y una cola acotada."""
+
+    def __init__(self, productos: Optional[List[int]], categorias: Optional[List[int]], queue_size: int):
+        self.productos = set(productos) if productos else None
+        self.categorias = set(categorias) if categorias else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def accepts(self, event: StockEvent) -> bool:
+        # Sin filtros se reciben todos los eventos; con ambos basta con uno
+        if self.productos is None and self.categorias is None:
+            return True
+        return (
+            (self.productos is not None and event.id_producto in self.productos)
+            or (self.categorias is not None and event.id_categoria in self.categorias)
+        )
+
+    def push(self, event: StockEvent) -> bool:
+        """Encola un evento; si la cola está llena la vacía, deja RESET y devuelve False."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+            return False
+
+class StockStream:
+    """
+    Difunde a los clientes SSE los movimientos de inventario y los cruces del
+    stock mínimo.
+
+    Cada proceso sigue la tabla ``Inventario`` por ``id_movimiento`` con una
+    sola consulta por intervalo (solo mientras tiene suscriptores) y reparte
+    los eventos en memoria, así que ve también los movimientos escritos por
+    otros workers y el coste en base de datos no crece con los clientes.
+    Los IDs que aparecen saltados se vuelven a consultar durante
+    ``GAP_TIMEOUT_SECONDS`` por si su transacción confirma más tarde.
+
+    Los clientes lentos no frenan a los demás: cuando la cola de uno se
+    llena se le envía ``reset`` y se cierra su suscripción para que recargue
+    el estado y vuelva a conectarse.
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._last_id: Optional[int] = None
+        # Se crea al primer uso (en Python 3.9 queda ligado al loop activo)
+        self._position_lock: Optional[asyncio.Lock] = None
+        self._gaps: Dict[int, float] = {}
+        self.polls = 0
+        self.events = 0
+        self.overflows = 0
+
+    def subscribe(self, productos: Optional[List[int]] = None, categorias: Optional[List[int]] = None) -> Subscription:
+        subscription = Subscription(productos, categorias, settings.INVENTARIO_STREAM_QUEUE_SIZE)
+        self._subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            # Al retomar tras un periodo sin suscriptores no se difunde lo anterior
+            self._last_id = None
+            self._gaps.clear()
+            # Contexto vacío: las lecturas no cuentan como consultas de la petición que lo arranca
+            self._task = contextvars.Context().run(asyncio.create_task, self._follow())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._subscriptions.clear()
+
+    async def position(self) -> int:
+        """
+        Último movimiento ya difundido. Los eventos posteriores llegan a las
+        suscripciones existentes, así que sirve de límite para ``replay``.
+        """
+        if self._position_lock is None:
+            self._position_lock = asyncio.Lock()
+        async with self._position_lock:
+            if self._last_id is None:
+                async with AsyncSessionLocal() as db:
+                    self._last_id = await db.scalar(select(func.max(Inventario.id_movimiento))) or 0
+            return self._last_id
+
+    async def replay(self, after_id: int, until_id: int) -> Optional[List[StockEvent]]:
+        """
+        Eventos con ``after_id < id <= until_id`` para reanudar un cliente
+        (cabecera Last-Event-ID). Devuelve None si son demasiados y el
+        cliente debe recargar el estado completo.
+        """
+        limit = settings.INVENTARIO_STREAM_REPLAY_LIMIT
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                self._query()
+                .where(Inventario.id_movimiento > after_id, Inventario.id_movimiento <= until_id)
+                .limit(limit + 1)
+            )).all()
+        if len(rows) > limit:
+            return None
+        return [event for row in rows for event in self._events(row)]
+
+    async def _follow(self):
+        await self.position()
+        while self._subscriptions:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("No se pudieron leer los movimientos de inventario")
+            await asyncio.sleep(settings.INVENTARIO_STREAM_POLL_SECONDS)
+
+    async def poll(self):
+        """Lee los movimientos nuevos (y los huecos pendientes) y los difunde."""
+        now = time.monotonic()
+        self._gaps = {id_: since for id_, since in self._gaps.items() if now - since < GAP_TIMEOUT_SECONDS}
+        condition = Inventario.id_movimiento > self._last_id
+        if self._gaps:
+            condition = or_(condition, Inventario.id_movimiento.in_(list(self._gaps)))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(self._query().where(condition).limit(BATCH_SIZE))).all()
+        self.polls += 1
+
+        for row in rows:
+            id_movimiento = row.id_movimiento
+            if id_movimiento > self._last_id:
+                for missing in range(self._last_id + 1, id_movimiento):
+                    self._gaps[missing] = now
+                self._last_id = id_movimiento
+            else:
+                self._gaps.pop(id_movimiento, None)
+            for event in self._events(row):
+                self.publish(event)
+
+    def publish(self, event: StockEvent):
+        self.events += 1
+        for subscription in list(self._subscriptions):
+            if subscription.accepts(event) and not subscription.push(event):
+                self.overflows += 1
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "following": self._task is not None and not self._task.done(),
+            "last_id": self._last_id,
+            "pending_gaps": len(self._gaps),
+            "polls": self.polls,
+            "events": self.events,
+            "overflows": self.overflows,
+        }
+
+    @staticmethod
+    def _query():
+        return (
+            select(
+                Inventario.id_movimiento, Inventario.id_producto, Inventario.cantidad,
+                Inventario.stock_anterior, Inventario.stock_nuevo, Inventario.fecha_movimiento,
+                Inventario.tipo_documento, Inventario.id_documento,
+                TiposMovimiento.nombre_tipo, Productos.id_categoria, Productos.stock_minimo,
+            )
+            .join(TiposMovimiento, TiposMovimiento.id_tipo_movimiento == Inventario.id_tipo_movimiento)
+            .join(Productos, Productos.id_producto == Inventario.id_producto)
+            .order_by(Inventario.id_movimiento)
+        )
+
+    @staticmethod
+    def _events(row) -> List[StockEvent]:
+        fecha = row.fecha_movimiento.isoformat() if isinstance(row.fecha_movimiento, datetime) else None
+        events = [StockEvent("movimiento", row.id_movimiento, row.id_producto, row.id_categoria, {
+            "id_movimiento": row.id_movimiento,
+            "id_producto": row.id_producto,
+            "tipo": row.nombre_tipo,
+            "cantidad": row.cantidad,
+            "stock_anterior": row.stock_anterior,
+            "stock_nuevo": row.stock_nuevo,
+            "tipo_documento": row.tipo_documento,
+            "id_documento": row.id_documento,
+            "fecha": fecha,
+        })]
+        # Cruce del stock mínimo (con el mínimo vigente al leer el movimiento)
+        if row.stock_minimo is not None:
+            bajo_antes = row.stock_anterior < row.stock_minimo
+            bajo_ahora = row.stock_nuevo < row.stock_minimo
+            if bajo_antes != bajo_ahora:
+                events.append(StockEvent("alerta", row.id_movimiento, row.id_producto, row.id_categoria, {
+                    "id_producto": row.id_producto,
+                    "stock_actual": row.stock_nuevo,
+                    "stock_minimo": row.stock_minimo,
+                    "stock_bajo": bajo_ahora,
+                }))
+        return events
+
+stock_stream = StockStream()
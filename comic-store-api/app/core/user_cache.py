@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..config import settings
+from ..database import async_engine
+from ..models.empleados import Empleados
+from ..models.secuencias import Secuencias
+
+logger = logging.getLogger(__name__)
+
+# Fila de Secuencias con la versión de los empleados
+NOMBRE = "empleados"
+
+class UserCache:
+    """
+    Caché LRU con TTL de los empleados autenticados, indexada por nombre de usuario.
+
+    Guarda solo los valores de las columnas (incluyendo id_status e id_rol, que
+    usan get_current_active_user y get_admin_user). Es local a cada proceso;
+    para que los demás workers vean una baja, un cambio de rol o de
+    contraseña, cada edición de un empleado sube con ``bump`` la versión de
+    la fila ``empleados`` de ``Secuencias`` en su misma transacción, y cada
+    proceso la relee cada ``USER_CACHE_VERSION_POLL_SECONDS`` y se vacía al
+    verla cambiar. Un cambio tarda así como máximo ese intervalo en verse en
+    los demás procesos (en el propio, nada). Si la lectura falla la caché se
+    vacía en cada sondeo, y el TTL acota el resto de casos.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Versión de los empleados vista en el último sondeo (None hasta el primero)
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.bumps = 0
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[username]
+                self.misses += 1
+                return None
+            self._data.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user: Empleados, version: Optional[int]):
+        """
+        Guarda el empleado leído con la caché en ``version`` (la de antes de
+        la consulta): si entretanto se vio una versión nueva, la fila puede
+        ser anterior al cambio y no se guarda.
+        """
+        if self.max_size <= 0:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(Empleados).column_attrs}
+        with self._lock:
+            if version != self.version:
+                return
+            self._data[user.nombre_usuario] = (time.monotonic() + self.ttl_seconds, values)
+            self._data.move_to_end(user.nombre_usuario)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, username: Optional[str]):
+        with self._lock:
+            if self._data.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    async def refresh(self):
+        """Relee la versión y vacía la caché si otro proceso editó algún empleado."""
+        async with async_engine.connect() as conn:
+            version = await conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == NOMBRE)) or 0
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+
+    async def refresh_periodically(self, seconds: float):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                # Sin versión no se sabe qué está al día: no guardar nada más de un sondeo
+                self.clear()
+                logger.exception("No se pudo leer la versión de los empleados")
+            await asyncio.sleep(seconds)
+
+    def start(self, seconds: float) -> asyncio.Task:
+        # Contexto vacío: las lecturas no cuentan como consultas de la petición que lo arranca
+        return contextvars.Context().run(asyncio.create_task, self.refresh_periodically(seconds))
+
+    async def bump(self, db: AsyncSession):
+        """
+        Sube la versión dentro de la transacción de ``db``; debe llamarse en
+        toda edición de un empleado que cambie lo que se autoriza con él.
+        """
+        result = await db.execute(
+            update(Secuencias)
+            .where(Secuencias.nombre == NOMBRE)
+            .values(valor=Secuencias.valor + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(Secuencias).values(nombre=NOMBRE, valor=1))
+            except IntegrityError:
+                return await self.bump(db)
+        self.bumps += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "bumps": self.bumps,
+            }
+
+async def attach_cached_user(db: AsyncSession, values: Dict[str, Any]) -> Empleados:
+    """
+    Reconstruye el empleado desde la caché y lo asocia a la sesión sin consultar
+    la base de datos, de modo que los handlers puedan modificarlo y hacer commit.
+    """
+    user = Empleados(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+user_cache = UserCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
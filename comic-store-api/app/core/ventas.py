@@ -0,0 +1,122 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, distinct, func, insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.pedidos import DetallesPedido, Pedidos
+from ..models.reportes import VentasDiarias, VentasDiariasCategoria, VentasDiariasProducto
+
+# Estado de pedido cancelado (sus ventas no cuentan)
+ESTADO_CANCELADO = 4
+
+MEDIDAS = ("pedidos", "unidades", "ingresos", "descuentos")
+
+# (id_producto, id_categoria, cantidad, subtotal, descuento_unitario)
+LineaVenta = Tuple[int, int, int, Decimal, Decimal]
+
+async def acumular_ventas(db: AsyncSession, fecha: date, lineas: Iterable[LineaVenta], signo: int = 1) -> None:
+    """
+    Suma (``signo=1``) o resta (``signo=-1``, cancelación) las líneas de un
+    pedido a los acumulados del día por producto, por categoría y total.
+
+    Son tres INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT en SQLite) con
+    las filas ordenadas por clave, para que pedidos simultáneos bloqueen los
+    acumulados siempre en el mismo orden. Debe ejecutarse al final de la
+    transacción del pedido: las filas del día quedan bloqueadas hasta el commit.
+    """
+    por_producto: Dict[int, List] = {}
+    por_categoria: Dict[int, List] = {}
+    total = [signo, 0, Decimal(0), Decimal(0)]
+    for id_producto, id_categoria, cantidad, subtotal, descuento_unitario in lineas:
+        descuento = (descuento_unitario or 0) * cantidad
+        for acumulado, clave in ((por_producto, id_producto), (por_categoria, id_categoria)):
+            # Un pedido cuenta una vez por producto y por categoría aunque tenga varias líneas
+            medidas = acumulado.setdefault(clave, [signo, 0, Decimal(0), Decimal(0)])
+            medidas[1] += signo * cantidad
+            medidas[2] += signo * subtotal
+            medidas[3] += signo * descuento
+        total[1] += signo * cantidad
+        total[2] += signo * subtotal
+        total[3] += signo * descuento
+    if not por_producto:
+        return
+
+    await db.execute(_acumular(db, VentasDiariasProducto, ["fecha", "id_producto"], [
+        {"fecha": fecha, "id_producto": clave, **dict(zip(MEDIDAS, medidas))}
+        for clave, medidas in sorted(por_producto.items())
+    ]))
+    await db.execute(_acumular(db, VentasDiariasCategoria, ["fecha", "id_categoria"], [
+        {"fecha": fecha, "id_categoria": clave, **dict(zip(MEDIDAS, medidas))}
+        for clave, medidas in sorted(por_categoria.items())
+    ]))
+    await db.execute(_acumular(db, VentasDiarias, ["fecha"], [{"fecha": fecha, **dict(zip(MEDIDAS, total))}]))
+
+async def lineas_de_pedido(db: AsyncSession, id_pedido: int) -> List[LineaVenta]:
+    """Líneas de un pedido para ``acumular_ventas``, con la categoría que tenía cada producto al venderse."""
+    result = await db.execute(
+        select(
+            DetallesPedido.id_producto, DetallesPedido.id_categoria, DetallesPedido.cantidad,
+            DetallesPedido.subtotal, DetallesPedido.descuento_unitario,
+        )
+        .where(DetallesPedido.id_pedido == id_pedido)
+    )
+    return [tuple(fila) for fila in result]
+
+def _acumular(db: AsyncSession, model, claves: List[str], filas: List[Dict]):
+    """INSERT que suma las medidas a la fila existente si la clave ya está."""
+    table = model.__table__
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table).values(filas)
+        return stmt.on_duplicate_key_update({m: table.c[m] + stmt.inserted[m] for m in MEDIDAS})
+    stmt = sqlite_insert(table).values(filas)
+    return stmt.on_conflict_do_update(index_elements=claves, set_={m: table.c[m] + stmt.excluded[m] for m in MEDIDAS})
+
+def reconstruir_ventas(conn: Connection, desde: date, hasta: date) -> None:
+    """
+    Recalcula desde Pedidos/DetallesPedido los acumulados de ``desde`` a
+    ``hasta`` (ambos incluidos): borra el rango y lo vuelve a insertar con
+    tres INSERT ... SELECT agrupados. Cada línea cuenta en la categoría
+    que tenía su producto al venderse (DetallesPedido.id_categoria), la
+    misma que usan los pedidos y cancelaciones de la API. Pensado para el motor síncrono (scripts de mantenimiento)
+    y para rangos acotados, cada uno en su propia transacción.
+    """
+    inicio = datetime.combine(desde, datetime.min.time())
+    fin = datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+    dia = func.date(Pedidos.fecha_creacion)
+    medidas = [
+        func.count(distinct(Pedidos.id_pedido)),
+        func.sum(DetallesPedido.cantidad),
+        func.sum(DetallesPedido.subtotal),
+        func.sum(func.coalesce(DetallesPedido.descuento_unitario, 0) * DetallesPedido.cantidad),
+    ]
+    ventas = (
+        select()
+        .select_from(Pedidos)
+        .join(DetallesPedido, DetallesPedido.id_pedido == Pedidos.id_pedido)
+        .where(
+            Pedidos.fecha_creacion >= inicio,
+            Pedidos.fecha_creacion < fin,
+            Pedidos.id_estado != ESTADO_CANCELADO,
+        )
+    )
+
+    for model in (VentasDiarias, VentasDiariasProducto, VentasDiariasCategoria):
+        conn.execute(delete(model).where(model.fecha >= desde, model.fecha <= hasta))
+
+    conn.execute(insert(VentasDiarias).from_select(
+        ["fecha", *MEDIDAS],
+        ventas.add_columns(dia, *medidas).group_by(dia),
+    ))
+    conn.execute(insert(VentasDiariasProducto).from_select(
+        ["fecha", "id_producto", *MEDIDAS],
+        ventas.add_columns(dia, DetallesPedido.id_producto, *medidas).group_by(dia, DetallesPedido.id_producto),
+    ))
+    conn.execute(insert(VentasDiariasCategoria).from_select(
+        ["fecha", "id_categoria", *MEDIDAS],
+        ventas.add_columns(dia, DetallesPedido.id_categoria, *medidas).group_by(dia, DetallesPedido.id_categoria),
+    ))
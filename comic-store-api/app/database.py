@@ -1,21 +1,170 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .core.pool_metrics import get_pool_metrics, instrument_engine, instrumented_pool_class
+from .core.query_metrics import instrument_queries
 
-# Crear motor SQLAlchemy
-engine = create_engine(settings.DATABASE_URL)
+# Drivers asíncronos equivalentes a los drivers síncronos configurados
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_url(url: str) -> str:
+    """
+    Convierte una URL síncrona (mysql+pymysql, sqlite) en su equivalente asíncrono.
+    Si la URL ya usa un driver asíncrono se devuelve sin cambios.
+    """
+    db_url = make_url(url)
+    if db_url.get_driver_name() in ("aiomysql", "asyncmy", "aiosqlite"):
+        return url
+    drivername = ASYNC_DRIVERS.get(db_url.get_backend_name(), db_url.drivername)
+    return db_url.set(drivername=drivername).render_as_string(hide_password=False)
+
+def get_pool_options(url: str, pool_class, metrics) -> dict:
+    """
+    Parámetros del pool tomados de Settings. SQLite en memoria usa un pool
+    propio de un solo hilo, así que se deja con la configuración por defecto.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "sqlite" and db_url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": instrumented_pool_class(pool_class, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def configure_sqlite(engine_, url: str):
+    """
+    SQLite en archivo: WAL (las lecturas no bloquean a la escritura ni al
+    revés) y espera de SQLITE_BUSY_TIMEOUT_MS para las escrituras
+    concurrentes de la API, el registro de auditoría y los scripts, que
+    usan conexiones distintas sobre el mismo archivo.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() != "sqlite" or db_url.database in (None, "", ":memory:"):
+        return
+
+    @event.listens_for(engine_, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+# Crear motor SQLAlchemy (scripts y tareas de mantenimiento)
+sync_pool_metrics = get_pool_metrics("sync")
+engine = create_engine(settings.DATABASE_URL, **get_pool_options(settings.DATABASE_URL, QueuePool, sync_pool_metrics))
+instrument_engine(engine, sync_pool_metrics)
+instrument_queries(engine)
+configure_sqlite(engine, settings.DATABASE_URL)
 
 # Sesión SQLAlchemy
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono usado por los routers de la API
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_url(settings.DATABASE_URL)
+async_pool_metrics = get_pool_metrics("async")
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **get_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics)
+)
+instrument_engine(async_engine.sync_engine, async_pool_metrics)
+instrument_queries(async_engine.sync_engine)
+configure_sqlite(async_engine.sync_engine, ASYNC_DATABASE_URL)
+
+# Sesión asíncrona; expire_on_commit=False evita recargas implícitas tras el commit
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Motor propio para reservar numeración de pedidos y compras: la reserva se
+# hace mientras la petición tiene su conexión tomada, así que no puede
+# esperar al pool principal (con el pool agotado se bloquearían entre sí).
+# SQLite en memoria comparte el motor principal para ver la misma base.
+if get_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics):
+    sequence_pool_metrics = get_pool_metrics("secuencias")
+    sequence_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **{
+            **get_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, sequence_pool_metrics),
+            "pool_size": 1,
+            "max_overflow": 2,
+        }
+    )
+    instrument_engine(sequence_engine.sync_engine, sequence_pool_metrics)
+    instrument_queries(sequence_engine.sync_engine)
+    configure_sqlite(sequence_engine.sync_engine, ASYNC_DATABASE_URL)
+else:
+    sequence_engine = async_engine
+
+# Réplicas de lectura (opcionales); cada una con su propio pool y métricas
+replica_engines = []
+for i, replica_url in enumerate(settings.replica_urls):
+    replica_async_url = get_async_url(replica_url)
+    replica_pool_metrics = get_pool_metrics(f"replica-{i}")
+    replica_engine = create_async_engine(
+        replica_async_url, **get_pool_options(replica_async_url, AsyncAdaptedQueuePool, replica_pool_metrics)
+    )
+    instrument_engine(replica_engine.sync_engine, replica_pool_metrics)
+    instrument_queries(replica_engine.sync_engine)
+    configure_sqlite(replica_engine.sync_engine, replica_async_url)
+    replica_engines.append(replica_engine)
+
+ReplicaSessionLocals = [
+    async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False)
+    for replica_engine in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessionLocals)
+
+# Read-your-writes: tras una escritura el cliente queda fijado al primario
+PRIMARY_COOKIE = "primary_until"
+PRIMARY_HEADER = "X-Primary-Until"
+
+def pin_to_primary(response: Response):
+    """Fija al cliente al primario durante READ_YOUR_WRITES_SECONDS."""
+    hasta = int(time.time()) + settings.READ_YOUR_WRITES_SECONDS
+    response.set_cookie(PRIMARY_COOKIE, str(hasta), max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True)
+    response.headers[PRIMARY_HEADER] = str(hasta)
+
+def is_pinned_to_primary(request: Request) -> bool:
+    valor = request.headers.get(PRIMARY_HEADER) or request.cookies.get(PRIMARY_COOKIE)
+    try:
+        return int(valor) > time.time()
+    except (TypeError, ValueError):
+        return False
+
 # Clase base para los modelos
 Base = declarative_base()
 
 # Dependencia para obtener la sesión de la base de datos
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def read_session_factory(request: Request) -> async_sessionmaker:
+    """Réplica siguiente si existe y el cliente no escribió recientemente; si no, el primario."""
+    if not ReplicaSessionLocals or is_pinned_to_primary(request):
+        return AsyncSessionLocal
+    return next(_replica_cycle)
+
+# Dependencia para lecturas (listados y reportes)
+async def get_read_db(request: Request):
+    async with read_session_factory(request)() as db:
+        yield db
+
+# Dependencia síncrona para scripts y utilidades fuera del event loop
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
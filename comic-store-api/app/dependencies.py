@@ -1,19 +1,26 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from .database import get_db
+from .database import AsyncSessionLocal, get_db
 from .config import settings
 from .models.empleados import Empleados
+from .core.user_cache import user_cache, attach_cached_user
+from .core.catalog_version import catalog_version
+from .core.reference_data import ReferenceData, reference_data
+from .core.search import CatalogSearch, catalog_search
+from .exceptions import NotModifiedError
 from .schemas.auth import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Empleados:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,10 +39,16 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
         
-    user = db.query(Empleados).filter(Empleados.nombre_usuario == token_data.username).first()
+    cached = user_cache.get(token_data.username)
+    if cached is not None:
+        return await attach_cached_user(db, cached)
+        
+    version = user_cache.version
+    user = await db.scalar(select(Empleados).where(Empleados.nombre_usuario == token_data.username))
     if user is None:
         raise credentials_exception
         
+    user_cache.set(user, version)
     return user
 
 async def get_current_active_user(
@@ -53,4 +66,53 @@ async def get_admin_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Permisos insuficientes",
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None, description="Token JWT para clientes EventSource, que no pueden enviar la cabecera Authorization"),
+) -> Empleados:
+    """
+    Usuario activo para respuestas de larga duración (streams). Usa una sesión
+    propia que se cierra enseguida: la de get_db seguiría ocupando una conexión
+    del pool mientras el cliente esté conectado.
+    """
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user(token or access_token or "", db)
+    return await get_current_active_user(user)
+
+async def get_catalog_search() -> CatalogSearch:
+    # Normalmente ya se construyó al iniciar la aplicación
+    if not catalog_search.loaded:
+        await catalog_search.load()
+    return catalog_search
+
+async def get_reference_data() -> ReferenceData:
+    # Normalmente ya se cargó al iniciar la aplicación
+    if not reference_data.loaded:
+        await reference_data.load()
+    return reference_data
+
+async def check_catalog_etag(request: Request, response: Response) -> None:
+    """
+    GET condicional de los listados de catálogo: ETag y Last-Modified según
+    la versión del catálogo, y 304 sin tocar la base de datos si el cliente
+    ya tiene esa versión. Las búsquedas quedan fuera porque dependen además
+    del índice en memoria, que cada worker pone al día al buscar.
+    If-Modified-Since no se evalúa: con resolución de un segundo podría
+    ocultar un cambio hecho en el mismo segundo.
+    """
+    if request.query_params.get("search"):
+        return
+    version = await catalog_version.current()
+    if version is None:
+        return
+    etag = catalog_version.etag(version)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": catalog_version.last_modified(version),
+        "Cache-Control": "private, no-cache",
+    }
+    if catalog_version.matches(request.headers.get("if-none-match"), etag):
+        raise NotModifiedError(headers)
+    response.headers.update(headers)
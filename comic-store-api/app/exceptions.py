@@ -1,5 +1,10 @@
 from fastapi import HTTPException, status
 
+class NotModifiedError(HTTPException):
+    def __init__(self, headers: dict):
+        # Sin cuerpo; se repiten ETag y Last-Modified de la respuesta completa
+        super().__init__(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
 class NotFoundError(HTTPException):
     def __init__(self, detail: str = "Recurso no encontrado"):
         super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
@@ -18,4 +23,16 @@ class ForbiddenError(HTTPException):
 
 class DatabaseError(HTTPException):
     def __init__(self, detail: str = "Error en la base de datos"):
-        super().__init__(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
\ No newline at end of file
+        super().__init__(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(self, detail: str = "Servicio no disponible temporalmente", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class ConflictError(HTTPException):
+    def __init__(self, detail: str = "Conflicto con el estado actual del recurso"):
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
@@ -1,17 +1,77 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 import uvicorn
 
 # Correct imports (assuming you're running from project root)
 from app.config import settings
-from app.api import auth, clientes, empleados, proveedores, productos, inventario, pedidos, compras
+from app.database import AsyncSessionLocal, PRIMARY_HEADER, replica_engines, pin_to_primary
+from app.core.auditoria import audit_log, ip_cliente
+from app.core.catalog_version import catalog_version
+from app.core.user_cache import user_cache
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.reference_data import reference_data
+from app.core.query_metrics import QueryTrackingMiddleware
+from app.core.request_metrics import MetricsMiddleware, request_metrics
+from app.core.search import catalog_search
+from app.core.stock import verificar_alertas
+from app.core.stock_stream import stock_stream
+from app.api import auth, clientes, empleados, proveedores, productos, inventario, pedidos, compras, reportes, admin
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cargar catálogos en memoria; si la base no responde se cargan en la primera petición
+    try:
+        await reference_data.load()
+    except Exception:
+        logger.exception("No se pudieron cargar los catálogos al iniciar")
+    recarga = asyncio.create_task(reference_data.refresh_periodically(settings.REFERENCE_DATA_REFRESH_SECONDS))
+    # Construir los índices de búsqueda; si falla se construyen en la primera búsqueda
+    try:
+        await catalog_search.load()
+    except Exception:
+        logger.exception("No se pudieron construir los índices de búsqueda al iniciar")
+    reconstruccion = asyncio.create_task(catalog_search.rebuild_periodically(settings.SEARCH_INDEX_REFRESH_SECONDS))
+    # Cambios de los índices confirmados por otros workers
+    sincronizacion = catalog_search.start(settings.SEARCH_SYNC_SECONDS)
+    # Versión del catálogo para los GET condicionales; sin ella se responde sin ETag
+    try:
+        await catalog_version.load()
+    except Exception:
+        logger.exception("No se pudo leer la versión del catálogo al iniciar")
+    sondeo_catalogo = catalog_version.start(settings.CATALOGO_VERSION_POLL_SECONDS)
+    # Ediciones de empleados confirmadas por otros workers (vacían la caché de usuarios)
+    sondeo_empleados = user_cache.start(settings.USER_CACHE_VERSION_POLL_SECONDS)
+    # Reconciliar el índice de alertas de stock (lo llena en bases existentes)
+    try:
+        async with AsyncSessionLocal() as db:
+            diferencias = await verificar_alertas(db, reparar=True)
+            await db.commit()
+        if diferencias["faltantes"] or diferencias["sobrantes"]:
+            logger.warning("Índice de alertas de stock corregido al iniciar: %s", diferencias)
+    except Exception:
+        logger.exception("No se pudo verificar el índice de alertas de stock al iniciar")
+    yield
+    recarga.cancel()
+    reconstruccion.cancel()
+    sincronizacion.cancel()
+    sondeo_catalogo.cancel()
+    sondeo_empleados.cancel()
+    await stock_stream.close()
+    # Escribir los eventos de auditoría pendientes antes de salir
+    await audit_log.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
-    description="API para la tienda de cómics y figuras de acción"
+    description="API para la tienda de cómics y figuras de acción",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -21,8 +81,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PRIMARY_HEADER],
 )
 
+# Read-your-writes: fijar al primario a los clientes que acaban de escribir
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if replica_engines and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        pin_to_primary(response)
+    return response
+
+# Auditoría: IP del cliente para los eventos que registre la petición
+# (detrás de un proxy, uvicorn --proxy-headers la toma de X-Forwarded-For)
+@app.middleware("http")
+async def capturar_ip_cliente(request: Request, call_next):
+    token = ip_cliente.set(request.client.host if request.client else None)
+    try:
+        return await call_next(request)
+    finally:
+        ip_cliente.reset(token)
+
+# Consultas SQL por petición (Server-Timing y avisos de N+1)
+app.add_middleware(QueryTrackingMiddleware)
+
+# Métricas por ruta; se añade la última para medir también los demás middlewares
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics, router_app=app)
+
 # Validation error handler
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -40,6 +126,14 @@ app.include_router(productos.router, prefix="/productos", tags=["Productos"])
 app.include_router(inventario.router, prefix="/inventario", tags=["Inventario"])
 app.include_router(pedidos.router, prefix="/pedidos", tags=["Pedidos"])
 app.include_router(compras.router, prefix="/compras", tags=["Compras"])
+app.include_router(reportes.router, prefix="/reportes", tags=["Reportes"])
+app.include_router(admin.router, prefix="/admin", tags=["Administración"])
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        # Sin autenticación, para el scraper de Prometheus (restringir en el proxy)
+        return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/", tags=["Raíz"])
 async def root():
@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String
+from ..database import Base
+
+class CambiosBusqueda(Base):
+    __tablename__ = "CambiosBusqueda"
+
+    # Una fila por documento modificado; cada worker reindexa las posteriores
+    # a la última que aplicó (ver CatalogSearch.sincronizar)
+    id_cambio = Column(Integer, primary_key=True, autoincrement=True)
+    indice = Column(String(20), nullable=False)
+    id_registro = Column(Integer, nullable=False)
+    # Hora del proceso que escribe (la misma que usa la purga)
+    fecha = Column(DateTime, nullable=False, default=datetime.now, index=True)
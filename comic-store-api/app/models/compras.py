@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, DECIMAL, Date, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, DECIMAL, Date, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -36,6 +36,9 @@ class ComprasProveedores(Base):
     proveedor = relationship("Proveedores", back_populates="compras")
     empleado = relationship("Empleados", back_populates="compras")
     detalles = relationship("DetallesCompra", back_populates="compra", cascade="all, delete-orphan")
+    
+    # Clave de la paginación por cursor (fecha_orden, id_compra)
+    __table_args__ = (Index("ix_ComprasProveedores_fecha_orden_id_compra", "fecha_orden", "id_compra"),)
 
 class DetallesCompra(Base):
     __tablename__ = "DetallesCompra"
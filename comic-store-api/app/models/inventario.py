@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -37,4 +37,14 @@ class Inventario(Base):
     # Relaciones
     producto = relationship("Productos", back_populates="inventario")
     tipo_movimiento = relationship("TiposMovimiento", back_populates="movimientos")
-    empleado = relationship("Empleados", back_populates="inventario_movimientos")
\ No newline at end of file
+    empleado = relationship("Empleados", back_populates="inventario_movimientos")
+    
+    # Clave de la paginación por cursor (fecha_movimiento, id_movimiento)
+    __table_args__ = (Index("ix_Inventario_fecha_movimiento_id_movimiento", "fecha_movimiento", "id_movimiento"),)
+
+class AlertasStock(Base):
+    __tablename__ = "AlertasStock"
+
+    # Productos con stock_actual < stock_minimo; se mantiene en la misma
+    # transacción que cada cambio de stock (ver app/core/stock.py)
+    id_producto = Column(Integer, ForeignKey("Productos.id_producto", ondelete="CASCADE"), primary_key=True)
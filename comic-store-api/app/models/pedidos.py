@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, DECIMAL
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -33,6 +33,9 @@ class Pedidos(Base):
     empleado = relationship("Empleados", back_populates="pedidos")
     estado = relationship("EstadosPedido", back_populates="pedidos")
     detalles = relationship("DetallesPedido", back_populates="pedido", cascade="all, delete-orphan")
+    
+    # Clave de la paginación por cursor (fecha_creacion, id_pedido)
+    __table_args__ = (Index("ix_Pedidos_fecha_creacion_id_pedido", "fecha_creacion", "id_pedido"),)
 
 class DetallesPedido(Base):
     __tablename__ = "DetallesPedido"
@@ -44,6 +47,9 @@ class DetallesPedido(Base):
     precio_unitario = Column(DECIMAL(10, 2), nullable=False)
     descuento_unitario = Column(DECIMAL(10, 2), default=0.00)
     subtotal = Column(DECIMAL(10, 2), nullable=False)
+    # Categoría del producto en el momento de la venta: la que suma y resta
+    # en los acumulados por categoría aunque el producto cambie después
+    id_categoria = Column(Integer, ForeignKey("Categorias.id_categoria"), nullable=False)
     
     # Relaciones
     pedido = relationship("Pedidos", back_populates="detalles")
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, DECIMAL, Index
+from ..database import Base
+
+# Acumulados diarios de ventas (pedidos no cancelados, por fecha de creación).
+# Se actualizan en create_pedido, cancelar_pedido y update_estado_pedido
+# (app/core/ventas.py), se reconstruyen desde el historial con
+# scripts/backfill_ventas.py y se crean en bases existentes con
+# database/004_ventas_diarias.sql
+
+class VentasDiarias(Base):
+    __tablename__ = "VentasDiarias"
+    
+    fecha = Column(Date, primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    ingresos = Column(DECIMAL(14, 2), nullable=False, default=0)  # Suma de subtotales (con descuento, sin impuestos)
+    descuentos = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+class VentasDiariasProducto(Base):
+    __tablename__ = "VentasDiariasProducto"
+    
+    fecha = Column(Date, primary_key=True)
+    id_producto = Column(Integer, ForeignKey("Productos.id_producto", ondelete="CASCADE"), primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    ingresos = Column(DECIMAL(14, 2), nullable=False, default=0)
+    descuentos = Column(DECIMAL(14, 2), nullable=False, default=0)
+    
+    # Series de un producto concreto
+    __table_args__ = (Index("ix_VentasDiariasProducto_id_producto_fecha", "id_producto", "fecha"),)
+
+class VentasDiariasCategoria(Base):
+    __tablename__ = "VentasDiariasCategoria"
+    
+    fecha = Column(Date, primary_key=True)
+    id_categoria = Column(Integer, ForeignKey("Categorias.id_categoria", ondelete="CASCADE"), primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    ingresos = Column(DECIMAL(14, 2), nullable=False, default=0)
+    descuentos = Column(DECIMAL(14, 2), nullable=False, default=0)
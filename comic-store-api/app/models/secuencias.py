@@ -0,0 +1,9 @@
+from sqlalchemy import BigInteger, Column, String
+from ..database import Base
+
+class Secuencias(Base):
+    __tablename__ = "Secuencias"
+
+    # Una fila por serie y día, p. ej. "PED-20240131"
+    nombre = Column(String(50), primary_key=True)
+    valor = Column(BigInteger, nullable=False, default=0)
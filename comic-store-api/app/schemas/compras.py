@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
+from decimal import Decimal
 
 class DetalleCompraBase(BaseModel):
     id_producto: int
@@ -59,4 +60,34 @@ class CompraDetalle(Compra):
 
 class RecepcionCompra(BaseModel):
     fecha_recepcion: date
-    detalles: List[dict]  # Lista de {id_detalle, cantidad_recibida}
\ No newline at end of file
+    detalles: List[dict]  # Lista de {id_detalle, cantidad_recibida}
+
+class SugerenciaDetalle(BaseModel):
+    id_producto: int
+    sku: str
+    nombre: str
+    stock_actual: int
+    stock_minimo: int
+    en_camino: int
+    velocidad_diaria: float
+    plazo_entrega: int
+    punto_reorden: int
+    cantidad: int
+    precio_unitario: Decimal
+    subtotal: Decimal
+
+class SugerenciaCompra(BaseModel):
+    id_proveedor: int
+    nombre_proveedor: str
+    id_compra: Optional[int] = None
+    numero_compra: Optional[str] = None
+    fecha_estimada_llegada: date
+    subtotal: Decimal
+    impuestos: Decimal
+    total: Decimal
+    detalles: List[SugerenciaDetalle]
+
+class SugerenciasCompra(BaseModel):
+    dry_run: bool
+    productos_evaluados: int
+    compras: List[SugerenciaCompra]
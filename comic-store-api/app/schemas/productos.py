@@ -108,4 +108,17 @@ class FiguraColeccionDetalle(FiguraColeccion):
 class ProductoCompletoCreate(BaseModel):
     producto: ProductoCreate
     comic: Optional[ComicBase] = None
-    figura: Optional[FiguraColeccionBase] = None
\ No newline at end of file
+    figura: Optional[FiguraColeccionBase] = None
+
+class ErrorImportacion(BaseModel):
+    fila: int
+    sku: Optional[str] = None
+    errores: List[str]
+
+class ResultadoImportacion(BaseModel):
+    dry_run: bool
+    filas: int
+    importados: int
+    comics: int
+    figuras: int
+    errores: List[ErrorImportacion]
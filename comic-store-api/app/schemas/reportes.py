@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from datetime import date
+from decimal import Decimal
+
+class VentasBase(BaseModel):
+    pedidos: int
+    unidades: int
+    ingresos: Decimal
+    descuentos: Decimal
+
+class VentasDia(VentasBase):
+    fecha: date
+    
+    class Config:
+        from_attributes = True
+
+class VentasProducto(VentasBase):
+    id_producto: int
+    sku: str
+    nombre: str
+    id_categoria: int
+    
+    class Config:
+        from_attributes = True
+
+class VentasCategoria(VentasBase):
+    id_categoria: int
+    nombre_categoria: str
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,149 @@
+"""
+Benchmark y verificación del índice de alertas de stock (AlertasStock).
+
+Siembra un catálogo de N productos con ~0,2 % por debajo del mínimo, mide
+la consulta de alertas por el índice frente al recorrido completo anterior y
+después aplica operaciones aleatorias por todas las rutas que cambian el
+stock o el mínimo (movimientos, ajustes, pedidos, cancelaciones, recepción
+de compras y edición de productos). Al final comprueba con
+``verificar_alertas`` que el índice coincide con un recorrido completo.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_alertas --productos 200000 --operaciones 300
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from benchmarks import common
+
+from app.core.stock import verificar_alertas
+from app.database import AsyncSessionLocal, SessionLocal, engine
+from app.main import app
+from app.models.inventario import AlertasStock
+from app.models.productos import Categorias, Productos
+from app.models.proveedores import Proveedores
+
+def sembrar(total: int, lote: int = 50_000) -> None:
+    rnd = random.Random(7)
+    with SessionLocal() as db:
+        # Categoría y cliente creados por seed_catalogo
+        id_categoria = db.scalar(select(Categorias.id_categoria).where(Categorias.nombre_categoria == "Bench"))
+        db.add(Proveedores(nombre="Proveedor", email="proveedor@bench.example.com", id_status=1))
+        db.commit()
+    with engine.begin() as conn:
+        for desde in range(0, total, lote):
+            conn.execute(Productos.__table__.insert(), [
+                {
+                    "sku": f"ALR-{i:07d}", "nombre": f"Producto {i}", "id_categoria": id_categoria,
+                    "stock_actual": rnd.randint(0, 3000), "stock_minimo": 5,
+                    "precio_compra": Decimal("50.00"), "precio_venta": Decimal("99.90"), "id_status": 1,
+                }
+                for i in range(desde, min(desde + lote, total))
+            ])
+
+async def consulta(query) -> float:
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        (await db.execute(query)).all()
+    return (time.perf_counter() - inicio) * 1000
+
+# Misma selección de IDs por las dos vías: recorrido del catálogo (anterior) e índice
+RECORRIDO = select(Productos.id_producto).where(Productos.stock_actual < Productos.stock_minimo, Productos.id_status == 1)
+INDICE = select(Productos.id_producto).where(
+    Productos.id_producto.in_(select(AlertasStock.id_producto)), Productos.id_status == 1
+)
+
+async def operacion(http, headers, rnd: random.Random, id_producto: int, pedidos: list) -> int:
+    tipo = rnd.choice(["entrada", "salida", "ajuste", "pedido", "cancelar", "compra", "minimo"])
+    if tipo == "entrada" or tipo == "salida":
+        r = await http.post("/inventario/movimientos", json={
+            "id_producto": id_producto, "id_tipo_movimiento": 1 if tipo == "entrada" else 2, "cantidad": rnd.randint(1, 4),
+        }, headers=headers)
+    elif tipo == "ajuste":
+        r = await http.post("/inventario/ajuste", json={"id_producto": id_producto, "nueva_cantidad": rnd.randint(0, 10), "motivo": "bench"}, headers=headers)
+    elif tipo == "pedido":
+        r = await http.post("/pedidos/", json={"id_cliente": 1, "detalles": [
+            {"id_producto": id_producto, "cantidad": rnd.randint(1, 3), "precio_unitario": 0, "subtotal": 0},
+        ]}, headers=headers)
+        if r.status_code == 201:
+            pedidos.append(r.json()["id_pedido"])
+    elif tipo == "cancelar" and pedidos:
+        r = await http.post(f"/pedidos/{pedidos.pop(rnd.randrange(len(pedidos)))}/cancelar", headers=headers)
+    elif tipo == "compra":
+        r = await http.post("/compras/", json={"id_proveedor": 1, "detalles": [
+            {"id_producto": id_producto, "cantidad_ordenada": 3, "precio_unitario": 50, "subtotal": 150},
+        ]}, headers=headers)
+        assert r.status_code == 201, r.text
+        compra = r.json()
+        r = await http.post(f"/compras/{compra['id_compra']}/recepcion", json={
+            "fecha_recepcion": date.today().isoformat(),
+            "detalles": [{"id_detalle": compra["detalles"][0]["id_detalle"], "cantidad_recibida": 3}],
+        }, headers=headers)
+    else:
+        r = await http.put(f"/productos/{id_producto}", json={"stock_minimo": rnd.randint(0, 8)}, headers=headers)
+    # 409: salida sin stock suficiente, parte normal de la prueba
+    assert r.status_code in (200, 201, 409), f"{tipo}: {r.status_code} {r.text}"
+    return r.status_code
+
+async def main(total: int, operaciones: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    common.seed_catalogo(0)
+    inicio = time.perf_counter()
+    sembrar(total)
+    print(f"{total} productos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    # Primer arranque sobre una base existente: el índice se llena reconciliando
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        diferencias = await verificar_alertas(db, reparar=True)
+        await db.commit()
+    print(f"índice inicial: {len(diferencias['faltantes'])} alertas en {time.perf_counter() - inicio:.1f} s")
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        latencias = []
+        for _ in range(5):
+            inicio = time.perf_counter()
+            r = await http.get("/inventario/alerta-stock", headers=headers)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            assert r.status_code == 200, r.text
+        recorrido = [await consulta(RECORRIDO) for _ in range(5)]
+        indice = [await consulta(INDICE) for _ in range(5)]
+        print(f"consulta de alertas: recorrido completo p50 {common.percentile(recorrido, 50):.1f} ms, "
+              f"índice p50 {common.percentile(indice, 50):.1f} ms")
+        print(f"GET /inventario/alerta-stock ({len(r.json())} productos) p50 {common.percentile(latencias, 50):.1f} ms")
+
+        # Operaciones sobre productos cerca del umbral, donde entran y salen de la alerta
+        rnd = random.Random(11)
+        async with AsyncSessionLocal() as db:
+            candidatos = list(await db.scalars(select(Productos.id_producto).where(Productos.stock_actual < 10).limit(50)))
+        pedidos = []
+        codigos = {}
+        for _ in range(operaciones):
+            codigo = await operacion(http, headers, rnd, rnd.choice(candidatos), pedidos)
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+        print(f"{operaciones} operaciones: {codigos}")
+
+    async with AsyncSessionLocal() as db:
+        diferencias = await verificar_alertas(db)
+    if diferencias["faltantes"] or diferencias["sobrantes"]:
+        print(f"FALLO: índice inconsistente {diferencias}")
+        return 1
+    print("OK: el índice coincide con el recorrido completo")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=200_000)
+    parser.add_argument("--operaciones", type=int, default=300)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.productos, args.operaciones)))
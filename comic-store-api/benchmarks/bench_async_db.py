@@ -0,0 +1,88 @@
+"""
+Benchmark: throughput de peticiones concurrentes con sesión síncrona vs asíncrona.
+
+Simula una consulta lenta (función SQL ``sleep(ms)`` registrada en SQLite) y
+lanza N peticiones concurrentes contra dos endpoints equivalentes:
+
+- ``/antes``: handler ``async def`` que usa la ``Session`` síncrona (bloquea el event loop)
+- ``/despues``: handler que usa la dependencia asíncrona ``get_db``
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_async_db --peticiones 50 --retardo-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_async.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal, async_engine, engine, get_db
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+@event.listens_for(engine, "connect")
+def _registrar_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep", 1, _sleep_ms)
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _registrar_sleep_async(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep", 1, _sleep_ms)
+
+def crear_app(retardo_ms: int) -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/antes")
+    async def antes():
+        db = SessionLocal()
+        try:
+            return {"ms": db.execute(text("SELECT sleep(:ms)"), {"ms": retardo_ms}).scalar()}
+        finally:
+            db.close()
+
+    @bench_app.get("/despues")
+    async def despues(db: AsyncSession = Depends(get_db)):
+        result = await db.execute(text("SELECT sleep(:ms)"), {"ms": retardo_ms})
+        return {"ms": result.scalar()}
+
+    return bench_app
+
+async def medir(client: httpx.AsyncClient, ruta: str, peticiones: int) -> float:
+    inicio = time.perf_counter()
+    respuestas = await asyncio.gather(*(client.get(ruta) for _ in range(peticiones)))
+    transcurrido = time.perf_counter() - inicio
+    assert all(r.status_code == 200 for r in respuestas)
+    return transcurrido
+
+async def main(peticiones: int, retardo_ms: int):
+    transport = httpx.ASGITransport(app=crear_app(retardo_ms))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Calentar pools de conexiones
+        await client.get("/antes")
+        await client.get("/despues")
+
+        print(f"{peticiones} peticiones concurrentes, consulta de {retardo_ms} ms")
+        for ruta in ("/antes", "/despues"):
+            transcurrido = await medir(client, ruta, peticiones)
+            print(f"{ruta:10s} {transcurrido:8.3f} s  {peticiones / transcurrido:8.1f} req/s")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=50)
+    parser.add_argument("--retardo-ms", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.peticiones, args.retardo_ms))
@@ -0,0 +1,161 @@
+"""
+Benchmark y verificación del registro de auditoría en ``LogsSistema``.
+
+Compara el coste de encolar un evento con el de escribirlo en la propia
+petición (un INSERT y un commit por evento), lanza N movimientos de
+inventario concurrentes por la API y comprueba que cada uno deja su evento
+con empleado e IP en lotes de varias filas. Después prueba la contrapresión
+(cola llena: se descarta y se cuenta), la recuperación tras un fallo de
+escritura (el lote vuelve a la cola y se escribe al reintentar) y que un
+evento que la base de datos rechaza siempre se descarta sin bloquear a los
+demás.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_auditoria --peticiones 2000 --concurrencia 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import func, select, text
+
+from benchmarks import common
+
+from app.core.auditoria import AuditLog, audit_log
+from app.database import AsyncSessionLocal, SessionLocal, engine
+from app.main import app
+from app.models.logs import LogsSistema
+
+async def escritura_directa(total: int) -> float:
+    """ms por evento escribiéndolo dentro de la petición (INSERT + commit)."""
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for i in range(total):
+            db.add(LogsSistema(tipo_accion="crear", tabla_afectada="Bench", id_registro_afectado=i, id_empleado=1))
+            await db.commit()
+    return (time.perf_counter() - inicio) * 1000 / total
+
+def encolado(total: int) -> float:
+    """µs por evento encolándolo (el escritor no llega a ejecutarse y la cola se descarta)."""
+    cola = AuditLog(total, total + 1, 60_000)
+    inicio = time.perf_counter()
+    for i in range(total):
+        cola.record("crear", "Bench", i, 1)
+    duracion = time.perf_counter() - inicio
+    cola._task.cancel()
+    return duracion * 1_000_000 / total
+
+def filas(*condiciones) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(LogsSistema).where(*condiciones))
+
+async def main(peticiones: int, concurrencia: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(50)
+    fallos = 0
+
+    directa = await escritura_directa(500)
+    print(f"evento escrito en la petición: {directa:.2f} ms; encolado: {encolado(10_000):.1f} µs")
+    with engine.begin() as conn:
+        conn.execute(LogsSistema.__table__.delete())
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        semaforo = asyncio.Semaphore(concurrencia)
+        latencias = []
+
+        async def mover(i: int):
+            async with semaforo:
+                t = time.perf_counter()
+                response = await http.post("/inventario/movimientos", json={
+                    "id_producto": productos[i % len(productos)], "id_tipo_movimiento": 1, "cantidad": 1,
+                }, headers=headers)
+                latencias.append((time.perf_counter() - t) * 1000)
+                assert response.status_code == 201, response.text
+                return response.json()["id_movimiento"]
+
+        inicio = time.perf_counter()
+        movimientos = await asyncio.gather(*(mover(i) for i in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+        await audit_log.flush()
+
+    stats = audit_log.stats()
+    print(f"{peticiones} movimientos en {duracion:.1f} s ({peticiones / duracion:.0f}/s), "
+          f"p50 {common.percentile(latencias, 50):.1f} ms  p99 {common.percentile(latencias, 99):.1f} ms")
+    print(f"auditoría: {stats['written']} eventos en {stats['flush_ms']['count']} INSERT "
+          f"({stats['written'] / max(stats['flush_ms']['count'], 1):.0f} filas por lote, "
+          f"{stats['flush_ms']['avg']:.1f} ms de media, máx {stats['flush_ms']['max']:.1f} ms); "
+          f"cola máxima {stats['max_pending_seen']}")
+
+    registrados = filas(
+        LogsSistema.tabla_afectada == "Inventario", LogsSistema.tipo_accion == "crear",
+        LogsSistema.id_registro_afectado.in_(movimientos), LogsSistema.id_empleado == 1,
+        LogsSistema.ip_usuario == "127.0.0.1",
+    )
+    if registrados != peticiones or filas(LogsSistema.tipo_accion == "login") != 1:
+        fallos += 1
+        print(f"FALLO: {registrados} de {peticiones} movimientos auditados con empleado e IP")
+    else:
+        print("cada movimiento tiene su evento con empleado e IP; login registrado")
+
+    # Contrapresión: la cola llena descarta sin bloquear
+    cola = AuditLog(100, 50, 50)
+    aceptados = sum(cola.record("crear", "Bench", i, 1) for i in range(1000))
+    antes = filas()
+    await cola.flush()
+    if aceptados != 100 or cola.dropped != 900 or filas() - antes != 100:
+        fallos += 1
+        print(f"FALLO contrapresión: {aceptados} aceptados, {cola.dropped} descartados")
+    else:
+        print(f"cola llena: {aceptados} aceptados y {cola.dropped} descartados sin bloquear")
+
+    # Fallo de escritura: el lote vuelve a la cola y se escribe al reintentar
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE "LogsSistema" RENAME TO "LogsSistema_off"'))
+    for i in range(10):
+        audit_log.record("error", "Bench", i)
+    await audit_log.flush()
+    errores, pendientes = audit_log.write_errors, audit_log.stats()["pending"]
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE "LogsSistema_off" RENAME TO "LogsSistema"'))
+    await audit_log.close()
+    if not errores or pendientes != 10 or filas(LogsSistema.tabla_afectada == "Bench", LogsSistema.tipo_accion == "error") != 10:
+        fallos += 1
+        print(f"FALLO recuperación: {errores} errores, {pendientes} pendientes")
+    else:
+        print(f"escritura fallida ({errores} error): {pendientes} eventos conservados y escritos al reintentar")
+
+    # Evento que la base de datos rechaza siempre (tipo_accion NOT NULL): tras
+    # los intentos el lote se escribe fila a fila y solo se pierde esa fila
+    cola = AuditLog(1000, 50, 20, max_intentos=3)
+    antes = filas(LogsSistema.tabla_afectada == "Veneno")
+    cola.record(None, "Veneno", 0)
+    for i in range(1, 101):
+        cola.record("crear", "Veneno", i)
+    for _ in range(100):
+        await asyncio.sleep(0.05)
+        if not cola.stats()["pending"]:
+            break
+    await cola.close()
+    escritos = filas(LogsSistema.tabla_afectada == "Veneno") - antes
+    if escritos != 100 or cola.rejected != 1 or cola.stats()["pending"]:
+        fallos += 1
+        print(f"FALLO evento rechazado: {escritos} escritos, {cola.rejected} rechazados, "
+              f"{cola.stats()['pending']} pendientes")
+    else:
+        print(f"evento rechazado: descartado tras {cola.max_intentos} intentos y {escritos} eventos escritos")
+
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.peticiones, args.concurrencia)))
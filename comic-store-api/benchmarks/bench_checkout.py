@@ -0,0 +1,74 @@
+"""
+Benchmark: latencia de ``POST /pedidos/`` según el número de líneas del pedido.
+
+Crea pedidos de 1, 10, 50 y 200 líneas y reporta p50/p99 de la latencia y
+el número de sentencias SQL emitidas por checkout, que con el checkout por
+conjuntos no debe crecer con el tamaño del pedido.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_checkout --repeticiones 20
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from benchmarks import common
+
+from app.database import async_engine
+from app.main import app
+
+TAMANOS = (1, 10, 50, 200)
+
+class ContadorSentencias:
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+async def checkout(http, headers, productos, lineas: int, contador: ContadorSentencias):
+    payload = {
+        "id_cliente": 1,
+        "detalles": [
+            {"id_producto": productos[i % len(productos)], "cantidad": 1, "precio_unitario": 0, "subtotal": 0}
+            for i in range(lineas)
+        ],
+    }
+    sentencias = contador.total
+    inicio = time.perf_counter()
+    response = await http.post("/pedidos/", json=payload, headers=headers)
+    latencia = (time.perf_counter() - inicio) * 1000
+    assert response.status_code == 201, response.text
+    assert len(response.json()["detalles"]) == lineas
+    return latencia, contador.total - sentencias
+
+async def main(repeticiones: int):
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(max(TAMANOS))
+    contador = ContadorSentencias(async_engine.sync_engine)
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        # Calentamiento: cachés de usuario y catálogos, conexiones del pool
+        await checkout(http, headers, productos, 1, contador)
+        print(f"{repeticiones} checkouts por tamaño")
+        for lineas in TAMANOS:
+            latencias = []
+            sentencias = 0
+            for _ in range(repeticiones):
+                latencia, sentencias = await checkout(http, headers, productos, lineas, contador)
+                latencias.append(latencia)
+            print(
+                f"{lineas:4d} líneas  p50 {common.percentile(latencias, 50):8.1f} ms  "
+                f"p99 {common.percentile(latencias, 99):8.1f} ms  sentencias SQL {sentencias:4d}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeticiones))
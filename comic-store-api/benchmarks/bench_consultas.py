@@ -0,0 +1,160 @@
+"""
+Benchmark y verificación del recuento de consultas SQL por petición.
+
+Siembra un catálogo, un pedido y una compra con muchas líneas y recorre los
+endpoints de detalle dentro de ``capturar_consultas`` para imprimir cuántas
+consultas hace cada uno. Comprueba que la cabecera ``Server-Timing`` cuadra
+con lo capturado, que ninguna de esas peticiones se avisa como N+1 (la
+recepción de la compra hacía una consulta por línea) y que una sentencia
+repetida sí se avisa en el log y en ``query_metrics``, que ``max_consultas``
+falla al superar el límite y mide el coste de los listeners por sentencia
+frente a un motor sin instrumentar. El máximo de consultas por endpoint,
+para cualquier tamaño, lo comprueba bench_perfiles_carga.py.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_consultas --lineas 50
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+from benchmarks import common
+
+from app.config import settings
+from app.core.query_metrics import (
+    QueryStats, TooManyQueriesError, capturar_consultas, instrument_queries, max_consultas, query_metrics,
+)
+from app.database import SessionLocal
+from app.main import app
+from app.models.proveedores import Proveedores
+
+class Avisos(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+def coste_listeners(total: int) -> float:
+    """
+    µs añadidos por sentencia con los listeners de instrument_queries, sobre
+    SQLite síncrono en memoria (con aiosqlite el salto al hilo lo tapa todo).
+    """
+    tiempos = []
+    for instrumentar in (False, True):
+        motor = create_engine("sqlite://")
+        if instrumentar:
+            instrument_queries(motor)
+        with motor.connect() as conn, capturar_consultas():
+            for _ in range(1000):
+                conn.execute(text("SELECT 1"))
+            inicio = time.perf_counter()
+            for _ in range(total):
+                conn.execute(text("SELECT 1"))
+            tiempos.append(time.perf_counter() - inicio)
+        motor.dispose()
+    return (tiempos[1] - tiempos[0]) * 1_000_000 / total
+
+async def main(lineas: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(max(lineas, 50))
+    with SessionLocal() as db:
+        db.add(Proveedores(nombre="Proveedor Bench", email="proveedor@bench.example.com", id_status=1))
+        db.commit()
+
+    avisos = Avisos()
+    logging.getLogger("app.core.query_metrics").addHandler(avisos)
+    fallos = 0
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        response = await http.post("/pedidos/", json={"id_cliente": 1, "detalles": [
+            {"id_producto": id_producto, "cantidad": 1, "precio_unitario": 0, "subtotal": 0}
+            for id_producto in productos[:lineas]
+        ]}, headers=headers)
+        assert response.status_code == 201, response.text
+        id_pedido = response.json()["id_pedido"]
+        response = await http.post("/compras/", json={"id_proveedor": 1, "detalles": [
+            {"id_producto": id_producto, "cantidad_ordenada": 10, "precio_unitario": 50, "subtotal": 500}
+            for id_producto in productos[:lineas]
+        ]}, headers=headers)
+        assert response.status_code == 201, response.text
+        compra = response.json()
+        query_metrics.reset()
+
+        peticiones = [
+            ("GET", "/productos/", None),
+            ("GET", f"/productos/{productos[0]}", None),
+            ("GET", "/productos/comics", None),
+            ("GET", "/productos/figuras", None),
+            ("GET", f"/pedidos/{id_pedido}", None),
+            ("GET", f"/compras/{compra['id_compra']}", None),
+            ("GET", "/inventario/movimientos", None),
+            ("POST", f"/compras/{compra['id_compra']}/recepcion", {
+                "fecha_recepcion": date.today().isoformat(),
+                "detalles": [{"id_detalle": d["id_detalle"], "cantidad_recibida": 10} for d in compra["detalles"]],
+            }),
+        ]
+        settings.SQL_SERVER_TIMING = True
+        print(f"{'petición':45s} {'consultas':>9s} {'db':>9s}")
+        for method, path, body in peticiones:
+            with capturar_consultas() as stats:
+                response = await http.request(method, path, json=body, headers=headers)
+            assert response.status_code == 200, f"{path}: {response.text}"
+            print(f"{method + ' ' + path:45s} {stats.count:9d} {stats.total_ms:6.1f} ms")
+            cabecera = response.headers.get("server-timing", "")
+            if f'desc="{stats.count} consultas"' not in cabecera:
+                fallos += 1
+                print(f"FALLO Server-Timing de {path}: {cabecera!r} (capturadas {stats.count})")
+        settings.SQL_SERVER_TIMING = False
+        if "server-timing" in (await http.get("/productos/", headers=headers)).headers:
+            fallos += 1
+            print("FALLO: Server-Timing con SQL_SERVER_TIMING desactivado")
+
+        # Límite de consultas para usar en pruebas
+        try:
+            with max_consultas(1):
+                await http.get(f"/compras/{compra['id_compra']}", headers=headers)
+            fallos += 1
+            print("FALLO: max_consultas(1) no falló")
+        except TooManyQueriesError as exc:
+            print(f"max_consultas(1): {str(exc).splitlines()[0]}")
+
+    for ruta, datos in query_metrics.snapshot().items():
+        if datos["n_plus_one"]:
+            fallos += 1
+            print(f"FALLO: N+1 en {ruta}: máx. {datos['max_queries']} consultas")
+
+    # Una sentencia repetida por línea se avisa como N+1
+    repetidas = QueryStats()
+    for id_detalle in range(lineas):
+        repetidas.record(f"SELECT * FROM DetallesCompra WHERE id_detalle = {id_detalle}", 0.1)
+    query_metrics.observe("POST", "/sintetica/{id}", repetidas)
+    sintetica = query_metrics.snapshot().get("POST /sintetica/{id}", {})
+    if not sintetica.get("n_plus_one") or not any("/sintetica/{id}" in m for m in avisos.mensajes):
+        fallos += 1
+        print(f"FALLO: {lineas} sentencias repetidas no se avisaron como N+1: {sintetica}")
+    else:
+        aviso = next(m for m in avisos.mensajes if "/sintetica/{id}" in m)
+        print(f"aviso N+1: {aviso[:160]}")
+
+    print(f"coste de los listeners: {coste_listeners(50_000):.1f} µs por sentencia")
+
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lineas", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.lineas)))
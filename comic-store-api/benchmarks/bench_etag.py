@@ -0,0 +1,151 @@
+"""
+Benchmark y verificación de los GET condicionales del catálogo (ETag).
+
+Simula terminales que consultan el catálogo una y otra vez: para cada
+listado mide bytes, latencia y consultas SQL por petición sin caché y con
+If-None-Match (304). Comprueba que los 304 no hacen ninguna consulta, que
+el ETag cambia al editar un producto, al crear una categoría y cuando otro
+worker sube la versión (visto en el siguiente sondeo), que una venta no lo
+cambia ni escribe la versión (los cobros no se esperan unos a otros por
+esa fila), y que las búsquedas se responden sin ETag.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_etag --productos 2000 --peticiones 300
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select, update
+
+from benchmarks import common
+
+from app.config import settings
+from app.core.catalog_version import NOMBRE
+from app.core.query_metrics import capturar_consultas
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.productos import Comics, FigurasColeccion
+from app.models.secuencias import Secuencias
+
+RUTAS = ["/productos/", "/productos/comics", "/productos/figuras", "/productos/categorias"]
+
+def sembrar(productos: int):
+    ids = common.seed_catalogo(productos)
+    with SessionLocal() as db:
+        for i, id_producto in enumerate(ids):
+            if i % 3 == 0:
+                db.add(Comics(id_producto=id_producto, titulo=f"Comic {i}", numero=i))
+            elif i % 3 == 1:
+                db.add(FigurasColeccion(id_producto=id_producto, personaje=f"Personaje {i}", universo="Bench"))
+        db.commit()
+    return ids
+
+async def sondear(http, ruta: str, headers: dict, peticiones: int):
+    """Devuelve (latencias en ms, bytes por respuesta, consultas por respuesta, estados)."""
+    tiempos, consultas, estados = [], [], set()
+    total_bytes = 0
+    for _ in range(peticiones):
+        with capturar_consultas() as stats:
+            inicio = time.perf_counter()
+            response = await http.get(ruta, headers=headers)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        total_bytes += len(response.content) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+        consultas.append(stats.count)
+        estados.add(response.status_code)
+    return tiempos, total_bytes / peticiones, sum(consultas) / peticiones, estados
+
+async def main(args) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    ids = sembrar(args.productos)
+    # Sondeo rápido para comprobar en poco tiempo lo que escriben otros workers
+    settings.CATALOGO_VERSION_POLL_SECONDS = 0.2
+    fallos = []
+
+    async with app.router.lifespan_context(app), common.client(app) as http:
+        auth = await common.auth_headers(http)
+
+        print(f"{'ruta':24s} {'bytes':>9s} {'p50 ms':>8s} {'consultas':>9s}   {'bytes 304':>9s} {'p50 ms':>8s} {'consultas':>9s}")
+        for ruta in RUTAS:
+            completo = await sondear(http, ruta, auth, args.peticiones)
+            etag = (await http.get(ruta, headers=auth)).headers.get("etag")
+            if not etag:
+                fallos.append(f"{ruta} sin ETag")
+                continue
+            condicional = await sondear(http, ruta, {**auth, "If-None-Match": etag}, args.peticiones)
+            if condicional[3] != {304}:
+                fallos.append(f"{ruta} con If-None-Match respondió {condicional[3]}")
+            if condicional[2]:
+                fallos.append(f"{ruta}: los 304 hicieron {condicional[2]:.1f} consultas")
+            print(
+                f"{ruta:24s} {completo[1]:9,.0f} {common.percentile(completo[0], 50):8.2f} {completo[2]:9.1f}   "
+                f"{condicional[1]:9,.0f} {common.percentile(condicional[0], 50):8.2f} {condicional[2]:9.1f}"
+            )
+
+        async def cambia(descripcion: str, ruta: str, accion) -> None:
+            antes = (await http.get(ruta, headers=auth)).headers["etag"]
+            await accion()
+            response = await http.get(ruta, headers={**auth, "If-None-Match": antes})
+            if response.status_code != 200 or response.headers.get("etag") == antes:
+                fallos.append(f"{descripcion}: {ruta} siguió respondiendo {response.status_code} con {antes}")
+            else:
+                print(f"{descripcion}: {antes} -> {response.headers['etag']}")
+            return response
+
+        async def editar_producto():
+            r = await http.put(f"/productos/{ids[0]}", json={"precio_venta": 123.45}, headers=auth)
+            assert r.status_code == 200, r.text
+
+        async def vender():
+            r = await http.post("/pedidos/", json={"id_cliente": 1, "detalles": [
+                {"id_producto": ids[1], "cantidad": 1, "precio_unitario": 0, "subtotal": 0},
+            ]}, headers=auth)
+            assert r.status_code == 201, r.text
+
+        async def crear_categoria():
+            r = await http.post("/productos/categorias", json={"nombre_categoria": "Nueva"}, headers=auth)
+            assert r.status_code == 201, r.text
+
+        async def otro_worker():
+            # Escritura hecha por otro proceso: este solo la ve al releer la versión
+            with engine.begin() as conn:
+                conn.execute(update(Secuencias).where(Secuencias.nombre == NOMBRE).values(valor=Secuencias.valor + 1))
+            await asyncio.sleep(settings.CATALOGO_VERSION_POLL_SECONDS * 3)
+
+        await cambia("editar producto", "/productos/?limit=5", editar_producto)
+        # Una venta solo mueve stock: ni cambia el ETag ni toca la fila de la versión
+        antes = (await http.get("/productos/?limit=5", headers=auth)).headers["etag"]
+        with engine.connect() as conn:
+            version = conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == NOMBRE))
+        await vender()
+        response = await http.get("/productos/?limit=5", headers={**auth, "If-None-Match": antes})
+        with engine.connect() as conn:
+            despues = conn.scalar(select(Secuencias.valor).where(Secuencias.nombre == NOMBRE))
+        if response.status_code != 304 or despues != version:
+            fallos.append(f"venta: respondió {response.status_code}, versión {version} -> {despues}")
+        else:
+            print(f"venta (stock): sigue {antes} (304)")
+        response = await cambia("crear categoría", "/productos/categorias", crear_categoria)
+        if "Nueva" not in response.text:
+            fallos.append("la categoría nueva no aparece tras cambiar el ETag")
+        await cambia("otro worker", "/productos/comics", otro_worker)
+
+        response = await http.get("/productos/?search=producto", headers=auth)
+        if "etag" in response.headers:
+            fallos.append("las búsquedas no deberían llevar ETag")
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--peticiones", type=int, default=300)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,184 @@
+"""
+Benchmark y verificación de las exportaciones en streaming (NDJSON y CSV).
+
+Genera dos historias de distinto tamaño con scripts/generar_datos.py y, para
+cada exportación, mide filas por segundo y el pico de memoria de Python
+(tracemalloc) mientras se envía la respuesta. Para comparar, mide también el
+pico del listado equivalente pidiendo todas las filas en una sola página.
+Con la base pequeña comprueba que el NDJSON contiene exactamente las filas
+del listado en el mismo orden, que el CSV tiene las mismas filas y
+cabeceras, que los filtros se aplican y que ``lineas=true`` exporta las
+líneas de los pedidos filtrados.
+
+La respuesta se consume llamando a la aplicación ASGI directamente, sin
+acumular el cuerpo: el cliente de httpx en proceso lo guardaría entero en
+memoria y falsearía la medida.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_export --pedidos 5000 20000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks import common
+
+from app.database import Base, engine
+from app.main import app
+from scripts.generar_datos import generar
+
+# (exportación, listado equivalente, campos que solo tiene el listado)
+RUTAS = [
+    ("/pedidos/export", "/pedidos/", ()),
+    ("/inventario/movimientos/export", "/inventario/movimientos", ("tipo_movimiento",)),
+    ("/compras/export", "/compras/", ()),
+    ("/clientes/export", "/clientes/", ()),
+]
+
+async def descargar(ruta: str, params: dict, token: str, guardar: bool = False):
+    """
+    Pide ``ruta`` a la aplicación ASGI y consume el cuerpo trozo a trozo.
+    Devuelve (estado, cabeceras, bytes totales, trozos, cuerpo si ``guardar``).
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": ruta, "raw_path": ruta.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    salida = {"estado": None, "cabeceras": {}, "bytes": 0, "trozos": 0, "cuerpo": []}
+    enviado = False
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            salida["estado"] = mensaje["status"]
+            salida["cabeceras"] = {k.decode(): v.decode() for k, v in mensaje["headers"]}
+        elif mensaje["type"] == "http.response.body":
+            cuerpo = mensaje.get("body", b"")
+            salida["bytes"] += len(cuerpo)
+            salida["trozos"] += bool(cuerpo)
+            if guardar:
+                salida["cuerpo"].append(cuerpo)
+
+    await app(scope, receive, send)
+    return salida["estado"], salida["cabeceras"], salida["bytes"], salida["trozos"], b"".join(salida["cuerpo"])
+
+async def pico_memoria(ruta: str, params: dict, token: str) -> float:
+    """Pico de memoria de Python (MB) mientras se sirve la petición."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        estado, *_ = await descargar(ruta, params, token)
+        assert estado == 200, (ruta, estado)
+        return (tracemalloc.get_traced_memory()[1] - base) / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+async def verificar(http, headers: dict, token: str) -> list:
+    fallos = []
+    for export, listado, solo_listado in RUTAS:
+        completo = (await http.get(listado, params={"limit": 1_000_000}, headers=headers)).json()
+        esperado = [{k: v for k, v in fila.items() if k not in solo_listado} for fila in completo]
+        estado, cabeceras, _, _, cuerpo = await descargar(export, {"formato": "ndjson"}, token, guardar=True)
+        if estado != 200 or not cabeceras.get("content-type", "").startswith("application/x-ndjson"):
+            fallos.append(f"{export}: {estado} {cabeceras.get('content-type')}")
+            continue
+        filas = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+        if filas != esperado:
+            fallos.append(f"{export}: el NDJSON ({len(filas)} filas) no coincide con {listado} ({len(esperado)} filas)")
+
+        estado, cabeceras, _, _, cuerpo = await descargar(export, {"formato": "csv"}, token, guardar=True)
+        lector = csv.DictReader(io.StringIO(cuerpo.decode()))
+        csv_filas = list(lector)
+        campos = list(esperado[0]) if esperado else []
+        if lector.fieldnames != campos or len(csv_filas) != len(esperado):
+            fallos.append(f"{export}: CSV con cabecera {lector.fieldnames} y {len(csv_filas)} filas")
+        elif any(str(fila[campos[0]]) != csv_fila[campos[0]] for fila, csv_fila in zip(esperado, csv_filas)):
+            fallos.append(f"{export}: el CSV no sigue el orden del listado")
+        if "attachment" not in cabeceras.get("content-disposition", ""):
+            fallos.append(f"{export}: sin Content-Disposition")
+        print(f"{export:32s} {len(filas):>7,} filas verificadas (NDJSON y CSV)")
+
+    # Mismos filtros que el listado
+    filtros = {"id_cliente": 1, "fecha_desde": "2000-01-01"}
+    listado = (await http.get("/pedidos/", params={**filtros, "limit": 1_000_000}, headers=headers)).json()
+    _, _, _, _, cuerpo = await descargar("/pedidos/export", filtros, token, guardar=True)
+    if [json.loads(linea) for linea in cuerpo.decode().splitlines()] != listado:
+        fallos.append("/pedidos/export no aplica los filtros del listado")
+
+    # Líneas de los pedidos filtrados
+    _, _, _, _, cuerpo = await descargar("/pedidos/export", {**filtros, "lineas": "true"}, token, guardar=True)
+    lineas = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+    pedidos = {pedido["id_pedido"] for pedido in listado}
+    for id_pedido in list(pedidos)[:20]:
+        detalle = (await http.get(f"/pedidos/{id_pedido}", headers=headers)).json()
+        if sorted(d["id_detalle"] for d in detalle["detalles"]) != sorted(l["id_detalle"] for l in lineas if l["id_pedido"] == id_pedido):
+            fallos.append(f"lineas=true no exporta las líneas del pedido {id_pedido}")
+            break
+    if {linea["id_pedido"] for linea in lineas} - pedidos:
+        fallos.append("lineas=true exporta líneas de pedidos fuera del filtro")
+
+    if (await http.get("/pedidos/export", params={"formato": "xml"}, headers=headers)).status_code != 422:
+        fallos.append("formato desconocido no responde 422")
+    return fallos
+
+async def medir(token: str, headers: dict, http) -> None:
+    print(f"{'ruta':38s} {'filas':>8s} {'MB':>7s} {'trozos':>7s} {'filas/s':>9s} {'pico MB':>8s}   {'pico listado':>12s}")
+    for export, listado, _ in RUTAS:
+        for formato in ("ndjson", "csv"):
+            inicio = time.perf_counter()
+            estado, _, total, trozos, _ = await descargar(export, {"formato": formato}, token)
+            transcurrido = time.perf_counter() - inicio
+            assert estado == 200, (export, estado)
+            pico = await pico_memoria(export, {"formato": formato}, token)
+            comparacion = ""
+            if formato == "ndjson":
+                comparacion = f"{await pico_memoria(listado, {'limit': 1_000_000}, token):12.1f}"
+            filas = await contar(export, token)
+            print(f"{export + '?' + formato:38s} {filas:8,} {total / 1024 / 1024:7.1f} {trozos:7d} {filas / transcurrido:9,.0f} {pico:8.1f}   {comparacion}")
+
+async def contar(ruta: str, token: str) -> int:
+    _, _, _, _, cuerpo = await descargar(ruta, {"formato": "ndjson"}, token, guardar=True)
+    return cuerpo.count(b"\n")
+
+async def main(args) -> int:
+    fallos = []
+    for i, pedidos in enumerate(args.pedidos):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        generar(engine, productos=2000, clientes=pedidos // 2, pedidos=pedidos, anios=1, acumulados=False)
+        print(f"\n== {pedidos:,} pedidos ==")
+        async with app.router.lifespan_context(app), common.client(app) as http:
+            headers = await common.auth_headers(http)
+            token = headers["Authorization"].split()[1]
+            if i == 0:
+                fallos += await verificar(http, headers, token)
+            await medir(token, headers, http)
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pedidos", type=int, nargs="+", default=[5_000, 20_000])
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,131 @@
+"""
+Verificación y rendimiento de scripts/generar_datos.py.
+
+Genera la misma historia dos veces en bases SQLite temporales y comprueba:
+
+- que el libro de inventario está encadenado (por producto y en orden de
+  id_movimiento, cada stock_anterior es el stock_nuevo anterior y la
+  cantidad cuadra con el salto) y que el último stock_nuevo es el
+  stock_actual del producto;
+- que ningún stock queda negativo y que los totales de los pedidos cuadran
+  con sus líneas;
+- que Secuencias guarda el último número usado de cada día;
+- que con la misma semilla las dos bases son idénticas.
+
+Imprime las filas escritas y las filas por segundo.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_generador --pedidos 50000
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+from benchmarks import common
+
+from app.database import Base
+from scripts.generar_datos import generar
+
+TABLAS = ["Productos", "Clientes", "Pedidos", "DetallesPedido", "ComprasProveedores", "DetallesCompra",
+          "Inventario", "AlertasStock", "Secuencias"]
+
+def huella(conn) -> str:
+    """SHA-256 del contenido de las tablas de datos."""
+    sha = hashlib.sha256()
+    for tabla in TABLAS:
+        for fila in conn.execute(text(f"SELECT * FROM {tabla} ORDER BY 1")):
+            sha.update(repr(tuple(fila)).encode())
+    return sha.hexdigest()
+
+def comprobar(conn) -> list:
+    fallos = []
+    rotos = conn.scalar(text("""
+        SELECT COUNT(*) FROM (
+            SELECT id_tipo_movimiento, cantidad, stock_anterior, stock_nuevo,
+                   LAG(stock_nuevo) OVER (PARTITION BY id_producto ORDER BY id_movimiento) AS previo
+            FROM Inventario
+        ) m
+        WHERE (previo IS NOT NULL AND stock_anterior <> previo)
+           OR (previo IS NULL AND stock_anterior <> 0)
+           OR stock_nuevo - stock_anterior <> CASE id_tipo_movimiento WHEN 2 THEN -cantidad ELSE cantidad END
+    """))
+    if rotos:
+        fallos.append(f"{rotos} movimientos no encadenan con el anterior")
+    descuadres = conn.scalar(text("""
+        SELECT COUNT(*) FROM Productos p
+        JOIN (SELECT id_producto, MAX(id_movimiento) AS ultimo FROM Inventario GROUP BY id_producto) u
+          ON u.id_producto = p.id_producto
+        JOIN Inventario i ON i.id_movimiento = u.ultimo
+        WHERE i.stock_nuevo <> p.stock_actual
+    """))
+    if descuadres:
+        fallos.append(f"{descuadres} productos con stock_actual distinto del último movimiento")
+    negativos = conn.scalar(text("SELECT COUNT(*) FROM Inventario WHERE stock_nuevo < 0"))
+    if negativos:
+        fallos.append(f"{negativos} movimientos dejan stock negativo")
+    totales = conn.scalar(text("""
+        SELECT COUNT(*) FROM Pedidos p
+        JOIN (SELECT id_pedido, SUM(subtotal) AS suma FROM DetallesPedido GROUP BY id_pedido) d
+          ON d.id_pedido = p.id_pedido
+        WHERE ABS(p.subtotal - d.suma) > 0.005 OR ABS(p.total - p.subtotal - p.impuestos) > 0.005
+    """))
+    if totales:
+        fallos.append(f"{totales} pedidos no cuadran con sus líneas")
+    numeracion = conn.scalar(text("""
+        SELECT COUNT(*) FROM Secuencias s
+        LEFT JOIN (
+            SELECT substr(numero_pedido, 1, 12) AS serie, MAX(CAST(substr(numero_pedido, 14) AS INTEGER)) AS ultimo
+            FROM Pedidos GROUP BY 1
+        ) p ON p.serie = s.nombre
+        WHERE s.nombre LIKE 'PED-%' AND (p.ultimo IS NULL OR p.ultimo <> s.valor)
+    """))
+    if numeracion:
+        fallos.append(f"{numeracion} series de Secuencias no coinciden con el último pedido del día")
+    return fallos
+
+def main(args) -> int:
+    huellas = []
+    fallos = []
+    for vuelta in range(2):
+        ruta = os.path.join(os.path.dirname(common.DB_PATH), f"generada-{vuelta}.db")
+        motor = create_engine(f"sqlite:///{ruta}")
+        Base.metadata.create_all(motor)
+        inicio = time.perf_counter()
+        escritas = generar(motor, args.productos, args.clientes, args.pedidos, args.anios,
+                           semilla=args.semilla, acumulados=not args.sin_acumulados)
+        transcurrido = time.perf_counter() - inicio
+        total = sum(escritas.values())
+        print(f"vuelta {vuelta + 1}: {total:,} filas en {transcurrido:.1f} s ({total / transcurrido:,.0f} filas/s)")
+        with motor.connect() as conn:
+            if vuelta == 0:
+                for tabla, filas in sorted(escritas.items(), key=lambda item: -item[1]):
+                    print(f"  {tabla:22s} {filas:>12,}")
+                fallos += comprobar(conn)
+            huellas.append(huella(conn))
+        motor.dispose()
+
+    if huellas[0] != huellas[1]:
+        fallos.append("la misma semilla generó datos distintos")
+    else:
+        print(f"misma semilla, misma huella: {huellas[0][:16]}")
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=2_000)
+    parser.add_argument("--clientes", type=int, default=1_000)
+    parser.add_argument("--pedidos", type=int, default=50_000)
+    parser.add_argument("--anios", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-acumulados", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,258 @@
+"""
+Benchmark y verificación de la importación masiva de catálogo
+(``POST /productos/importar`` y scripts/importar_catalogo.py).
+
+Genera un catálogo de distribuidor con comics, figuras y productos sueltos, y
+algunas filas erróneas a propósito: categoría inexistente, SKU repetido en el
+archivo, SKU ya registrado, precio no numérico, comic y figura a la vez y
+JSON roto. Mide:
+
+- ``POST /productos/completo`` fila a fila sobre una muestra (referencia);
+- ``POST /productos/importar`` con el archivo completo en CSV y en NDJSON,
+  con su número de consultas SQL y el mayor bloqueo del event loop durante
+  la importación (lo que esperaría cualquier otra petición del worker).
+
+Comprueba que se importan exactamente las filas válidas con su comic o
+figura, que cada error se reporta con su número de fila, que ``dry_run`` no
+escribe nada, que las alertas de stock, el ETag del catálogo y la búsqueda
+ven los productos nuevos, que cada importación queda en LogsSistema y que el
+script de línea de comandos importa igual.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_importacion --filas 8000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks import common
+
+from app.core.query_metrics import capturar_consultas
+from app.database import SessionLocal
+from app.main import app
+from app.models.inventario import AlertasStock
+from app.models.logs import LogsSistema
+from app.models.productos import Categorias, Comics, FigurasColeccion, Productos
+from app.models.proveedores import Proveedores
+from scripts import importar_catalogo
+
+CAMPOS_PRODUCTO = ["sku", "nombre", "descripcion", "categoria", "proveedor", "stock_actual", "stock_minimo",
+                   "precio_compra", "precio_venta", "fecha_lanzamiento"]
+CAMPOS_COMIC = ["titulo", "numero", "isbn", "fecha_publicacion", "guionista"]
+CAMPOS_FIGURA = ["personaje", "universo", "material", "edicion_limitada", "numero_serie"]
+
+def sembrar():
+    common.seed_catalogo(50)  # categoría "Bench" y productos BENCH-000000...
+    with SessionLocal() as db:
+        db.add_all([Categorias(nombre_categoria="Comics"), Categorias(nombre_categoria="Figuras")])
+        db.add(Proveedores(nombre="Distribuidora Bench", email="pedidos@distribuidora.example.com", id_status=1))
+        db.commit()
+
+def catalogo(filas: int, prefijo: str):
+    """Filas de ProductoCompletoCreate (como dicts) y {número de fila: motivo} de las erróneas."""
+    salida, erroneas = [], {}
+    for i in range(filas):
+        producto = {
+            "sku": f"{prefijo}-{i:06d}", "nombre": f"Solicit {i}", "descripcion": f"Novedad {i} del mes",
+            "categoria": "Comics" if i % 3 else "Figuras", "proveedor": "Distribuidora Bench",
+            "stock_actual": i % 7, "stock_minimo": 5, "precio_compra": "%.2f" % (10 + i % 50),
+            "precio_venta": "%.2f" % (20 + i % 50), "fecha_lanzamiento": "2024-06-%02d" % (1 + i % 28),
+        }
+        fila = {"producto": producto}
+        if i % 3 == 1:
+            fila["comic"] = {"titulo": f"Serie {i % 40}", "numero": i, "isbn": f"978{i:010d}",
+                             "fecha_publicacion": "2024-06-01", "guionista": "Guionista Bench"}
+        elif i % 3 == 0:
+            fila["figura"] = {"personaje": f"Personaje {i}", "universo": "Bench", "material": "PVC",
+                              "edicion_limitada": i % 2 == 0, "numero_serie": f"S-{i}"}
+        # Una fila errónea de cada tipo cada 500
+        motivo = {
+            17: "categoria", 118: "repetido", 219: "registrado", 320: "precio", 421: "comic y figura",
+        }.get(i % 500)
+        if motivo == "categoria":
+            producto["categoria"] = "No existe"
+        elif motivo == "repetido":
+            producto["sku"] = f"{prefijo}-{i - 1:06d}"
+        elif motivo == "registrado":
+            producto["sku"] = f"BENCH-{i // 500:06d}"
+        elif motivo == "precio":
+            producto["precio_venta"] = "gratis"
+        elif motivo == "comic y figura":
+            fila["comic"] = {"titulo": "Doble"}
+            fila["figura"] = {"personaje": "Doble"}
+        if motivo:
+            erroneas[i] = motivo
+        salida.append(fila)
+    return salida, erroneas
+
+def a_csv(filas) -> bytes:
+    columnas = CAMPOS_PRODUCTO + [f"comic.{c}" for c in CAMPOS_COMIC] + [f"figura.{c}" for c in CAMPOS_FIGURA]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columnas)
+    writer.writeheader()
+    for fila in filas:
+        plana = dict(fila["producto"])
+        for grupo in ("comic", "figura"):
+            for campo, valor in (fila.get(grupo) or {}).items():
+                plana[f"{grupo}.{campo}"] = valor
+        writer.writerow(plana)
+    return buffer.getvalue().encode()
+
+def a_ndjson(filas, roto: bool = False) -> bytes:
+    lineas = [json.dumps(fila) for fila in filas]
+    if roto:
+        lineas[3] = lineas[3][:-5]
+    return ("\n".join(lineas) + "\n").encode()
+
+def contar(prefijo: str):
+    with SessionLocal() as db:
+        filtro = Productos.sku.like(f"{prefijo}-%")
+        productos = db.scalar(select(func.count()).where(filtro))
+        comics = db.scalar(select(func.count()).select_from(Comics).join(Productos).where(filtro))
+        figuras = db.scalar(select(func.count()).select_from(FigurasColeccion).join(Productos).where(filtro))
+        alertas = db.scalar(select(func.count()).select_from(AlertasStock).join(
+            Productos, AlertasStock.id_producto == Productos.id_producto).where(filtro))
+        bajos = db.scalar(select(func.count()).where(filtro, Productos.stock_actual < Productos.stock_minimo))
+    return productos, comics, figuras, alertas, bajos
+
+async def medir_bloqueo(intervalo: float = 0.005) -> float:
+    """Mayor retraso (ms) de un ``sleep(intervalo)`` hasta que se cancela la tarea."""
+    maximo = 0.0
+    try:
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            maximo = max(maximo, (time.perf_counter() - inicio - intervalo) * 1000)
+    except asyncio.CancelledError:
+        return maximo
+
+def comprobar(nombre: str, resultado: dict, filas: list, erroneas: dict, fila_inicial: int, fallos: list):
+    """Compara el resultado con lo esperado; ``fila_inicial`` es el número de la primera fila de datos."""
+    validas = [fila for i, fila in enumerate(filas) if i not in erroneas]
+    reportadas = {error["fila"] - fila_inicial: error for error in resultado["errores"]}
+    if set(reportadas) != set(erroneas):
+        fallos.append(f"{nombre}: filas con error {sorted(reportadas)[:10]} en lugar de {sorted(erroneas)[:10]}")
+    if resultado["importados"] != len(validas):
+        fallos.append(f"{nombre}: {resultado['importados']} importados en lugar de {len(validas)}")
+    for i, error in reportadas.items():
+        if i in erroneas and erroneas[i] == "registrado" and "ya está registrado" not in error["errores"][0]:
+            fallos.append(f"{nombre}: fila {i} con mensaje inesperado {error['errores']}")
+            break
+
+async def main(args) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    sembrar()
+    fallos = []
+
+    async with app.router.lifespan_context(app), common.client(app) as http:
+        headers = await common.auth_headers(http)
+
+        # Referencia: fila a fila por POST /productos/completo
+        with SessionLocal() as db:
+            categorias = dict(db.execute(select(Categorias.nombre_categoria, Categorias.id_categoria)).all())
+        muestra, malas = catalogo(args.muestra, "UNO")
+        muestra = [fila for i, fila in enumerate(muestra) if i not in malas]
+        inicio = time.perf_counter()
+        for fila in muestra:
+            producto = {campo: valor for campo, valor in fila["producto"].items() if campo not in ("categoria", "proveedor")}
+            fila = {**fila, "producto": {**producto, "id_categoria": categorias[fila["producto"]["categoria"]]}}
+            response = await http.post("/productos/completo", json=fila, headers=headers)
+            assert response.status_code == 201, response.text
+        uno_a_uno = len(muestra) / (time.perf_counter() - inicio)
+        print(f"POST /productos/completo     {len(muestra):6,} filas  {uno_a_uno:8,.0f} filas/s"
+              f"  ({args.filas / uno_a_uno:.0f} s para {args.filas:,})")
+
+        etag = (await http.get("/productos/?limit=1", headers=headers)).headers["etag"]
+
+        # dry_run: valida todo y no escribe nada
+        filas, erroneas = catalogo(args.filas, "CSV")
+        response = await http.post("/productos/importar", params={"dry_run": True}, headers=headers,
+                                   files={"archivo": ("solicits.csv", a_csv(filas), "text/csv")})
+        assert response.status_code == 200, response.text
+        comprobar("dry_run", response.json(), filas, erroneas, 2, fallos)
+        if contar("CSV")[0]:
+            fallos.append("dry_run escribió productos")
+
+        for formato, prefijo in (("csv", "CSV"), ("ndjson", "NDJ")):
+            filas, erroneas = catalogo(args.filas, prefijo)
+            if formato == "csv":
+                contenido, fila_inicial = a_csv(filas), 2
+            else:
+                erroneas[3] = "json roto"
+                contenido, fila_inicial = a_ndjson(filas, roto=True), 1
+            # Codificar el multipart antes de medir: el bloqueo que importa es
+            # el del servidor, no el del cliente que comparte el event loop
+            peticion = http.build_request("POST", "/productos/importar", headers=headers,
+                                          files={"archivo": (f"solicits.{formato}", contenido, "application/octet-stream")})
+            peticion.read()
+            vigia = asyncio.create_task(medir_bloqueo())
+            await asyncio.sleep(0)
+            with capturar_consultas() as stats:
+                inicio = time.perf_counter()
+                response = await http.send(peticion)
+                transcurrido = time.perf_counter() - inicio
+            vigia.cancel()
+            bloqueo = await vigia
+            assert response.status_code == 200, response.text
+            resultado = response.json()
+            comprobar(formato, resultado, filas, erroneas, fila_inicial, fallos)
+            print(f"POST /productos/importar {formato:6s} {args.filas:6,} filas  {args.filas / transcurrido:8,.0f} filas/s"
+                  f"  ({transcurrido:.1f} s, {stats.count} consultas, {len(resultado['errores'])} errores, "
+                  f"{args.filas / transcurrido / uno_a_uno:.0f}x, event loop bloqueado hasta {bloqueo:.0f} ms)")
+
+            productos, comics, figuras, alertas, bajos = contar(prefijo)
+            if (productos, comics, figuras) != (resultado["importados"], resultado["comics"], resultado["figuras"]):
+                fallos.append(f"{formato}: en la base {productos}/{comics}/{figuras}, el resultado dice "
+                              f"{resultado['importados']}/{resultado['comics']}/{resultado['figuras']}")
+            if alertas != bajos:
+                fallos.append(f"{formato}: {alertas} alertas para {bajos} productos bajo mínimo")
+
+        if (await http.get("/productos/?limit=1", headers={**headers, "If-None-Match": etag})).status_code != 200:
+            fallos.append("el ETag del catálogo no cambió tras importar")
+        busqueda = (await http.get("/productos/", params={"search": "CSV-000005"}, headers=headers)).json()
+        if not any(producto["sku"] == "CSV-000005" for producto in busqueda):
+            fallos.append("la búsqueda no encuentra un producto importado")
+
+    # El cierre de la app vacía la cola de auditoría
+    with SessionLocal() as db:
+        auditadas = db.scalars(select(LogsSistema.tipo_accion).where(
+            LogsSistema.tabla_afectada == "Productos", LogsSistema.detalle.like("Importación masiva:%"))).all()
+    if auditadas != ["crear", "crear"]:
+        fallos.append(f"auditoría de las importaciones: {auditadas}")
+
+    # Línea de comandos, mismo archivo que la API
+    filas, erroneas = catalogo(args.filas // 4, "CLI")
+    ruta = os.path.join(os.path.dirname(common.DB_PATH), "solicits.csv")
+    reporte = os.path.join(os.path.dirname(common.DB_PATH), "errores.json")
+    with open(ruta, "wb") as archivo:
+        archivo.write(a_csv(filas))
+    codigo = await importar_catalogo.main(argparse.Namespace(
+        archivo=ruta, formato=None, lote=500, dry_run=False, reporte=reporte, max_errores=0))
+    with open(reporte, encoding="utf-8") as archivo:
+        errores = json.load(archivo)
+    if codigo != 1 or {error["fila"] - 2 for error in errores} != set(erroneas):
+        fallos.append(f"CLI: código {codigo}, {len(errores)} errores en lugar de {len(erroneas)}")
+    if contar("CLI")[0] != len(filas) - len(erroneas):
+        fallos.append("CLI: no importó las filas válidas")
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=8000)
+    parser.add_argument("--muestra", type=int, default=300, help="filas de la referencia fila a fila")
+    sys.exit(asyncio.run(main(parser.parse_args())))
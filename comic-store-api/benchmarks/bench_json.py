@@ -0,0 +1,104 @@
+"""
+Benchmark y verificación de la serialización rápida de listados
+(``FAST_JSON_LISTS``: filas Core + orjson frente a ORM + Pydantic + json).
+
+Genera un catálogo con pedidos y movimientos con scripts/generar_datos.py y
+pide cada listado grande con el modo rápido activado y desactivado. Mide CPU
+y tiempo por petición y comprueba que ambas respuestas son idénticas byte a
+byte y conservan las cabeceras (X-Next-Cursor, ETag). Con ``--perfil``
+imprime las funciones más costosas de cada modo en
+``/inventario/movimientos``.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_json --limit 5000 --perfil
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import sys
+import time
+
+from benchmarks import common
+
+from app.config import settings
+from app.database import Base, engine
+from app.main import app
+from scripts.generar_datos import generar
+
+RUTAS = ["/inventario/movimientos", "/pedidos/", "/productos/"]
+
+async def medir(http, ruta: str, params: dict, headers: dict, repeticiones: int):
+    cpu, reloj = [], []
+    for _ in range(repeticiones):
+        inicio_cpu, inicio = time.process_time(), time.perf_counter()
+        response = await http.get(ruta, params=params, headers=headers)
+        cpu.append((time.process_time() - inicio_cpu) * 1000)
+        reloj.append((time.perf_counter() - inicio) * 1000)
+        assert response.status_code == 200, response.text
+    return response, common.percentile(cpu, 50), common.percentile(reloj, 50)
+
+async def perfilar(http, ruta: str, params: dict, headers: dict, repeticiones: int):
+    perfil = cProfile.Profile()
+    perfil.enable()
+    for _ in range(repeticiones):
+        await http.get(ruta, params=params, headers=headers)
+    perfil.disable()
+    pstats.Stats(perfil).sort_stats("tottime").print_stats(8)
+
+async def main(args) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    generar(engine, productos=args.limit * 2, clientes=1000, pedidos=args.limit * 2, anios=1, acumulados=False)
+    params = {"limit": args.limit}
+    fallos = []
+
+    async with app.router.lifespan_context(app), common.client(app) as http:
+        headers = await common.auth_headers(http)
+        print(f"{'ruta':26s} {'filas':>6s} {'KB':>7s}   {'CPU ms':>8s} {'p50 ms':>8s}   {'CPU rápido':>10s} {'p50 ms':>8s}  {'CPU':>6s}")
+        for ruta in RUTAS:
+            settings.FAST_JSON_LISTS = False
+            lento, cpu_lento, reloj_lento = await medir(http, ruta, params, headers, args.repeticiones)
+            settings.FAST_JSON_LISTS = True
+            rapido, cpu_rapido, reloj_rapido = await medir(http, ruta, params, headers, args.repeticiones)
+            if rapido.content != lento.content:
+                fallos.append(f"{ruta}: el modo rápido no devuelve los mismos bytes")
+            for cabecera in ("x-next-cursor", "etag", "content-type"):
+                if rapido.headers.get(cabecera) != lento.headers.get(cabecera):
+                    fallos.append(f"{ruta}: cabecera {cabecera} distinta: {rapido.headers.get(cabecera)!r} != {lento.headers.get(cabecera)!r}")
+            print(
+                f"{ruta:26s} {len(rapido.json()):6d} {len(rapido.content) / 1024:7.0f}   "
+                f"{cpu_lento:8.1f} {reloj_lento:8.1f}   {cpu_rapido:10.1f} {reloj_rapido:8.1f}  {cpu_lento / cpu_rapido:5.1f}x"
+            )
+
+        # El cursor devuelto por el modo rápido lleva a la misma página siguiente
+        for modo in (False, True):
+            settings.FAST_JSON_LISTS = modo
+            primera = await http.get("/pedidos/", params={"limit": 50}, headers=headers)
+            segunda = await http.get("/pedidos/", params={"limit": 50, "cursor": primera.headers["x-next-cursor"]}, headers=headers)
+            if modo:
+                if segunda.content != pagina_lenta:
+                    fallos.append("la página siguiente del modo rápido no coincide")
+            else:
+                pagina_lenta = segunda.content
+
+        if args.perfil:
+            for modo in (False, True):
+                settings.FAST_JSON_LISTS = modo
+                print(f"\n/inventario/movimientos?limit={args.limit} con FAST_JSON_LISTS={modo}")
+                await perfilar(http, "/inventario/movimientos", params, headers, args.repeticiones)
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--perfil", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,70 @@
+"""
+Benchmark: latencia de endpoints ajenos durante una ráfaga de logins.
+
+Lanza N logins concurrentes (bcrypt) mientras un cliente consulta
+``GET /auth/me`` sin pausa, y reporta p50/p99 de esa consulta con el hash
+ejecutado en el event loop (antes) y en el pool de hilos (después).
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_login_storm --logins 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+from app.api import auth as auth_api
+from app.core.auth import password_hasher, verify_password, verify_password_async
+from app.main import app
+
+async def _verify_en_event_loop(plain_password, hashed_password):
+    # Comportamiento anterior: bcrypt síncrono dentro del handler async
+    return verify_password(plain_password, hashed_password)
+
+async def tormenta(http, headers, logins: int):
+    latencias = []
+    terminado = asyncio.Event()
+
+    async def sondear():
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            response = await http.get("/auth/me", headers=headers)
+            assert response.status_code == 200
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(0)
+
+    sonda = asyncio.create_task(sondear())
+    inicio = time.perf_counter()
+    respuestas = await asyncio.gather(*(
+        http.post("/auth/login", data={"username": common.ADMIN_USER, "password": common.ADMIN_PASSWORD})
+        for _ in range(logins)
+    ))
+    duracion = time.perf_counter() - inicio
+    terminado.set()
+    await sonda
+    assert all(r.status_code == 200 for r in respuestas)
+    return duracion, latencias
+
+async def main(logins: int):
+    common.create_schema()
+    common.seed_reference_data()
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        print(f"{logins} logins concurrentes; sondeo de GET /auth/me")
+        for nombre, verificador in (("antes", _verify_en_event_loop), ("despues", verify_password_async)):
+            auth_api.verify_password_async = verificador
+            duracion, latencias = await tormenta(http, headers, logins)
+            print(
+                f"{nombre:8s} ráfaga {duracion:6.2f} s  sondeos {len(latencias):5d}  "
+                f"p50 {common.percentile(latencias, 50):8.1f} ms  p99 {common.percentile(latencias, 99):8.1f} ms  "
+                f"max {max(latencias):8.1f} ms"
+            )
+    print("pool de hash:", password_hasher.stats())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
@@ -0,0 +1,157 @@
+"""
+Benchmark y verificación de las métricas HTTP por ruta (``/metrics``).
+
+Mide el coste del middleware aislado (una aplicación ASGI trivial con y sin
+``MetricsMiddleware``), lanza pedidos (checkout), consultas de pedidos por
+ID, reportes y rutas inexistentes por la API y comprueba en ``/metrics``
+que cada ruta aparece una sola vez con su plantilla, que los contadores por
+estado cuadran con lo enviado, que los histogramas son acumulativos y que
+no quedan peticiones en curso. Imprime la latencia por ruta como base para
+los SLO de checkout frente a reportes.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_metrics --pedidos 300
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+from starlette.routing import Route
+
+from benchmarks import common
+
+from app.core.request_metrics import MetricsMiddleware, RequestMetrics, request_metrics
+from app.main import app
+
+class RutasFalsas:
+    routes = [Route("/items/{item_id}", lambda request: None, methods=["GET"])]
+
+    @property
+    def router(self):
+        return self
+
+async def trivial(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def coste_middleware(total: int) -> float:
+    """µs añadidos por petición (mismo path repetido: plantilla en caché)."""
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/items/42", "root_path": "", "headers": []}
+    medido = MetricsMiddleware(trivial, RequestMetrics(), RutasFalsas())
+    tiempos = []
+    for aplicacion in (trivial, medido):
+        inicio = time.perf_counter()
+        for _ in range(total):
+            await aplicacion(scope, receive, send)
+        tiempos.append(time.perf_counter() - inicio)
+    return (tiempos[1] - tiempos[0]) * 1_000_000 / total
+
+def coste_resolucion(total: int) -> float:
+    """µs por petición para resolver la plantilla de paths con IDs distintos, con las rutas reales."""
+    metricas = RequestMetrics()
+    inicio = time.perf_counter()
+    for i in range(total):
+        metricas.route_template(app, {"type": "http", "method": "GET", "path": f"/reportes/ventas/productos/{i}", "root_path": ""})
+    return (time.perf_counter() - inicio) * 1_000_000 / total
+
+def leer_metrics(texto: str):
+    series = {}
+    for linea in texto.splitlines():
+        if linea.startswith("#"):
+            continue
+        nombre, valor = linea.rsplit(" ", 1)
+        series[nombre] = float(valor)
+    return series
+
+async def main(pedidos: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(50)
+    fallos = 0
+
+    print(f"coste del middleware: {await coste_middleware(100_000):.1f} µs por petición; "
+          f"resolver paths con IDs distintos: {coste_resolucion(5000):.1f} µs")
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        request_metrics.reset()
+
+        creados = []
+        for i in range(pedidos):
+            response = await http.post("/pedidos/", json={"id_cliente": 1, "detalles": [
+                {"id_producto": productos[(i + j) % len(productos)], "cantidad": 1, "precio_unitario": 0, "subtotal": 0}
+                for j in range(3)
+            ]}, headers=headers)
+            assert response.status_code == 201, response.text
+            creados.append(response.json()["id_pedido"])
+        for id_pedido in creados:
+            assert (await http.get(f"/pedidos/{id_pedido}", headers=headers)).status_code == 200
+        hoy = date.today()
+        params = {"fecha_desde": (hoy - timedelta(days=29)).isoformat(), "fecha_hasta": hoy.isoformat()}
+        for _ in range(100):
+            assert (await http.get("/reportes/ventas/productos", params=params, headers=headers)).status_code == 200
+        for i in range(50):
+            assert (await http.get(f"/no-existe/{i}")).status_code == 404
+            assert (await http.get(f"/pedidos/{10_000_000 + i}", headers=headers)).status_code == 404
+        assert (await http.delete("/pedidos/", headers=headers)).status_code == 405
+
+        response = await http.get("/metrics")
+        assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+        series = leer_metrics(response.text)
+
+    esperado = {
+        ('POST', '/pedidos/', '201'): pedidos,
+        ('GET', '/pedidos/{pedido_id}', '200'): pedidos,
+        ('GET', '/pedidos/{pedido_id}', '404'): 50,
+        ('GET', '/reportes/ventas/productos', '200'): 100,
+        ('GET', 'unmatched', '404'): 50,
+        ('DELETE', '/pedidos/', '405'): 1,
+    }
+    for (method, route, status), total in esperado.items():
+        valor = series.get(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}}')
+        if valor != total:
+            fallos += 1
+            print(f"FALLO {method} {route} {status}: {valor} != {total}")
+    rutas = {m.group(1) for m in re.finditer(r'route="([^"]*)"', response.text)}
+    if any(re.search(r"/\d", ruta) for ruta in rutas):
+        fallos += 1
+        print(f"FALLO: rutas con IDs en las etiquetas: {sorted(rutas)}")
+
+    for nombre, valor in series.items():
+        if nombre.startswith("http_requests_in_flight") and 'route="/metrics"' not in nombre and valor != 0:
+            fallos += 1
+            print(f"FALLO en curso: {nombre} = {valor}")
+    for etiquetas in ('method="POST",route="/pedidos/"', 'method="GET",route="/reportes/ventas/productos"'):
+        buckets = [v for k, v in series.items() if k.startswith(f"http_request_duration_seconds_bucket{{{etiquetas},")]
+        total = series[f"http_request_duration_seconds_count{{{etiquetas}}}"]
+        if buckets != sorted(buckets) or buckets[-1] != total:
+            fallos += 1
+            print(f"FALLO histograma {etiquetas}")
+
+    print(f"{len(rutas)} series de ruta en /metrics ({len(response.text) // 1024} KiB)")
+    print(f"{'ruta':40s} {'n':>5s} {'media':>9s} {'p50':>8s} {'p99':>8s}")
+    for ruta, datos in request_metrics.snapshot().items():
+        if datos["count"]:
+            print(f"{ruta:40s} {datos['count']:5d} {datos['avg_ms']:6.1f} ms "
+                  f"{datos['p50_ms'] or 0:5.0f} ms {datos['p99_ms'] or 0:5.0f} ms")
+
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pedidos", type=int, default=300)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.pedidos)))
@@ -0,0 +1,90 @@
+"""
+Benchmark: paginación por offset frente a paginación por cursor (keyset).
+
+Siembra N movimientos de inventario y mide ``GET /inventario/movimientos``
+a distintas profundidades con ``skip`` y con ``cursor``; después recorre la
+tabla completa siguiendo ``X-Next-Cursor`` y comprueba que no se pierde ni
+se repite ninguna fila.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_pagination --movimientos 1000000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from benchmarks import common
+
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from app.database import SessionLocal
+from app.main import app
+from app.models.inventario import Inventario
+
+async def medir(http, headers, params: dict, repeticiones: int = 3) -> float:
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        response = await http.get("/inventario/movimientos", params=params, headers=headers)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        assert response.status_code == 200, response.text
+    return common.percentile(latencias, 50)
+
+def cursor_en(posicion: int) -> str:
+    """Cursor equivalente a haber leído ``posicion`` filas en orden descendente."""
+    with SessionLocal() as db:
+        fila = db.execute(
+            select(Inventario.fecha_movimiento, Inventario.id_movimiento)
+            .order_by(Inventario.fecha_movimiento.desc(), Inventario.id_movimiento.desc())
+            .offset(posicion - 1).limit(1)
+        ).one()
+    return encode_cursor(list(fila))
+
+async def recorrer(http, headers, limit: int) -> int:
+    vistos = set()
+    params = {"limit": limit}
+    while True:
+        response = await http.get("/inventario/movimientos", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        for movimiento in response.json():
+            assert movimiento["id_movimiento"] not in vistos, "fila repetida"
+            vistos.add(movimiento["id_movimiento"])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return len(vistos)
+        params = {"limit": limit, "cursor": cursor}
+
+async def main(total: int, limit: int, recorrido: int):
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(100)
+    inicio = time.perf_counter()
+    common.seed_movimientos(total, productos)
+    print(f"{total} movimientos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        print(f"página de {limit} filas (p50 de 3)")
+        for profundidad in (0, total // 100, total // 10, total // 2, total - limit):
+            offset = await medir(http, headers, {"skip": profundidad, "limit": limit})
+            if profundidad:
+                keyset = await medir(http, headers, {"cursor": cursor_en(profundidad), "limit": limit})
+            else:
+                keyset = await medir(http, headers, {"limit": limit})
+            print(f"fila {profundidad:9d}  offset {offset:9.1f} ms  cursor {keyset:7.1f} ms")
+
+        inicio = time.perf_counter()
+        leidas = await recorrer(http, headers, recorrido)
+        duracion = time.perf_counter() - inicio
+        assert leidas == total, f"el recorrido por cursor leyó {leidas} de {total} filas"
+        print(f"recorrido completo por cursor: {leidas} filas en {duracion:.1f} s (páginas de {recorrido})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movimientos", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--recorrido", type=int, default=1000, help="tamaño de página del recorrido completo")
+    args = parser.parse_args()
+    asyncio.run(main(args.movimientos, args.limit, args.recorrido))
@@ -0,0 +1,175 @@
+"""
+Verificación del número de consultas SQL por endpoint (perfiles de carga de
+los modelos ``*Detalle``, app/core/loading.py).
+
+Genera una historia con scripts/generar_datos.py y pide cada endpoint con
+tamaños de página o de documento distintos (1, 10, 100 y 500 filas o
+líneas). Comprueba que el número de consultas no depende del tamaño y que no
+supera el máximo fijado para cada endpoint en ``MAXIMOS`` (con
+``max_consultas``). Imprime las consultas y el tiempo por petición.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_perfiles_carga
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import select
+
+from benchmarks import common
+
+from app.config import settings
+from app.core.query_metrics import TooManyQueriesError, max_consultas
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.clientes import Clientes
+from app.models.compras import ComprasProveedores
+from app.models.pedidos import Pedidos
+from app.models.productos import Comics, FigurasColeccion, Productos
+from app.models.proveedores import Proveedores
+from scripts.generar_datos import generar
+
+TAMANOS = [1, 10, 100, 500]
+
+# Consultas máximas por petición, sea cual sea el tamaño
+MAXIMOS = {
+    "GET /productos/comics": 1,
+    "GET /productos/figuras": 1,
+    "GET /inventario/movimientos": 1,
+    "GET /inventario/movimientos (ORM)": 1,
+    "GET /inventario/alerta-stock": 1,
+    "GET /productos/{id}": 1,
+    "GET /productos/comics/{id}": 1,
+    "GET /productos/figuras/{id}": 1,
+    "GET /pedidos/{id}": 2,
+    "GET /compras/{id}": 2,
+    "GET /clientes/{id}": 1,
+    "GET /empleados/{id}": 1,
+    "POST /pedidos/": 17,
+    "POST /compras/": 8,
+    "POST /compras/{id}/recepcion": 11,
+    "POST /productos/completo": 9,
+}
+
+async def main(args) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    generar(engine, productos=3000, clientes=500, pedidos=3000, anios=1, acumulados=False)
+    with SessionLocal() as db:
+        comic = db.scalar(select(Comics.id_comic))
+        figura = db.scalar(select(FigurasColeccion.id_figura))
+        producto = db.scalar(select(Productos.id_producto))
+        pedido = db.scalar(select(Pedidos.id_pedido))
+        compra = db.scalar(select(ComprasProveedores.id_compra))
+        cliente = db.scalar(select(Clientes.id_cliente))
+        proveedor = db.scalar(select(Proveedores.id_proveedor))
+        activos = list(db.scalars(select(Productos.id_producto).where(Productos.id_status == 1)
+                                  .order_by(Productos.stock_actual.desc()).limit(max(TAMANOS))))
+        assert len(activos) == max(TAMANOS)
+        categoria = db.scalar(select(Productos.id_categoria))
+    fallos = []
+
+    async with app.router.lifespan_context(app), common.client(app) as http:
+        headers = await common.auth_headers(http)
+        siguiente_sku = iter(range(10**6))
+
+        def lista(ruta):
+            return lambda n: http.get(ruta, params={"limit": n}, headers=headers)
+
+        def detalle(ruta):
+            return lambda n: http.get(ruta, headers=headers)
+
+        async def crear_pedido(n):
+            return await http.post("/pedidos/", headers=headers, json={"id_cliente": cliente, "detalles": [
+                {"id_producto": id_producto, "cantidad": 1, "precio_unitario": 0, "subtotal": 0}
+                for id_producto in activos[:n]
+            ]})
+
+        async def crear_compra(n):
+            return await http.post("/compras/", headers=headers, json={"id_proveedor": proveedor, "detalles": [
+                {"id_producto": id_producto, "cantidad_ordenada": 2, "precio_unitario": 10, "subtotal": 20}
+                for id_producto in activos[:n]
+            ]})
+
+        async def compra_pendiente(n):
+            return (await crear_compra(n)).json()
+
+        async def recibir(n, nueva):
+            return await http.post(f"/compras/{nueva['id_compra']}/recepcion", headers=headers, json={
+                "fecha_recepcion": date.today().isoformat(),
+                "detalles": [{"id_detalle": d["id_detalle"], "cantidad_recibida": 2} for d in nueva["detalles"]],
+            })
+
+        async def crear_completo(n):
+            return await http.post("/productos/completo", headers=headers, json={
+                "producto": {"sku": f"CONSULTAS-{next(siguiente_sku)}", "nombre": "Comic", "id_categoria": categoria,
+                             "precio_compra": 1, "precio_venta": 2},
+                "comic": {"titulo": "Comic", "numero": n},
+            })
+
+        endpoints = {
+            "GET /productos/comics": lista("/productos/comics"),
+            "GET /productos/figuras": lista("/productos/figuras"),
+            "GET /inventario/movimientos": lista("/inventario/movimientos"),
+            "GET /inventario/movimientos (ORM)": lista("/inventario/movimientos"),
+            "GET /inventario/alerta-stock": detalle("/inventario/alerta-stock"),
+            "GET /productos/{id}": detalle(f"/productos/{producto}"),
+            "GET /productos/comics/{id}": detalle(f"/productos/comics/{comic}"),
+            "GET /productos/figuras/{id}": detalle(f"/productos/figuras/{figura}"),
+            "GET /pedidos/{id}": detalle(f"/pedidos/{pedido}"),
+            "GET /compras/{id}": detalle(f"/compras/{compra}"),
+            "GET /clientes/{id}": detalle(f"/clientes/{cliente}"),
+            "GET /empleados/{id}": detalle("/empleados/1"),
+            "POST /pedidos/": crear_pedido,
+            "POST /compras/": crear_compra,
+            "POST /compras/{id}/recepcion": (compra_pendiente, recibir),
+            "POST /productos/completo": crear_completo,
+        }
+
+        print(f"{'endpoint':34s} " + " ".join(f"{'n=' + str(n):>7s}" for n in TAMANOS) + f" {'máximo':>7s} {'ms (n máx)':>11s}")
+        for nombre, pedir in endpoints.items():
+            settings.FAST_JSON_LISTS = not nombre.endswith("(ORM)")
+            # Con preparación (fuera de la medida) el endpoint recibe lo preparado
+            preparar, pedir = pedir if isinstance(pedir, tuple) else (None, pedir)
+
+            async def peticion(n):
+                if preparar is None:
+                    return await pedir(n), (lambda: pedir(n))
+                preparado = await preparar(n)
+                return None, (lambda: pedir(n, preparado))
+
+            _, calentar = await peticion(TAMANOS[0])
+            await calentar()  # cachés (usuario, catálogos, numeración)
+            conteos = []
+            for n in TAMANOS:
+                llamada = (lambda: pedir(n)) if preparar is None else (await peticion(n))[1]
+                try:
+                    with max_consultas(MAXIMOS[nombre]) as stats:
+                        inicio = time.perf_counter()
+                        response = await llamada()
+                        transcurrido = (time.perf_counter() - inicio) * 1000
+                except TooManyQueriesError as exc:
+                    fallos.append(f"{nombre} n={n}: {exc.args[0].splitlines()[0]}")
+                    conteos.append(stats.count)
+                    continue
+                assert response.status_code in (200, 201), (nombre, response.status_code, response.text)
+                conteos.append(stats.count)
+            if len(set(conteos)) > 1:
+                fallos.append(f"{nombre}: las consultas cambian con el tamaño: {conteos}")
+            print(f"{nombre:34s} " + " ".join(f"{c:7d}" for c in conteos) + f" {MAXIMOS[nombre]:7d} {transcurrido:11.1f}")
+        settings.FAST_JSON_LISTS = True
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sys.exit(asyncio.run(main(parser.parse_args())))
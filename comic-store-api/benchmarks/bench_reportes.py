@@ -0,0 +1,229 @@
+"""
+Benchmark y verificación de los acumulados diarios de ventas y /reportes/ventas.
+
+Siembra un año de historial de pedidos (una parte cancelados), lo
+reconstruye con ``reconstruir_ventas`` (lo mismo que scripts/backfill_ventas.py)
+y compara, para rangos de 30, 90 y 365 días, la consulta SUM sobre
+Pedidos/DetallesPedido con los endpoints de /reportes, que leen los
+acumulados. Después crea y cancela pedidos por la API (también pasándolos
+a cancelado y sacándolos de él con ``PUT /pedidos/{id}/estado``) y
+comprueba que los acumulados incrementales coinciden con un recálculo
+completo. Antes del backfill y entre la venta y las cancelaciones cambia
+de categoría parte de los productos: cada línea debe seguir contando en la
+categoría con la que se vendió.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_reportes --pedidos 200000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import distinct, func, select
+
+from benchmarks import common
+
+from app.core.ventas import ESTADO_CANCELADO, reconstruir_ventas
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.pedidos import DetallesPedido, Pedidos
+from app.models.productos import Categorias, Productos
+from app.models.reportes import VentasDiarias, VentasDiariasCategoria, VentasDiariasProducto
+
+CATEGORIAS = 8
+
+def sembrar(total: int, productos, lote: int = 20_000) -> None:
+    rnd = random.Random(3)
+    # Repartir los productos en varias categorías
+    with SessionLocal() as db:
+        categorias = [Categorias(nombre_categoria=f"Categoría {i}") for i in range(CATEGORIAS)]
+        db.add_all(categorias)
+        db.flush()
+        categoria = {}
+        for i, id_producto in enumerate(productos):
+            categoria[id_producto] = db.get(Productos, id_producto).id_categoria = categorias[i % CATEGORIAS].id_categoria
+        db.commit()
+
+    inicio = datetime.combine(date.today() - timedelta(days=365), datetime.min.time())
+    with engine.begin() as conn:
+        for desde in range(0, total, lote):
+            pedidos, detalles = [], []
+            for i in range(desde, min(desde + lote, total)):
+                lineas = []
+                for id_producto in rnd.sample(productos, rnd.randint(1, 5)):
+                    cantidad = rnd.randint(1, 3)
+                    descuento = Decimal("4.99") if rnd.random() < 0.3 else Decimal("0.00")
+                    lineas.append({
+                        "id_pedido": i + 1, "id_producto": id_producto, "cantidad": cantidad,
+                        "precio_unitario": Decimal("99.90"), "descuento_unitario": descuento,
+                        "subtotal": (Decimal("99.90") - descuento) * cantidad,
+                        "id_categoria": categoria[id_producto],
+                    })
+                subtotal = sum(linea["subtotal"] for linea in lineas)
+                pedidos.append({
+                    "id_pedido": i + 1, "numero_pedido": f"HIST-{i:09d}", "id_cliente": 1, "id_empleado": 1,
+                    "fecha_creacion": inicio + timedelta(seconds=rnd.randint(0, 365 * 86400 - 1)),
+                    "subtotal": subtotal, "impuestos": subtotal * Decimal("0.16"), "descuento": 0,
+                    "total": subtotal * Decimal("1.16"), "id_estado": ESTADO_CANCELADO if rnd.random() < 0.05 else 3,
+                })
+                detalles += lineas
+            conn.execute(Pedidos.__table__.insert(), pedidos)
+            conn.execute(DetallesPedido.__table__.insert(), detalles)
+
+def recategorizar(productos) -> None:
+    """Pasa cada producto a la siguiente categoría (sus ventas anteriores no se mueven)."""
+    with SessionLocal() as db:
+        categorias = db.scalars(select(Categorias.id_categoria).where(Categorias.nombre_categoria.like("Categoría %"))).all()
+        siguiente = dict(zip(categorias, categorias[1:] + categorias[:1]))
+        for id_producto in productos:
+            producto = db.get(Productos, id_producto)
+            producto.id_categoria = siguiente[producto.id_categoria]
+        db.commit()
+
+def suma_directa(desde: date, hasta: date) -> float:
+    # Consulta ad hoc anterior: agregar sobre las tablas de pedidos
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        db.execute(
+            select(DetallesPedido.id_producto, func.sum(DetallesPedido.cantidad), func.sum(DetallesPedido.subtotal))
+            .join(Pedidos, Pedidos.id_pedido == DetallesPedido.id_pedido)
+            .where(
+                Pedidos.fecha_creacion >= desde,
+                Pedidos.fecha_creacion < hasta + timedelta(days=1),
+                Pedidos.id_estado != ESTADO_CANCELADO,
+            )
+            .group_by(DetallesPedido.id_producto)
+            .order_by(func.sum(DetallesPedido.subtotal).desc())
+            .limit(20)
+        ).all()
+    return (time.perf_counter() - inicio) * 1000
+
+def acumulados(model, clave):
+    with SessionLocal() as db:
+        filas = db.execute(select(model.fecha, *clave, model.pedidos, model.unidades, model.ingresos, model.descuentos)).all()
+    return {tuple(f[:-4]): tuple(f[-4:]) for f in filas if any(f[-4:])}
+
+def recalculo(*clave):
+    """Acumulados esperados, calculados desde cero sobre Pedidos/DetallesPedido."""
+    dia = func.date(Pedidos.fecha_creacion)
+    query = (
+        select(
+            dia, *clave,
+            func.count(distinct(Pedidos.id_pedido)), func.sum(DetallesPedido.cantidad), func.sum(DetallesPedido.subtotal),
+            func.sum(func.coalesce(DetallesPedido.descuento_unitario, 0) * DetallesPedido.cantidad),
+        )
+        .select_from(Pedidos)
+        .join(DetallesPedido, DetallesPedido.id_pedido == Pedidos.id_pedido)
+        .where(Pedidos.id_estado != ESTADO_CANCELADO)
+        .group_by(dia, *clave)
+    )
+    with SessionLocal() as db:
+        filas = db.execute(query).all()
+    return {(date.fromisoformat(f[0]), *f[1:-4]): (f[-4], f[-3], Decimal(str(f[-2])).quantize(Decimal("0.01")), Decimal(str(f[-1])).quantize(Decimal("0.01"))) for f in filas}
+
+def verificar() -> int:
+    fallos = 0
+    for nombre, model, clave_acumulado, clave_recalculo in (
+        ("día", VentasDiarias, [], []),
+        ("producto", VentasDiariasProducto, [VentasDiariasProducto.id_producto], [DetallesPedido.id_producto]),
+        ("categoría", VentasDiariasCategoria, [VentasDiariasCategoria.id_categoria], [DetallesPedido.id_categoria]),
+    ):
+        actual = acumulados(model, clave_acumulado)
+        esperado = recalculo(*clave_recalculo)
+        diferentes = [k for k in set(actual) | set(esperado) if actual.get(k) != esperado.get(k)]
+        if diferentes:
+            fallos += 1
+            k = diferentes[0]
+            print(f"FALLO acumulados por {nombre}: {len(diferentes)} diferencias, p. ej. {k}: {actual.get(k)} != {esperado.get(k)}")
+        else:
+            print(f"acumulados por {nombre}: {len(actual)} filas coinciden con el recálculo")
+    return fallos
+
+async def main(total: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(500)
+    inicio = time.perf_counter()
+    sembrar(total, productos)
+    print(f"{total} pedidos históricos sembrados en {time.perf_counter() - inicio:.1f} s")
+    # El backfill debe usar la categoría de la venta, no la actual
+    recategorizar(productos[::3])
+
+    inicio = time.perf_counter()
+    hoy = date.today()
+    lote_desde = hoy - timedelta(days=366)
+    while lote_desde <= hoy:
+        with engine.begin() as conn:
+            reconstruir_ventas(conn, lote_desde, min(lote_desde + timedelta(days=30), hoy))
+        lote_desde += timedelta(days=31)
+    print(f"backfill de un año en {time.perf_counter() - inicio:.1f} s")
+
+    fallos = 0
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        print(f"{'rango':>6s} {'SUM directa':>12s} {'/ventas':>9s} {'/productos':>11s} {'/categorias':>12s}")
+        for dias in (30, 90, 365):
+            params = {"fecha_desde": (hoy - timedelta(days=dias - 1)).isoformat(), "fecha_hasta": hoy.isoformat()}
+            directa = common.percentile([suma_directa(hoy - timedelta(days=dias - 1), hoy) for _ in range(3)], 50)
+            tiempos = []
+            for ruta in ("/reportes/ventas", "/reportes/ventas/productos", "/reportes/ventas/categorias"):
+                latencias = []
+                for _ in range(3):
+                    t = time.perf_counter()
+                    response = await http.get(ruta, params=params, headers=headers)
+                    latencias.append((time.perf_counter() - t) * 1000)
+                    assert response.status_code == 200, response.text
+                tiempos.append(common.percentile(latencias, 50))
+            print(f"{dias:4d} d {directa:9.1f} ms {tiempos[0]:6.1f} ms {tiempos[1]:8.1f} ms {tiempos[2]:9.1f} ms")
+
+        # Pedidos de hoy por la API, con varias líneas del mismo producto y cancelaciones
+        rnd = random.Random(9)
+        creados = []
+        for _ in range(60):
+            elegidos = rnd.sample(productos, 3)
+            response = await http.post("/pedidos/", json={"id_cliente": 1, "detalles": [
+                {"id_producto": p, "cantidad": rnd.randint(1, 3), "precio_unitario": 0, "subtotal": 0}
+                for p in elegidos + elegidos[:1]
+            ]}, headers=headers)
+            assert response.status_code == 201, response.text
+            creados.append(response.json()["id_pedido"])
+        # Recategorizar entre la venta y las cancelaciones / cambios de estado
+        movidos = productos[1::3]
+        recategorizar(movidos)
+        with SessionLocal() as db:
+            distintas = db.scalar(
+                select(func.count()).select_from(DetallesPedido)
+                .join(Productos, Productos.id_producto == DetallesPedido.id_producto)
+                .where(DetallesPedido.id_pedido.in_(creados), DetallesPedido.id_categoria != Productos.id_categoria)
+            )
+        if not distintas:
+            print("FALLO: ninguna línea de los pedidos nuevos conserva la categoría de la venta")
+            fallos += 1
+        cancelados = rnd.sample(creados, 15)
+        for id_pedido in cancelados:
+            response = await http.post(f"/pedidos/{id_pedido}/cancelar", headers=headers)
+            assert response.status_code == 200, response.text
+        # Cambios de estado directos: a cancelado, y de cancelado a otro estado
+        pendientes = [id_pedido for id_pedido in creados if id_pedido not in cancelados]
+        for id_pedido in rnd.sample(pendientes, 10) + cancelados[:5]:
+            estado = 2 if id_pedido in cancelados else ESTADO_CANCELADO
+            response = await http.put(f"/pedidos/{id_pedido}/estado", json={"id_estado": estado}, headers=headers)
+            assert response.status_code == 200, response.text
+        print(f"60 pedidos creados, {len(movidos)} productos recategorizados, 15 cancelados, 10 pasados a cancelado y 5 reactivados por la API")
+
+    fallos += verificar()
+    if fallos:
+        return 1
+    print("OK: acumulados consistentes")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pedidos", type=int, default=200_000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.pedidos)))
@@ -0,0 +1,230 @@
+"""
+Benchmark: búsqueda de catálogo con LIKE '%término%' frente al índice invertido.
+
+Siembra un catálogo de N productos (un tercio comics y un tercio figuras),
+construye el índice de búsqueda y compara, para consultas típicas de
+"búsqueda mientras se escribe", el tiempo de la consulta LIKE anterior, el
+de la búsqueda en el índice y la latencia completa de ``GET /productos``.
+
+Comprueba además que una búsqueda con filtro de categoría y las páginas
+más allá de los primeros miles de resultados devuelven lo mismo que el
+índice completo filtrado, en orden de relevancia; que un término encuentra
+también las palabras que lo contienen ("man" -> "Batmán", por detrás de
+las coincidencias por palabra o prefijo); y que otro worker (un segundo
+``CatalogSearch`` con sus propios índices) ve las altas y ediciones de
+productos, clientes y proveedores en su siguiente búsqueda, sin recargar.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_search --productos 200000
+"""
+import argparse
+import asyncio
+import random
+import resource
+import sys
+import time
+from decimal import Decimal
+
+from sqlalchemy import or_, select
+
+from benchmarks import common
+
+from app.core.search import CatalogSearch, catalog_search
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.productos import Categorias, Comics, FigurasColeccion, Productos
+
+PERSONAJES = ["Batmán", "Superman", "Spider-Man", "Wonder Woman", "Hulk", "Iron Man", "Thor", "Capitán América",
+              "Daredevil", "Wolverine", "Flash", "Linterna Verde", "Aquaman", "Deadpool", "Venom", "Robin"]
+ADJETIVOS = ["Año Uno", "Regreso", "Saga Clásica", "Edición Deluxe", "Origen", "Guerra Secreta", "Crisis", "Legado"]
+GUIONISTAS = ["Frank Miller", "Alan Moore", "Grant Morrison", "Stan Lee", "Neil Gaiman", "Brian Bendis"]
+UNIVERSOS = ["DC", "Marvel", "Image", "Dark Horse"]
+PALABRAS = ["edición", "limitada", "tapa", "dura", "coleccionista", "pintada", "mano", "variante", "portada",
+            "exclusiva", "numerada", "firmada", "reimpresión", "especial", "aniversario"]
+
+CONSULTAS = ["b", "ba", "bat", "batm", "batman", "batman año", "spider", "miller", "marvel variante", "SKU-0012345"]
+
+def sembrar(total: int, lote: int = 20_000):
+    rnd = random.Random(42)
+    with SessionLocal() as db:
+        categorias = [Categorias(nombre_categoria="Bench"), Categorias(nombre_categoria="Bench filtro")]
+        db.add_all(categorias)
+        db.commit()
+        id_categoria, id_filtro = (categoria.id_categoria for categoria in categorias)
+    with engine.begin() as conn:
+        for desde in range(0, total, lote):
+            filas = []
+            for i in range(desde, min(desde + lote, total)):
+                personaje = rnd.choice(PERSONAJES)
+                filas.append({
+                    "id_producto": i + 1,
+                    "sku": f"SKU-{i:07d}",
+                    "nombre": f"{personaje} {rnd.choice(ADJETIVOS)} #{rnd.randint(1, 500)}",
+                    "descripcion": " ".join(rnd.choices(PALABRAS, k=8)),
+                    "id_categoria": id_filtro if i % 5 == 0 else id_categoria,
+                    "stock_actual": rnd.randint(0, 50),
+                    "precio_compra": Decimal("50.00"),
+                    "precio_venta": Decimal("99.90"),
+                    "id_status": 1,
+                })
+            conn.execute(Productos.__table__.insert(), filas)
+            conn.execute(Comics.__table__.insert(), [
+                {"id_producto": f["id_producto"], "titulo": f["nombre"], "guionista": rnd.choice(GUIONISTAS),
+                 "isbn": f"978-{f['id_producto']:09d}"}
+                for f in filas if f["id_producto"] % 3 == 0
+            ])
+            conn.execute(FigurasColeccion.__table__.insert(), [
+                {"id_producto": f["id_producto"], "personaje": f["nombre"].split(" #")[0],
+                 "universo": rnd.choice(UNIVERSOS)}
+                for f in filas if f["id_producto"] % 3 == 1
+            ])
+
+def like(texto: str) -> float:
+    # Consulta anterior: LIKE '%término%' sobre nombre o SKU
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        termino = f"%{texto}%"
+        db.scalars(
+            select(Productos).where(or_(Productos.nombre.like(termino), Productos.sku.like(termino)))
+            .order_by(Productos.nombre).limit(100)
+        ).all()
+    return (time.perf_counter() - inicio) * 1000
+
+def indice(texto: str):
+    inicio = time.perf_counter()
+    resultados = catalog_search.indexes["productos"].search(texto)
+    return (time.perf_counter() - inicio) * 1000, len(resultados)
+
+async def paginas(http, headers, ruta: str, params: dict, cuantos: int, clave: str):
+    """Ids de los ``cuantos`` primeros resultados pidiendo páginas de 100."""
+    ids = []
+    for skip in range(0, cuantos, 100):
+        response = await http.get(ruta, params={**params, "skip": skip, "limit": 100}, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.extend(fila[clave] for fila in response.json())
+    return ids
+
+async def main(total: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    inicio = time.perf_counter()
+    sembrar(total)
+    print(f"{total} productos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    # ru_maxrss está en KB en Linux
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    await catalog_search.load()
+    memoria = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_antes) / 1024
+    stats = catalog_search.indexes["productos"].stats()
+    print(f"índice construido en {stats['build_seconds']:.1f} s, {stats['tokens']} términos, {stats['identifiers']} identificadores, +{memoria:.0f} MB de RSS máximo")
+
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        print(f"{'consulta':18s} {'LIKE':>9s} {'índice':>9s} {'GET /productos':>15s} {'resultados':>11s}")
+        for consulta in CONSULTAS:
+            t_like = like(consulta)
+            t_indice, encontrados = indice(consulta)
+            latencias = []
+            for _ in range(3):
+                inicio = time.perf_counter()
+                response = await http.get("/productos/", params={"search": consulta, "limit": 20}, headers=headers)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                assert response.status_code == 200, response.text
+            print(f"{consulta:18s} {t_like:7.1f} ms {t_indice:7.1f} ms {common.percentile(latencias, 50):12.1f} ms {encontrados:11d}")
+
+        # Filtros y páginas profundas: lo mismo que el índice completo filtrado
+        fallos = 0
+        with SessionLocal() as db:
+            id_filtro = db.scalar(select(Categorias.id_categoria).where(Categorias.nombre_categoria == "Bench filtro"))
+        ranking = [doc_id for doc_id, _ in catalog_search.indexes["productos"].search("batman")]
+        casos = [
+            ("/productos/", {"search": "batman", "categoria": id_filtro}, "id_producto", [i for i in ranking if i % 5 == 1]),
+            ("/productos/", {"search": "batman"}, "id_producto", ranking),
+            ("/productos/comics", {"search": "batman"}, "id_producto", [i for i in ranking if i % 3 == 0]),
+        ]
+        for ruta, params, clave, esperados in casos:
+            cuantos = min(len(esperados), 1500)
+            inicio = time.perf_counter()
+            obtenidos = await paginas(http, headers, ruta, params, cuantos, clave)
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            descripcion = f"{ruta} {params}"
+            if obtenidos != esperados[:cuantos]:
+                fallos += 1
+                print(f"FALLO {descripcion}: {len(obtenidos)} resultados en lugar de {cuantos} o en otro orden")
+            else:
+                print(f"{descripcion}: {cuantos} de {len(esperados)} resultados en orden ({transcurrido:.0f} ms)")
+
+        # Coincidencias dentro de la palabra, por detrás de palabra y prefijo
+        with SessionLocal() as db:
+            batman = db.scalar(select(Productos.id_producto).where(Productos.nombre.like("Batmán %")).limit(1))
+            manga = db.scalar(select(Productos.id_producto).where(Productos.nombre.like("% mano%")).limit(1))
+        resultados = dict(catalog_search.indexes["productos"].search("man"))
+        if batman not in resultados:
+            fallos += 1
+            print("FALLO subcadena: 'man' no encuentra 'Batmán'")
+        else:
+            mejor = max(resultados.values())
+            print(f"'man': {len(resultados)} resultados, 'Batmán' con {resultados[batman]:.1f} puntos (máximo {mejor:.1f})")
+            if manga is not None and manga in resultados and resultados[manga] <= resultados[batman]:
+                fallos += 1
+                print("FALLO subcadena: una coincidencia por prefijo no queda por delante")
+
+        # Otro worker: sus índices se cargaron antes de las escrituras
+        otro = CatalogSearch()
+        await otro.load()
+        escrituras = [
+            ("productos", "post", "/productos/", {
+                "sku": "SKU-NOCTURNO", "nombre": "Murciélago Nocturno", "id_categoria": id_filtro,
+                "precio_compra": 10, "precio_venta": 20,
+            }, "id_producto", "nocturno"),
+            ("clientes", "post", "/clientes/", {
+                "nombre": "Bruna", "apellidos": "Wayneson", "email": "bruna@bench.example.com",
+            }, "id_cliente", "wayneson"),
+            ("proveedores", "post", "/proveedores/", {
+                "nombre": "Distribuidora Gótica", "email": "ventas@bench.example.com",
+            }, "id_proveedor", "gotica"),
+        ]
+        creados = {}
+        for indice_, metodo, ruta, cuerpo, clave, termino in escrituras:
+            response = await http.request(metodo, ruta, json=cuerpo, headers=headers)
+            assert response.status_code == 201, response.text
+            creados[indice_] = (ruta, response.json()[clave])
+        ediciones = [
+            ("productos", {"nombre": "Murciélago Diurno"}, "nocturno", "diurno"),
+            ("clientes", {"apellidos": "Kentman"}, "wayneson", "kentman"),
+            ("proveedores", {"nombre": "Distribuidora Solar"}, "gotica", "solar"),
+        ]
+        for (indice_, _, _, _, _, termino), (_, cambios, _, _) in zip(escrituras, ediciones):
+            doc_id = creados[indice_][1]
+            inicio = time.perf_counter()
+            encontrado = doc_id in await otro.ranking(indice_, termino)
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            if not encontrado:
+                fallos += 1
+                print(f"FALLO otro worker: el alta en {indice_} no aparece buscando '{termino}'")
+            else:
+                print(f"otro worker: alta en {indice_} visible en la siguiente búsqueda ({transcurrido:.1f} ms)")
+        for indice_, cambios, antes, despues in ediciones:
+            ruta, doc_id = creados[indice_]
+            response = await http.put(f"{ruta}{doc_id}", json=cambios, headers=headers)
+            assert response.status_code == 200, response.text
+            if doc_id in await otro.ranking(indice_, antes) or doc_id not in await otro.ranking(indice_, despues):
+                fallos += 1
+                print(f"FALLO otro worker: la edición en {indice_} no se aplica ('{antes}' -> '{despues}')")
+            else:
+                print(f"otro worker: edición en {indice_} aplicada ('{antes}' -> '{despues}')")
+        response = await http.get("/productos/", params={"search": "diurno"}, headers=headers)
+        if [fila["id_producto"] for fila in response.json()] != [creados["productos"][1]]:
+            fallos += 1
+            print("FALLO: GET /productos/?search no ve la edición en el propio worker")
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=200_000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.productos)))
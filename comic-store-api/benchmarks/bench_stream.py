@@ -0,0 +1,193 @@
+"""
+Benchmark y verificación de ``GET /inventario/stream`` (SSE).
+
+Arranca la API con uvicorn en un puerto local, conecta N clientes SSE (sin
+filtro, por producto y por categoría) y registra movimientos de inventario
+por la API. Comprueba que cada cliente recibe exactamente los movimientos
+que le corresponden y las alertas de cruce del stock mínimo, mide la
+latencia desde la escritura hasta la recepción y compara las consultas del
+stream con las que harían esos clientes sondeando ``/inventario/movimientos``.
+También prueba la reanudación con Last-Event-ID y el corte de un cliente
+lento con ``reset``.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_stream --clientes 50 --movimientos 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks import common
+
+from app.config import settings
+from app.core.stock_stream import RESET, stock_stream
+from app.database import SessionLocal
+from app.main import app
+from app.models.productos import Productos
+
+# Intervalo de sondeo de las pantallas antes del stream
+POLLING_SECONDS = 2
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ClienteSSE:
+    def __init__(self, nombre: str, params: dict, headers: dict):
+        self.nombre = nombre
+        self.params = params
+        self.headers = headers
+        self.eventos = []
+        self.conectado = asyncio.Event()
+
+    async def escuchar(self, base_url: str):
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+            async with http.stream("GET", "/inventario/stream", params=self.params, headers=self.headers) as response:
+                assert response.status_code == 200, await response.aread()
+                evento = {}
+                async for linea in response.aiter_lines():
+                    if linea.startswith(": conectado"):
+                        self.conectado.set()
+                    elif linea.startswith("event: "):
+                        evento["event"] = linea[7:]
+                    elif linea.startswith("id: "):
+                        evento["id"] = int(linea[4:])
+                    elif linea.startswith("data: "):
+                        evento["data"] = json.loads(linea[6:])
+                    elif linea == "" and evento:
+                        evento["recibido"] = time.perf_counter()
+                        self.eventos.append(evento)
+                        evento = {}
+
+    def movimientos(self):
+        return [e for e in self.eventos if e["event"] == "movimiento"]
+
+async def main(clientes: int, movimientos: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    productos = common.seed_catalogo(20, stock=10)
+    with SessionLocal() as db:
+        id_categoria = db.get(Productos, productos[0]).id_categoria
+
+    puerto = puerto_libre()
+    base_url = f"http://127.0.0.1:{puerto}"
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    servidor = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        headers = await common.auth_headers(http)
+        token = headers["Authorization"].split()[1]
+
+        # Un tercio sin filtro, un tercio por producto y un tercio por categoría;
+        # la mitad se autentica con access_token, como haría EventSource
+        suscriptores = []
+        for i in range(clientes):
+            params = {}
+            if i % 3 == 1:
+                params["producto"] = productos[i % 5]
+            elif i % 3 == 2:
+                params["categoria"] = id_categoria
+            if i % 2:
+                suscriptores.append(ClienteSSE(f"c{i}", {**params, "access_token": token}, {}))
+            else:
+                suscriptores.append(ClienteSSE(f"c{i}", params, headers))
+        tareas = [asyncio.create_task(c.escuchar(base_url)) for c in suscriptores]
+        await asyncio.wait_for(asyncio.gather(*(c.conectado.wait() for c in suscriptores)), 30)
+
+        # Movimientos de entrada y salida; empezando con stock 10 y mínimo 5
+        # varios productos cruzan el mínimo en ambos sentidos
+        rnd = random.Random(5)
+        escritos = {}
+        inicio = time.perf_counter()
+        for _ in range(movimientos):
+            id_producto = rnd.choice(productos)
+            tipo = rnd.choice([1, 2])
+            response = await http.post("/inventario/movimientos", json={
+                "id_producto": id_producto, "id_tipo_movimiento": tipo, "cantidad": rnd.randint(1, 3),
+            }, headers=headers)
+            if response.status_code == 201:
+                escritos[response.json()["id_movimiento"]] = (id_producto, time.perf_counter())
+            else:
+                assert response.status_code == 409, response.text
+        duracion = time.perf_counter() - inicio
+
+        # Esperar a que el último movimiento llegue a todos
+        limite = time.perf_counter() + 10
+        while time.perf_counter() < limite and any(
+            len(c.movimientos()) < sum(1 for p, _ in escritos.values() if "producto" not in c.params or p == c.params["producto"])
+            for c in suscriptores
+        ):
+            await asyncio.sleep(0.1)
+
+        fallos = 0
+        latencias = []
+        alertas = 0
+        for c in suscriptores:
+            esperados = {i for i, (p, _) in escritos.items() if "producto" not in c.params or p == c.params["producto"]}
+            recibidos = [e["id"] for e in c.movimientos()]
+            if sorted(recibidos) != sorted(esperados):
+                fallos += 1
+                print(f"FALLO {c.nombre} {c.params}: esperados {len(esperados)} recibidos {len(recibidos)}")
+            latencias += [(e["recibido"] - escritos[e["id"]][1]) * 1000 for e in c.movimientos() if e["id"] in escritos]
+            alertas += sum(1 for e in c.eventos if e["event"] == "alerta")
+        stats = stock_stream.stats()
+        print(f"{len(escritos)} movimientos en {duracion:.1f} s a {clientes} clientes; {alertas} alertas entregadas")
+        print(f"latencia escritura -> evento: p50 {common.percentile(latencias, 50):.0f} ms  p99 {common.percentile(latencias, 99):.0f} ms "
+              f"(intervalo de lectura {settings.INVENTARIO_STREAM_POLL_SECONDS} s)")
+        print(f"consultas del stream: {stats['polls']}; sondeando cada {POLLING_SECONDS} s serían "
+              f"{int(clientes * duracion / POLLING_SECONDS)} peticiones a /inventario/movimientos")
+
+        # Reanudar desde el primer movimiento con Last-Event-ID
+        primero = min(escritos)
+        reanudado = ClienteSSE("reanudado", {}, {**headers, "Last-Event-ID": str(primero)})
+        tarea = asyncio.create_task(reanudado.escuchar(base_url))
+        await asyncio.wait_for(reanudado.conectado.wait(), 10)
+        await asyncio.sleep(0.5)
+        tarea.cancel()
+        if sorted(e["id"] for e in reanudado.movimientos()) != sorted(i for i in escritos if i > primero):
+            fallos += 1
+            print(f"FALLO reanudación: {len(reanudado.movimientos())} eventos")
+        else:
+            print(f"reanudación con Last-Event-ID: {len(reanudado.movimientos())} eventos reenviados")
+
+        # Cliente lento: cola pequeña que nadie consume
+        settings.INVENTARIO_STREAM_QUEUE_SIZE, tamano = 4, settings.INVENTARIO_STREAM_QUEUE_SIZE
+        lento = stock_stream.subscribe()
+        settings.INVENTARIO_STREAM_QUEUE_SIZE = tamano
+        for _ in range(6):
+            await http.post("/inventario/movimientos", json={"id_producto": productos[0], "id_tipo_movimiento": 1, "cantidad": 1}, headers=headers)
+        await asyncio.sleep(settings.INVENTARIO_STREAM_POLL_SECONDS * 2)
+        if lento.queue.get_nowait() is not RESET or not lento.overflowed:
+            fallos += 1
+            print("FALLO: el cliente lento no recibió reset")
+        else:
+            print(f"cliente lento desconectado con reset; desbordes {stock_stream.stats()['overflows']}")
+
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    server.should_exit = True
+    await servidor
+    if fallos:
+        return 1
+    print("OK: todos los clientes recibieron sus eventos")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--movimientos", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.clientes, args.movimientos)))
@@ -0,0 +1,160 @@
+"""
+Benchmark y verificación de ``POST /compras/sugerencias``.
+
+Siembra un catálogo de N productos repartidos entre proveedores con plazos
+de entrega distintos, un mes de salidas de inventario (pocas referencias
+concentran la mayoría de las ventas), devoluciones por cancelación y compras
+abiertas. Mide el cálculo en modo dry-run y la creación de las compras,
+compara una muestra de productos con un cálculo independiente producto a
+producto y comprueba que una segunda ejecución ya no sugiere nada (lo pedido
+cuenta como pendiente de recibir).
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_sugerencias --productos 100000 --salidas 500000
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from benchmarks import common
+
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.compras import ComprasProveedores, DetallesCompra
+from app.models.inventario import Inventario
+from app.models.productos import Categorias, Productos
+from app.models.proveedores import Proveedores
+
+PROVEEDORES = 50
+
+def sembrar(total: int, salidas: int, lote: int = 50_000) -> None:
+    rnd = random.Random(21)
+    with SessionLocal() as db:
+        id_categoria = db.scalar(select(Categorias.id_categoria))
+    with engine.begin() as conn:
+        conn.execute(Proveedores.__table__.insert(), [
+            {"id_proveedor": i + 1, "nombre": f"Proveedor {i}", "email": f"proveedor{i}@bench.example.com",
+             "tiempo_entrega_promedio": None if i % 10 == 0 else rnd.randint(3, 21), "id_status": 1}
+            for i in range(PROVEEDORES)
+        ])
+        for desde in range(0, total, lote):
+            conn.execute(Productos.__table__.insert(), [
+                {
+                    "id_producto": i + 1, "sku": f"REP-{i:07d}", "nombre": f"Producto {i}", "id_categoria": id_categoria,
+                    "stock_actual": rnd.randint(0, 200), "stock_minimo": 5, "precio_compra": Decimal("50.00"),
+                    "precio_venta": Decimal("99.90"), "id_status": 1, "id_proveedor": 1 + i % PROVEEDORES,
+                }
+                for i in range(desde, min(desde + lote, total))
+            ])
+
+        # Salidas del último mes concentradas en pocas referencias, más algunas devoluciones
+        ahora = datetime.now()
+        for desde in range(0, salidas, lote):
+            conn.execute(Inventario.__table__.insert(), [
+                {
+                    "id_producto": 1 + int(rnd.paretovariate(0.8)) % total,
+                    "id_tipo_movimiento": 1 if i % 20 == 0 else 2,
+                    "cantidad": rnd.randint(1, 3), "stock_anterior": 0, "stock_nuevo": 0, "id_empleado": 1,
+                    "fecha_movimiento": ahora - timedelta(seconds=rnd.randint(0, 29 * 86400)),
+                    "tipo_documento": "pedido",
+                }
+                for i in range(desde, min(desde + lote, salidas))
+            ])
+
+        # Compras abiertas para algunas referencias
+        conn.execute(ComprasProveedores.__table__.insert(), [
+            {"id_compra": 1, "numero_compra": "COMP-BENCH-1", "id_proveedor": 1, "subtotal": 0, "impuestos": 0,
+             "total": 0, "estado": "pendiente"},
+        ])
+        conn.execute(DetallesCompra.__table__.insert(), [
+            {"id_compra": 1, "id_producto": 1 + i, "cantidad_ordenada": 40, "cantidad_recibida": 10,
+             "precio_unitario": Decimal("50.00"), "subtotal": Decimal("2000.00"), "estado": "parcial"}
+            for i in range(0, 2000, 2)
+        ])
+
+def esperado(id_producto: int, dias_ventas: int, dias_cobertura: int) -> int:
+    """Cantidad sugerida calculada producto a producto, de forma independiente."""
+    desde = datetime.now() - timedelta(days=dias_ventas)
+    with SessionLocal() as db:
+        producto = db.get(Productos, id_producto)
+        proveedor = db.get(Proveedores, producto.id_proveedor)
+        salidas = db.scalar(select(func.coalesce(func.sum(Inventario.cantidad), 0)).where(
+            Inventario.id_producto == id_producto, Inventario.id_tipo_movimiento == 2, Inventario.fecha_movimiento >= desde))
+        devueltas = db.scalar(select(func.coalesce(func.sum(Inventario.cantidad), 0)).where(
+            Inventario.id_producto == id_producto, Inventario.id_tipo_movimiento == 1,
+            Inventario.tipo_documento == "pedido", Inventario.fecha_movimiento >= desde))
+        pendiente = db.scalar(select(func.coalesce(func.sum(DetallesCompra.cantidad_ordenada - DetallesCompra.cantidad_recibida), 0)).where(
+            DetallesCompra.id_producto == id_producto, DetallesCompra.estado.in_(["pendiente", "parcial"])))
+    velocidad = max(salidas - devueltas, 0) / dias_ventas
+    punto_reorden = math.ceil(velocidad * (proveedor.tiempo_entrega_promedio or 7)) + producto.stock_minimo
+    disponible = producto.stock_actual + pendiente
+    if disponible > punto_reorden:
+        return 0
+    return max(math.ceil(punto_reorden + velocidad * dias_cobertura) - disponible, 0)
+
+async def sugerir(http, headers, dry_run: bool):
+    inicio = time.perf_counter()
+    response = await http.post("/compras/sugerencias", params={"dry_run": dry_run}, headers=headers)
+    duracion = time.perf_counter() - inicio
+    assert response.status_code == 200, response.text
+    return response.json(), duracion
+
+async def main(total: int, salidas: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    common.seed_catalogo(0)
+    inicio = time.perf_counter()
+    sembrar(total, salidas)
+    print(f"{total} productos y {salidas} movimientos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    fallos = 0
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        prueba, duracion = await sugerir(http, headers, dry_run=True)
+        lineas = {d["id_producto"]: d["cantidad"] for c in prueba["compras"] for d in c["detalles"]}
+        print(f"dry-run: {prueba['productos_evaluados']} productos evaluados en {duracion:.2f} s; "
+              f"{len(lineas)} líneas en {len(prueba['compras'])} compras")
+
+        muestra = random.Random(4).sample(range(1, total + 1), 200) + list(range(1, 21))
+        distintos = [(p, lineas.get(p, 0), esperado(p, 30, 30)) for p in muestra if lineas.get(p, 0) != esperado(p, 30, 30)]
+        if distintos:
+            fallos += 1
+            print(f"FALLO: {len(distintos)} productos no coinciden con el cálculo individual, p. ej. {distintos[:3]}")
+        else:
+            print(f"muestra de {len(muestra)} productos: coincide con el cálculo individual")
+
+        creadas, duracion = await sugerir(http, headers, dry_run=False)
+        with SessionLocal() as db:
+            compras = db.scalar(select(func.count()).select_from(ComprasProveedores).where(ComprasProveedores.id_compra > 1))
+            detalles = db.scalar(select(func.count()).select_from(DetallesCompra).where(DetallesCompra.id_compra > 1))
+        print(f"creación: {compras} compras y {detalles} líneas en {duracion:.2f} s")
+        if compras != len(creadas["compras"]) or detalles != len(lineas):
+            fallos += 1
+            print("FALLO: las compras creadas no coinciden con el dry-run")
+
+        repetida, _ = await sugerir(http, headers, dry_run=True)
+        if repetida["compras"]:
+            fallos += 1
+            print(f"FALLO: una segunda ejecución sugiere {sum(len(c['detalles']) for c in repetida['compras'])} líneas más")
+        else:
+            print("segunda ejecución: sin sugerencias (lo pedido cuenta como pendiente de recibir)")
+
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--salidas", type=int, default=500_000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.productos, args.salidas)))
@@ -0,0 +1,117 @@
+"""
+Verificación de la caché de usuarios autenticados entre workers.
+
+Un empleado administrador consulta la API con la caché llena; después
+"otro worker" (una transacción aparte que, como la API, edita el empleado
+y sube la versión con ``user_cache.bump`` sin tocar la caché de este
+proceso) le quita el rol de administrador y luego lo da de baja. Mide cuánto
+tarda este proceso en dejar de autorizarlo: con el sondeo de la versión
+debe ser a lo sumo ``USER_CACHE_VERSION_POLL_SECONDS``; sin él (comportamiento
+anterior) el empleado sigue autorizado hasta que caduca el TTL.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.bench_user_cache
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select
+
+from benchmarks import common
+
+from app.config import settings
+from app.core.user_cache import user_cache
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.models.empleados import Empleados
+
+USUARIO = "gerente"
+CLAVE = "gerente123"
+
+async def editar_en_otro_worker(**valores) -> None:
+    async with AsyncSessionLocal() as db:
+        empleado = await db.scalar(select(Empleados).where(Empleados.nombre_usuario == USUARIO))
+        for campo, valor in valores.items():
+            setattr(empleado, campo, valor)
+        await user_cache.bump(db)
+        await db.commit()
+
+async def esperar_rechazo(http, headers, ruta: str, esperado: int, limite: float) -> float:
+    """Segundos hasta que ``ruta`` responde ``esperado`` (o ``limite`` si no llega a hacerlo)."""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        response = await http.get(ruta, headers=headers)
+        if response.status_code == esperado:
+            return time.perf_counter() - inicio
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(0.01)
+    return limite
+
+async def main(consultas: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    sondeo = settings.USER_CACHE_VERSION_POLL_SECONDS
+    # El transporte ASGI no ejecuta el lifespan: arrancar el sondeo aquí
+    tarea = user_cache.start(sondeo)
+    fallos = 0
+    async with common.client(app) as http:
+        admin = await common.auth_headers(http)
+        response = await http.post("/empleados/", json={
+            "nombre": "Gerente", "apellidos": "Bench", "email": "gerente@bench.example.com", "id_puesto": 1,
+            "nombre_usuario": USUARIO, "password": CLAVE, "id_rol": 1,
+        }, headers=admin)
+        assert response.status_code == 201, response.text
+        headers = await common.auth_headers(http, USUARIO, CLAVE)
+
+        latencias = []
+        for _ in range(consultas):
+            t = time.perf_counter()
+            response = await http.get("/auth/me", headers=headers)
+            latencias.append((time.perf_counter() - t) * 1000)
+            assert response.status_code == 200, response.text
+        estadisticas = user_cache.stats()
+        print(f"GET /auth/me x{consultas}: p50 {common.percentile(latencias, 50):.1f} ms  "
+              f"p99 {common.percentile(latencias, 99):.1f} ms  aciertos {estadisticas['hit_ratio']:.2%}")
+
+        # Con sondeo: quitar el rol de administrador desde otro worker
+        await editar_en_otro_worker(id_rol=2)
+        segundos = await esperar_rechazo(http, headers, "/admin/user-cache", 403, 5 * sondeo + 1)
+        if segundos > sondeo + 0.5:
+            fallos += 1
+            print(f"FALLO: el cambio de rol de otro worker sigue sin verse tras {segundos:.2f} s")
+        else:
+            print(f"cambio de rol en otro worker visible en {segundos:.2f} s (sondeo cada {sondeo:g} s)")
+
+        # Sin sondeo (comportamiento anterior): la baja no se ve hasta el TTL
+        tarea.cancel()
+        await http.get("/auth/me", headers=headers)
+        await editar_en_otro_worker(id_status=2)
+        espera = 3 * sondeo
+        segundos = await esperar_rechazo(http, headers, "/auth/me", 400, espera)
+        if segundos < espera:
+            print(f"sin sondeo la baja se vio en {segundos:.2f} s (¿caducó el TTL?)")
+        else:
+            print(f"sin sondeo la baja en otro worker sigue sin verse tras {espera:g} s (TTL {settings.USER_CACHE_TTL_SECONDS} s)")
+
+        tarea = user_cache.start(sondeo)
+        segundos = await esperar_rechazo(http, headers, "/auth/me", 400, 5 * sondeo + 1)
+        if segundos > sondeo + 0.5:
+            fallos += 1
+            print(f"FALLO: la baja de otro worker sigue sin verse tras {segundos:.2f} s con el sondeo")
+        else:
+            print(f"con el sondeo de nuevo, baja visible en {segundos:.2f} s")
+    tarea.cancel()
+    print("caché:", user_cache.stats())
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consultas", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.consultas)))
@@ -0,0 +1,110 @@
+"""
+Utilidades compartidas por los benchmarks: base de datos SQLite temporal,
+esquema, datos de catálogo mínimos y cliente HTTP en proceso.
+
+Debe importarse antes que ``app`` para que DATABASE_URL apunte a la base temporal.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="comicstore-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.core.auth import get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.models.base import Roles, Status
+from app.models.clientes import Clientes, NivelesMembresia
+from app.models.empleados import Empleados, Puestos
+from app.models.inventario import Inventario, TiposMovimiento
+from app.models.pedidos import EstadosPedido
+from app.models.productos import Categorias, Productos
+# Registrar el resto de modelos en Base.metadata
+from app.models import busqueda, compras, logs, proveedores, reportes, secuencias  # noqa: F401
+
+ADMIN_USER = "admin"
+ADMIN_PASSWORD = "admin123"
+
+def create_schema():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+def seed_reference_data():
+    """Inserta los catálogos base y un administrador (id_status=1, id_rol=1)."""
+    with SessionLocal() as db:
+        db.add_all([Status(nombre_status="activo"), Status(nombre_status="inactivo")])
+        db.add_all([Roles(nombre_rol="administrador"), Roles(nombre_rol="cajero")])
+        db.add(Puestos(nombre_puesto="Gerente"))
+        db.add_all([
+            NivelesMembresia(nombre_nivel="Básico", descuento_porcentaje=0, puntos_por_compra=1),
+            NivelesMembresia(nombre_nivel="Plata", descuento_porcentaje=5, puntos_por_compra=2),
+            NivelesMembresia(nombre_nivel="Oro", descuento_porcentaje=10, puntos_por_compra=5),
+        ])
+        db.add_all([EstadosPedido(nombre_estado=nombre) for nombre in ("pendiente", "procesando", "entregado", "cancelado")])
+        db.add_all([TiposMovimiento(nombre_tipo=nombre) for nombre in ("entrada", "salida", "ajuste")])
+        db.flush()
+        db.add(Empleados(
+            nombre="Admin", apellidos="Bench", email="admin@bench.example.com", id_puesto=1, id_status=1,
+            nombre_usuario=ADMIN_USER, password_hash=get_password_hash(ADMIN_PASSWORD), id_rol=1,
+        ))
+        db.commit()
+
+def seed_catalogo(productos: int, stock: int = 1_000_000) -> List[int]:
+    """Inserta una categoría, un cliente y ``productos`` productos activos; devuelve sus IDs."""
+    with SessionLocal() as db:
+        categoria = Categorias(nombre_categoria="Bench")
+        db.add(categoria)
+        db.add(Clientes(nombre="Cliente", apellidos="Bench", email="cliente@bench.example.com", id_nivel=2, id_status=1))
+        db.flush()
+        filas = [
+            Productos(
+                sku=f"BENCH-{i:06d}", nombre=f"Producto {i}", id_categoria=categoria.id_categoria,
+                stock_actual=stock, precio_compra=Decimal("50.00"), precio_venta=Decimal("99.90"), id_status=1,
+            )
+            for i in range(productos)
+        ]
+        db.add_all(filas)
+        db.commit()
+        return [producto.id_producto for producto in filas]
+
+def seed_movimientos(total: int, productos: List[int], lote: int = 50_000) -> None:
+    """Inserta ``total`` movimientos de inventario repartidos en el último año (varios por segundo)."""
+    inicio = datetime.now() - timedelta(days=365)
+    paso = timedelta(days=365) / total
+    with engine.begin() as conn:
+        for desde in range(0, total, lote):
+            conn.execute(Inventario.__table__.insert(), [
+                {
+                    "id_producto": productos[i % len(productos)],
+                    "id_tipo_movimiento": 1 + i % 3,
+                    "cantidad": 1,
+                    "stock_anterior": 0,
+                    "stock_nuevo": 1,
+                    "id_empleado": 1,
+                    # Redondear a segundos para que haya fechas repetidas
+                    "fecha_movimiento": (inicio + paso * i).replace(microsecond=0),
+                    "tipo_documento": "ajuste",
+                }
+                for i in range(desde, min(desde + lote, total))
+            ])
+
+def client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+
+async def auth_headers(http: httpx.AsyncClient, username: str = ADMIN_USER, password: str = ADMIN_PASSWORD) -> dict:
+    response = await http.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordenados = sorted(values)
+    index = min(len(ordenados) - 1, int(round(pct / 100 * (len(ordenados) - 1))))
+    return ordenados[index]
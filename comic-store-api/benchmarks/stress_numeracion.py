@@ -0,0 +1,108 @@
+"""
+Prueba de estrés: numeración de pedidos desde varios procesos a la vez.
+
+Lanza P procesos (como P workers de uvicorn) que piden N números de pedido
+cada uno, con peticiones concurrentes dentro de cada proceso, y comprueba
+que no hay ningún número repetido, que todos tienen el formato
+``PED-YYYYMMDD-NNNNN`` y cuántos viajes a la base de datos costaron.
+
+También cuenta los números fuera de orden cronológico: los menores que uno
+que otro worker ya había recibido antes de pedirlos. Con ``--bloque 1`` (el
+valor por defecto de ``NUMERACION_BLOQUE``) no debe haber ninguno.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.stress_numeracion --procesos 4 --numeros 2000
+    python -m benchmarks.stress_numeracion --bloque 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import re
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks import common
+
+FORMATO = re.compile(r"^PED-\d{8}-\d{5,}$")
+
+def worker(numeros: int, concurrencia: int, bloque: int, cola) -> None:
+    from app.core.numeracion import numerador_pedidos
+    from app.database import sequence_engine
+
+    numerador_pedidos.bloque = bloque
+
+    sentencias = [0]
+    event.listen(sequence_engine.sync_engine, "before_cursor_execute", lambda *args: sentencias.__setitem__(0, sentencias[0] + 1))
+
+    async def pedir(cuantos: int):
+        # (instante de la petición, número, instante de la respuesta)
+        numeros = []
+        for _ in range(cuantos):
+            pedido = time.time()
+            numero = await numerador_pedidos.siguiente()
+            numeros.append((pedido, numero, time.time()))
+        return numeros
+
+    async def main():
+        lotes = await asyncio.gather(*(pedir(numeros // concurrencia) for _ in range(concurrencia)))
+        await sequence_engine.dispose()
+        return [n for lote in lotes for n in lote]
+
+    cola.put((asyncio.run(main()), sentencias[0]))
+
+def fuera_de_orden(numeros) -> int:
+    """Números menores que alguno ya entregado (a cualquier worker) antes de pedirlos."""
+    entregados = sorted(numeros, key=lambda n: n[2])
+    maximo, i, fuera = "", 0, 0
+    for pedido, numero, _ in sorted(numeros):
+        while i < len(entregados) and entregados[i][2] < pedido:
+            maximo = max(maximo, entregados[i][1])
+            i += 1
+        fuera += numero < maximo
+    return fuera
+
+def main(procesos: int, numeros: int, concurrencia: int, bloque: int) -> int:
+    common.create_schema()
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue()
+    inicio = time.perf_counter()
+    hijos = [contexto.Process(target=worker, args=(numeros, concurrencia, bloque, cola)) for _ in range(procesos)]
+    for hijo in hijos:
+        hijo.start()
+    resultados = [cola.get() for _ in hijos]
+    for hijo in hijos:
+        hijo.join()
+    duracion = time.perf_counter() - inicio
+
+    registros = [n for lote, _ in resultados for n in lote]
+    generados = [numero for _, numero, _ in registros]
+    desordenados = fuera_de_orden(registros)
+    sentencias = sum(s for _, s in resultados)
+    unicos = set(generados)
+    mal_formados = [n for n in generados if not FORMATO.match(n)]
+    print(f"{len(generados)} números en {procesos} procesos ({duracion:.1f} s), {len(unicos)} únicos")
+    print(f"{sentencias} sentencias SQL ({sentencias / len(generados):.2f} por número)")
+    print(f"primero {min(generados)}  último {max(generados)}")
+    print(f"bloque {bloque}: {desordenados} números fuera de orden cronológico")
+
+    esperados = procesos * (numeros // concurrencia) * concurrencia
+    if len(unicos) != len(generados) or len(generados) != esperados or mal_formados:
+        print(f"FALLO: repetidos={len(generados) - len(unicos)} mal formados={mal_formados[:5]}")
+        return 1
+    if bloque == 1 and desordenados:
+        print(f"FALLO: {desordenados} números fuera de orden con bloque 1")
+        return 1
+    print("OK: sin colisiones" + (" y en orden" if bloque == 1 else ""))
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--numeros", type=int, default=2000, help="números por proceso")
+    parser.add_argument("--concurrencia", type=int, default=10, help="peticiones simultáneas por proceso")
+    parser.add_argument("--bloque", type=int, default=1, help="números reservados por viaje (NUMERACION_BLOQUE)")
+    args = parser.parse_args()
+    sys.exit(main(args.procesos, args.numeros, args.concurrencia, args.bloque))
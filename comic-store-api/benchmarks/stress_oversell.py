@@ -0,0 +1,74 @@
+"""
+Prueba de estrés: compradores simultáneos sobre las últimas unidades de un producto.
+
+Lanza N ``POST /pedidos/`` en paralelo contra un producto con menos stock
+que compradores y comprueba que no hay sobreventa: exactamente ``stock``
+pedidos se aceptan, el resto recibe 409, el stock termina en 0 y los
+movimientos de inventario forman una cadena sin huecos ni repeticiones.
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.stress_oversell --compradores 50 --stock 10
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from benchmarks import common
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.inventario import Inventario
+from app.models.productos import Productos
+
+async def comprar(http, headers, id_producto: int):
+    return await http.post("/pedidos/", json={
+        "id_cliente": 1,
+        "detalles": [{"id_producto": id_producto, "cantidad": 1, "precio_unitario": 0, "subtotal": 0}],
+    }, headers=headers)
+
+async def main(compradores: int, stock: int) -> int:
+    common.create_schema()
+    common.seed_reference_data()
+    id_producto = common.seed_catalogo(1, stock=stock)[0]
+    async with common.client(app) as http:
+        headers = await common.auth_headers(http)
+        respuestas = await asyncio.gather(*(comprar(http, headers, id_producto) for _ in range(compradores)))
+
+    codigos = [r.status_code for r in respuestas]
+    aceptados = codigos.count(201)
+    rechazados = codigos.count(409)
+    with SessionLocal() as db:
+        stock_final = db.scalar(select(Productos.stock_actual).where(Productos.id_producto == id_producto))
+        movimientos = db.scalars(
+            select(Inventario).where(Inventario.id_producto == id_producto).order_by(Inventario.stock_anterior.desc())
+        ).all()
+
+    cadena = [(m.stock_anterior, m.stock_nuevo) for m in movimientos]
+    esperada = [(s, s - 1) for s in range(stock, 0, -1)]
+    print(f"{compradores} compradores, stock inicial {stock}")
+    print(f"aceptados {aceptados}  rechazados (409) {rechazados}  otros {compradores - aceptados - rechazados}")
+    print(f"stock final {stock_final}  movimientos {len(movimientos)}")
+
+    errores = []
+    if aceptados != min(stock, compradores):
+        errores.append(f"se aceptaron {aceptados} pedidos para {stock} unidades")
+    if aceptados + rechazados != compradores:
+        errores.append(f"respuestas inesperadas: {sorted(set(codigos) - {201, 409})}")
+    if stock_final != max(stock - compradores, 0):
+        errores.append(f"stock final {stock_final}")
+    if compradores >= stock and cadena != esperada:
+        errores.append(f"cadena de movimientos incoherente: {cadena}")
+    for error in errores:
+        print("ERROR:", error)
+    print("sin sobreventa" if not errores else "SOBREVENTA DETECTADA")
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compradores", type=int, default=50)
+    parser.add_argument("--stock", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.compradores, args.stock)))
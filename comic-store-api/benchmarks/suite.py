@@ -0,0 +1,394 @@
+"""
+Suite de benchmarks de endpoints con líneas base y umbrales de regresión.
+
+Arranca la aplicación (con su lifespan: catálogos, índices de búsqueda y de
+alertas) contra la base de DATABASE_URL, la siembra a la escala elegida y
+mide latencia (p50/p95/p99) y rendimiento (peticiones/s) de uno o varios endpoints de cada
+router de app/api. Los resultados se comparan con una línea base en JSON y
+la ejecución termina con código 1 si algún endpoint empeora más del umbral.
+
+Sin DATABASE_URL se usa un SQLite temporal. Para medir contra un MySQL local
+(la base se BORRA y se vuelve a crear salvo con --sin-sembrar):
+
+    DATABASE_URL=mysql+pymysql://root@localhost/ComicStoreBench python -m benchmarks.suite --escala 100k
+
+Uso (desde comic-store-api/):
+
+    python -m benchmarks.suite                              # 10k, compara con benchmarks/baselines/sqlite-10k.json
+    python -m benchmarks.suite --guardar-baseline           # fija la línea base con esta ejecución
+    python -m benchmarks.suite --solo pedidos,productos --peticiones 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from benchmarks import common
+
+from app.core.auditoria import audit_log
+from app.core.ventas import ESTADO_CANCELADO, reconstruir_ventas
+from app.database import engine
+from app.main import app
+from app.models.clientes import Clientes
+from app.models.compras import ComprasProveedores, DetallesCompra
+from app.models.inventario import AlertasStock, Inventario
+from app.models.pedidos import DetallesPedido, Pedidos
+from app.models.productos import Categorias, Comics, FigurasColeccion, Productos
+from app.models.proveedores import Proveedores
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Filas sembradas por escala (el nombre es el número de productos)
+ESCALAS = {
+    "10k": {"productos": 10_000, "clientes": 5_000, "pedidos": 20_000, "movimientos": 50_000},
+    "100k": {"productos": 100_000, "clientes": 50_000, "pedidos": 200_000, "movimientos": 500_000},
+    "1m": {"productos": 1_000_000, "clientes": 500_000, "pedidos": 2_000_000, "movimientos": 5_000_000},
+}
+
+CATEGORIAS = 12
+PROVEEDORES = 50
+# Productos con stock de sobra para los escenarios de escritura (checkout, salidas)
+SUPERVENTAS = 100
+LOTE = 20_000
+
+def sembrar(escala: dict, rnd: random.Random) -> None:
+    """Inserta catálogo, clientes, un año de pedidos, movimientos y compras con INSERT masivos."""
+    productos, clientes, pedidos, movimientos = (
+        escala["productos"], escala["clientes"], escala["pedidos"], escala["movimientos"]
+    )
+    inicio = datetime.combine(date.today() - timedelta(days=365), datetime.min.time())
+    with engine.begin() as conn:
+        conn.execute(Categorias.__table__.insert(), [
+            {"id_categoria": i + 1, "nombre_categoria": f"Categoría {i}"} for i in range(CATEGORIAS)
+        ])
+        conn.execute(Proveedores.__table__.insert(), [
+            {"id_proveedor": i + 1, "nombre": f"Proveedor {i}", "email": f"proveedor{i}@bench.example.com",
+             "tiempo_entrega_promedio": rnd.randint(3, 21), "id_status": 1}
+            for i in range(PROVEEDORES)
+        ])
+        for desde in range(0, productos, LOTE):
+            filas = [
+                {
+                    "id_producto": i + 1, "sku": f"SUITE-{i:07d}", "nombre": f"Producto {i}",
+                    "id_categoria": 1 + i % CATEGORIAS, "id_proveedor": 1 + i % PROVEEDORES,
+                    "stock_actual": 1_000_000 if i < SUPERVENTAS else rnd.randint(0, 200), "stock_minimo": 5,
+                    "precio_compra": Decimal("50.00"), "precio_venta": Decimal("99.90"), "id_status": 1,
+                }
+                for i in range(desde, min(desde + LOTE, productos))
+            ]
+            conn.execute(Productos.__table__.insert(), filas)
+            # Índice de alertas coherente con el stock (lo mantiene app/core/stock.py)
+            alertas = [{"id_producto": f["id_producto"]} for f in filas if f["stock_actual"] < f["stock_minimo"]]
+            if alertas:
+                conn.execute(AlertasStock.__table__.insert(), alertas)
+            conn.execute(Comics.__table__.insert(), [
+                {"id_producto": f["id_producto"], "titulo": f["nombre"], "numero": f["id_producto"] % 500}
+                for f in filas if f["id_producto"] % 3 == 0
+            ])
+            conn.execute(FigurasColeccion.__table__.insert(), [
+                {"id_producto": f["id_producto"], "personaje": f["nombre"], "universo": "Marvel"}
+                for f in filas if f["id_producto"] % 3 == 1
+            ])
+
+        for desde in range(0, clientes, LOTE):
+            conn.execute(Clientes.__table__.insert(), [
+                {"id_cliente": i + 1, "nombre": f"Cliente {i}", "apellidos": "Suite", "email": f"cliente{i}@bench.example.com",
+                 "id_nivel": 1 + i % 3, "id_status": 1, "fecha_registro": inicio}
+                for i in range(desde, min(desde + LOTE, clientes))
+            ])
+
+        for desde in range(0, pedidos, LOTE):
+            filas, detalles = [], []
+            for i in range(desde, min(desde + LOTE, pedidos)):
+                lineas = [
+                    {"id_pedido": i + 1, "id_producto": id_producto, "cantidad": 1,
+                     "precio_unitario": Decimal("99.90"), "descuento_unitario": Decimal("0.00"), "subtotal": Decimal("99.90"),
+                     "id_categoria": 1 + (id_producto - 1) % CATEGORIAS}
+                    for id_producto in {rnd.randint(1, productos) for _ in range(rnd.randint(1, 4))}
+                ]
+                subtotal = sum(linea["subtotal"] for linea in lineas)
+                filas.append({
+                    "id_pedido": i + 1, "numero_pedido": f"SUITE-{i:09d}", "id_cliente": rnd.randint(1, clientes),
+                    "id_empleado": 1, "fecha_creacion": inicio + timedelta(seconds=rnd.randint(0, 365 * 86400 - 1)),
+                    "subtotal": subtotal, "impuestos": subtotal * Decimal("0.16"), "descuento": 0,
+                    "total": subtotal * Decimal("1.16"), "id_estado": ESTADO_CANCELADO if rnd.random() < 0.05 else 3,
+                })
+                detalles += lineas
+            conn.execute(Pedidos.__table__.insert(), filas)
+            conn.execute(DetallesPedido.__table__.insert(), detalles)
+
+        for desde in range(0, movimientos, LOTE):
+            conn.execute(Inventario.__table__.insert(), [
+                {"id_producto": rnd.randint(1, productos), "id_tipo_movimiento": 1 + i % 3, "cantidad": 1,
+                 "stock_anterior": 0, "stock_nuevo": 1, "id_empleado": 1, "tipo_documento": "ajuste",
+                 "fecha_movimiento": inicio + timedelta(seconds=rnd.randint(0, 365 * 86400 - 1))}
+                for i in range(desde, min(desde + LOTE, movimientos))
+            ])
+
+        compras = max(productos // 100, 1)
+        conn.execute(ComprasProveedores.__table__.insert(), [
+            {"id_compra": i + 1, "numero_compra": f"SUITE-{i:09d}", "id_proveedor": 1 + i % PROVEEDORES,
+             "subtotal": Decimal("5000.00"), "impuestos": Decimal("800.00"), "total": Decimal("5800.00"),
+             "estado": "pendiente", "id_empleado": 1}
+            for i in range(compras)
+        ])
+        for desde in range(0, compras, LOTE // 10):
+            conn.execute(DetallesCompra.__table__.insert(), [
+                {"id_compra": i + 1, "id_producto": rnd.randint(1, productos), "cantidad_ordenada": 10,
+                 "cantidad_recibida": 0, "precio_unitario": Decimal("50.00"), "subtotal": Decimal("500.00"),
+                 "estado": "pendiente"}
+                for i in range(desde, min(desde + LOTE // 10, compras)) for _ in range(10)
+            ])
+
+        reconstruir_ventas(conn, inicio.date(), date.today())
+
+def contar() -> dict:
+    """Filas de cada tabla (los IDs son consecutivos desde 1)."""
+    with engine.connect() as conn:
+        return {
+            "productos": conn.scalar(select(func.max(Productos.id_producto))) or 0,
+            "clientes": conn.scalar(select(func.max(Clientes.id_cliente))) or 0,
+            "pedidos": conn.scalar(select(func.max(Pedidos.id_pedido))) or 0,
+            "movimientos": conn.scalar(select(func.count()).select_from(Inventario)) or 0,
+            "compras": conn.scalar(select(func.max(ComprasProveedores.id_compra))) or 0,
+        }
+
+def escenarios(datos: dict):
+    """
+    (nombre, método, petición, estado esperado, fracción de --peticiones).
+    ``petición(rnd)`` devuelve (path, params, json); los IDs varían en cada
+    llamada para no medir solo lo que ya está en caché.
+    """
+    hoy = date.today()
+    mes = {"fecha_desde": (hoy - timedelta(days=29)).isoformat(), "fecha_hasta": hoy.isoformat()}
+    anio = {"fecha_desde": (hoy - timedelta(days=364)).isoformat(), "fecha_hasta": hoy.isoformat()}
+
+    def producto(rnd):
+        return rnd.randint(1, datos["productos"])
+
+    def cliente(rnd):
+        return rnd.randint(1, datos["clientes"])
+
+    def checkout(rnd):
+        return "/pedidos/", None, {"id_cliente": cliente(rnd), "detalles": [
+            {"id_producto": id_producto, "cantidad": 1, "precio_unitario": 0, "subtotal": 0}
+            for id_producto in rnd.sample(range(1, SUPERVENTAS + 1), 3)
+        ]}
+
+    return [
+        ("auth: POST /auth/login", "POST", lambda rnd: ("/auth/login", None, None), 200, 0.05),
+        ("auth: GET /auth/me", "GET", lambda rnd: ("/auth/me", None, None), 200, 1),
+        ("clientes: GET /clientes/", "GET", lambda rnd: ("/clientes/", {"nivel": rnd.randint(1, 3)}, None), 200, 1),
+        ("clientes: GET /clientes/?search", "GET", lambda rnd: ("/clientes/", {"search": f"cliente{rnd.randint(1, 99)}"}, None), 200, 1),
+        ("clientes: GET /clientes/{cliente_id}", "GET", lambda rnd: (f"/clientes/{cliente(rnd)}", None, None), 200, 1),
+        ("clientes: GET /clientes/{cliente_id}/membresia", "GET", lambda rnd: (f"/clientes/{cliente(rnd)}/membresia", None, None), 200, 1),
+        ("empleados: GET /empleados/", "GET", lambda rnd: ("/empleados/", None, None), 200, 1),
+        ("empleados: GET /empleados/{empleado_id}", "GET", lambda rnd: ("/empleados/1", None, None), 200, 1),
+        ("proveedores: GET /proveedores/", "GET", lambda rnd: ("/proveedores/", None, None), 200, 1),
+        ("proveedores: GET /proveedores/{proveedor_id}", "GET", lambda rnd: (f"/proveedores/{rnd.randint(1, PROVEEDORES)}", None, None), 200, 1),
+        ("productos: GET /productos/", "GET", lambda rnd: ("/productos/", {"skip": rnd.randint(0, 1000)}, None), 200, 1),
+        ("productos: GET /productos/?search", "GET", lambda rnd: ("/productos/", {"search": f"producto {rnd.randint(1, 999)}"}, None), 200, 1),
+        ("productos: GET /productos/{producto_id}", "GET", lambda rnd: (f"/productos/{producto(rnd)}", None, None), 200, 1),
+        ("productos: GET /productos/comics", "GET", lambda rnd: ("/productos/comics", None, None), 200, 1),
+        ("productos: GET /productos/figuras", "GET", lambda rnd: ("/productos/figuras", None, None), 200, 1),
+        ("productos: GET /productos/categorias", "GET", lambda rnd: ("/productos/categorias", None, None), 200, 1),
+        ("inventario: GET /inventario/movimientos", "GET", lambda rnd: ("/inventario/movimientos", {"id_producto": producto(rnd)}, None), 200, 1),
+        ("inventario: GET /inventario/alerta-stock", "GET", lambda rnd: ("/inventario/alerta-stock", None, None), 200, 0.2),
+        ("inventario: POST /inventario/movimientos", "POST", lambda rnd: ("/inventario/movimientos", None, {
+            "id_producto": rnd.randint(1, SUPERVENTAS), "id_tipo_movimiento": 2, "cantidad": 1,
+        }), 201, 0.5),
+        ("pedidos: GET /pedidos/", "GET", lambda rnd: ("/pedidos/", {"id_cliente": cliente(rnd)}, None), 200, 1),
+        ("pedidos: GET /pedidos/{pedido_id}", "GET", lambda rnd: (f"/pedidos/{rnd.randint(1, datos['pedidos'])}", None, None), 200, 1),
+        ("pedidos: POST /pedidos/", "POST", checkout, 201, 0.5),
+        ("compras: GET /compras/", "GET", lambda rnd: ("/compras/", None, None), 200, 1),
+        ("compras: GET /compras/{compra_id}", "GET", lambda rnd: (f"/compras/{rnd.randint(1, datos['compras'])}", None, None), 200, 1),
+        ("reportes: GET /reportes/ventas", "GET", lambda rnd: ("/reportes/ventas", anio, None), 200, 1),
+        ("reportes: GET /reportes/ventas/productos", "GET", lambda rnd: ("/reportes/ventas/productos", mes, None), 200, 1),
+        ("reportes: GET /reportes/ventas/categorias", "GET", lambda rnd: ("/reportes/ventas/categorias", anio, None), 200, 1),
+        ("admin: GET /admin/pool", "GET", lambda rnd: ("/admin/pool", None, None), 200, 1),
+    ]
+
+async def medir(http, headers, metodo, peticion, esperado, total: int, concurrencia: int, rnd: random.Random):
+    """Lanza ``total`` peticiones con ``concurrencia`` clientes; devuelve (latencias en ms, errores, segundos)."""
+    tiempos, errores = [], 0
+    pendientes = iter(range(total))
+
+    async def trabajador():
+        nonlocal errores
+        for _ in pendientes:
+            path, params, body = peticion(rnd)
+            if path == "/auth/login":
+                kwargs = {"data": {"username": common.ADMIN_USER, "password": common.ADMIN_PASSWORD}}
+            else:
+                kwargs = {"params": params, "json": body, "headers": headers}
+            inicio = time.perf_counter()
+            response = await http.request(metodo, path, **kwargs)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code != esperado:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return tiempos, errores, time.perf_counter() - inicio
+
+def resumir(tiempos: list, errores: int, rps_rondas: list) -> dict:
+    return {
+        "peticiones": len(tiempos),
+        "errores": errores,
+        "p50_ms": round(common.percentile(tiempos, 50), 3),
+        "p95_ms": round(common.percentile(tiempos, 95), 3),
+        "p99_ms": round(common.percentile(tiempos, 99), 3),
+        # La mejor ronda: las pausas ajenas a la aplicación solo restan
+        "rps": round(max(rps_rondas), 1),
+    }
+
+def comparar(actual: dict, base: dict, umbral: float, margen_ms: float) -> list:
+    """
+    Endpoints (nombre -> motivos) que empeoran más de ``umbral`` en p50 o en
+    peticiones/s frente a la línea base. p95/p99 se guardan y se muestran pero no cortan la
+    ejecución: con unos cientos de peticiones dependen de pausas aisladas.
+    """
+    regresiones = {}
+    for nombre, medida in actual.items():
+        anterior = base["endpoints"].get(nombre)
+        if anterior is None:
+            continue
+        mensajes = []
+        # El margen absoluto evita falsos positivos en endpoints de pocos ms
+        if medida["p50_ms"] > anterior["p50_ms"] * (1 + umbral) and medida["p50_ms"] - anterior["p50_ms"] > margen_ms:
+            mensajes.append(f"p50 {anterior['p50_ms']:.1f} -> {medida['p50_ms']:.1f} ms")
+        if medida["rps"] < anterior["rps"] * (1 - umbral) and 1000 / medida["rps"] - 1000 / anterior["rps"] > margen_ms:
+            mensajes.append(f"{anterior['rps']:.0f} -> {medida['rps']:.0f} peticiones/s")
+        if mensajes:
+            regresiones[nombre] = mensajes
+    return regresiones
+
+async def medir_escenarios(http, headers, seleccion, args, rnd: random.Random) -> dict:
+    # Rondas alternadas: una racha de ruido en la máquina no cae entera sobre un endpoint
+    medidas = {nombre: ([], 0, []) for nombre, *_ in seleccion}
+    for _ in range(args.rondas):
+        for nombre, metodo, peticion, esperado, fraccion in seleccion:
+            total = max(int(args.peticiones * fraccion / args.rondas), 5)
+            tiempos, errores, segundos = await medir(http, headers, metodo, peticion, esperado, total, args.concurrencia, rnd)
+            acumulado = medidas[nombre]
+            medidas[nombre] = (acumulado[0] + tiempos, acumulado[1] + errores, acumulado[2] + [total / segundos])
+    return {nombre: resumir(*medida) for nombre, medida in medidas.items()}
+
+def imprimir(endpoints: dict) -> None:
+    print(f"{'endpoint':52s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'req/s':>8s}")
+    for nombre, medida in endpoints.items():
+        aviso = f"  ({medida['errores']} errores)" if medida["errores"] else ""
+        print(f"{nombre:52s} {medida['p50_ms']:5.1f} ms {medida['p95_ms']:5.1f} ms "
+              f"{medida['p99_ms']:5.1f} ms {medida['rps']:8.1f}{aviso}")
+
+async def main(args) -> int:
+    rnd = random.Random(args.semilla)
+    dialecto = engine.dialect.name
+    escala = dict(ESCALAS[args.escala])
+    baseline = args.baseline or os.path.join(BASELINES_DIR, f"{dialecto}-{args.escala}.json")
+
+    if not args.sin_sembrar:
+        inicio = time.perf_counter()
+        common.create_schema()
+        common.seed_reference_data()
+        sembrar(escala, rnd)
+        print(f"base sembrada ({args.escala}) en {time.perf_counter() - inicio:.1f} s")
+    datos = contar()
+    print("filas: " + ", ".join(f"{tabla} {n}" for tabla, n in datos.items()))
+
+    base = None
+    if not args.guardar_baseline and os.path.exists(baseline):
+        with open(baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        if (base["meta"]["filas"], base["meta"]["concurrencia"]) != (datos, args.concurrencia):
+            print(f"AVISO: la línea base se midió con otros datos o concurrencia ({base['meta']['filas']}, "
+                  f"concurrencia {base['meta']['concurrencia']})")
+
+    seleccion = [e for e in escenarios(datos) if not args.solo or e[0].split(":")[0] in args.solo]
+    resultado = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "dialecto": dialecto,
+            "escala": args.escala,
+            "filas": datos,
+            "peticiones": args.peticiones,
+            "concurrencia": args.concurrencia,
+            "rondas": args.rondas,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "endpoints": {},
+    }
+
+    # Con el lifespan, como en producción (catálogos e índices ya cargados)
+    async with app.router.lifespan_context(app):
+        async with common.client(app) as http:
+            headers = await common.auth_headers(http)
+            # Calentamiento: planes de consulta, cachés y conexiones del pool
+            for nombre, metodo, peticion, esperado, fraccion in seleccion:
+                await medir(http, headers, metodo, peticion, esperado, 5, 1, rnd)
+            resultado["endpoints"] = await medir_escenarios(http, headers, seleccion, args, rnd)
+            imprimir(resultado["endpoints"])
+
+            regresiones = {}
+            if base is not None:
+                regresiones = comparar(resultado["endpoints"], base, args.umbral, args.margen_ms)
+                if regresiones:
+                    # Solo cuenta la regresión que se repite al volver a medir esos endpoints
+                    print(f"posible regresión en {len(regresiones)} endpoints; midiendo de nuevo")
+                    repetidos = await medir_escenarios(http, headers, [e for e in seleccion if e[0] in regresiones], args, rnd)
+                    confirmadas = comparar(repetidos, base, args.umbral, args.margen_ms)
+                    regresiones = {
+                        nombre: regresiones[nombre] + ["al repetir: " + ", ".join(confirmadas[nombre])]
+                        for nombre in confirmadas if nombre in regresiones
+                    }
+        await audit_log.flush()
+
+    fallos = sum(1 for medida in resultado["endpoints"].values() if medida["errores"])
+    if args.resultado:
+        with open(args.resultado, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline)), exist_ok=True)
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"línea base guardada en {baseline}")
+    elif base is not None:
+        for nombre, mensajes in regresiones.items():
+            print(f"REGRESIÓN {nombre}: {'; '.join(mensajes)}")
+        if not regresiones:
+            print(f"sin regresiones frente a {baseline} (umbral {args.umbral:.0%})")
+        fallos += len(regresiones)
+    else:
+        print(f"sin línea base en {baseline}; créala con --guardar-baseline")
+
+    if fallos:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="10k")
+    parser.add_argument("--peticiones", type=int, default=200, help="peticiones por endpoint (las escrituras y el login usan una fracción)")
+    parser.add_argument("--concurrencia", type=int, default=4)
+    parser.add_argument("--rondas", type=int, default=3, help="rondas alternando endpoints; las peticiones se reparten entre ellas")
+    parser.add_argument("--solo", type=lambda valor: valor.split(","), default=None, help="routers a medir, separados por comas")
+    parser.add_argument("--semilla", type=int, default=19)
+    parser.add_argument("--sin-sembrar", action="store_true", help="reutilizar una base ya sembrada")
+    parser.add_argument("--baseline", default=None, help="JSON de la línea base (por defecto baselines/<dialecto>-<escala>.json)")
+    parser.add_argument("--guardar-baseline", action="store_true", help="guardar esta ejecución como línea base")
+    parser.add_argument("--umbral", type=float, default=0.25, help="empeoramiento tolerado (0.25 = 25 %%)")
+    parser.add_argument("--margen-ms", type=float, default=2.0, help="diferencia mínima en ms para contar como regresión")
+    parser.add_argument("--resultado", default=None, help="guardar también los resultados en este JSON")
+    sys.exit(asyncio.run(main(parser.parse_args())))
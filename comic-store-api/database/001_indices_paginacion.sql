@@ -0,0 +1,15 @@
+-- Índices de la paginación por cursor (keyset) de los listados de pedidos,
+-- movimientos de inventario y compras: cada listado ordena y filtra por
+-- (fecha, id). En una base nueva los crea el modelo; en una existente hay
+-- que ejecutar este script una vez, antes de desplegar la API.
+--
+--     mysql -u root -p ComicStore < database/001_indices_paginacion.sql
+
+CREATE INDEX `ix_Pedidos_fecha_creacion_id_pedido`
+    ON `Pedidos` (fecha_creacion, id_pedido);
+
+CREATE INDEX `ix_Inventario_fecha_movimiento_id_movimiento`
+    ON `Inventario` (fecha_movimiento, id_movimiento);
+
+CREATE INDEX `ix_ComprasProveedores_fecha_orden_id_compra`
+    ON `ComprasProveedores` (fecha_orden, id_compra);
@@ -0,0 +1,13 @@
+-- Tabla de secuencias (app/models/secuencias.py): el consecutivo diario de
+-- los números de pedido y de compra (filas "PED-YYYYMMDD" y
+-- "COMP-YYYYMMDD", que la API crea al primer uso de cada día) y la versión
+-- del catálogo de los ETag (fila "catalogo", que crea el arranque de la API).
+-- Ejecutar una vez en una base existente, antes de desplegar la API.
+--
+--     mysql -u root -p ComicStore < database/002_secuencias.sql
+
+CREATE TABLE IF NOT EXISTS `Secuencias` (
+    nombre VARCHAR(50) NOT NULL,
+    valor BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (nombre)
+) ENGINE=InnoDB;
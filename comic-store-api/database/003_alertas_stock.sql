@@ -0,0 +1,19 @@
+-- Índice de alertas de stock (app/models/inventario.py, AlertasStock): una
+-- fila por producto con stock_actual < stock_minimo, mantenida en la misma
+-- transacción que cada cambio de stock. Ejecutar una vez en una base
+-- existente, antes de desplegar la API.
+--
+--     mysql -u root -p ComicStore < database/003_alertas_stock.sql
+--
+-- La carga inicial es la misma comprobación que hace la API al arrancar
+-- (verificar_alertas con reparar=True) y que ofrece el endpoint de
+-- administración para reparar el índice.
+
+CREATE TABLE IF NOT EXISTS `AlertasStock` (
+    id_producto INTEGER NOT NULL,
+    PRIMARY KEY (id_producto),
+    FOREIGN KEY (id_producto) REFERENCES `Productos` (id_producto) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO `AlertasStock` (id_producto)
+SELECT id_producto FROM `Productos` WHERE stock_actual < stock_minimo;
@@ -0,0 +1,40 @@
+-- Acumulados diarios de ventas (app/models/reportes.py) que leen los
+-- endpoints de /reportes: total del día, por producto y por categoría.
+-- Ejecutar una vez en una base existente, antes de desplegar la API, y con
+-- la API nueva ya desplegada (que suma cada pedido nuevo) cargar el
+-- historial:
+--
+--     mysql -u root -p ComicStore < database/004_ventas_diarias.sql
+--     python -m scripts.backfill_ventas
+
+CREATE TABLE IF NOT EXISTS `VentasDiarias` (
+    fecha DATE NOT NULL,
+    pedidos INTEGER NOT NULL DEFAULT 0,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `VentasDiariasProducto` (
+    fecha DATE NOT NULL,
+    id_producto INTEGER NOT NULL,
+    pedidos INTEGER NOT NULL DEFAULT 0,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_producto),
+    INDEX `ix_VentasDiariasProducto_id_producto_fecha` (id_producto, fecha),
+    FOREIGN KEY (id_producto) REFERENCES `Productos` (id_producto) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `VentasDiariasCategoria` (
+    fecha DATE NOT NULL,
+    id_categoria INTEGER NOT NULL,
+    pedidos INTEGER NOT NULL DEFAULT 0,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_categoria),
+    FOREIGN KEY (id_categoria) REFERENCES `Categorias` (id_categoria) ON DELETE CASCADE
+) ENGINE=InnoDB;
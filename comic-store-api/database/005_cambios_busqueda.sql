@@ -0,0 +1,19 @@
+-- Registro de cambios de los índices de búsqueda (app/models/busqueda.py):
+-- cada escritura de productos, clientes o proveedores anota aquí, en su
+-- misma transacción, los documentos que cambia, y cada worker los reindexa
+-- antes de su siguiente búsqueda. Ejecutar una vez en una base existente,
+-- antes de desplegar la API.
+--
+--     mysql -u root -p ComicStore < database/005_cambios_busqueda.sql
+--
+-- No necesita carga inicial: cada worker construye sus índices completos al
+-- arrancar y solo aplica los cambios posteriores.
+
+CREATE TABLE IF NOT EXISTS `CambiosBusqueda` (
+    id_cambio INTEGER NOT NULL AUTO_INCREMENT,
+    indice VARCHAR(20) NOT NULL,
+    id_registro INTEGER NOT NULL,
+    fecha DATETIME NOT NULL,
+    PRIMARY KEY (id_cambio),
+    INDEX `ix_CambiosBusqueda_fecha` (fecha)
+) ENGINE=InnoDB;
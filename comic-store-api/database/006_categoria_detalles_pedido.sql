@@ -0,0 +1,20 @@
+-- Categoría de cada línea de pedido en el momento de la venta
+-- (DetallesPedido.id_categoria): los acumulados por categoría suman, restan
+-- al cancelar y se reconstruyen con ella, aunque el producto cambie después
+-- de categoría. Ejecutar una vez en una base existente, antes de desplegar
+-- la API.
+--
+--     mysql -u root -p ComicStore < database/006_categoria_detalles_pedido.sql
+--
+-- Las líneas anteriores toman la categoría actual de su producto (la única
+-- que se conoce), la misma que usaron los acumulados ya calculados.
+
+ALTER TABLE `DetallesPedido` ADD COLUMN id_categoria INTEGER NULL;
+
+UPDATE `DetallesPedido` d
+JOIN `Productos` p ON p.id_producto = d.id_producto
+SET d.id_categoria = p.id_categoria;
+
+ALTER TABLE `DetallesPedido`
+    MODIFY id_categoria INTEGER NOT NULL,
+    ADD FOREIGN KEY (id_categoria) REFERENCES `Categorias` (id_categoria);
@@ -0,0 +1,53 @@
+"""
+Reconstruye los acumulados diarios de ventas (VentasDiarias,
+VentasDiariasProducto, VentasDiariasCategoria) a partir del historial de
+pedidos.
+
+Procesa el rango por lotes de días, cada uno en su propia transacción, para
+no bloquear el primario durante toda la reconstrucción. Es idempotente: cada
+lote borra y vuelve a calcular sus días.
+
+Uso (desde comic-store-api/):
+
+    python -m scripts.backfill_ventas                       # todo el historial
+    python -m scripts.backfill_ventas --desde 2024-01-01 --hasta 2024-03-31
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app.core.ventas import reconstruir_ventas
+from app.database import engine
+from app.models.pedidos import Pedidos
+# Registrar el resto de modelos para que se resuelvan las relaciones
+from app.models import base, clientes, compras, empleados, inventario, logs, productos, proveedores  # noqa: F401
+
+def main(desde: date, hasta: date, dias_por_lote: int) -> None:
+    if desde is None:
+        with engine.connect() as conn:
+            primero = conn.scalar(select(func.min(Pedidos.fecha_creacion)))
+        if primero is None:
+            print("No hay pedidos; nada que reconstruir")
+            return
+        desde = primero.date()
+
+    inicio = time.perf_counter()
+    lote_desde = desde
+    while lote_desde <= hasta:
+        lote_hasta = min(lote_desde + timedelta(days=dias_por_lote - 1), hasta)
+        t = time.perf_counter()
+        with engine.begin() as conn:
+            reconstruir_ventas(conn, lote_desde, lote_hasta)
+        print(f"{lote_desde} a {lote_hasta}: {time.perf_counter() - t:.2f} s")
+        lote_desde = lote_hasta + timedelta(days=1)
+    print(f"Acumulados de {desde} a {hasta} reconstruidos en {time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="primer día (por defecto el del primer pedido)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date.today(), help="último día (por defecto hoy)")
+    parser.add_argument("--dias-por-lote", type=int, default=31)
+    args = parser.parse_args()
+    main(args.desde, args.hasta, args.dias_por_lote)
@@ -0,0 +1,541 @@
+"""
+Genera datos sintéticos realistas para pruebas de carga: catálogo de cómics
+(series con números) y figuras por universo, clientes repartidos entre los
+niveles de membresía, años de pedidos con sus líneas, compras a proveedores
+con recepciones parciales y el libro de inventario completo, con
+stock_anterior/stock_nuevo encadenados y el stock final en Productos.
+
+La historia se simula en orden cronológico (inventario inicial, ventas,
+reposición por proveedor, recepciones y devoluciones por cancelación) y se
+escribe por lotes con executemany del INSERT compilado. Con la misma
+semilla genera exactamente los mismos datos. Termina con la numeración
+(Secuencias), el índice de alertas de stock y los acumulados de ventas
+coherentes, así que la API puede seguir operando sobre la base generada.
+
+Los catálogos base (estados, niveles, tipos de movimiento...) se crean si
+faltan; las tablas de datos deben estar vacías (--vaciar borra y recrea el
+esquema). La historia termina ayer para no pisar la numeración de hoy.
+
+Uso (desde comic-store-api/):
+
+    python -m scripts.generar_datos --productos 100000 --clientes 50000 --pedidos 2000000 --anios 3
+    python -m scripts.generar_datos --vaciar --pedidos 5000000 --semilla 7
+"""
+import argparse
+import heapq
+import random
+import time
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.auth import get_password_hash
+from app.core.ventas import reconstruir_ventas
+from app.database import Base, engine
+from app.models.base import Roles, Status
+from app.models.clientes import Clientes, NivelesMembresia
+from app.models.compras import ComprasProveedores, DetallesCompra
+from app.models.empleados import Empleados, Puestos
+from app.models.inventario import AlertasStock, Inventario, TiposMovimiento
+from app.models.pedidos import DetallesPedido, EstadosPedido, Pedidos
+from app.models.productos import Categorias, Comics, FigurasColeccion, Productos
+from app.models.proveedores import Proveedores
+from app.models.secuencias import Secuencias
+# Registrar el resto de modelos en Base.metadata
+from app.models import busqueda, logs, reportes  # noqa: F401
+
+# Catálogos base: nombre -> columnas adicionales
+CATALOGOS = [
+    (Status, "nombre_status", {"activo": {}, "inactivo": {}}),
+    (Roles, "nombre_rol", {"administrador": {}, "cajero": {}}),
+    (Puestos, "nombre_puesto", {"Gerente": {}, "Cajero": {}}),
+    (NivelesMembresia, "nombre_nivel", {
+        "Básico": {"descuento_porcentaje": 0, "puntos_por_compra": 1},
+        "Plata": {"descuento_porcentaje": 5, "puntos_por_compra": 2},
+        "Oro": {"descuento_porcentaje": 10, "puntos_por_compra": 5},
+    }),
+    (EstadosPedido, "nombre_estado", {"pendiente": {}, "procesando": {}, "entregado": {}, "cancelado": {}}),
+    (TiposMovimiento, "nombre_tipo", {"entrada": {}, "salida": {}, "ajuste": {}}),
+]
+
+# Reparto de clientes por nivel (Básico, Plata, Oro)
+PESOS_NIVEL = (70, 22, 8)
+
+PERSONAJES = ["Batman", "Superman", "Spider-Man", "Wonder Woman", "X-Men", "Hulk", "Thor", "Iron Man",
+              "Daredevil", "Wolverine", "Flash", "Linterna Verde", "Aquaman", "Deadpool", "Venom", "Robin",
+              "Capitán América", "Hellboy", "Spawn", "Sandman", "Watchmen", "Saga", "Invencible", "Catwoman"]
+SERIES = ["", "Año Uno", "Legado", "Origen", "Renacimiento", "Guerra Secreta", "Crisis", "Saga Clásica",
+          "Edición Deluxe", "Tierra Uno", "Black Label", "Ultimate"]
+GUIONISTAS = ["Frank Miller", "Alan Moore", "Grant Morrison", "Stan Lee", "Neil Gaiman", "Brian Bendis",
+              "Tom King", "Jason Aaron", "Ed Brubaker", "Geoff Johns", "Jonathan Hickman", "Scott Snyder"]
+UNIVERSOS = ["DC", "Marvel", "Image", "Dark Horse", "Star Wars", "Dragon Ball", "Transformers", "Anime"]
+MATERIALES = ["PVC", "Resina", "Vinilo", "Polystone", "Metal"]
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Sofía", "Jorge", "Lucía", "Miguel", "Elena", "Diego",
+           "Paula", "Javier", "Valeria", "Andrés", "Camila", "Raúl", "Daniela", "Pablo", "Regina", "Hugo"]
+APELLIDOS = ["García", "Martínez", "López", "Hernández", "González", "Pérez", "Sánchez", "Ramírez",
+             "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Cruz", "Morales", "Reyes", "Ortiz", "Castillo"]
+
+IVA_POR_MIL = 160
+PEDIDOS_EN_CURSO_DIAS = 3  # los pedidos de los últimos días siguen pendientes/procesando
+PROB_CANCELACION = 0.03
+PROB_COMPRA_CANCELADA = 0.02
+PROB_RECEPCION_PARCIAL = 0.15
+PROB_RESTO_LLEGA = 0.7
+
+def pesos(centavos: int) -> float:
+    """Importe en centavos a valor de columna DECIMAL(10, 2)."""
+    return centavos / 100
+
+class Escritor:
+    """
+    Acumula filas por tabla y las escribe cada ``lote`` filas con un único
+    ``executemany`` del cursor DBAPI sobre el INSERT compilado (SQLAlchemy
+    procesaría cada parámetro en Python, lo que triplica el tiempo). Al vaciar
+    una tabla vacía también las que van antes en ``orden`` para que las claves
+    foráneas siempre encuentren su fila.
+    """
+
+    def __init__(self, conn: Connection, lote: int, orden: List):
+        self.conn = conn
+        self.lote = lote
+        self.orden = orden
+        self.filas: Dict[Any, List[Dict]] = {model: [] for model in orden}
+        self.sentencias: Dict[Any, Tuple[str, Callable]] = {}
+        self.escritas: Dict[str, int] = {}
+
+    def add(self, model, fila: Dict):
+        filas = self.filas[model]
+        filas.append(fila)
+        if len(filas) >= self.lote:
+            self.flush(hasta=model)
+
+    def _sentencia(self, model, columnas: Tuple[str, ...]) -> Tuple[str, Callable]:
+        clave = (model, columnas)
+        if clave not in self.sentencias:
+            compilada = model.__table__.insert().compile(dialect=self.conn.dialect, column_keys=list(columnas))
+            orden = compilada.positiontup if compilada.positional else columnas
+            valores = itemgetter(*orden)
+            if len(orden) == 1:
+                # itemgetter de una sola clave no devuelve una tupla
+                valores = lambda fila, clave=orden[0]: (fila[clave],)  # noqa: E731
+            self.sentencias[clave] = (str(compilada), valores)
+        return self.sentencias[clave]
+
+    def flush(self, hasta=None):
+        cursor = None
+        for model in self.orden:
+            filas = self.filas[model]
+            if filas:
+                sql, valores = self._sentencia(model, tuple(filas[0]))
+                if cursor is None:
+                    cursor = self.conn.connection.cursor()
+                cursor.executemany(sql, [valores(fila) for fila in filas])
+                nombre = model.__tablename__
+                self.escritas[nombre] = self.escritas.get(nombre, 0) + len(filas)
+                self.filas[model] = []
+            if model is hasta:
+                break
+        if cursor is not None:
+            cursor.close()
+
+def asegurar_catalogos(conn: Connection) -> Dict[str, Dict[str, Any]]:
+    """Crea los catálogos base que falten; devuelve nombre -> fila de cada uno."""
+    catalogos = {}
+    for model, columna, valores in CATALOGOS:
+        existentes = {getattr(fila, columna): fila for fila in conn.execute(select(model.__table__))}
+        faltantes = [{columna: nombre, **extra} for nombre, extra in valores.items() if nombre not in existentes]
+        if faltantes:
+            conn.execute(model.__table__.insert(), faltantes)
+            existentes = {getattr(fila, columna): fila for fila in conn.execute(select(model.__table__))}
+        catalogos[model.__tablename__] = existentes
+    return catalogos
+
+def generar(
+    motor: Engine,
+    productos: int,
+    clientes: int,
+    pedidos: int,
+    anios: int = 3,
+    proveedores: int = 50,
+    empleados: int = 20,
+    semilla: int = 1,
+    lote: int = 20_000,
+    acumulados: bool = True,
+    admin_password: str = "admin123",
+) -> Dict[str, int]:
+    """Genera la historia completa en ``motor``; devuelve las filas escritas por tabla."""
+    rnd = random.Random(semilla)
+    fin = datetime.combine(date.today(), datetime.min.time())  # la historia acaba ayer
+    inicio = fin - timedelta(days=365 * anios)
+    segundos = (fin - inicio).total_seconds()
+
+    with motor.begin() as conn:
+        for model in (Productos, Clientes, Pedidos, ComprasProveedores, Inventario):
+            if conn.scalar(select(func.count()).select_from(model)):
+                raise SystemExit(f"La tabla {model.__tablename__} no está vacía; usa --vaciar para recrear el esquema")
+
+        catalogos = asegurar_catalogos(conn)
+        activo = catalogos["Status"]["activo"].id_status
+        niveles = sorted(catalogos["NivelesMembresia"].values(), key=lambda nivel: nivel.id_nivel)
+        estados = {nombre: fila.id_estado for nombre, fila in catalogos["EstadosPedido"].items()}
+        tipos = {nombre: fila.id_tipo_movimiento for nombre, fila in catalogos["TiposMovimiento"].items()}
+        escritor = Escritor(conn, lote, [
+            Categorias, Proveedores, Empleados, Productos, Comics, FigurasColeccion, Clientes,
+            Pedidos, DetallesPedido, ComprasProveedores, DetallesCompra, Inventario, AlertasStock, Secuencias,
+        ])
+
+        # Empleados: el administrador (si no existe) y cajeros con una contraseña común
+        hash_cajeros = get_password_hash("cajero123")
+        ids_empleados = [fila.id_empleado for fila in conn.execute(select(Empleados.id_empleado))]
+        siguiente_empleado = max(ids_empleados, default=0) + 1
+        if not ids_empleados:
+            escritor.add(Empleados, {
+                "id_empleado": siguiente_empleado, "nombre": "Admin", "apellidos": "ComicStore",
+                "email": "admin@comicstore.example.com", "id_puesto": catalogos["Puestos"]["Gerente"].id_puesto,
+                "id_status": activo, "nombre_usuario": "admin", "password_hash": get_password_hash(admin_password),
+                "id_rol": catalogos["Roles"]["administrador"].id_rol, "fecha_contratacion": inicio.date(),
+            })
+            ids_empleados.append(siguiente_empleado)
+            siguiente_empleado += 1
+        cajeros = []
+        for i in range(empleados):
+            cajeros.append(siguiente_empleado + i)
+            escritor.add(Empleados, {
+                "id_empleado": siguiente_empleado + i, "nombre": rnd.choice(NOMBRES), "apellidos": rnd.choice(APELLIDOS),
+                "email": f"cajero{i}@comicstore.example.com", "id_puesto": catalogos["Puestos"]["Cajero"].id_puesto,
+                "id_status": activo, "nombre_usuario": f"cajero{i}", "password_hash": hash_cajeros,
+                "id_rol": catalogos["Roles"]["cajero"].id_rol,
+                "fecha_contratacion": (inicio - timedelta(days=rnd.randint(0, 1500))).date(),
+            })
+        vendedores = cajeros or ids_empleados
+
+        # Catálogo
+        categorias = ["Comics", "Figuras", "Accesorios"]
+        for i, nombre in enumerate(categorias):
+            escritor.add(Categorias, {"id_categoria": i + 1, "nombre_categoria": nombre})
+        plazos = []
+        for i in range(proveedores):
+            plazos.append(rnd.randint(3, 21))
+            escritor.add(Proveedores, {
+                "id_proveedor": i + 1, "nombre": f"Distribuidora {rnd.choice(APELLIDOS)} {i}",
+                "email": f"proveedor{i}@comicstore.example.com", "tiempo_entrega_promedio": plazos[-1], "id_status": activo,
+            })
+
+        precio = [0] * (productos + 1)  # centavos
+        costo = [0] * (productos + 1)
+        stock = [0] * (productos + 1)
+        minimo = [0] * (productos + 1)
+        proveedor = [0] * (productos + 1)
+        categoria = [0] * (productos + 1)
+        numeros_serie: Dict[str, int] = {}
+        for id_producto in range(1, productos + 1):
+            tipo = rnd.random()
+            minimo[id_producto] = rnd.randint(3, 15)
+            stock[id_producto] = rnd.randint(minimo[id_producto] * 2, minimo[id_producto] * 8)
+            proveedor[id_producto] = rnd.randint(1, proveedores)
+            personaje = rnd.choice(PERSONAJES)
+            if tipo < 0.6:
+                serie = f"{personaje} {rnd.choice(SERIES)}".strip()
+                numero = numeros_serie[serie] = numeros_serie.get(serie, 0) + 1
+                nombre, id_categoria = f"{serie} #{numero}", 1
+                precio[id_producto] = rnd.randrange(5990, 34990, 100)
+            elif tipo < 0.9:
+                universo = rnd.choice(UNIVERSOS)
+                nombre, id_categoria = f"Figura {personaje} ({universo})", 2
+                precio[id_producto] = rnd.randrange(29900, 299900, 1000)
+            else:
+                nombre, id_categoria = f"Accesorio {personaje} {id_producto}", 3
+                precio[id_producto] = rnd.randrange(4990, 49990, 500)
+            costo[id_producto] = precio[id_producto] * rnd.randint(45, 65) // 100
+            categoria[id_producto] = id_categoria
+            escritor.add(Productos, {
+                "id_producto": id_producto, "sku": f"CS-{id_producto:08d}", "nombre": nombre[:100],
+                "id_categoria": id_categoria, "stock_actual": stock[id_producto], "stock_minimo": minimo[id_producto],
+                "precio_compra": pesos(costo[id_producto]), "precio_venta": pesos(precio[id_producto]),
+                "id_proveedor": proveedor[id_producto], "id_status": activo,
+                "fecha_lanzamiento": (inicio - timedelta(days=rnd.randint(0, 3650))).date(),
+            })
+            if id_categoria == 1:
+                escritor.add(Comics, {
+                    "id_producto": id_producto, "titulo": nombre[:255], "numero": numero,
+                    "isbn": f"978-{id_producto:010d}", "guionista": rnd.choice(GUIONISTAS),
+                    "fecha_publicacion": (inicio - timedelta(days=rnd.randint(0, 3650))).date(),
+                })
+            elif id_categoria == 2:
+                escritor.add(FigurasColeccion, {
+                    "id_producto": id_producto, "personaje": personaje, "universo": universo,
+                    "material": rnd.choice(MATERIALES), "edicion_limitada": rnd.random() < 0.1,
+                    "numero_serie": f"{universo[:3].upper()}-{id_producto:07d}",
+                })
+
+        # Clientes
+        nivel_cliente = [0] * (clientes + 1)
+        for id_cliente in range(1, clientes + 1):
+            nivel_cliente[id_cliente] = rnd.choices(range(len(niveles)), PESOS_NIVEL[:len(niveles)])[0]
+            escritor.add(Clientes, {
+                "id_cliente": id_cliente, "nombre": rnd.choice(NOMBRES), "apellidos": f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+                "email": f"cliente{id_cliente}@comicstore.example.com", "telefono": f"55{rnd.randint(0, 99_999_999):08d}",
+                "fecha_registro": inicio - timedelta(days=rnd.randint(0, 730)), "puntos_acumulados": 0,
+                "id_nivel": niveles[nivel_cliente[id_cliente]].id_nivel, "id_status": activo,
+            })
+        descuento_nivel = [int(nivel.descuento_porcentaje or 0) for nivel in niveles]
+        puntos_nivel = [nivel.puntos_por_compra or 0 for nivel in niveles]
+        puntos = [0] * (clientes + 1)
+        ultima_compra: List[Any] = [None] * (clientes + 1)
+
+        # Inventario inicial
+        for id_producto in range(1, productos + 1):
+            escritor.add(Inventario, {
+                "id_producto": id_producto, "id_tipo_movimiento": tipos["ajuste"], "cantidad": stock[id_producto],
+                "stock_anterior": 0, "stock_nuevo": stock[id_producto], "id_empleado": vendedores[0],
+                "fecha_movimiento": inicio, "motivo": "Inventario inicial", "id_documento": None, "tipo_documento": "ajuste",
+            })
+
+        # Popularidad: unos pocos productos concentran la mayoría de las ventas
+        ranking = list(range(1, productos + 1))
+        rnd.shuffle(ranking)
+
+        def movimiento(id_producto, tipo, cantidad, anterior, fecha, empleado, motivo, id_documento, documento):
+            escritor.add(Inventario, {
+                "id_producto": id_producto, "id_tipo_movimiento": tipos[tipo], "cantidad": cantidad,
+                "stock_anterior": anterior, "stock_nuevo": stock[id_producto], "id_empleado": empleado,
+                "fecha_movimiento": fecha, "motivo": motivo, "id_documento": id_documento, "tipo_documento": documento,
+            })
+
+        # Eventos futuros (recepciones y devoluciones): (fecha, orden, tipo, datos)
+        eventos: List = []
+        orden_eventos = 0
+        pendiente = [False] * (productos + 1)  # ya hay una compra en camino
+        vendidas = [0] * (productos + 1)  # unidades vendidas desde la última compra
+        por_pedir: Dict[int, List[int]] = {}
+        compras: List[Dict] = []
+        secuencias: Dict[str, int] = {}
+
+        def siguiente_numero(prefijo: str, dia: datetime) -> str:
+            serie = f"{prefijo}-{dia:%Y%m%d}"
+            secuencias[serie] = secuencias.get(serie, 0) + 1
+            return f"{serie}-{secuencias[serie]:05d}"
+
+        def crear_compras(dia: datetime):
+            nonlocal orden_eventos
+            for id_proveedor in sorted(por_pedir):
+                lineas = por_pedir[id_proveedor]
+                fecha_orden = dia + timedelta(hours=8, seconds=rnd.randint(0, 3600))
+                id_compra = len(compras) + 1
+                cancelada = rnd.random() < PROB_COMPRA_CANCELADA
+                llegada = fecha_orden + timedelta(days=max(1, plazos[id_proveedor - 1] + rnd.randint(-2, 3)), hours=1)
+                detalles = []
+                for id_producto in lineas:
+                    cantidad = max(20, 2 * vendidas[id_producto], minimo[id_producto] * 3)
+                    vendidas[id_producto] = 0
+                    detalles.append({
+                        "id_compra": id_compra, "id_producto": id_producto, "cantidad_ordenada": cantidad,
+                        "cantidad_recibida": 0, "precio_unitario": costo[id_producto], "subtotal": costo[id_producto] * cantidad,
+                        "estado": "cancelado" if cancelada else "pendiente",
+                    })
+                    if cancelada:
+                        pendiente[id_producto] = False
+                subtotal = sum(d["subtotal"] for d in detalles)
+                compras.append({
+                    "id_compra": id_compra, "numero_compra": siguiente_numero("COMP", dia), "id_proveedor": id_proveedor,
+                    "fecha_orden": fecha_orden, "fecha_estimada_llegada": llegada.date(), "fecha_recepcion": None,
+                    "subtotal": subtotal, "impuestos": (subtotal * IVA_POR_MIL + 500) // 1000,
+                    "estado": "cancelado" if cancelada else "pendiente", "id_empleado": vendedores[0],
+                    "detalles": detalles,
+                })
+                if not cancelada:
+                    orden_eventos += 1
+                    heapq.heappush(eventos, (llegada, orden_eventos, "recepcion", (id_compra, None)))
+            por_pedir.clear()
+
+        def recibir(fecha: datetime, id_compra: int, solo):
+            nonlocal orden_eventos
+            compra = compras[id_compra - 1]
+            restos = []
+            for detalle in compra["detalles"]:
+                faltan = detalle["cantidad_ordenada"] - detalle["cantidad_recibida"]
+                if faltan <= 0 or (solo is not None and detalle["id_producto"] not in solo):
+                    continue
+                cantidad = faltan
+                if solo is None and rnd.random() < PROB_RECEPCION_PARCIAL:
+                    cantidad = max(1, faltan * rnd.randint(50, 90) // 100)
+                    if rnd.random() < PROB_RESTO_LLEGA:
+                        restos.append(detalle["id_producto"])
+                id_producto = detalle["id_producto"]
+                anterior = stock[id_producto]
+                stock[id_producto] += cantidad
+                pendiente[id_producto] = False
+                detalle["cantidad_recibida"] += cantidad
+                detalle["estado"] = "completo" if detalle["cantidad_recibida"] == detalle["cantidad_ordenada"] else "parcial"
+                movimiento(id_producto, "entrada", cantidad, anterior, fecha, compra["id_empleado"],
+                           f"Entrada por compra #{compra['numero_compra']}", id_compra, "compra")
+            compra["fecha_recepcion"] = fecha.date()
+            completa = all(d["estado"] == "completo" for d in compra["detalles"])
+            compra["estado"] = "entregado" if completa else "procesado"
+            if restos:
+                orden_eventos += 1
+                heapq.heappush(eventos, (fecha + timedelta(days=rnd.randint(3, 10)), orden_eventos, "recepcion", (id_compra, set(restos))))
+
+        def devolver(fecha: datetime, id_pedido: int, numero: str, lineas, empleado: int):
+            for id_producto, cantidad in lineas:
+                anterior = stock[id_producto]
+                stock[id_producto] += cantidad
+                movimiento(id_producto, "entrada", cantidad, anterior, fecha, empleado,
+                           f"Devolución por cancelación de pedido #{numero}", id_pedido, "pedido")
+
+        def procesar_evento():
+            momento, _, tipo, datos = heapq.heappop(eventos)
+            if tipo == "recepcion":
+                recibir(momento, *datos)
+            else:
+                devolver(momento, *datos)
+
+        # Ventas
+        paso = segundos / max(pedidos, 1)
+        dia_actual = inicio
+        en_curso_desde = fin - timedelta(days=PEDIDOS_EN_CURSO_DIAS)
+        id_pedido = 0
+        t0 = time.perf_counter()
+        for i in range(pedidos):
+            fecha = inicio + timedelta(seconds=(i + rnd.random()) * paso)
+            while eventos and eventos[0][0] <= fecha:
+                procesar_evento()
+            if fecha.date() != dia_actual.date():
+                # Un pedido a cada proveedor con lo que quedó bajo mínimo el día anterior
+                crear_compras(datetime.combine(fecha.date(), datetime.min.time()))
+                dia_actual = fecha
+
+            id_cliente = rnd.randint(1, clientes)
+            nivel = nivel_cliente[id_cliente]
+            empleado = rnd.choice(vendedores)
+            lineas = []
+            for _ in range(rnd.choice((1, 1, 1, 2, 2, 3, 4))):
+                for _ in range(3):  # otro producto si el elegido está agotado
+                    id_producto = ranking[int(productos * rnd.random() ** 3)]
+                    cantidad = min(rnd.choice((1, 1, 1, 1, 2, 3)), stock[id_producto])
+                    if cantidad and all(p != id_producto for p, _ in lineas):
+                        lineas.append((id_producto, cantidad))
+                        break
+            if not lineas:
+                continue
+
+            id_pedido += 1
+            numero = siguiente_numero("PED", fecha)
+            importes = []
+            for id_producto, cantidad in lineas:
+                # Descuento por unidad redondeado a centavos, como en POST /pedidos/
+                descuento_unitario = (precio[id_producto] * descuento_nivel[nivel] + 50) // 100
+                importes.append((descuento_unitario, (precio[id_producto] - descuento_unitario) * cantidad))
+            subtotal = sum(importe for _, importe in importes)
+            impuestos = (subtotal * IVA_POR_MIL + 500) // 1000
+            if rnd.random() < PROB_CANCELACION:
+                estado = estados["cancelado"]
+                orden_eventos += 1
+                heapq.heappush(eventos, (fecha + timedelta(minutes=rnd.randint(10, 2880)), orden_eventos, "devolucion",
+                                         (id_pedido, numero, lineas, empleado)))
+            elif fecha >= en_curso_desde:
+                estado = estados[rnd.choice(("pendiente", "procesando"))]
+            else:
+                estado = estados["entregado"]
+            # La cabecera antes que las líneas: un lote lleno escribe las tablas en orden
+            escritor.add(Pedidos, {
+                "id_pedido": id_pedido, "numero_pedido": numero, "fecha_creacion": fecha, "id_cliente": id_cliente,
+                "id_empleado": empleado, "subtotal": pesos(subtotal), "impuestos": pesos(impuestos),
+                "descuento": pesos((subtotal * descuento_nivel[nivel] + 50) // 100),
+                "total": pesos(subtotal + impuestos), "id_estado": estado, "notas": None,
+            })
+            for (id_producto, cantidad), (descuento_unitario, importe) in zip(lineas, importes):
+                escritor.add(DetallesPedido, {
+                    "id_pedido": id_pedido, "id_producto": id_producto, "cantidad": cantidad,
+                    "precio_unitario": pesos(precio[id_producto]), "descuento_unitario": pesos(descuento_unitario),
+                    "subtotal": pesos(importe), "id_categoria": categoria[id_producto],
+                })
+                anterior = stock[id_producto]
+                stock[id_producto] -= cantidad
+                vendidas[id_producto] += cantidad
+                movimiento(id_producto, "salida", cantidad, anterior, fecha, empleado,
+                           f"Salida por pedido #{numero}", id_pedido, "pedido")
+                if stock[id_producto] < minimo[id_producto] and not pendiente[id_producto]:
+                    pendiente[id_producto] = True
+                    por_pedir.setdefault(proveedor[id_producto], []).append(id_producto)
+            puntos[id_cliente] += puntos_nivel[nivel]
+            ultima_compra[id_cliente] = fecha
+
+            if id_pedido % 500_000 == 0:
+                print(f"  {id_pedido} pedidos ({id_pedido / (time.perf_counter() - t0):,.0f}/s)")
+
+        # Lo que ya debía ocurrir antes del final de la historia
+        while eventos and eventos[0][0] < fin:
+            procesar_evento()
+
+        for compra in compras:
+            detalles = compra.pop("detalles")
+            compra.update(subtotal=pesos(compra["subtotal"]), impuestos=pesos(compra["impuestos"]),
+                          total=pesos(compra["subtotal"] + compra["impuestos"]), notas=None)
+            escritor.add(ComprasProveedores, compra)
+            for detalle in detalles:
+                detalle.update(precio_unitario=pesos(detalle["precio_unitario"]), subtotal=pesos(detalle["subtotal"]))
+                escritor.add(DetallesCompra, detalle)
+        for id_producto in range(1, productos + 1):
+            if stock[id_producto] < minimo[id_producto]:
+                escritor.add(AlertasStock, {"id_producto": id_producto})
+        for serie, valor in secuencias.items():
+            escritor.add(Secuencias, {"nombre": serie, "valor": valor})
+        escritor.flush()
+
+        # Estado final de productos y clientes
+        for desde in range(1, productos + 1, lote):
+            conn.execute(
+                update(Productos.__table__).where(Productos.__table__.c.id_producto == bindparam("b_id")),
+                [{"b_id": p, "stock_actual": stock[p]} for p in range(desde, min(desde + lote, productos + 1))],
+            )
+        for desde in range(1, clientes + 1, lote):
+            conn.execute(
+                update(Clientes.__table__).where(Clientes.__table__.c.id_cliente == bindparam("b_id")),
+                [{"b_id": c, "puntos_acumulados": puntos[c], "fecha_ultima_compra": ultima_compra[c]}
+                 for c in range(desde, min(desde + lote, clientes + 1)) if ultima_compra[c] is not None],
+            )
+
+    if acumulados and id_pedido:
+        # Acumulados de ventas por meses, como scripts/backfill_ventas.py
+        desde = inicio.date()
+        while desde < fin.date():
+            hasta = min(desde + timedelta(days=30), fin.date() - timedelta(days=1))
+            with motor.begin() as conn:
+                reconstruir_ventas(conn, desde, hasta)
+            desde = hasta + timedelta(days=1)
+
+    return escritor.escritas
+
+def main(args) -> None:
+    if args.vaciar:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    inicio = time.perf_counter()
+    escritas = generar(
+        engine, args.productos, args.clientes, args.pedidos, args.anios, args.proveedores, args.empleados,
+        args.semilla, args.lote, not args.sin_acumulados, args.admin_password,
+    )
+    transcurrido = time.perf_counter() - inicio
+    total = sum(escritas.values())
+    for tabla, filas in sorted(escritas.items(), key=lambda item: -item[1]):
+        print(f"{tabla:22s} {filas:>12,}")
+    print(f"{total:,} filas en {transcurrido:.1f} s ({total / transcurrido:,.0f} filas/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--clientes", type=int, default=5_000)
+    parser.add_argument("--pedidos", type=int, default=100_000)
+    parser.add_argument("--anios", type=int, default=3, help="años de historia hasta ayer")
+    parser.add_argument("--proveedores", type=int, default=50)
+    parser.add_argument("--empleados", type=int, default=20, help="cajeros (usuario cajeroN, contraseña cajero123)")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--lote", type=int, default=20_000, help="filas por INSERT")
+    parser.add_argument("--vaciar", action="store_true", help="borrar y recrear el esquema antes de generar")
+    parser.add_argument("--sin-acumulados", action="store_true", help="no reconstruir los acumulados de ventas")
+    parser.add_argument("--admin-password", default="admin123", help="contraseña del usuario admin si hay que crearlo")
+    main(parser.parse_args())
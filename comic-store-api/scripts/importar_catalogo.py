@@ -0,0 +1,63 @@
+"""
+Importa en bloque productos con su comic o figura desde un archivo CSV o
+NDJSON, con el mismo formato y las mismas validaciones que
+``POST /productos/importar``.
+
+Las filas se validan e insertan por lotes, cada uno en su transacción; las
+filas con errores no se importan y se listan con su número de fila (o se
+guardan en ``--reporte`` como JSON). Los workers de la API ven los productos
+nuevos en los listados en cuanto releen la versión del catálogo; el índice de
+búsqueda los incluye en su siguiente reconstrucción periódica.
+
+Uso (desde comic-store-api/):
+
+    python -m scripts.importar_catalogo solicits-2024-06.csv
+    python -m scripts.importar_catalogo solicits.ndjson --dry-run --reporte errores.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from app.config import settings
+from app.core.importacion import importar_catalogo, leer_filas
+from app.database import AsyncSessionLocal
+# Registrar el resto de modelos para que se resuelvan las relaciones
+from app.models import base, clientes, compras, empleados, inventario, logs, pedidos, productos, proveedores  # noqa: F401
+
+async def main(args) -> int:
+    formato = args.formato or ("csv" if os.path.splitext(args.archivo)[1].lower() == ".csv" else "ndjson")
+    inicio = time.perf_counter()
+    with open(args.archivo, "rb") as archivo:
+        async with AsyncSessionLocal() as db:
+            resultado = await importar_catalogo(db, leer_filas(archivo, formato), args.lote, args.dry_run)
+    transcurrido = time.perf_counter() - inicio
+
+    accion = "válidos" if args.dry_run else "importados"
+    print(
+        f"{resultado['filas']:,} filas, {resultado['importados']:,} productos {accion} "
+        f"({resultado['comics']:,} comics, {resultado['figuras']:,} figuras), "
+        f"{len(resultado['errores']):,} con errores, en {transcurrido:.1f} s"
+    )
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as reporte:
+            json.dump(resultado["errores"], reporte, ensure_ascii=False, indent=2)
+        print(f"Errores guardados en {args.reporte}")
+    else:
+        for error in resultado["errores"][:args.max_errores]:
+            print(f"  fila {error['fila']} ({error['sku'] or 'sin SKU'}): {'; '.join(error['errores'])}")
+        if len(resultado["errores"]) > args.max_errores:
+            print(f"  ... y {len(resultado['errores']) - args.max_errores:,} más (use --reporte)")
+    return 1 if resultado["errores"] else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], default=None, help="por defecto según la extensión")
+    parser.add_argument("--lote", type=int, default=settings.IMPORT_BATCH_SIZE, help="filas por transacción")
+    parser.add_argument("--dry-run", action="store_true", help="solo validar")
+    parser.add_argument("--reporte", default=None, help="guardar los errores en este archivo JSON")
+    parser.add_argument("--max-errores", type=int, default=20, help="errores a mostrar sin --reporte")
+    sys.exit(asyncio.run(main(parser.parse_args())))